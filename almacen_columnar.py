@@ -0,0 +1,423 @@
+"""Almacenamiento columnar (NumPy) de beneficiarios.
+
+Cada campo del beneficiario se guarda en un arreglo: códigos int8 para los
+enums, int16 para la edad, códigos categóricos para enfermedad y herramienta
+y marcas de tiempo int64 (microsegundos desde 1970). Las estadísticas se
+calculan con np.bincount / sumas sobre columnas completas.
+
+numpy es una dependencia opcional: solo se necesita para usar este módulo.
+"""
+import weakref
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # numpy es opcional
+    np = None
+
+from instrumentacion import BUS_EVENTOS, instrumentado
+from proyecto_salud import (CELDAS_CUBO, LIMITES_FRANJAS_EDAD, Beneficiario, EstadisticasParciales,
+                            Genero, Institucion, RespuestaTratamiento, SeriesTemporales,
+                            TipoBeneficiario, codigo_celda, memorizar_por_version)
+
+TIPOS = list(TipoBeneficiario)
+GENEROS = list(Genero)
+RESPUESTAS = list(RespuestaTratamiento)
+_CODIGO_TIPO = {t: i for i, t in enumerate(TIPOS)}
+_CODIGO_GENERO = {g: i for i, g in enumerate(GENEROS)}
+_CODIGO_RESPUESTA = {r: i for i, r in enumerate(RESPUESTAS)}
+
+_EPOCA = datetime(1970, 1, 1)
+_MICROSEGUNDO = timedelta(microseconds=1)
+_MICROSEGUNDOS_POR_DIA = 24 * 3600 * 1000000
+
+
+def a_marca_tiempo(fecha: datetime) -> int:
+    """Convierte una fecha en microsegundos desde 1970 (sin zona horaria)"""
+    return (fecha - _EPOCA) // _MICROSEGUNDO
+
+
+def desde_marca_tiempo(marca: int) -> datetime:
+    """Convierte microsegundos desde 1970 en fecha"""
+    return _EPOCA + timedelta(microseconds=int(marca))
+
+
+def _requerir_numpy():
+    if np is None:
+        raise ImportError("El almacenamiento columnar requiere numpy (pip install numpy)")
+
+
+class Categorias:
+    """Diccionario de valores de texto <-> códigos enteros"""
+
+    def __init__(self):
+        self.__codigos: Dict[str, int] = {}
+        self.__valores: List[str] = []
+
+    def codificar(self, valor: str) -> int:
+        codigo = self.__codigos.get(valor)
+        if codigo is None:
+            codigo = len(self.__valores)
+            self.__codigos[valor] = codigo
+            self.__valores.append(valor)
+        return codigo
+
+    def valor(self, codigo: int) -> str:
+        return self.__valores[codigo]
+
+    @property
+    def valores(self) -> List[str]:
+        return self.__valores.copy()
+
+    def __len__(self):
+        return len(self.__valores)
+
+
+class AlmacenColumnar:
+    """Columnas de beneficiarios con crecimiento amortizado.
+
+    Las filas removidas se marcan como no vigentes para que los números de
+    fila (y las vistas FilaBeneficiario ya entregadas) sigan siendo válidos.
+    """
+
+    def __init__(self, capacidad_inicial: int = 1024,
+                 al_cambiar_respuesta: Optional[Callable] = None):
+        _requerir_numpy()
+        self.__cantidad = 0
+        self.__vigentes = 0
+        self.__nombres: List[str] = []
+        self.__enfermedades = Categorias()
+        self.__herramientas = Categorias()
+        self.__al_cambiar_respuesta = al_cambiar_respuesta
+        self.__vistas = weakref.WeakValueDictionary()
+        self.__observadores: Dict[int, List[Callable]] = {}
+        capacidad = max(1, capacidad_inicial)
+        self.__tipo = np.zeros(capacidad, dtype=np.int8)
+        self.__genero = np.zeros(capacidad, dtype=np.int8)
+        self.__respuesta = np.zeros(capacidad, dtype=np.int8)
+        self.__edad = np.zeros(capacidad, dtype=np.int16)
+        self.__enfermedad = np.zeros(capacidad, dtype=np.int32)
+        self.__herramienta = np.zeros(capacidad, dtype=np.int32)
+        self.__fecha = np.zeros(capacidad, dtype=np.int64)
+        self.__vigente = np.zeros(capacidad, dtype=bool)
+
+    def __len__(self):
+        return self.__vigentes
+
+    def __crecer(self):
+        """Duplica la capacidad de todas las columnas"""
+        capacidad = len(self.__tipo) * 2
+        for nombre in ("tipo", "genero", "respuesta", "edad", "enfermedad",
+                       "herramienta", "fecha", "vigente"):
+            atributo = f"_AlmacenColumnar__{nombre}"
+            anterior = getattr(self, atributo)
+            nueva = np.zeros(capacidad, dtype=anterior.dtype)
+            nueva[:self.__cantidad] = anterior[:self.__cantidad]
+            setattr(self, atributo, nueva)
+
+    def agregar(self, beneficiario: Beneficiario) -> int:
+        """Agrega un beneficiario y retorna su número de fila"""
+        if self.__cantidad == len(self.__tipo):
+            self.__crecer()
+        fila = self.__cantidad
+        self.__nombres.append(beneficiario.nombre)
+        self.__tipo[fila] = _CODIGO_TIPO[beneficiario.tipo]
+        self.__genero[fila] = _CODIGO_GENERO[beneficiario.genero]
+        self.__respuesta[fila] = _CODIGO_RESPUESTA[beneficiario.respuesta_tratamiento]
+        self.__edad[fila] = beneficiario.edad
+        self.__enfermedad[fila] = self.__enfermedades.codificar(beneficiario.enfermedad)
+        self.__herramienta[fila] = self.__herramientas.codificar(beneficiario.herramienta_tratamiento)
+        self.__fecha[fila] = a_marca_tiempo(beneficiario.fecha_registro)
+        self.__vigente[fila] = True
+        self.__cantidad += 1
+        self.__vigentes += 1
+        return fila
+
+    def remover(self, fila: int):
+        """Marca una fila como no vigente"""
+        if self.__vigente[fila]:
+            self.__vigente[fila] = False
+            self.__vigentes -= 1
+            self.__observadores.pop(fila, None)
+
+    def filas(self) -> Iterator[int]:
+        """Números de fila vigentes, en orden de registro"""
+        return (int(i) for i in np.flatnonzero(self.__vigente[:self.__cantidad]))
+
+    def vista(self, fila: int) -> "FilaBeneficiario":
+        """Retorna la vista de una fila (la misma instancia mientras siga en uso)"""
+        vista = self.__vistas.get(fila)
+        if vista is None:
+            vista = FilaBeneficiario(self, fila)
+            self.__vistas[fila] = vista
+        return vista
+
+    # Acceso a campos individuales (usado por FilaBeneficiario)
+    def nombre(self, fila: int) -> str:
+        return self.__nombres[fila]
+
+    def tipo(self, fila: int) -> TipoBeneficiario:
+        return TIPOS[self.__tipo[fila]]
+
+    def genero(self, fila: int) -> Genero:
+        return GENEROS[self.__genero[fila]]
+
+    def edad(self, fila: int) -> int:
+        return int(self.__edad[fila])
+
+    def enfermedad(self, fila: int) -> str:
+        return self.__enfermedades.valor(self.__enfermedad[fila])
+
+    def herramienta(self, fila: int) -> str:
+        return self.__herramientas.valor(self.__herramienta[fila])
+
+    def respuesta(self, fila: int) -> RespuestaTratamiento:
+        return RESPUESTAS[self.__respuesta[fila]]
+
+    def fecha_registro(self, fila: int) -> datetime:
+        return desde_marca_tiempo(self.__fecha[fila])
+
+    def actualizar_respuesta(self, fila: int, valor: RespuestaTratamiento):
+        """Cambia la respuesta al tratamiento de una fila"""
+        anterior = self.respuesta(fila)
+        self.__respuesta[fila] = _CODIGO_RESPUESTA[valor]
+        if anterior is not valor and self.__vigente[fila]:
+            vista = self.vista(fila)
+            for observador in list(self.__observadores.get(fila, [])):
+                observador(vista, anterior, valor)
+            if self.__al_cambiar_respuesta:
+                self.__al_cambiar_respuesta(vista)
+
+    def agregar_observador(self, fila: int, observador: Callable):
+        self.__observadores.setdefault(fila, []).append(observador)
+
+    def remover_observador(self, fila: int, observador: Callable):
+        observadores = self.__observadores.get(fila, [])
+        if observador in observadores:
+            observadores.remove(observador)
+
+    # Agregaciones vectorizadas
+    def __columna(self, columna):
+        return columna[:self.__cantidad][self.__vigente[:self.__cantidad]]
+
+    def obtener_parcial(self) -> EstadisticasParciales:
+        """Agregado parcial de las filas vigentes: el cubo sale de un solo
+        np.bincount sobre el código (herramienta, celda) de cada fila"""
+        edades = self.__columna(self.__edad)
+        celdas = codigo_celda(self.__columna(self.__tipo).astype(np.int64),
+                              self.__columna(self.__genero).astype(np.int64),
+                              self.__columna(self.__respuesta).astype(np.int64),
+                              np.searchsorted(LIMITES_FRANJAS_EDAD, edades, side="right"))
+        codigos = self.__columna(self.__herramienta).astype(np.int64) * CELDAS_CUBO + celdas
+        conteo = np.bincount(codigos, minlength=len(self.__herramientas) * CELDAS_CUBO)
+        valores = self.__herramientas.valores
+        return EstadisticasParciales.desde_conteos(
+            {(valores[codigo // CELDAS_CUBO], codigo % CELDAS_CUBO): int(conteo[codigo])
+             for codigo in np.flatnonzero(conteo).tolist()},
+            int(edades.sum(dtype=np.int64)))
+
+    def obtener_estadisticas(self) -> Dict:
+        """Estadísticas con el mismo formato que Institucion.obtener_estadisticas"""
+        if self.__vigentes == 0:
+            return {"total": 0}
+        return self.obtener_parcial().a_estadisticas()
+
+    def contar_herramientas(self) -> Dict[str, int]:
+        """Cuenta los beneficiarios por herramienta de tratamiento"""
+        conteo = np.bincount(self.__columna(self.__herramienta),
+                             minlength=len(self.__herramientas))
+        valores = self.__herramientas.valores
+        return {valores[i]: int(n) for i, n in enumerate(conteo) if n}
+
+    def obtener_series(self) -> SeriesTemporales:
+        """Series de ingresos y respuestas, contando cada (día, respuesta) con np.unique"""
+        dias = self.__columna(self.__fecha) // _MICROSEGUNDOS_POR_DIA
+        pares = dias * len(RESPUESTAS) + self.__columna(self.__respuesta)
+        valores, conteos = np.unique(pares, return_counts=True)
+        series = SeriesTemporales()
+        for valor, cantidad in zip(valores.tolist(), conteos.tolist()):
+            dia, respuesta = divmod(valor, len(RESPUESTAS))
+            series.agregar(_EPOCA + timedelta(days=dia), RESPUESTAS[respuesta], cantidad)
+        return series
+
+    def contar_enfermedades(self) -> Dict[str, int]:
+        """Cuenta los beneficiarios por enfermedad/padecimiento"""
+        conteo = np.bincount(self.__columna(self.__enfermedad),
+                             minlength=len(self.__enfermedades))
+        valores = self.__enfermedades.valores
+        return {valores[i]: int(n) for i, n in enumerate(conteo) if n}
+
+
+class FilaBeneficiario:
+    """Vista liviana de una fila del almacén con la interfaz de Beneficiario"""
+
+    __slots__ = ("__almacen", "__fila", "__weakref__")
+
+    def __init__(self, almacen: AlmacenColumnar, fila: int):
+        self.__almacen = almacen
+        self.__fila = fila
+
+    @property
+    def fila(self):
+        return self.__fila
+
+    @property
+    def nombre(self):
+        return self.__almacen.nombre(self.__fila)
+
+    @property
+    def tipo(self):
+        return self.__almacen.tipo(self.__fila)
+
+    @property
+    def genero(self):
+        return self.__almacen.genero(self.__fila)
+
+    @property
+    def edad(self):
+        return self.__almacen.edad(self.__fila)
+
+    @property
+    def enfermedad(self):
+        return self.__almacen.enfermedad(self.__fila)
+
+    @property
+    def herramienta_tratamiento(self):
+        return self.__almacen.herramienta(self.__fila)
+
+    @property
+    def respuesta_tratamiento(self):
+        return self.__almacen.respuesta(self.__fila)
+
+    @respuesta_tratamiento.setter
+    def respuesta_tratamiento(self, valor: RespuestaTratamiento):
+        self.__almacen.actualizar_respuesta(self.__fila, valor)
+
+    @property
+    def fecha_registro(self):
+        return self.__almacen.fecha_registro(self.__fila)
+
+    def agregar_observador(self, observador: Callable):
+        self.__almacen.agregar_observador(self.__fila, observador)
+
+    def remover_observador(self, observador: Callable):
+        self.__almacen.remover_observador(self.__fila, observador)
+
+    def get_data(self):
+        """Muestra información completa del beneficiario"""
+        print(f"""
+Id beneficiario: {self.nombre}
+Tipo: {self.tipo.value}
+Género: {self.genero.value}
+Edad: {self.edad}
+Enfermedad/Padecimiento: {self.enfermedad}
+Herramienta de tratamiento: {self.herramienta_tratamiento}
+Respuesta al tratamiento: {self.respuesta_tratamiento.value}
+""")
+
+    def __str__(self):
+        return f"{self.nombre} ({self.tipo.value}, {self.edad} años)"
+
+
+class InstitucionColumnar(Institucion):
+    """Institución que guarda sus beneficiarios en un AlmacenColumnar.
+
+    Conserva la interfaz de Institucion; buscar_beneficiario y beneficiarios
+    retornan vistas FilaBeneficiario en lugar de objetos Beneficiario.
+    """
+
+    def __init__(self, nombre: str, direccion: str, telefono: str, capacidad_inicial: int = 1024):
+        super().__init__(nombre, direccion, telefono)
+        self.__almacen = AlmacenColumnar(capacidad_inicial, self.__respuesta_actualizada)
+        self.__indice_nombres: Dict[str, List[int]] = {}
+
+    @property
+    def almacen(self) -> AlmacenColumnar:
+        return self.__almacen
+
+    @property
+    def beneficiarios(self):
+        return [self.__almacen.vista(fila) for fila in self.__almacen.filas()]
+
+    @property
+    def total_beneficiarios(self) -> int:
+        return len(self.__almacen)
+
+    def iterar_beneficiarios(self):
+        """Recorre los beneficiarios sin copiar la lista"""
+        return (self.__almacen.vista(fila) for fila in self.__almacen.filas())
+
+    def __respuesta_actualizada(self, vista: FilaBeneficiario):
+        self._notificar("respuesta_actualizada", vista)
+
+    def agregar_beneficiario(self, beneficiario: Beneficiario):
+        """Agrega un beneficiario de los 3 grupos a la institución"""
+        fila = self.__almacen.agregar(beneficiario)
+        self.__indice_nombres.setdefault(beneficiario.nombre, []).append(fila)
+        self._notificar("agregado", self.__almacen.vista(fila))
+        if BUS_EVENTOS.escuchado("beneficiario_agregado"):
+            BUS_EVENTOS.publicar("beneficiario_agregado", beneficiario=beneficiario.nombre,
+                                 institucion=self.nombre)
+
+    def remover_beneficiario(self, nombre: str) -> bool:
+        """Remueve un beneficiario por nombre"""
+        filas = self.__indice_nombres.get(nombre)
+        if filas:
+            fila = filas.pop(0)
+            if not filas:
+                del self.__indice_nombres[nombre]
+            vista = self.__almacen.vista(fila)
+            self.__almacen.remover(fila)
+            self._notificar("removido", vista)
+            BUS_EVENTOS.publicar("beneficiario_removido", beneficiario=nombre, institucion=self.nombre)
+            return True
+        BUS_EVENTOS.publicar("beneficiario_no_encontrado", beneficiario=nombre, institucion=self.nombre)
+        return False
+
+    def buscar_beneficiario(self, nombre: str) -> Optional[FilaBeneficiario]:
+        """Buscar beneficiario por su nombre"""
+        filas = self.__indice_nombres.get(nombre)
+        if filas:
+            return self.__almacen.vista(filas[0])
+        return None
+
+    def buscar_beneficiarios(self, nombre: str) -> List[FilaBeneficiario]:
+        """Todos los beneficiarios con ese nombre, en orden de registro"""
+        return [self.__almacen.vista(fila) for fila in self.__indice_nombres.get(nombre, [])]
+
+    def iterar_nombres(self):
+        """Recorre los nombres distintos de los beneficiarios"""
+        return iter(self.__indice_nombres)
+
+    def _calcular_estadisticas(self) -> Dict:
+        """Estadísticas calculadas sobre las columnas del almacén"""
+        return self.__almacen.obtener_estadisticas()
+
+    def recalcular_estadisticas(self) -> Dict:
+        """Estadísticas recorriendo las filas una por una, sin las operaciones
+        sobre columnas, para verificar las del almacén"""
+        return EstadisticasParciales.desde_valores(self.iterar_valores()).a_estadisticas()
+
+    def contar_herramientas(self) -> Dict[str, int]:
+        """Cuenta los beneficiarios por herramienta de tratamiento"""
+        return self.__almacen.contar_herramientas()
+
+    def obtener_parcial(self) -> EstadisticasParciales:
+        """Agregado parcial de la institución, calculado sobre las columnas"""
+        return self.__almacen.obtener_parcial()
+
+    @memorizar_por_version
+    def obtener_series(self) -> SeriesTemporales:
+        """Series de ingresos y respuestas, calculadas sobre las columnas"""
+        return self.__almacen.obtener_series()
+
+    def iterar_valores(self):
+        """Genera (tipo, genero, edad, respuesta, herramienta) por beneficiario"""
+        almacen = self.__almacen
+        for fila in almacen.filas():
+            yield (almacen.tipo(fila), almacen.genero(fila), almacen.edad(fila),
+                   almacen.respuesta(fila), almacen.herramienta(fila))
+
+    def __str__(self):
+        return f"{self.nombre} ({len(self.__almacen)} beneficiarios)"
@@ -0,0 +1,228 @@
+"""Pruebas de rendimiento del modelo con datos sintéticos.
+
+Para cada tamaño se genera un gestor con datos_sinteticos (misma semilla,
+mismos datos) y se mide el tiempo y la memoria máxima de:
+
+- agregar_beneficiario: carga de todos los beneficiarios,
+- buscar_beneficiario_global: búsquedas exactas y aproximadas,
+- obtener_estadisticas: con la caché vacía, y recalcular_estadisticas,
+- generar_reporte_consolidado: con la caché vacía y con la caché llena,
+- exportar_datos: reporte completo a un archivo temporal.
+
+El tiempo es el mejor de varias repeticiones (la carga se mide una sola
+vez). La memoria máxima se mide con tracemalloc en una ejecución aparte,
+porque tracemalloc hace más lento el código que observa.
+
+Los resultados se guardan en JSON. Con --comparar se contrastan contra un
+resultado anterior y el programa termina con código 1 si alguna operación
+es más lenta que el umbral (las diferencias de menos de un milisegundo no
+cuentan).
+
+Uso:
+    python benchmark.py --tamanos 1e3,1e4,1e5 --salida benchmark.json
+    python benchmark.py --tamanos 1e3,1e4,1e5 --comparar benchmark.json --umbral 0.2
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from datos_sinteticos import SEMILLA, crear_estructura, repartir
+from proyecto_salud import CACHE_REPORTES, GestorProyectos
+
+TAMANOS = "1e3,1e4,1e5"
+REPETICIONES = 3
+BUSQUEDAS = 1000
+UMBRAL = 0.2
+# Diferencias menores a esto (segundos) se consideran ruido de medición
+DIFERENCIA_MINIMA = 0.001
+ARCHIVO_RESULTADOS = "benchmark.json"
+
+
+def medir_tiempo(operacion: Callable, repeticiones: int,
+                 preparar: Optional[Callable] = None) -> float:
+    """Mejor tiempo de `repeticiones` ejecuciones; `preparar` corre antes de
+    cada una sin contar en el tiempo"""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        if preparar is not None:
+            preparar()
+        gc.collect()
+        inicio = time.perf_counter()
+        operacion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def medir_memoria(operacion: Callable, preparar: Optional[Callable] = None) -> int:
+    """Memoria máxima (bytes) reservada por Python durante la operación"""
+    if preparar is not None:
+        preparar()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        operacion()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return pico
+
+
+def _cargar(gestor: GestorProyectos, ubicaciones: List[Tuple]):
+    for institucion, beneficiario in ubicaciones:
+        institucion.agregar_beneficiario(beneficiario)
+
+
+def _buscar(gestor: GestorProyectos, nombres: List[str], aproximado: bool):
+    for nombre in nombres:
+        gestor.buscar_beneficiario_global(nombre, aproximado=aproximado)
+
+
+def _estadisticas(gestor: GestorProyectos, recalcular: bool):
+    for proyecto in gestor.proyectos:
+        for institucion in proyecto.instituciones:
+            if recalcular:
+                institucion.recalcular_estadisticas()
+            else:
+                institucion.obtener_estadisticas()
+
+
+def ejecutar_tamano(tamano: int, repeticiones: int = REPETICIONES, memoria: bool = True,
+                    semilla: int = SEMILLA) -> List[Dict]:
+    """Mide todas las operaciones para un tamaño. Retorna un resultado por operación"""
+    gestor = crear_estructura()
+    ubicaciones = list(repartir(gestor, tamano, semilla))
+    rng = random.Random(semilla)
+    nombres = [beneficiario.nombre for _, beneficiario in rng.sample(ubicaciones, min(BUSQUEDAS, tamano))]
+    # Nombres con errores de tipeo (dos letras intercambiadas) para la búsqueda aproximada
+    con_errores = []
+    for nombre in nombres[:max(1, len(nombres) // 10)]:
+        posicion = rng.randrange(len(nombre) - 1)
+        con_errores.append(nombre[:posicion] + nombre[posicion + 1] + nombre[posicion] + nombre[posicion + 2:])
+
+    resultados = []
+
+    def registrar(operacion: str, segundos: float, cantidad: int, pico: Optional[int]):
+        resultados.append({
+            "operacion": operacion,
+            "tamano": tamano,
+            "segundos": segundos,
+            "operaciones": cantidad,
+            "por_segundo": cantidad / segundos if segundos > 0 else None,
+            "memoria_pico_bytes": pico,
+        })
+        memoria_texto = f"{pico / 1e6:9.1f} MB" if pico is not None else ""
+        print(f"{tamano:>10} {operacion:<40} {segundos:10.4f} s {memoria_texto}", file=sys.stderr)
+
+    # La carga se mide una sola vez; el gestor cargado se usa para el resto
+    segundos = medir_tiempo(lambda: _cargar(gestor, ubicaciones), 1)
+    del ubicaciones
+    pico = None
+    if memoria:
+        # Beneficiarios nuevos (los mismos datos) para no compartirlos entre gestores
+        otra = crear_estructura()
+        copia = list(repartir(otra, tamano, semilla))
+        pico = medir_memoria(lambda: _cargar(otra, copia))
+        del otra, copia
+    registrar("agregar_beneficiario", segundos, tamano, pico)
+
+    archivo = tempfile.NamedTemporaryFile(suffix=".json", delete=False)
+    archivo.close()
+    operaciones = [
+        ("buscar_beneficiario_global", lambda: _buscar(gestor, nombres, False), len(nombres), None),
+        ("buscar_beneficiario_global_aproximado", lambda: _buscar(gestor, con_errores, True),
+         len(con_errores), None),
+        ("obtener_estadisticas", lambda: _estadisticas(gestor, False), 1, CACHE_REPORTES.limpiar),
+        ("recalcular_estadisticas", lambda: _estadisticas(gestor, True), 1, None),
+        ("generar_reporte_consolidado", gestor.generar_reporte_consolidado, 1, CACHE_REPORTES.limpiar),
+        ("generar_reporte_consolidado_cache", gestor.generar_reporte_consolidado, 1, None),
+        ("exportar_datos", lambda: gestor.exportar_datos(archivo.name), 1, None),
+    ]
+    try:
+        # Crea el índice de nombres antes de medir las búsquedas aproximadas
+        gestor.buscar_beneficiario_global("", aproximado=True)
+        for operacion, funcion, cantidad, preparar in operaciones:
+            segundos = medir_tiempo(funcion, repeticiones, preparar)
+            pico = medir_memoria(funcion, preparar) if memoria else None
+            registrar(operacion, segundos, cantidad, pico)
+    finally:
+        os.remove(archivo.name)
+    return resultados
+
+
+def comparar(actuales: List[Dict], anteriores: List[Dict], umbral: float) -> List[Dict]:
+    """Operaciones cuyo tiempo creció más que `umbral` (0.2 = 20%) respecto al resultado anterior"""
+    base = {(r["operacion"], r["tamano"]): r for r in anteriores}
+    regresiones = []
+    for resultado in actuales:
+        anterior = base.get((resultado["operacion"], resultado["tamano"]))
+        if anterior is None or anterior["segundos"] <= 0:
+            continue
+        cambio = resultado["segundos"] / anterior["segundos"] - 1
+        if cambio > umbral and resultado["segundos"] - anterior["segundos"] > DIFERENCIA_MINIMA:
+            regresiones.append({"operacion": resultado["operacion"], "tamano": resultado["tamano"],
+                                "anterior": anterior["segundos"], "actual": resultado["segundos"],
+                                "cambio": cambio})
+    return regresiones
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Mide el rendimiento del modelo con datos sintéticos")
+    parser.add_argument("--tamanos", default=TAMANOS,
+                        help=f"cantidades de beneficiarios separadas por comas (por defecto {TAMANOS})")
+    parser.add_argument("--repeticiones", type=int, default=REPETICIONES)
+    parser.add_argument("--semilla", type=int, default=SEMILLA)
+    parser.add_argument("--sin-memoria", action="store_true",
+                        help="no medir la memoria máxima (más rápido en tamaños grandes)")
+    parser.add_argument("--salida", default=ARCHIVO_RESULTADOS, help="archivo JSON de resultados")
+    parser.add_argument("--comparar", help="resultado anterior contra el que buscar regresiones")
+    parser.add_argument("--umbral", type=float, default=UMBRAL,
+                        help="aumento de tiempo tolerado antes de contar una regresión (0.2 = 20%%)")
+    args = parser.parse_args(argumentos)
+
+    # Leer la base antes de medir, por si --salida apunta al mismo archivo
+    anteriores = None
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            anteriores = json.load(f)["resultados"]
+
+    resultados = []
+    for tamano in (int(float(t)) for t in args.tamanos.split(",")):
+        resultados.extend(ejecutar_tamano(tamano, args.repeticiones, not args.sin_memoria, args.semilla))
+        CACHE_REPORTES.limpiar()
+        gc.collect()
+
+    informe = {
+        "fecha": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "semilla": args.semilla,
+        "repeticiones": args.repeticiones,
+        "resultados": resultados,
+    }
+    if anteriores is not None:
+        informe["umbral"] = args.umbral
+        informe["regresiones"] = comparar(resultados, anteriores, args.umbral)
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(informe, f, ensure_ascii=False, indent=2)
+    print(f"Resultados guardados en '{args.salida}'")
+
+    if informe.get("regresiones"):
+        for regresion in informe["regresiones"]:
+            print(f"REGRESIÓN {regresion['operacion']} ({regresion['tamano']}): "
+                  f"{regresion['anterior']:.4f} s -> {regresion['actual']:.4f} s "
+                  f"(+{regresion['cambio']:.0%})")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,713 @@
+"""Bitácora de cambios (write-ahead log) con instantáneas de compactación.
+
+Cada cambio del gestor se agrega como una línea JSON al final de
+`bitacora.jsonl`, en lugar de reescribir toda la base de datos:
+
+    {"secuencia": 1, "registro": "proyecto", "tipo": "Musicoterapia", "nombre": ..., ...}
+    {"secuencia": 2, "registro": "institucion", "id": 0, "nombre": ..., ...}
+    {"secuencia": 3, "registro": "vinculo", "proyecto": ..., "institucion": 0}
+    {"secuencia": 4, "registro": "beneficiario", "institucion": 0, "nombre": ..., ...}
+    {"secuencia": 5, "registro": "respuesta", "institucion": 0, "nombre": ..., "orden": 0,
+     "respuesta": "Buena"}
+    {"secuencia": 6, "registro": "baja", "institucion": 0, "nombre": ...}
+
+Los registros se escriben al búfer del archivo y se sincronizan a disco
+(fsync) en grupo: cada `ventana_commit` segundos, o antes si se acumulan
+`max_pendientes` registros. Ante una caída se pierden a lo sumo los
+registros de la última ventana. Con ventana_commit=0 se sincroniza cada
+registro.
+
+compactar() guarda una instantánea completa (persistencia.py) en
+`instantanea.jsonl`, con la secuencia del último registro que incluye, y
+vacía la bitácora. Al recuperar se carga la instantánea y se reproducen solo
+los registros posteriores a esa secuencia; un último registro incompleto
+(la escritura que se cortó con la caída) se descarta.
+
+La compactación debe hacerse cuando ningún otro hilo esté modificando el
+gestor.
+
+Para solo leer los datos, cargar() y cargar_parciales() usan el índice de la
+instantánea (persistencia.py) y leen únicamente los proyectos pedidos y, en
+el caso de los parciales, solo las instituciones que cambiaron después de la
+instantánea. cambios_desde() usa la secuencia como marca de agua: resume los
+cambios posteriores a una secuencia dada (exportacion_incremental.py).
+
+Uso:
+    bitacora = Bitacora.iniciar(gestor, "datos_salud")
+    gestor, bitacora, resumen = Bitacora.recuperar("datos_salud")
+    gestor, resumen = cargar("datos_salud", proyectos=["Melodía Vital"])
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from persistencia import (ErrorInstantanea, beneficiario_a_registro, buscar_en_bloque,
+                          cargar_instantanea, cargar_instituciones, guardar_instantanea, leer_indice,
+                          numerar_instituciones, registro_a_beneficiario, registro_a_parcial,
+                          registro_a_proyecto)
+from proyecto_salud import (Beneficiario, EstadisticasParciales, GestorProyectos, Institucion,
+                            Proyecto, RespuestaTratamiento)
+
+DIRECTORIO_DATOS = "datos_salud"
+ARCHIVO_BITACORA = "bitacora.jsonl"
+ARCHIVO_INSTANTANEA = "instantanea.jsonl"
+# Segundos máximos que un registro puede quedar sin sincronizar a disco
+VENTANA_COMMIT = 0.05
+# Registros que fuerzan una sincronización aunque no haya pasado la ventana
+MAX_PENDIENTES = 1000
+# Registros tras los cuales compactar_si_corresponde() guarda una instantánea
+COMPACTAR_CADA = 100000
+
+# Un solo codificador: json.dumps con opciones crea uno nuevo en cada llamada
+_codificar = json.JSONEncoder(ensure_ascii=False).encode
+
+
+class ErrorBitacora(Exception):
+    """La bitácora está dañada o cerrada"""
+
+
+class Bitacora:
+    """Registra los cambios de un GestorProyectos en una bitácora de solo agregado"""
+
+    def __init__(self, directorio: str = DIRECTORIO_DATOS, ventana_commit: float = VENTANA_COMMIT,
+                 max_pendientes: int = MAX_PENDIENTES, compactar_cada: Optional[int] = COMPACTAR_CADA):
+        self.__directorio = directorio
+        self.__ventana_commit = ventana_commit
+        self.__max_pendientes = max_pendientes
+        self.__compactar_cada = compactar_cada
+        self.__gestor: Optional[GestorProyectos] = None
+        # Instituciones registradas; su posición es el id que usan los registros
+        self.__instituciones: List[Institucion] = []
+        self.__ids: Dict[int, int] = {}
+        self.__archivo = None
+        self.__secuencia = 0
+        self.__sincronizada = 0
+        self.__pendientes = 0
+        self.__desde_instantanea = 0
+        self.__metricas = {"registros": 0, "sincronizaciones": 0, "segundos_sincronizacion": 0.0,
+                           "compactaciones": 0}
+        # __cerrojo protege el búfer y los contadores; __cerrojo_disco se toma
+        # antes, mientras se sincroniza o se reemplaza el archivo, para que los
+        # escritores no esperen a fsync
+        self.__cerrojo = threading.Lock()
+        self.__cerrojo_disco = threading.Lock()
+        self.__detener = threading.Event()
+        self.__hilo: Optional[threading.Thread] = None
+
+    @staticmethod
+    def existe(directorio: str = DIRECTORIO_DATOS) -> bool:
+        """Indica si el directorio tiene una instantánea o una bitácora"""
+        return (os.path.exists(os.path.join(directorio, ARCHIVO_INSTANTANEA))
+                or os.path.exists(os.path.join(directorio, ARCHIVO_BITACORA)))
+
+    @classmethod
+    def iniciar(cls, gestor: GestorProyectos, directorio: str = DIRECTORIO_DATOS,
+                **opciones) -> "Bitacora":
+        """Empieza a registrar los cambios de `gestor`, partiendo de una
+        instantánea de su estado actual"""
+        os.makedirs(directorio, exist_ok=True)
+        bitacora = cls(directorio, **opciones)
+        bitacora.__adjuntar(gestor, numerar_instituciones(gestor), 0)
+        bitacora.compactar()
+        return bitacora
+
+    @classmethod
+    def recuperar(cls, directorio: str = DIRECTORIO_DATOS,
+                  **opciones) -> Tuple[GestorProyectos, "Bitacora", Dict]:
+        """Reconstruye el gestor desde la última instantánea y los registros
+        posteriores de la bitácora, y sigue registrando sus cambios.
+        Retorna el gestor, la bitácora y un resumen de la recuperación"""
+        gestor, instituciones, secuencia, resumen = _reconstruir(directorio)
+        bitacora = cls(directorio, **opciones)
+        bitacora.__adjuntar(gestor, instituciones, secuencia)
+        return gestor, bitacora, resumen
+
+    @property
+    def secuencia(self) -> int:
+        """Secuencia del último registro escrito"""
+        return self.__secuencia
+
+    @property
+    def secuencia_sincronizada(self) -> int:
+        """Secuencia del último registro que ya está en disco"""
+        return self.__sincronizada
+
+    def __ruta(self, archivo: str) -> str:
+        return os.path.join(self.__directorio, archivo)
+
+    def __adjuntar(self, gestor: GestorProyectos, instituciones: List[Institucion], secuencia: int):
+        os.makedirs(self.__directorio, exist_ok=True)
+        self.__gestor = gestor
+        self.__secuencia = self.__sincronizada = secuencia
+        self.__numerar(instituciones)
+        self.__archivo = open(self.__ruta(ARCHIVO_BITACORA), "a", encoding="utf-8")
+        gestor.agregar_observador(self.__proyecto_agregado)
+        for proyecto in gestor.proyectos:
+            proyecto.agregar_observador(self.__institucion_agregada)
+        for institucion in instituciones:
+            institucion.agregar_observador(self.__beneficiario_modificado)
+        if self.__ventana_commit > 0:
+            self.__hilo = threading.Thread(target=self.__sincronizar_periodicamente,
+                                           name="bitacora", daemon=True)
+            self.__hilo.start()
+
+    def __numerar(self, instituciones: List[Institucion]):
+        self.__instituciones = list(instituciones)
+        self.__ids = {id(institucion): numero for numero, institucion in enumerate(instituciones)}
+
+    # Observadores del gestor, los proyectos y las instituciones
+
+    def __proyecto_agregado(self, gestor: GestorProyectos, proyecto: Proyecto):
+        self.__anotar("proyecto", tipo=proyecto.TIPO_PROYECTO, nombre=proyecto.nombre,
+                      descripcion=proyecto.descripcion, fecha_inicio=proyecto.fecha_inicio.isoformat())
+        proyecto.agregar_observador(self.__institucion_agregada)
+        for institucion in proyecto.instituciones:
+            self.__institucion_agregada(proyecto, institucion)
+
+    def __institucion_agregada(self, proyecto: Proyecto, institucion: Institucion):
+        if id(institucion) not in self.__ids:
+            # Primera vez que aparece: sus datos y los beneficiarios que ya tenía
+            numero = self.__ids[id(institucion)] = len(self.__instituciones)
+            self.__instituciones.append(institucion)
+            self.__anotar("institucion", id=numero, nombre=institucion.nombre,
+                          direccion=institucion.direccion, telefono=institucion.telefono)
+            for beneficiario in institucion.iterar_beneficiarios():
+                self.__anotar("beneficiario", institucion=numero, **beneficiario_a_registro(beneficiario))
+            institucion.agregar_observador(self.__beneficiario_modificado)
+        self.__anotar("vinculo", proyecto=proyecto.nombre, institucion=self.__ids[id(institucion)])
+
+    def __beneficiario_modificado(self, evento: str, institucion: Institucion, beneficiario: Beneficiario):
+        numero = self.__ids[id(institucion)]
+        if evento == "agregado":
+            self.__anotar("beneficiario", institucion=numero, **beneficiario_a_registro(beneficiario))
+        elif evento == "removido":
+            self.__anotar("baja", institucion=numero, nombre=beneficiario.nombre)
+        elif evento == "respuesta_actualizada":
+            # Posición entre los homónimos de la institución, para reproducir
+            # el cambio sobre el mismo beneficiario
+            homonimos = institucion.buscar_beneficiarios(beneficiario.nombre)
+            orden = next(i for i, b in enumerate(homonimos) if b is beneficiario)
+            self.__anotar("respuesta", institucion=numero, nombre=beneficiario.nombre, orden=orden,
+                          respuesta=beneficiario.respuesta_tratamiento.value)
+
+    # Escritura y sincronización
+
+    def __anotar(self, clase: str, **campos):
+        with self.__cerrojo:
+            if self.__archivo is None:
+                raise ErrorBitacora("La bitácora está cerrada")
+            self.__secuencia += 1
+            registro = {"secuencia": self.__secuencia, "registro": clase, **campos}
+            self.__archivo.write(_codificar(registro) + "\n")
+            self.__pendientes += 1
+            self.__desde_instantanea += 1
+            self.__metricas["registros"] += 1
+            sincronizar = self.__ventana_commit <= 0 or self.__pendientes >= self.__max_pendientes
+        if sincronizar:
+            self.sincronizar()
+
+    def sincronizar(self):
+        """Escribe a disco los registros pendientes"""
+        with self.__cerrojo_disco:
+            with self.__cerrojo:
+                if self.__archivo is None or not self.__pendientes:
+                    return
+                self.__archivo.flush()
+                descriptor = self.__archivo.fileno()
+                hasta = self.__secuencia
+                self.__pendientes = 0
+            # fsync fuera de __cerrojo: los escritores siguen llenando el búfer
+            inicio = time.perf_counter()
+            os.fsync(descriptor)
+            segundos = time.perf_counter() - inicio
+            with self.__cerrojo:
+                self.__sincronizada = max(self.__sincronizada, hasta)
+                self.__metricas["sincronizaciones"] += 1
+                self.__metricas["segundos_sincronizacion"] += segundos
+
+    def __sincronizar_periodicamente(self):
+        while not self.__detener.wait(self.__ventana_commit):
+            self.sincronizar()
+
+    # Compactación
+
+    def compactar(self) -> int:
+        """Guarda una instantánea del gestor y vacía la bitácora.
+        Retorna la cantidad de registros de la instantánea"""
+        with self.__cerrojo_disco, self.__cerrojo:
+            if self.__archivo is None:
+                raise ErrorBitacora("La bitácora está cerrada")
+            self.__archivo.flush()
+            os.fsync(self.__archivo.fileno())
+            registros = guardar_instantanea(self.__gestor, self.__ruta(ARCHIVO_INSTANTANEA),
+                                            {"secuencia": self.__secuencia})
+            # Si el proceso se corta antes de vaciar la bitácora, la
+            # recuperación descarta los registros incluidos en la instantánea
+            self.__archivo.close()
+            self.__archivo = open(self.__ruta(ARCHIVO_BITACORA), "w", encoding="utf-8")
+            os.fsync(self.__archivo.fileno())
+            # La instantánea numera las instituciones a su manera
+            self.__numerar(numerar_instituciones(self.__gestor))
+            self.__sincronizada = self.__secuencia
+            self.__pendientes = 0
+            self.__desde_instantanea = 0
+            self.__metricas["compactaciones"] += 1
+        return registros
+
+    def compactar_si_corresponde(self) -> bool:
+        """Compacta si se acumularon `compactar_cada` registros desde la última instantánea"""
+        if self.__compactar_cada and self.__desde_instantanea >= self.__compactar_cada:
+            self.compactar()
+            return True
+        return False
+
+    def estado(self) -> Dict:
+        """Secuencias, registros pendientes y métricas de sincronización"""
+        with self.__cerrojo:
+            return {
+                "secuencia": self.__secuencia,
+                "secuencia_sincronizada": self.__sincronizada,
+                "pendientes": self.__pendientes,
+                "registros_desde_instantanea": self.__desde_instantanea,
+                **self.__metricas,
+            }
+
+    def cerrar(self):
+        """Sincroniza los registros pendientes y deja de registrar cambios"""
+        if self.__hilo is not None:
+            self.__detener.set()
+            self.__hilo.join()
+            self.__hilo = None
+        self.sincronizar()
+        with self.__cerrojo_disco, self.__cerrojo:
+            if self.__archivo is None:
+                return
+            self.__archivo.close()
+            self.__archivo = None
+        gestor = self.__gestor
+        gestor.remover_observador(self.__proyecto_agregado)
+        for proyecto in gestor.proyectos:
+            proyecto.remover_observador(self.__institucion_agregada)
+        for institucion in self.__instituciones:
+            institucion.remover_observador(self.__beneficiario_modificado)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+
+def _leer_bitacora(ruta: str, reparar: bool = True):
+    """Genera los registros de la bitácora. Un último registro incompleto se
+    descarta (y con reparar=True se corta del archivo); uno dañado en el
+    medio es un error"""
+    with open(ruta, "rb+" if reparar else "rb") as f:
+        posicion = 0
+        anterior = 0
+        for linea in f:
+            try:
+                if not linea.endswith(b"\n"):
+                    raise ValueError("registro incompleto")
+                registro = json.loads(linea)
+                if registro["secuencia"] <= anterior:
+                    raise ErrorBitacora(f"Secuencia fuera de orden en la posición {posicion}")
+            except (ValueError, KeyError, TypeError) as e:
+                if f.read(1):
+                    raise ErrorBitacora(f"Registro dañado en la posición {posicion}: {e}") from e
+                # Escritura cortada por una caída: se descarta
+                if reparar:
+                    f.truncate(posicion)
+                return
+            posicion += len(linea)
+            anterior = registro["secuencia"]
+            yield registro
+
+
+def _aplicar(gestor: GestorProyectos, instituciones: List[Optional[Institucion]], registro: Dict,
+             seleccion: Optional[set] = None):
+    """Reproduce un registro de la bitácora sobre el gestor. Si hay
+    `seleccion` (nombres de proyectos), se omiten los registros de los demás
+    proyectos y de las instituciones que no se cargaron (los None de
+    `instituciones`)"""
+    parcial = seleccion is not None
+    clase = registro["registro"]
+    try:
+        if clase in ("beneficiario", "respuesta", "baja"):
+            institucion = instituciones[registro["institucion"]]
+            if institucion is None and parcial:
+                return
+            if clase == "beneficiario":
+                institucion.agregar_beneficiario(registro_a_beneficiario(registro))
+            elif clase == "respuesta":
+                beneficiario = institucion.buscar_beneficiarios(registro["nombre"])[registro["orden"]]
+                beneficiario.respuesta_tratamiento = RespuestaTratamiento(registro["respuesta"])
+            else:
+                institucion.remover_beneficiario(registro["nombre"])
+        elif clase == "vinculo":
+            proyecto = gestor.buscar_proyecto(registro["proyecto"])
+            if proyecto is None and parcial:
+                return
+            proyecto.agregar_institucion(instituciones[registro["institucion"]])
+        elif clase == "institucion":
+            if registro["id"] != len(instituciones):
+                raise ErrorBitacora(f"Id de institución inesperado: {registro['id']}")
+            instituciones.append(Institucion(registro["nombre"], registro["direccion"],
+                                             registro["telefono"]))
+        elif clase == "proyecto":
+            if not parcial or registro["nombre"] in seleccion:
+                gestor.agregar_proyecto(registro_a_proyecto(registro))
+        else:
+            raise ErrorBitacora(f"Tipo de registro desconocido: {clase}")
+    except (ErrorBitacora, ErrorInstantanea):
+        raise
+    except (KeyError, IndexError, ValueError, TypeError, AttributeError) as e:
+        raise ErrorBitacora(f"No se pudo reproducir el registro {registro.get('secuencia')}: {e}") from e
+
+
+def _rutas(ruta: str) -> Tuple[str, Optional[str]]:
+    """Instantánea y bitácora de un directorio de datos, o solo la
+    instantánea si `ruta` es un archivo"""
+    if os.path.isdir(ruta):
+        return os.path.join(ruta, ARCHIVO_INSTANTANEA), os.path.join(ruta, ARCHIVO_BITACORA)
+    if os.path.isfile(ruta):
+        return ruta, None
+    raise FileNotFoundError(f"No existen datos en '{ruta}'")
+
+
+def _leer_cola(ruta_bitacora: Optional[str], secuencia: int, reparar: bool) -> Tuple[List[Dict], int]:
+    """Registros de la bitácora posteriores a `secuencia` y cantidad de
+    registros anteriores descartados (ya incluidos en la instantánea porque
+    la compactación se cortó antes de vaciar la bitácora)"""
+    cola = []
+    descartados = 0
+    if ruta_bitacora is not None and os.path.exists(ruta_bitacora):
+        for registro in _leer_bitacora(ruta_bitacora, reparar):
+            if registro["secuencia"] <= secuencia:
+                descartados += 1
+            else:
+                cola.append(registro)
+    return cola, descartados
+
+
+def _relevantes(indice: Dict, cola: List[Dict], seleccion: set) -> set:
+    """Ids de las instituciones de los proyectos seleccionados, incluidas
+    las que la bitácora les vincula"""
+    relevantes = set()
+    for datos in indice["proyectos"]:
+        if datos["nombre"] in seleccion:
+            relevantes.update(datos["instituciones"])
+    relevantes.update(r["institucion"] for r in cola
+                      if r["registro"] == "vinculo" and r["proyecto"] in seleccion)
+    return relevantes
+
+
+def _reconstruir(ruta: str, proyectos: Optional[Iterable[str]] = None, reparar: bool = True):
+    """Arma un gestor desde la instantánea y la bitácora de `ruta`.
+
+    Sin `proyectos` se carga todo. Con `proyectos` (nombres) y un índice
+    válido se leen solo las instituciones de esos proyectos.
+
+    Retorna (gestor, instituciones por id, secuencia, resumen)
+    """
+    inicio = time.perf_counter()
+    ruta_instantanea, ruta_bitacora = _rutas(ruta)
+    seleccion = None if proyectos is None else set(proyectos)
+    existe_instantanea = os.path.exists(ruta_instantanea)
+    indice = leer_indice(ruta_instantanea) if existe_instantanea and seleccion is not None else None
+    resumen = {"registros_instantanea": 0, "instituciones_cargadas": 0}
+
+    if indice is not None:
+        secuencia = indice.get("secuencia", 0)
+    elif existe_instantanea:
+        gestor, resumen_instantanea = cargar_instantanea(ruta_instantanea)
+        secuencia = resumen_instantanea["encabezado"].get("secuencia", 0)
+        resumen["registros_instantanea"] = resumen_instantanea["registros"]
+        instituciones = numerar_instituciones(gestor)
+    else:
+        gestor, secuencia, instituciones = GestorProyectos(), 0, []
+    cola, descartados = _leer_cola(ruta_bitacora, secuencia, reparar)
+
+    if indice is not None:
+        relevantes = _relevantes(indice, cola, seleccion)
+        cargadas = cargar_instituciones(ruta_instantanea, indice,
+                                        {n for n in relevantes if n < len(indice["instituciones"])})
+        resumen["instituciones_cargadas"] = len(cargadas)
+        instituciones = [cargadas.get(datos["id"]) for datos in indice["instituciones"]]
+        gestor = GestorProyectos()
+        for datos in indice["proyectos"]:
+            if datos["nombre"] in seleccion:
+                proyecto = registro_a_proyecto(datos)
+                for numero in datos["instituciones"]:
+                    proyecto.agregar_institucion(instituciones[numero])
+                gestor.agregar_proyecto(proyecto)
+        for registro in cola:
+            _aplicar(gestor, instituciones, registro, seleccion)
+    else:
+        for registro in cola:
+            _aplicar(gestor, instituciones, registro)
+        if seleccion is not None:
+            # Sin índice se cargó todo; se dejan solo los proyectos pedidos
+            completo = gestor
+            gestor = GestorProyectos()
+            for proyecto in completo.proyectos:
+                if proyecto.nombre in seleccion:
+                    gestor.agregar_proyecto(proyecto)
+
+    if cola:
+        secuencia = cola[-1]["secuencia"]
+    resumen.update({
+        "registros_reproducidos": len(cola),
+        "registros_descartados": descartados,
+        "secuencia": secuencia,
+        "segundos": time.perf_counter() - inicio,
+    })
+    return gestor, instituciones, secuencia, resumen
+
+
+def nombres_proyectos(ruta: str = DIRECTORIO_DATOS) -> List[str]:
+    """Nombres de los proyectos guardados, sin cargar instituciones si hay índice"""
+    ruta_instantanea, ruta_bitacora = _rutas(ruta)
+    indice = leer_indice(ruta_instantanea) if os.path.exists(ruta_instantanea) else None
+    if indice is None:
+        gestor, _, _, _ = _reconstruir(ruta, reparar=False)
+        return gestor.listar_proyectos()
+    cola, _ = _leer_cola(ruta_bitacora, indice.get("secuencia", 0), reparar=False)
+    return ([datos["nombre"] for datos in indice["proyectos"]]
+            + [r["nombre"] for r in cola if r["registro"] == "proyecto"])
+
+
+def cargar(ruta: str = DIRECTORIO_DATOS,
+           proyectos: Optional[Iterable[str]] = None) -> Tuple[GestorProyectos, Dict]:
+    """Carga los datos solo para leerlos (no registra cambios ni modifica
+    los archivos). Con `proyectos` se cargan solo esos proyectos y sus
+    instituciones. Retorna el gestor y un resumen de la carga"""
+    gestor, _, _, resumen = _reconstruir(ruta, proyectos, reparar=False)
+    return gestor, resumen
+
+
+def _reproducir(ruta_instantanea: str, indice: Dict, cola: List[Dict], seleccion: set,
+                desde: Optional[int] = None):
+    """Reproduce la cola de la bitácora sobre los parciales del índice de la
+    instantánea, sin cargar beneficiarios, para los proyectos de `seleccion`.
+
+    Con `desde` (una secuencia) además junta, por beneficiario, los cambios
+    posteriores a ella: el registro que tenía en `desde` (None si se agregó
+    después), si se dio de baja y su estado final.
+
+    Retorna (proyectos por nombre, instituciones, parciales, cambios por id
+    de institución, cantidad de instituciones leídas de la instantánea)
+    """
+    relevantes = _relevantes(indice, cola, seleccion)
+    # Instituciones sin beneficiarios: solo dan nombre y orden al reporte
+    instituciones = [Institucion(datos["nombre"], datos["direccion"], datos["telefono"])
+                     for datos in indice["instituciones"]]
+    parciales = [registro_a_parcial(datos["parcial"]) for datos in indice["instituciones"]]
+    proyectos_cargados: Dict[str, Proyecto] = {}
+    for datos in indice["proyectos"]:
+        if datos["nombre"] in seleccion:
+            proyecto = proyectos_cargados[datos["nombre"]] = registro_a_proyecto(datos)
+            for numero in datos["instituciones"]:
+                proyecto.agregar_institucion(instituciones[numero])
+
+    # Homónimos de los nombres con bajas o cambios de respuesta, en orden de
+    # registro, para saber a quién afecta cada uno (igual que Institucion)
+    nombres_por_institucion: Dict[int, set] = {}
+    for r in cola:
+        if r["registro"] in ("baja", "respuesta") and r["institucion"] in relevantes:
+            nombres_por_institucion.setdefault(r["institucion"], set()).add(r["nombre"])
+    homonimos: Dict[Tuple[int, str], List[Beneficiario]] = {}
+    for numero, nombres in nombres_por_institucion.items():
+        if numero < len(indice["instituciones"]):
+            encontrados = buscar_en_bloque(ruta_instantanea, indice, numero, nombres)
+        else:
+            encontrados = {nombre: [] for nombre in nombres}
+        for nombre, lista in encontrados.items():
+            homonimos[(numero, nombre)] = lista
+
+    # id del beneficiario -> [beneficiario, registro en `desde`, dado de baja]
+    cambios: Dict[int, Dict[int, list]] = {}
+
+    def cambio(numero: int, beneficiario: Beneficiario, nuevo: bool = False) -> list:
+        por_beneficiario = cambios.setdefault(numero, {})
+        if id(beneficiario) not in por_beneficiario:
+            por_beneficiario[id(beneficiario)] = [
+                beneficiario, None if nuevo else beneficiario_a_registro(beneficiario), False]
+        return por_beneficiario[id(beneficiario)]
+
+    for r in cola:
+        clase = r["registro"]
+        posterior = desde is not None and r["secuencia"] > desde
+        if clase == "proyecto":
+            if r["nombre"] in seleccion:
+                proyectos_cargados[r["nombre"]] = registro_a_proyecto(r)
+        elif clase == "institucion":
+            instituciones.append(Institucion(r["nombre"], r["direccion"], r["telefono"]))
+            parciales.append(EstadisticasParciales())
+            if posterior:
+                cambios.setdefault(r["id"], {})
+        elif clase == "vinculo":
+            if r["proyecto"] in proyectos_cargados:
+                proyectos_cargados[r["proyecto"]].agregar_institucion(
+                    instituciones[r["institucion"]])
+        elif r["institucion"] in relevantes:
+            numero = r["institucion"]
+            if clase == "beneficiario":
+                beneficiario = registro_a_beneficiario(r)
+                parciales[numero].agregar(beneficiario)
+                lista = homonimos.get((numero, beneficiario.nombre))
+                if lista is not None:
+                    lista.append(beneficiario)
+                if posterior:
+                    cambio(numero, beneficiario, nuevo=True)
+            elif clase == "baja":
+                lista = homonimos[(numero, r["nombre"])]
+                if lista:
+                    beneficiario = lista.pop(0)
+                    parciales[numero].agregar(beneficiario, -1)
+                    if posterior:
+                        cambio(numero, beneficiario)[2] = True
+            elif clase == "respuesta":
+                beneficiario = homonimos[(numero, r["nombre"])][r["orden"]]
+                if posterior:
+                    cambio(numero, beneficiario)
+                nueva = RespuestaTratamiento(r["respuesta"])
+                parciales[numero].mover_respuesta(beneficiario, beneficiario.respuesta_tratamiento, nueva)
+                beneficiario.respuesta_tratamiento = nueva
+    return proyectos_cargados, instituciones, parciales, cambios, len(nombres_por_institucion)
+
+
+def _parciales_de_proyectos(proyectos: Iterable[Proyecto], instituciones: List[Institucion],
+                            parciales: List[EstadisticasParciales]):
+    posiciones = {id(institucion): numero for numero, institucion in enumerate(instituciones)}
+    return [
+        (proyecto, [(institucion.nombre, parciales[posiciones[id(institucion)]])
+                    for institucion in proyecto.instituciones])
+        for proyecto in proyectos
+    ]
+
+
+def cargar_numerado(ruta: str = DIRECTORIO_DATOS) -> Tuple[GestorProyectos, List[Institucion], int]:
+    """Carga todos los datos para leerlos. Retorna el gestor, sus
+    instituciones ordenadas por el id que tienen en la bitácora y la
+    secuencia del último registro"""
+    gestor, instituciones, secuencia, _ = _reconstruir(ruta, reparar=False)
+    return gestor, instituciones, secuencia
+
+
+def cargar_parciales(ruta: str = DIRECTORIO_DATOS, proyectos: Optional[Iterable[str]] = None
+                     ) -> Tuple[List[Tuple[Proyecto, List[Tuple[str, EstadisticasParciales]]]], Dict]:
+    """Agregados parciales de cada institución de los proyectos (todos si no
+    se indican). Retorna [(proyecto, [(nombre de la institución, parcial)])]
+    y un resumen de la carga.
+
+    Con índice no se cargan beneficiarios: los parciales del índice se
+    actualizan con los registros de la bitácora, y para las bajas y cambios
+    de respuesta se leen de la instantánea solo los beneficiarios con esos
+    nombres.
+    """
+    inicio = time.perf_counter()
+    ruta_instantanea, ruta_bitacora = _rutas(ruta)
+    indice = leer_indice(ruta_instantanea) if os.path.exists(ruta_instantanea) else None
+    if indice is None:
+        gestor, _, _, resumen = _reconstruir(ruta, proyectos, reparar=False)
+        return [(proyecto, proyecto.obtener_parciales()) for proyecto in gestor.proyectos], resumen
+
+    cola, descartados = _leer_cola(ruta_bitacora, indice.get("secuencia", 0), reparar=False)
+    seleccion = (set(proyectos) if proyectos is not None
+                 else {datos["nombre"] for datos in indice["proyectos"]}
+                 | {r["nombre"] for r in cola if r["registro"] == "proyecto"})
+    proyectos_cargados, instituciones, parciales, _, leidas = _reproducir(
+        ruta_instantanea, indice, cola, seleccion)
+    return _parciales_de_proyectos(proyectos_cargados.values(), instituciones, parciales), {
+        "instituciones_leidas": leidas,
+        "registros_reproducidos": len(cola),
+        "registros_descartados": descartados,
+        "segundos": time.perf_counter() - inicio,
+    }
+
+
+def identificar_instantanea(ruta: str = DIRECTORIO_DATOS) -> Optional[Dict]:
+    """Secuencia y fecha de la instantánea de `ruta` según su índice, o None
+    si no tiene índice. Cambia con cada compactación, que además renumera
+    las instituciones"""
+    ruta_instantanea, _ = _rutas(ruta)
+    indice = leer_indice(ruta_instantanea) if os.path.exists(ruta_instantanea) else None
+    if indice is None:
+        return None
+    return {"secuencia": indice.get("secuencia", 0), "fecha_generacion": indice["fecha_generacion"]}
+
+
+def cambios_desde(ruta: str, secuencia: int) -> Optional[Dict]:
+    """Cambios de los datos de `ruta` posteriores a `secuencia`, sin cargar
+    beneficiarios (como cargar_parciales).
+
+    Retorna None si ya no se pueden saber: la instantánea es posterior a
+    `secuencia` (la compactación descartó esos registros de la bitácora), la
+    bitácora no llega a ella o no hay índice. Si no, un diccionario con:
+
+        secuencia: la del último cambio
+        proyectos, instituciones, vinculos: registros nuevos de la bitácora
+        beneficiarios: {id de institución: [(registro en `secuencia` o None
+            si es nuevo, registro actual o None si se dio de baja)]}, uno
+            por beneficiario que cambió, sin los que se agregaron y se dieron
+            de baja después de `secuencia`
+        parciales: {id de institución: parcial actual} de las instituciones
+            con cambios y de las demás de los proyectos afectados
+        proyectos_afectados: [(proyecto, [(nombre de la institución, parcial)])]
+            de los proyectos nuevos, con instituciones nuevas o con cambios
+        resumen: registros leídos y segundos
+    """
+    inicio = time.perf_counter()
+    ruta_instantanea, ruta_bitacora = _rutas(ruta)
+    indice = leer_indice(ruta_instantanea) if os.path.exists(ruta_instantanea) else None
+    if indice is None or indice.get("secuencia", 0) > secuencia:
+        return None
+    cola, _ = _leer_cola(ruta_bitacora, indice["secuencia"], reparar=False)
+    actual = cola[-1]["secuencia"] if cola else indice["secuencia"]
+    if actual < secuencia:
+        return None
+    nuevos = [r for r in cola if r["secuencia"] > secuencia]
+
+    # Proyectos afectados: los nuevos, los que vinculan instituciones y los
+    # que tienen alguna institución con cambios de beneficiarios
+    cambiadas = {r["institucion"] for r in nuevos if "institucion" in r and r["registro"] != "vinculo"}
+    seleccion = {r["nombre"] if r["registro"] == "proyecto" else r["proyecto"]
+                 for r in nuevos if r["registro"] in ("proyecto", "vinculo")}
+    for datos in indice["proyectos"]:
+        if cambiadas.intersection(datos["instituciones"]):
+            seleccion.add(datos["nombre"])
+    for r in cola:
+        if r["registro"] == "vinculo" and r["institucion"] in cambiadas:
+            seleccion.add(r["proyecto"])
+
+    proyectos_cargados, instituciones, parciales, cambios, leidas = _reproducir(
+        ruta_instantanea, indice, cola, seleccion, desde=secuencia)
+    beneficiarios = {}
+    for numero, por_beneficiario in cambios.items():
+        lista = beneficiarios[numero] = []
+        for beneficiario, anterior, baja in por_beneficiario.values():
+            final = None if baja else beneficiario_a_registro(beneficiario)
+            if anterior != final:
+                lista.append((anterior, final))
+    afectados = _parciales_de_proyectos(proyectos_cargados.values(), instituciones, parciales)
+    posiciones = {id(institucion): numero for numero, institucion in enumerate(instituciones)}
+    return {
+        "secuencia": actual,
+        "proyectos": [r for r in nuevos if r["registro"] == "proyecto"],
+        "instituciones": [r for r in nuevos if r["registro"] == "institucion"],
+        "vinculos": [r for r in nuevos if r["registro"] == "vinculo"],
+        "beneficiarios": beneficiarios,
+        "parciales": {posiciones[id(institucion)]: parciales[posiciones[id(institucion)]]
+                      for proyecto, _ in afectados for institucion in proyecto.instituciones},
+        "proyectos_afectados": afectados,
+        "resumen": {
+            "registros_reproducidos": len(cola),
+            "registros_nuevos": len(nuevos),
+            "instituciones_leidas": leidas,
+            "segundos": time.perf_counter() - inicio,
+        },
+    }
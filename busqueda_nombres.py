@@ -0,0 +1,401 @@
+"""Búsqueda de beneficiarios por nombre: exacta normalizada, por prefijo y aproximada.
+
+Los nombres se normalizan (sin tildes, sin distinguir mayúsculas, espacios y
+signos colapsados) antes de indexarlos, de modo que "maria torres" encuentra
+a "María Torres". Sobre las palabras de los nombres normalizados se mantienen:
+
+- un trie de palabras, con la cantidad de nombres bajo cada nodo, para
+  búsquedas por prefijo ("Ana Garc"),
+- un índice de trigramas de palabras para encontrar nombres con errores de
+  tipeo ("Mraia Torres"), ordenados por similitud.
+
+Se indexan palabras y no nombres completos: hay muchas menos palabras
+distintas que nombres, así que el trie y los trigramas se mantienen chicos
+aunque haya millones de beneficiarios.
+"""
+import heapq
+import itertools
+import unicodedata
+from collections import Counter
+from typing import Dict, FrozenSet, Iterator, List, Optional, Set, Tuple, Union
+
+# Similitud mínima (coeficiente de Dice sobre trigramas) para considerar
+# que dos palabras se parecen
+SIMILITUD_MINIMA = 0.4
+# Palabras parecidas que se consideran por cada palabra de la búsqueda
+PALABRAS_SIMILARES = 20
+# Nombres que se puntúan como máximo en una búsqueda aproximada o se
+# ordenan en una búsqueda por prefijo
+MAX_CANDIDATOS = 1000
+# Un prefijo que abarca hasta esta cantidad de palabras se cruza por
+# conjuntos en lugar de comprobarse nombre por nombre
+PALABRAS_CRUCE = 8
+
+
+class _TablaNormalizacion(dict):
+    """Tabla para str.translate: cada carácter se reemplaza por su
+    descomposición NFKD sin marcas diacríticas, y los que no son letras ni
+    dígitos por un espacio. Se completa a medida que aparecen caracteres"""
+
+    def __missing__(self, codigo: int) -> str:
+        descompuesto = unicodedata.normalize("NFKD", chr(codigo))
+        reemplazo = "".join(caracter if caracter.isalnum() else " "
+                            for caracter in descompuesto if not unicodedata.combining(caracter))
+        self[codigo] = reemplazo
+        return reemplazo
+
+
+_TABLA_NORMALIZACION = _TablaNormalizacion()
+
+
+def normalizar_nombre(nombre: str) -> str:
+    """Minúsculas, sin tildes y con las palabras separadas por un espacio"""
+    return " ".join(nombre.translate(_TABLA_NORMALIZACION).casefold().split())
+
+
+def trigramas(palabra: str) -> FrozenSet[str]:
+    """Trigramas de la palabra con dos espacios al inicio y uno al final"""
+    relleno = f"  {palabra} "
+    return frozenset(relleno[i:i + 3] for i in range(len(relleno) - 2))
+
+
+def similitud(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Coeficiente de Dice entre dos conjuntos de trigramas"""
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+def _rango_prefijo(clave: str, prefijos: List[str]) -> Tuple[int, bool, str]:
+    """Orden de un nombre normalizado en una búsqueda por prefijos: primero
+    los que tienen más prefijos como palabras completas, después los que
+    empiezan con los prefijos en el mismo orden y al final alfabéticamente"""
+    palabras = clave.split()
+    completas = 0
+    for prefijo in prefijos:
+        if prefijo in palabras:
+            completas += 1
+    al_inicio = len(palabras) >= len(prefijos) and all(
+        palabra.startswith(prefijo) for palabra, prefijo in zip(palabras, prefijos))
+    return -completas, not al_inicio, clave
+
+
+class _NodoTrie:
+    __slots__ = ("hijos", "fin", "cantidad")
+
+    def __init__(self):
+        self.hijos: Dict[str, "_NodoTrie"] = {}
+        self.fin = False
+        # Pares (palabra, nombre) que cuelgan de este nodo, para estimar
+        # cuántos resultados trae un prefijo sin recorrerlo
+        self.cantidad = 0
+
+
+class IndiceNombres:
+    """Índice de nombres exactos para búsquedas normalizadas, por prefijo y aproximadas.
+
+    Retorna siempre los nombres exactos tal como fueron registrados; el
+    gestor los traduce a sus ubicaciones (proyecto, institución).
+    """
+
+    def __init__(self):
+        # clave normalizada -> nombre exacto, o conjunto de nombres exactos si
+        # hay varios con la misma clave (casi siempre hay uno: guardarlo sin
+        # conjunto ahorra memoria y trabajo al recolector de basura)
+        self.__nombres_por_clave: Dict[str, Union[str, Set[str]]] = {}
+        # palabra -> claves normalizadas que la contienen
+        self.__claves_por_palabra: Dict[str, Set[str]] = {}
+        self.__raiz = _NodoTrie()
+        self.__trigramas: Dict[str, Set[str]] = {}
+        self.__trigramas_palabra: Dict[str, FrozenSet[str]] = {}
+        # Cambios en la cantidad de nombres de cada palabra que todavía no se
+        # sumaron a los nodos del trie; se aplican antes de buscar, para que
+        # agregar un nombre no tenga que recorrer el trie
+        self.__cambios: Dict[str, int] = {}
+
+    @property
+    def total_nombres(self) -> int:
+        return sum(1 if isinstance(nombres, str) else len(nombres)
+                   for nombres in self.__nombres_por_clave.values())
+
+    @property
+    def total_palabras(self) -> int:
+        return len(self.__claves_por_palabra)
+
+    def agregar(self, nombre: str):
+        """Indexa un nombre exacto (una sola vez aunque lo lleven varios beneficiarios)"""
+        clave = normalizar_nombre(nombre)
+        nombres = self.__nombres_por_clave.get(clave)
+        if nombres is not None:
+            if isinstance(nombres, str):
+                if nombres != nombre:
+                    self.__nombres_por_clave[clave] = {nombres, nombre}
+            else:
+                nombres.add(nombre)
+            return
+        self.__nombres_por_clave[clave] = nombre
+        # Se llama con cada nombre nuevo que registra el gestor: se evitan
+        # búsquedas de atributos y conjuntos vacíos en el recorrido
+        claves_por_palabra = self.__claves_por_palabra
+        cambios = self.__cambios
+        for palabra in set(clave.split()):
+            claves = claves_por_palabra.get(palabra)
+            if claves is None:
+                claves = claves_por_palabra[palabra] = set()
+                self.__indexar_palabra(palabra)
+            claves.add(clave)
+            cambios[palabra] = cambios.get(palabra, 0) + 1
+
+    def remover(self, nombre: str):
+        """Quita un nombre exacto que ya no lleva ningún beneficiario"""
+        clave = normalizar_nombre(nombre)
+        nombres = self.__nombres_por_clave.get(clave)
+        if isinstance(nombres, set):
+            nombres.discard(nombre)
+            if len(nombres) == 1:
+                self.__nombres_por_clave[clave] = nombres.pop()
+            return
+        if nombres != nombre:
+            return
+        del self.__nombres_por_clave[clave]
+        for palabra in set(clave.split()):
+            claves = self.__claves_por_palabra[palabra]
+            claves.discard(clave)
+            cambio = self.__cambios.get(palabra, 0) - 1
+            if not claves:
+                self.__cambios.pop(palabra, None)
+                self.__ajustar_cantidades(palabra, cambio)
+                del self.__claves_por_palabra[palabra]
+                self.__desindexar_palabra(palabra)
+            else:
+                self.__cambios[palabra] = cambio
+
+    def __indexar_palabra(self, palabra: str):
+        nodo = self.__raiz
+        for caracter in palabra:
+            nodo = nodo.hijos.setdefault(caracter, _NodoTrie())
+        nodo.fin = True
+        grupos = trigramas(palabra)
+        self.__trigramas_palabra[palabra] = grupos
+        for trigrama in grupos:
+            self.__trigramas.setdefault(trigrama, set()).add(palabra)
+
+    def __desindexar_palabra(self, palabra: str):
+        camino = [self.__raiz]
+        for caracter in palabra:
+            camino.append(camino[-1].hijos[caracter])
+        camino[-1].fin = False
+        # Podar los nodos que quedaron sin palabras
+        for posicion in range(len(palabra), 0, -1):
+            nodo = camino[posicion]
+            if nodo.fin or nodo.hijos:
+                break
+            del camino[posicion - 1].hijos[palabra[posicion - 1]]
+        for trigrama in self.__trigramas_palabra.pop(palabra):
+            palabras = self.__trigramas[trigrama]
+            palabras.discard(palabra)
+            if not palabras:
+                del self.__trigramas[trigrama]
+
+    def __ajustar_cantidades(self, palabra: str, delta: int):
+        nodo = self.__raiz
+        nodo.cantidad += delta
+        for caracter in palabra:
+            nodo = nodo.hijos[caracter]
+            nodo.cantidad += delta
+
+    def __aplicar_cambios(self):
+        for palabra, cambio in self.__cambios.items():
+            if cambio:
+                self.__ajustar_cantidades(palabra, cambio)
+        self.__cambios.clear()
+
+    def __nodo(self, prefijo: str) -> Optional[_NodoTrie]:
+        if self.__cambios:
+            self.__aplicar_cambios()
+        nodo = self.__raiz
+        for caracter in prefijo:
+            nodo = nodo.hijos.get(caracter)
+            if nodo is None:
+                return None
+        return nodo
+
+    def __palabras_bajo(self, prefijo: str, nodo: _NodoTrie) -> Iterator[str]:
+        """Palabras del trie que empiezan con `prefijo`, en orden alfabético"""
+        pendientes = [(prefijo, nodo)]
+        while pendientes:
+            palabra, nodo = pendientes.pop()
+            if nodo.fin:
+                yield palabra
+            for caracter in sorted(nodo.hijos, reverse=True):
+                pendientes.append((palabra + caracter, nodo.hijos[caracter]))
+
+    def __nombres_de(self, clave: str) -> List[str]:
+        """Nombres exactos con la clave normalizada, en orden alfabético"""
+        nombres = self.__nombres_por_clave.get(clave, ())
+        return [nombres] if isinstance(nombres, str) else sorted(nombres)
+
+    def buscar_exacto(self, texto: str) -> List[str]:
+        """Nombres iguales al texto sin considerar tildes ni mayúsculas"""
+        return self.__nombres_de(normalizar_nombre(texto))
+
+    def buscar_prefijo(self, texto: str, limite: int = 10) -> List[str]:
+        """Nombres en los que cada palabra del texto es el comienzo de alguna
+        palabra del nombre ("ana garc" -> "Ana García López"), hasta `limite`
+        nombres exactos.
+
+        Primero van los nombres que contienen más palabras del texto completas,
+        después los que empiezan con las palabras del texto en el mismo orden y
+        a igualdad en orden alfabético (ver _rango_prefijo).
+
+        Se recorre solo el subárbol del prefijo más selectivo, empezando por la
+        palabra igual al prefijo. Sus nombres se cruzan como conjuntos con los
+        de los prefijos que abarcan pocas palabras; los demás prefijos se
+        comprueban sobre cada nombre candidato. Se ordenan como máximo
+        MAX_CANDIDATOS nombres: de cada palabra se guardan los mejores.
+        """
+        prefijos = list(dict.fromkeys(normalizar_nombre(texto).split()))
+        if not prefijos or limite <= 0:
+            return []
+        nodos = [(prefijo, self.__nodo(prefijo)) for prefijo in prefijos]
+        if any(nodo is None for _, nodo in nodos):
+            return []
+        nodos.sort(key=lambda par: par[1].cantidad)
+        (guia, nodo), otros = nodos[0], nodos[1:]
+        cruces, comprobar = [], []
+        for prefijo, nodo_prefijo in otros:
+            palabras = list(itertools.islice(self.__palabras_bajo(prefijo, nodo_prefijo),
+                                             PALABRAS_CRUCE + 1))
+            if len(palabras) <= PALABRAS_CRUCE:
+                cruces.append(palabras)
+            else:
+                comprobar.append(prefijo)
+
+        def rango(clave: str) -> Tuple:
+            return _rango_prefijo(clave, prefijos)
+
+        claves: Set[str] = set()
+        for palabra in self.__palabras_bajo(guia, nodo):
+            candidatas = self.__claves_por_palabra[palabra]
+            for palabras in cruces:
+                candidatas = set().union(*(candidatas & self.__claves_por_palabra[otra]
+                                           for otra in palabras))
+            candidatas = candidatas - claves
+            if comprobar:
+                candidatas = {clave for clave in candidatas
+                              if all(any(p.startswith(prefijo) for p in clave.split())
+                                     for prefijo in comprobar)}
+            faltan = MAX_CANDIDATOS - len(claves)
+            if len(candidatas) > faltan:
+                candidatas = heapq.nsmallest(faltan, candidatas, key=rango)
+            claves.update(candidatas)
+            if len(claves) >= MAX_CANDIDATOS:
+                break
+        # Cada clave tiene al menos un nombre: alcanzan las `limite` mejores
+        nombres = [nombre for clave in heapq.nsmallest(limite, claves, key=rango)
+                   for nombre in self.__nombres_de(clave)]
+        return nombres[:limite]
+
+    def __palabras_similares(self, palabra: str) -> List[Tuple[float, str]]:
+        """Palabras indexadas parecidas a `palabra`, de la más a la menos parecida"""
+        grupos = trigramas(palabra)
+        coincidencias = Counter()
+        for trigrama in grupos:
+            coincidencias.update(self.__trigramas.get(trigrama, ()))
+        similares = []
+        for candidata, comunes in coincidencias.items():
+            puntaje = 2 * comunes / (len(grupos) + len(self.__trigramas_palabra[candidata]))
+            if puntaje >= SIMILITUD_MINIMA:
+                similares.append((puntaje, candidata))
+        return heapq.nlargest(PALABRAS_SIMILARES, similares)
+
+    def __frecuencia(self, similares: List[Tuple[float, str]]) -> int:
+        """Cantidad de nombres (con repeticiones) que tienen alguna de las palabras"""
+        return sum(len(self.__claves_por_palabra[palabra]) for _, palabra in similares)
+
+    def __candidatas(self, guias: List[List[Tuple[float, str]]]) -> Iterator[Tuple[float, Set[str]]]:
+        """Nombres que tienen una palabra parecida a cada palabra guía, por
+        combinación de palabras parecidas, de la mayor a la menor suma de
+        similitudes. Retorna (suma, nombres) de cada combinación; con dos guías
+        los nombres son la intersección de los de ambas palabras"""
+        if len(guias) == 1:
+            for puntaje, palabra in guias[0]:
+                yield puntaje, self.__claves_por_palabra[palabra]
+            return
+        primera, segunda = guias
+        pendientes = [(-(primera[0][0] + segunda[0][0]), 0, 0)]
+        agregadas = {(0, 0)}
+        while pendientes:
+            suma, i, j = heapq.heappop(pendientes)
+            yield -suma, self.__claves_por_palabra[primera[i][1]] & self.__claves_por_palabra[segunda[j][1]]
+            for a, b in ((i + 1, j), (i, j + 1)):
+                if a < len(primera) and b < len(segunda) and (a, b) not in agregadas:
+                    agregadas.add((a, b))
+                    heapq.heappush(pendientes, (-(primera[a][0] + segunda[b][0]), a, b))
+
+    def buscar_aproximado(self, texto: str, limite: int = 10) -> List[Tuple[str, float]]:
+        """Nombres parecidos al texto aunque tengan errores de tipeo, con su
+        puntaje de similitud (1.0 = igual), del más al menos parecido.
+
+        Los candidatos salen de cruzar los nombres de las palabras parecidas a
+        las dos palabras buscadas más selectivas (o de la más selectiva, si
+        ningún nombre tiene ambas), de las combinaciones más parecidas a las
+        menos. Se deja de buscar cuando ningún candidato restante puede
+        superar a los `limite` mejores, o tras puntuar MAX_CANDIDATOS nombres.
+        """
+        palabras = normalizar_nombre(texto).split()
+        if not palabras or limite <= 0:
+            return []
+        similares = [self.__palabras_similares(palabra) for palabra in palabras]
+        guias = sorted((lista for lista in similares if lista), key=self.__frecuencia)[:2]
+        if not guias:
+            return []
+        grupos_busqueda = [trigramas(palabra) for palabra in palabras]
+        # Similitud de cada palabra buscada con las palabras indexadas ya comparadas
+        conocidas = [{parecida: puntaje for puntaje, parecida in lista} for lista in similares]
+
+        def puntuar(clave: str) -> float:
+            # Promedio de la mejor coincidencia de cada palabra buscada
+            total = 0.0
+            palabras_clave = clave.split()
+            for grupos, similitudes in zip(grupos_busqueda, conocidas):
+                mejor = 0.0
+                for palabra in palabras_clave:
+                    valor = similitudes.get(palabra)
+                    if valor is None:
+                        valor = similitudes[palabra] = similitud(grupos, self.__trigramas_palabra[palabra])
+                    if valor > mejor:
+                        mejor = valor
+                total += mejor
+            return total / len(palabras)
+
+        puntajes = []
+        # Los `limite` mejores puntajes hasta ahora (el menor primero)
+        mejores: List[float] = []
+        vistas: Set[str] = set()
+        for intento in (guias, guias[:1]):
+            for suma, claves in self.__candidatas(intento):
+                # Las palabras buscadas que no guían aportan a lo sumo 1.0 cada una
+                cota = (suma + (len(palabras) - len(intento))) / len(palabras)
+                if cota < SIMILITUD_MINIMA or (len(mejores) >= limite and mejores[0] > cota):
+                    break
+                nuevas = claves - vistas
+                if len(vistas) + len(nuevas) > MAX_CANDIDATOS:
+                    nuevas = heapq.nsmallest(MAX_CANDIDATOS - len(vistas), nuevas)
+                vistas.update(nuevas)
+                for clave in nuevas:
+                    puntaje = puntuar(clave)
+                    if puntaje < SIMILITUD_MINIMA:
+                        continue
+                    puntajes.append((puntaje, clave))
+                    if len(mejores) < limite:
+                        heapq.heappush(mejores, puntaje)
+                    elif puntaje > mejores[0]:
+                        heapq.heapreplace(mejores, puntaje)
+                if len(vistas) >= MAX_CANDIDATOS:
+                    break
+            if vistas or len(guias) == 1:
+                break
+        mejores = heapq.nsmallest(limite, puntajes, key=lambda par: (-par[0], par[1]))
+        return [(nombre, round(puntaje, 3)) for puntaje, clave in mejores
+                for nombre in self.__nombres_de(clave)]
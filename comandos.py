@@ -0,0 +1,440 @@
+"""Comandos no interactivos sobre una base de datos guardada.
+
+Pensado para tareas programadas (cron) y scripts: no crea datos de ejemplo,
+no pide nada por teclado y escribe el resultado en JSON por la salida
+estándar (los errores van a la salida de error, con código de salida 1).
+
+Los datos son un directorio con instantánea y bitácora (bitacora.py) o una
+instantánea suelta (persistencia.py). Los comandos de lectura cargan solo
+los proyectos que piden con --proyecto; estadisticas, tablas, reporte y
+exportar toman los agregados del índice de la instantánea y leen
+beneficiarios solo de las instituciones que cambiaron después de ella. Fuera
+de bitacora.py, de donde sale el directorio por defecto, cada comando
+importa los módulos que necesita al ejecutarse.
+
+Con --metricas se guardan al terminar las métricas de las búsquedas,
+estadísticas, reportes y exportaciones (instrumentacion.py); --perfilar y
+--memoria agregan muestras con cProfile y tracemalloc. importar --eventos
+escribe cada alta en la salida de error como JSON Lines.
+
+Uso:
+    python comandos.py estadisticas --datos datos_salud
+    python comandos.py reporte --proyecto "Melodía Vital" --compacto
+    python comandos.py reporte --normalizado
+    python comandos.py tablas --tabla herramienta,respuesta --tabla tipo,franja_edad,respuesta
+    python comandos.py exportar --salida reporte.json.gz --comprimir
+    python comandos.py exportar --incremental exportacion
+    python comandos.py consultar --tipo paciente_cuidador --edad-min 30 --edad-max 50
+    python comandos.py consultar --nombre "maria torres" --aproximado
+    python comandos.py importar nuevos.csv --datos datos_salud --eventos
+    python comandos.py sqlite datos_salud.db --datos datos_salud
+    python comandos.py estadisticas --sqlite datos_salud.db
+    python comandos.py reporte --metricas metricas.json --perfilar 1
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from bitacora import DIRECTORIO_DATOS
+
+
+class ErrorComando(Exception):
+    """Error de los datos o de los argumentos que se informa sin traza"""
+
+
+def _escribir(resultado, compacto: bool = False):
+    if compacto:
+        texto = json.dumps(resultado, ensure_ascii=False, separators=(",", ":"), default=str)
+    else:
+        texto = json.dumps(resultado, ensure_ascii=False, indent=2, default=str)
+    sys.stdout.write(texto + "\n")
+
+
+def _informar_carga(args, resumen, inicio: float):
+    if args.detalle:
+        print(json.dumps({"carga": resumen, "segundos_totales": time.perf_counter() - inicio},
+                         ensure_ascii=False), file=sys.stderr)
+
+
+def _escribir_evento(evento):
+    sys.stderr.write(json.dumps(evento, ensure_ascii=False) + "\n")
+
+
+def _volcar_metricas(args):
+    """Guarda las métricas en --metricas ("-": la salida de error)"""
+    from instrumentacion import INSTRUMENTACION
+    if args.metricas == "-":
+        print(json.dumps(INSTRUMENTACION.resumen(), ensure_ascii=False), file=sys.stderr)
+    else:
+        INSTRUMENTACION.volcar(args.metricas)
+
+
+def _proyectos_pedidos(args):
+    """Nombres de --proyecto, comprobando que existan; None si no se indicó ninguno"""
+    if not args.proyecto:
+        return None
+    from bitacora import nombres_proyectos
+    existentes = set(nombres_proyectos(args.datos))
+    desconocidos = [nombre for nombre in args.proyecto if nombre not in existentes]
+    if desconocidos:
+        raise ErrorComando(f"Proyectos no encontrados: {', '.join(desconocidos)}")
+    return args.proyecto
+
+
+def _parciales(args, inicio: float):
+    from bitacora import cargar_parciales
+    parciales, resumen = cargar_parciales(args.datos, _proyectos_pedidos(args))
+    _informar_carga(args, resumen, inicio)
+    return parciales
+
+
+def _estadisticas_sqlite(args) -> int:
+    """Estadísticas calculadas por la base SQLite con GROUP BY"""
+    from repositorio import RepositorioSQLite
+    if not os.path.exists(args.sqlite):
+        raise ErrorComando(f"No existe la base SQLite '{args.sqlite}'")
+    repositorio = RepositorioSQLite(args.sqlite)
+    try:
+        existentes = repositorio.listar_proyectos()
+        desconocidos = [nombre for nombre in args.proyecto or [] if nombre not in existentes]
+        if desconocidos:
+            raise ErrorComando(f"Proyectos no encontrados: {', '.join(desconocidos)}")
+        proyectos = []
+        for nombre in args.proyecto or existentes:
+            estadisticas = repositorio.estadisticas_proyecto(nombre)
+            proyectos.append({"nombre_proyecto": nombre,
+                              "tipo_proyecto": repositorio.crear_proyecto(nombre).TIPO_PROYECTO,
+                              **{clave: valor for clave, valor in estadisticas.items()
+                                 if clave != "nombre_proyecto"}})
+    finally:
+        repositorio.cerrar()
+    _escribir({"total_beneficiarios": sum(p["total_beneficiarios"] for p in proyectos),
+               "proyectos": proyectos}, args.compacto)
+    return 0
+
+
+def comando_estadisticas(args, inicio: float) -> int:
+    """Estadísticas por institución de cada proyecto"""
+    if args.sqlite:
+        return _estadisticas_sqlite(args)
+    proyectos = []
+    for proyecto, parciales in _parciales(args, inicio):
+        por_institucion = {nombre: parcial.a_estadisticas() for nombre, parcial in parciales}
+        proyectos.append({
+            "nombre_proyecto": proyecto.nombre,
+            "tipo_proyecto": proyecto.TIPO_PROYECTO,
+            "total_instituciones": len(parciales),
+            "total_beneficiarios": sum(parcial.total for _, parcial in parciales),
+            "estadisticas_por_institucion": por_institucion,
+        })
+    _escribir({"total_beneficiarios": sum(p["total_beneficiarios"] for p in proyectos),
+               "proyectos": proyectos}, args.compacto)
+    return 0
+
+
+def comando_tablas(args, inicio: float) -> int:
+    """Tablas cruzadas de cada proyecto, armadas con el cubo de los parciales"""
+    from proyecto_salud import TABLAS_CRUZADAS, EstadisticasParciales
+    combinaciones = ([tuple(tabla.split(",")) for tabla in args.tabla] if args.tabla
+                     else TABLAS_CRUZADAS)
+    proyectos = []
+    for proyecto, parciales in _parciales(args, inicio):
+        combinado = EstadisticasParciales()
+        for _, parcial in parciales:
+            combinado.combinar(parcial)
+        proyectos.append({"nombre_proyecto": proyecto.nombre,
+                          "total_beneficiarios": combinado.total,
+                          "tablas_cruzadas": combinado.tablas_cruzadas(combinaciones)})
+    _escribir({"proyectos": proyectos}, args.compacto)
+    return 0
+
+
+def _reporte(args, inicio: float):
+    """Reporte con el formato de GestorProyectos.generar_reporte_consolidado"""
+    reportes = [proyecto.reporte_desde_parciales(parciales)
+                for proyecto, parciales in _parciales(args, inicio)]
+    return {
+        "fecha_generacion": datetime.now().isoformat(),
+        "total_proyectos": len(reportes),
+        "total_beneficiarios": sum(r["total_beneficiarios"] for r in reportes),
+        "proyectos": reportes
+    }
+
+
+def _reporte_normalizado(args, inicio: float):
+    """Reporte del modelo normalizado: cuenta cada persona una vez aunque
+    esté en varios proyectos. Necesita los beneficiarios, no solo los parciales"""
+    from bitacora import cargar
+    gestor, resumen = cargar(args.datos, _proyectos_pedidos(args))
+    _informar_carga(args, resumen, inicio)
+    return gestor.a_modelo_inscripciones().generar_reporte_consolidado()
+
+
+def comando_reporte(args, inicio: float) -> int:
+    reporte = _reporte_normalizado(args, inicio) if args.normalizado else _reporte(args, inicio)
+    _escribir(reporte, args.compacto)
+    return 0
+
+
+def comando_exportar(args, inicio: float) -> int:
+    """Escribe el reporte consolidado en un archivo, igual que exportar_datos,
+    o con --incremental solo los cambios desde la exportación anterior"""
+    if args.incremental:
+        if args.proyecto:
+            raise ErrorComando("--incremental exporta todos los proyectos; no admite --proyecto")
+        from exportacion_incremental import exportar_incremental
+        _escribir(exportar_incremental(args.datos, args.incremental, args.base, args.comprimir),
+                  compacto=True)
+        return 0
+    from proyecto_salud import escritura_atomica
+    reporte = _reporte(args, inicio)
+    separadores = (",", ":") if args.compacto else (",", ": ")
+    with escritura_atomica(args.salida, args.comprimir) as f:
+        json.dump(reporte, f, indent=None if args.compacto else 2, separators=separadores,
+                  ensure_ascii=False, default=str)
+    _escribir({"archivo": args.salida, "total_proyectos": reporte["total_proyectos"],
+               "total_beneficiarios": reporte["total_beneficiarios"]}, compacto=True)
+    return 0
+
+
+def comando_consultar(args, inicio: float) -> int:
+    """Beneficiarios por nombre o por filtros, uno por línea (JSON Lines)"""
+    from bitacora import cargar
+    from persistencia import beneficiario_a_registro
+
+    criterios = {}
+    for campo, valor in (("tipo", args.tipo), ("genero", args.genero),
+                         ("respuesta_tratamiento", args.respuesta), ("enfermedad", args.enfermedad),
+                         ("herramienta_tratamiento", args.herramienta),
+                         ("institucion", args.institucion)):
+        if valor:
+            criterios[campo] = valor
+    if args.edad_min is not None or args.edad_max is not None:
+        criterios["edad"] = (args.edad_min, args.edad_max)
+    if args.nombre is None and not criterios:
+        raise ErrorComando("Indique --nombre o al menos un filtro")
+
+    gestor, resumen = cargar(args.datos, _proyectos_pedidos(args))
+    _informar_carga(args, resumen, inicio)
+    try:
+        if args.explicar:
+            _escribir([{"filtro": filtro, "estimado": estimado}
+                       for filtro, estimado in gestor.explicar_consulta(**criterios)], args.compacto)
+            return 0
+        if args.nombre is not None:
+            resultados = gestor.buscar_beneficiario_global(args.nombre, args.aproximado,
+                                                           args.limite or 10)
+            if criterios:
+                coinciden = {id(b) for _, _, b in gestor.consultar(**criterios)}
+                resultados = [r for r in resultados if id(r[2]) in coinciden]
+        else:
+            resultados = gestor.consultar(**criterios)
+    except ValueError as e:
+        raise ErrorComando(str(e)) from e
+
+    cantidad = 0
+    filas = []
+    for nombre_proyecto, nombre_institucion, beneficiario in resultados:
+        if args.limite is not None and cantidad >= args.limite:
+            break
+        fila = {"proyecto": nombre_proyecto, "institucion": nombre_institucion,
+                **beneficiario_a_registro(beneficiario)}
+        cantidad += 1
+        if args.formato == "json":
+            filas.append(fila)
+        else:
+            sys.stdout.write(json.dumps(fila, ensure_ascii=False) + "\n")
+    if args.formato == "json":
+        _escribir(filas, args.compacto)
+    return 0
+
+
+def comando_importar(args, inicio: float) -> int:
+    """Importa beneficiarios y registra los cambios en la bitácora"""
+    from bitacora import Bitacora
+    from importacion import importar_archivo
+    from instrumentacion import BUS_EVENTOS
+
+    if not os.path.isdir(args.datos) or not Bitacora.existe(args.datos):
+        raise ErrorComando(f"No existe la base de datos '{args.datos}'")
+    # Escribir requiere todos los datos: la compactación guarda el gestor completo
+    gestor, bitacora, resumen_carga = Bitacora.recuperar(args.datos)
+    _informar_carga(args, resumen_carga, inicio)
+    repositorio = None
+    if args.sqlite:
+        from repositorio import RepositorioSQLite
+        if not os.path.exists(args.sqlite):
+            bitacora.cerrar()
+            raise ErrorComando(f"No existe la base SQLite '{args.sqlite}' (créela con el comando sqlite)")
+        repositorio = RepositorioSQLite(args.sqlite)
+    # Después de la carga, para no informar lo que ya estaba guardado
+    if args.eventos:
+        BUS_EVENTOS.suscribir(_escribir_evento)
+    try:
+        if repositorio is None:
+            resumen = importar_archivo(gestor, args.archivo, args.errores, args.procesos)
+        else:
+            # La base ya tiene los datos: solo se reflejan las altas, en una transacción
+            detener = repositorio.reflejar(gestor, copiar=False)
+            try:
+                with repositorio.transaccion():
+                    resumen = importar_archivo(gestor, args.archivo, args.errores, args.procesos)
+            except BaseException:
+                # Las filas importadas antes del error quedaron en el gestor y
+                # en la bitácora, pero la transacción se deshizo: se iguala la
+                # base con el gestor
+                repositorio.sincronizar(gestor)
+                raise
+            finally:
+                detener()
+        if args.compactar:
+            bitacora.compactar()
+        else:
+            bitacora.compactar_si_corresponde()
+    finally:
+        bitacora.cerrar()
+        if repositorio is not None:
+            repositorio.cerrar()
+    _escribir(resumen, compacto=True)
+    return 0
+
+
+def comando_sqlite(args, inicio: float) -> int:
+    """Crea una base SQLite (repositorio.py) con todos los datos guardados"""
+    from bitacora import cargar
+    from repositorio import RepositorioSQLite
+
+    if os.path.exists(args.archivo):
+        raise ErrorComando(f"'{args.archivo}' ya existe")
+    gestor, resumen = cargar(args.datos)
+    _informar_carga(args, resumen, inicio)
+    repositorio = RepositorioSQLite(args.archivo)
+    try:
+        repositorio.cargar_gestor(gestor)
+        proyectos = repositorio.listar_proyectos()
+        total = sum(repositorio.estadisticas_proyecto(nombre)["total_beneficiarios"]
+                    for nombre in proyectos)
+    finally:
+        repositorio.cerrar()
+    _escribir({"archivo": args.archivo, "total_proyectos": len(proyectos),
+               "total_beneficiarios": total}, compacto=True)
+    return 0
+
+
+def crear_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Comandos no interactivos del sistema de salud")
+    comun = argparse.ArgumentParser(add_help=False)
+    comun.add_argument("--datos", default=DIRECTORIO_DATOS,
+                       help=f"directorio de datos o instantánea (por defecto {DIRECTORIO_DATOS})")
+    comun.add_argument("--compacto", action="store_true", help="JSON en una sola línea")
+    comun.add_argument("--detalle", action="store_true",
+                       help="informar la carga de datos en la salida de error")
+    comun.add_argument("--metricas", metavar="ARCHIVO",
+                       help="guardar al terminar las métricas de las operaciones en ARCHIVO "
+                            "(\"-\": la salida de error)")
+    comun.add_argument("--perfilar", type=int, default=0, metavar="N",
+                       help="con --metricas, perfilar con cProfile una de cada N llamadas")
+    comun.add_argument("--memoria", type=int, default=0, metavar="N",
+                       help="con --metricas, medir con tracemalloc el pico de memoria "
+                            "de una de cada N llamadas")
+    seleccion = argparse.ArgumentParser(add_help=False)
+    seleccion.add_argument("--proyecto", action="append",
+                           help="limitar a este proyecto (se puede repetir)")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+
+    estadisticas = subcomandos.add_parser("estadisticas", parents=[comun, seleccion],
+                                          help="estadísticas por institución")
+    estadisticas.add_argument("--sqlite", metavar="ARCHIVO",
+                              help="calcular con GROUP BY sobre una base creada con el comando sqlite")
+    estadisticas.set_defaults(funcion=comando_estadisticas)
+
+    tablas = subcomandos.add_parser("tablas", parents=[comun, seleccion],
+                                    help="tablas cruzadas por proyecto")
+    tablas.add_argument("--tabla", action="append", metavar="DIMENSIONES",
+                        help="dimensiones separadas por coma, por ejemplo herramienta,respuesta "
+                             "(se puede repetir; por defecto las de los reportes)")
+    tablas.set_defaults(funcion=comando_tablas)
+
+    reporte = subcomandos.add_parser("reporte", parents=[comun, seleccion],
+                                     help="reporte consolidado por la salida estándar")
+    reporte.add_argument("--normalizado", action="store_true",
+                         help="contar personas distintas con el modelo normalizado")
+    reporte.set_defaults(funcion=comando_reporte)
+
+    exportar = subcomandos.add_parser("exportar", parents=[comun, seleccion],
+                                      help="reporte consolidado a un archivo")
+    exportar.add_argument("--salida", default="reporte_proyectos.json")
+    exportar.add_argument("--comprimir", action="store_true", help="escribir en formato gzip")
+    exportar.add_argument("--incremental", metavar="DIRECTORIO",
+                          help="exportar a DIRECTORIO solo los cambios desde la exportación anterior")
+    exportar.add_argument("--base", action="store_true",
+                          help="con --incremental, exportar todo aunque se pueda un delta")
+    exportar.set_defaults(funcion=comando_exportar)
+
+    consultar = subcomandos.add_parser("consultar", parents=[comun, seleccion],
+                                       help="buscar beneficiarios por nombre o filtros")
+    consultar.add_argument("--nombre")
+    consultar.add_argument("--aproximado", action="store_true",
+                           help="sin tildes ni mayúsculas, por prefijo y con errores de tipeo")
+    consultar.add_argument("--tipo", action="append")
+    consultar.add_argument("--genero", action="append")
+    consultar.add_argument("--respuesta", action="append")
+    consultar.add_argument("--enfermedad", action="append")
+    consultar.add_argument("--herramienta", action="append")
+    consultar.add_argument("--institucion", action="append")
+    consultar.add_argument("--edad-min", type=int)
+    consultar.add_argument("--edad-max", type=int)
+    consultar.add_argument("--limite", type=int)
+    consultar.add_argument("--formato", choices=("jsonl", "json"), default="jsonl")
+    consultar.add_argument("--explicar", action="store_true",
+                           help="mostrar el plan de la consulta en lugar de los resultados")
+    consultar.set_defaults(funcion=comando_consultar)
+
+    importar = subcomandos.add_parser("importar", parents=[comun],
+                                      help="importar beneficiarios desde CSV o JSONL")
+    importar.add_argument("archivo", help="archivo .csv o .jsonl con los beneficiarios")
+    importar.add_argument("--errores", default=None, help="archivo para las filas rechazadas")
+    importar.add_argument("--procesos", type=int, default=None, help="procesos de validación")
+    importar.add_argument("--compactar", action="store_true",
+                          help="guardar una instantánea al terminar")
+    importar.add_argument("--eventos", action="store_true",
+                          help="escribir cada alta en la salida de error (JSON Lines)")
+    importar.add_argument("--sqlite", metavar="ARCHIVO",
+                          help="agregar también las altas a esta base SQLite")
+    importar.set_defaults(funcion=comando_importar)
+
+    sqlite = subcomandos.add_parser("sqlite", parents=[comun],
+                                    help="crear una base SQLite con todos los datos")
+    sqlite.add_argument("archivo", help="archivo .db a crear")
+    sqlite.set_defaults(funcion=comando_sqlite)
+    return parser
+
+
+def main(argumentos=None) -> int:
+    inicio = time.perf_counter()
+    args = crear_parser().parse_args(argumentos)
+    try:
+        if (args.perfilar or args.memoria) and not args.metricas:
+            raise ErrorComando("--perfilar y --memoria requieren --metricas")
+        if args.metricas:
+            from instrumentacion import INSTRUMENTACION
+            INSTRUMENTACION.configurar(perfil_cada=args.perfilar, memoria_cada=args.memoria)
+        try:
+            return args.funcion(args, inicio)
+        finally:
+            if args.metricas:
+                _volcar_metricas(args)
+    except Exception as e:
+        from bitacora import ErrorBitacora
+        from persistencia import ErrorInstantanea
+        if not isinstance(e, (ErrorComando, ErrorBitacora, ErrorInstantanea, OSError, ValueError)):
+            raise
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
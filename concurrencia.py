@@ -0,0 +1,461 @@
+"""Acceso concurrente al GestorProyectos: varios hilos de ingreso y de reportes.
+
+GestorConcurrente envuelve un GestorProyectos y le asigna a cada institución
+un cerrojo de lectores y escritores (LectorEscritor):
+
+- las altas, bajas y cambios de respuesta toman el cerrojo de escritura de
+  su institución, así que los ingresos en instituciones distintas no se
+  esperan entre sí (salvo por los índices globales del gestor, que tienen
+  su propio cerrojo),
+- los reportes se arman desde una InstantaneaReporte: se toman a la vez los
+  cerrojos de lectura de todas las instituciones (siempre en el mismo orden),
+  se copian sus agregados parciales y se liberan. Copiar un parcial no
+  depende de la cantidad de beneficiarios, así que los escritores solo
+  esperan lo que tarda esa copia, y el reporte refleja un único instante.
+
+Cada cerrojo cuenta cuántas veces se tomó, cuántas tuvo que esperar y
+cuánto tiempo; GestorConcurrente.metricas() los resume.
+
+Los objetos del gestor se deben modificar solo a través de GestorConcurrente
+mientras haya hilos usándolo.
+
+Prueba de estrés (ingresos y reportes a la vez, con verificación final):
+    python concurrencia.py --beneficiarios 200000 --escritores 4 --lectores 2
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from instrumentacion import BUS_EVENTOS, instrumentado
+from proyecto_salud import (Beneficiario, EstadisticasParciales, GestorProyectos, Institucion,
+                            Proyecto, RespuestaTratamiento, _FlujoLista, _FlujoObjeto,
+                            _fragmentos_json, escritura_atomica)
+
+# Altas por toma del cerrojo en agregar_beneficiarios_lote, para que un lote
+# grande no demore a los reportes
+TAMANO_LOTE = 1000
+
+
+class LectorEscritor:
+    """Cerrojo de lectores y escritores con preferencia para los escritores.
+
+    Varios lectores pueden tenerlo a la vez; un escritor lo tiene solo. Si
+    hay un escritor esperando, los lectores nuevos esperan detrás de él para
+    que un flujo continuo de reportes no deje sin turno a los ingresos.
+    """
+
+    def __init__(self):
+        self.__condicion = threading.Condition(threading.Lock())
+        self.__lectores = 0
+        self.__escribiendo = False
+        self.__escritores_esperando = 0
+        self.__metricas = {
+            "lecturas": 0,
+            "escrituras": 0,
+            "lecturas_con_espera": 0,
+            "escrituras_con_espera": 0,
+            "segundos_espera_lectura": 0.0,
+            "segundos_espera_escritura": 0.0,
+            "espera_maxima": 0.0,
+        }
+
+    def __registrar_espera(self, tipo: str, segundos: float):
+        self.__metricas[f"{tipo}_con_espera"] += 1
+        self.__metricas[f"segundos_espera_{tipo[:-1]}"] += segundos
+        self.__metricas["espera_maxima"] = max(self.__metricas["espera_maxima"], segundos)
+
+    def adquirir_lectura(self):
+        with self.__condicion:
+            if self.__escribiendo or self.__escritores_esperando:
+                inicio = time.perf_counter()
+                while self.__escribiendo or self.__escritores_esperando:
+                    self.__condicion.wait()
+                self.__registrar_espera("lecturas", time.perf_counter() - inicio)
+            self.__lectores += 1
+            self.__metricas["lecturas"] += 1
+
+    def liberar_lectura(self):
+        with self.__condicion:
+            self.__lectores -= 1
+            if self.__lectores == 0:
+                self.__condicion.notify_all()
+
+    def adquirir_escritura(self):
+        with self.__condicion:
+            if self.__escribiendo or self.__lectores:
+                inicio = time.perf_counter()
+                self.__escritores_esperando += 1
+                try:
+                    while self.__escribiendo or self.__lectores:
+                        self.__condicion.wait()
+                finally:
+                    self.__escritores_esperando -= 1
+                self.__registrar_espera("escrituras", time.perf_counter() - inicio)
+            self.__escribiendo = True
+            self.__metricas["escrituras"] += 1
+
+    def liberar_escritura(self):
+        with self.__condicion:
+            self.__escribiendo = False
+            self.__condicion.notify_all()
+
+    @contextmanager
+    def lectura(self):
+        self.adquirir_lectura()
+        try:
+            yield
+        finally:
+            self.liberar_lectura()
+
+    @contextmanager
+    def escritura(self):
+        self.adquirir_escritura()
+        try:
+            yield
+        finally:
+            self.liberar_escritura()
+
+    def metricas(self) -> Dict:
+        """Tomas del cerrojo, cuántas esperaron y el tiempo de espera (segundos)"""
+        with self.__condicion:
+            return dict(self.__metricas)
+
+
+class InstantaneaReporte:
+    """Agregados de todas las instituciones copiados en un mismo instante"""
+
+    def __init__(self, fecha: datetime,
+                 proyectos: List[Tuple[Proyecto, List[Tuple[str, EstadisticasParciales, int]]]]):
+        self.__fecha = fecha
+        self.__proyectos = proyectos
+
+    @property
+    def fecha(self) -> datetime:
+        return self.__fecha
+
+    @property
+    def total_beneficiarios(self) -> int:
+        return sum(parcial.total for _, parciales in self.__proyectos for _, parcial, _ in parciales)
+
+    def reporte_consolidado(self) -> Dict:
+        """Reporte con el formato de GestorProyectos.generar_reporte_consolidado"""
+        reportes = [
+            proyecto.reporte_desde_parciales([(nombre, parcial) for nombre, parcial, _ in parciales])
+            for proyecto, parciales in self.__proyectos
+        ]
+        return {
+            "fecha_generacion": self.__fecha.isoformat(),
+            "total_proyectos": len(reportes),
+            "total_beneficiarios": sum(r["total_beneficiarios"] for r in reportes),
+            "proyectos": reportes
+        }
+
+    def iterar_reporte_consolidado(self) -> _FlujoObjeto:
+        """El mismo reporte como flujo: el reporte de cada proyecto se arma
+        recién cuando se lo escribe"""
+        def pares():
+            yield "fecha_generacion", self.__fecha.isoformat()
+            yield "total_proyectos", len(self.__proyectos)
+            yield "total_beneficiarios", self.total_beneficiarios
+            yield "proyectos", _FlujoLista(
+                proyecto.reporte_desde_parciales([(nombre, parcial) for nombre, parcial, _ in parciales])
+                for proyecto, parciales in self.__proyectos)
+        return _FlujoObjeto(pares())
+
+    def verificar(self) -> List[str]:
+        """Diferencias entre el agregado de cada institución y su cantidad de
+        beneficiarios, que se leyeron juntos. Una lista vacía indica que
+        ninguna escritura quedó a medias en la instantánea"""
+        diferencias = []
+        for proyecto, parciales in self.__proyectos:
+            for nombre, parcial, registrados in parciales:
+                if parcial.total != registrados:
+                    diferencias.append(f"{proyecto.nombre} -> {nombre}: agregado {parcial.total}, "
+                                       f"beneficiarios {registrados}")
+        return diferencias
+
+
+class GestorConcurrente:
+    """Operaciones de GestorProyectos que se pueden llamar desde varios hilos"""
+
+    def __init__(self, gestor: GestorProyectos):
+        self.__gestor = gestor
+        # Cerrojo de cada institución (clave: id de la institución)
+        self.__cerrojos: Dict[int, LectorEscritor] = {}
+        self.__instituciones: Dict[Tuple[str, str], Institucion] = {}
+        self.__cerrojo_registro = threading.Lock()
+        self.__instantaneas = 0
+        self.__segundos_instantaneas = 0.0
+        self.__instantanea_maxima = 0.0
+
+    @property
+    def gestor(self) -> GestorProyectos:
+        return self.__gestor
+
+    def cerrojo_institucion(self, institucion: Institucion) -> LectorEscritor:
+        """Cerrojo de la institución (el mismo aunque participe en varios proyectos)"""
+        with self.__cerrojo_registro:
+            cerrojo = self.__cerrojos.get(id(institucion))
+            if cerrojo is None:
+                cerrojo = self.__cerrojos[id(institucion)] = LectorEscritor()
+            return cerrojo
+
+    def __institucion(self, nombre_proyecto: str, nombre_institucion: str) -> Institucion:
+        clave = (nombre_proyecto, nombre_institucion)
+        institucion = self.__instituciones.get(clave)
+        if institucion is None:
+            with self.__gestor.cerrojo:
+                proyecto = self.__gestor.buscar_proyecto(nombre_proyecto)
+                if proyecto is None:
+                    raise ValueError(f"No existe el proyecto '{nombre_proyecto}'")
+                institucion = proyecto.buscar_institucion(nombre_institucion)
+            if institucion is None:
+                raise ValueError(f"La institución '{nombre_institucion}' no participa en "
+                                 f"'{nombre_proyecto}'")
+            self.__instituciones[clave] = institucion
+        return institucion
+
+    def agregar_institucion(self, nombre_proyecto: str, institucion: Institucion):
+        """Agrega una institución a un proyecto"""
+        with self.__gestor.cerrojo:
+            proyecto = self.__gestor.buscar_proyecto(nombre_proyecto)
+            if proyecto is None:
+                raise ValueError(f"No existe el proyecto '{nombre_proyecto}'")
+            with self.cerrojo_institucion(institucion).escritura():
+                proyecto.agregar_institucion(institucion)
+
+    def agregar_beneficiario(self, nombre_proyecto: str, nombre_institucion: str,
+                             beneficiario: Beneficiario):
+        institucion = self.__institucion(nombre_proyecto, nombre_institucion)
+        with self.cerrojo_institucion(institucion).escritura():
+            institucion.agregar_beneficiario(beneficiario)
+
+    def agregar_beneficiarios_lote(self, nombre_proyecto: str, nombre_institucion: str,
+                                   beneficiarios: Iterable[Beneficiario]) -> int:
+        """Agrega los beneficiarios tomando el cerrojo cada TAMANO_LOTE altas.
+        Retorna la cantidad agregada"""
+        institucion = self.__institucion(nombre_proyecto, nombre_institucion)
+        cerrojo = self.cerrojo_institucion(institucion)
+        cantidad = 0
+        lote = []
+        for beneficiario in beneficiarios:
+            lote.append(beneficiario)
+            if len(lote) >= TAMANO_LOTE:
+                with cerrojo.escritura():
+                    cantidad += institucion.agregar_beneficiarios_lote(lote)
+                lote = []
+        if lote:
+            with cerrojo.escritura():
+                cantidad += institucion.agregar_beneficiarios_lote(lote)
+        return cantidad
+
+    def remover_beneficiario(self, nombre_proyecto: str, nombre_institucion: str, nombre: str) -> bool:
+        institucion = self.__institucion(nombre_proyecto, nombre_institucion)
+        with self.cerrojo_institucion(institucion).escritura():
+            return institucion.remover_beneficiario(nombre)
+
+    def actualizar_respuesta(self, nombre_proyecto: str, nombre_institucion: str, nombre: str,
+                             respuesta: RespuestaTratamiento) -> bool:
+        """Cambia la respuesta al tratamiento de un beneficiario. Retorna False si no existe"""
+        institucion = self.__institucion(nombre_proyecto, nombre_institucion)
+        with self.cerrojo_institucion(institucion).escritura():
+            beneficiario = institucion.buscar_beneficiario(nombre)
+            if beneficiario is None:
+                return False
+            beneficiario.respuesta_tratamiento = respuesta
+            return True
+
+    def buscar_beneficiario_global(self, nombre: str, aproximado: bool = False,
+                                   limite: int = 10) -> List[tuple]:
+        return self.__gestor.buscar_beneficiario_global(nombre, aproximado, limite)
+
+    def consultar(self, *filtros, **criterios) -> List[tuple]:
+        """Como GestorProyectos.consultar, pero recorre los resultados dentro
+        del cerrojo de los índices y los retorna en una lista"""
+        with self.__gestor.cerrojo:
+            return list(self.__gestor.consultar(*filtros, **criterios))
+
+    def instantanea(self) -> InstantaneaReporte:
+        """Copia los agregados de todas las instituciones en un mismo instante"""
+        with self.__gestor.cerrojo:
+            estructura = [(proyecto, proyecto.instituciones) for proyecto in self.__gestor.proyectos]
+        instituciones = {id(i): i for _, lista in estructura for i in lista}
+        # Siempre en el mismo orden, para que dos instantáneas no se bloqueen entre sí
+        cerrojos = [self.cerrojo_institucion(instituciones[clave]) for clave in sorted(instituciones)]
+
+        tomados = []
+        try:
+            for cerrojo in cerrojos:
+                cerrojo.adquirir_lectura()
+                tomados.append(cerrojo)
+            inicio = time.perf_counter()
+            fecha = datetime.now()
+            copias = {clave: (i.obtener_parcial(), i.total_beneficiarios)
+                      for clave, i in instituciones.items()}
+            duracion = time.perf_counter() - inicio
+        finally:
+            for cerrojo in tomados:
+                cerrojo.liberar_lectura()
+
+        with self.__cerrojo_registro:
+            self.__instantaneas += 1
+            self.__segundos_instantaneas += duracion
+            self.__instantanea_maxima = max(self.__instantanea_maxima, duracion)
+        return InstantaneaReporte(fecha, [
+            (proyecto, [(i.nombre, *copias[id(i)]) for i in lista]) for proyecto, lista in estructura
+        ])
+
+    @instrumentado
+    def generar_reporte_consolidado(self) -> Dict:
+        """Reporte consolidado de un único instante, sin bloquear a los
+        escritores mientras se arma"""
+        return self.instantanea().reporte_consolidado()
+
+    @instrumentado
+    def exportar_datos(self, archivo: str = "reporte_proyectos.json",
+                       compacto: bool = False, comprimir: bool = False) -> bool:
+        """Exporta el reporte consolidado de una instantánea (mismo formato que
+        GestorProyectos.exportar_datos)"""
+        try:
+            reporte = self.instantanea().iterar_reporte_consolidado()
+            with escritura_atomica(archivo, comprimir) as f:
+                for fragmento in _fragmentos_json(reporte, None if compacto else 2):
+                    f.write(fragmento)
+            return True
+        except Exception as e:
+            BUS_EVENTOS.publicar("exportacion_fallida", archivo=archivo, error=str(e))
+            return False
+
+    def metricas(self) -> Dict:
+        """Contención de los cerrojos de las instituciones y duración de las instantáneas"""
+        with self.__cerrojo_registro:
+            cerrojos = list(self.__cerrojos.values())
+            instantaneas = {
+                "cantidad": self.__instantaneas,
+                "segundos_promedio": (self.__segundos_instantaneas / self.__instantaneas
+                                      if self.__instantaneas else 0.0),
+                "segundos_maximo": self.__instantanea_maxima,
+            }
+        totales: Dict[str, float] = {}
+        for cerrojo in cerrojos:
+            for clave, valor in cerrojo.metricas().items():
+                if clave == "espera_maxima":
+                    totales[clave] = max(totales.get(clave, 0.0), valor)
+                else:
+                    totales[clave] = totales.get(clave, 0) + valor
+        return {"cerrojos": len(cerrojos), "contencion": totales, "instantaneas": instantaneas}
+
+
+def prueba_estres(beneficiarios: int = 200000, escritores: int = 4, lectores: int = 2,
+                  semilla: int = 42, instituciones: int = 3) -> Dict:
+    """Ingresa beneficiarios desde `escritores` hilos mientras `lectores` hilos
+    generan reportes y exportaciones, y verifica que cada instantánea sea
+    coherente y que el resultado final coincida con un recálculo completo"""
+    import os
+    import random
+    import tempfile
+    from datos_sinteticos import crear_estructura, repartir
+
+    gestor = crear_estructura(instituciones)
+    concurrente = GestorConcurrente(gestor)
+    nombres = {id(i): (p.nombre, i.nombre) for p in gestor.proyectos for i in p.instituciones}
+    pendientes = [(nombres[id(i)], b) for i, b in repartir(gestor, beneficiarios, semilla)]
+    partes = [pendientes[n::escritores] for n in range(escritores)]
+    del pendientes
+
+    errores: List[str] = []
+    reportes = [0] * lectores
+    terminado = threading.Event()
+    cerrojo_errores = threading.Lock()
+
+    def anotar(error: str):
+        with cerrojo_errores:
+            if len(errores) < 20:
+                errores.append(error)
+
+    def escribir(numero: int):
+        rng = random.Random(semilla + numero)
+        respuestas = list(RespuestaTratamiento)
+        for (proyecto, institucion), beneficiario in partes[numero]:
+            concurrente.agregar_beneficiario(proyecto, institucion, beneficiario)
+            if rng.random() < 0.1:
+                concurrente.actualizar_respuesta(proyecto, institucion, beneficiario.nombre,
+                                                 rng.choice(respuestas))
+
+    def leer(numero: int):
+        anterior = 0
+        archivo = tempfile.NamedTemporaryFile(suffix=".json", delete=False)
+        archivo.close()
+        try:
+            while not terminado.is_set():
+                instantanea = concurrente.instantanea()
+                for diferencia in instantanea.verificar():
+                    anotar(f"instantánea incoherente: {diferencia}")
+                total = instantanea.reporte_consolidado()["total_beneficiarios"]
+                if total < anterior:
+                    anotar(f"el total bajó de {anterior} a {total} sin bajas")
+                anterior = total
+                reportes[numero] += 1
+                if reportes[numero] % 10 == 0:
+                    if not concurrente.exportar_datos(archivo.name):
+                        anotar("falló la exportación")
+                    else:
+                        with open(archivo.name, "r", encoding="utf-8") as f:
+                            json.load(f)
+        finally:
+            os.remove(archivo.name)
+
+    hilos_lectores = [threading.Thread(target=leer, args=(n,)) for n in range(lectores)]
+    hilos_escritores = [threading.Thread(target=escribir, args=(n,)) for n in range(escritores)]
+    inicio = time.perf_counter()
+    for hilo in hilos_lectores + hilos_escritores:
+        hilo.start()
+    for hilo in hilos_escritores:
+        hilo.join()
+    segundos_ingreso = time.perf_counter() - inicio
+    terminado.set()
+    for hilo in hilos_lectores:
+        hilo.join()
+
+    final = concurrente.generar_reporte_consolidado()
+    if final["total_beneficiarios"] != beneficiarios:
+        anotar(f"total final {final['total_beneficiarios']} != {beneficiarios}")
+    for proyecto in gestor.proyectos:
+        for institucion in proyecto.instituciones:
+            if institucion.obtener_estadisticas() != institucion.recalcular_estadisticas():
+                anotar(f"estadísticas de {institucion.nombre} distintas del recálculo")
+
+    return {
+        "beneficiarios": beneficiarios,
+        "escritores": escritores,
+        "lectores": lectores,
+        "segundos_ingreso": segundos_ingreso,
+        "altas_por_segundo": beneficiarios / segundos_ingreso if segundos_ingreso > 0 else None,
+        "reportes": sum(reportes),
+        "metricas": concurrente.metricas(),
+        "errores": errores,
+    }
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Prueba de estrés de ingresos y reportes concurrentes")
+    parser.add_argument("--beneficiarios", type=float, default=200000)
+    parser.add_argument("--escritores", type=int, default=4)
+    parser.add_argument("--lectores", type=int, default=2)
+    parser.add_argument("--instituciones", type=int, default=3, help="instituciones por proyecto")
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args(argumentos)
+
+    resultado = prueba_estres(int(args.beneficiarios), args.escritores, args.lectores,
+                              args.semilla, args.instituciones)
+    print(json.dumps(resultado, ensure_ascii=False, indent=2))
+    return 1 if resultado["errores"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,266 @@
+"""Consultas con filtros sobre todos los beneficiarios del gestor.
+
+IndiceConsultas mantiene índices secundarios sobre las ubicaciones
+(proyecto, institucion, beneficiario):
+
+- listas de publicación (conjuntos de ids) por tipo, género y respuesta,
+- conjuntos de ids por edad (un entero acotado) para consultas por rango,
+  que se resuelven recorriendo las edades del rango,
+- índices invertidos por enfermedad, herramienta, proyecto e institución.
+
+Una consulta es una lista de Filtro que deben cumplirse todos. El
+planificador estima cuántas ubicaciones deja pasar cada filtro, parte de
+las del más selectivo y las intersecta con los demás índices en orden de
+selectividad; los resultados se entregan de a uno, en orden de registro.
+"""
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from proyecto_salud import Genero, RespuestaTratamiento, TipoBeneficiario
+
+# Campos que se filtran por igualdad y el enum de sus valores (None: texto)
+CAMPOS_IGUALDAD = {
+    "tipo": TipoBeneficiario,
+    "genero": Genero,
+    "respuesta_tratamiento": RespuestaTratamiento,
+    "enfermedad": None,
+    "herramienta_tratamiento": None,
+    "proyecto": None,
+    "institucion": None,
+}
+CAMPOS_RANGO = ("edad",)
+
+
+def normalizar_texto(valor: str) -> str:
+    """Los campos de texto se comparan sin distinguir mayúsculas ni espacios en los extremos"""
+    return str(valor).strip().casefold()
+
+
+class Filtro:
+    """Condición sobre un campo: igualdad con alguno de `valores`, o
+    `minimo` <= valor <= `maximo` para los campos de rango (extremos incluidos)"""
+
+    def __init__(self, campo: str, valores: Tuple = (), minimo: Optional[int] = None,
+                 maximo: Optional[int] = None):
+        if campo in CAMPOS_IGUALDAD:
+            if not valores:
+                raise ValueError(f"El filtro por '{campo}' necesita al menos un valor")
+            enum = CAMPOS_IGUALDAD[campo]
+            if enum is None:
+                valores = tuple(normalizar_texto(v) for v in valores)
+            else:
+                valores = tuple(v if isinstance(v, enum) else enum(v) for v in valores)
+        elif campo in CAMPOS_RANGO:
+            if minimo is not None and maximo is not None and minimo > maximo:
+                raise ValueError(f"Rango vacío para '{campo}': {minimo} > {maximo}")
+        else:
+            raise ValueError(f"Campo de consulta desconocido: '{campo}'")
+        self.__campo = campo
+        self.__valores = valores
+        self.__minimo = minimo
+        self.__maximo = maximo
+
+    @classmethod
+    def igual(cls, campo: str, *valores) -> "Filtro":
+        return cls(campo, valores)
+
+    @classmethod
+    def rango(cls, campo: str, minimo: Optional[int] = None,
+              maximo: Optional[int] = None) -> "Filtro":
+        return cls(campo, minimo=minimo, maximo=maximo)
+
+    @classmethod
+    def desde_criterios(cls, criterios: Dict) -> List["Filtro"]:
+        """Convierte criterios con nombre en filtros: una tupla (min, max) en un
+        campo de rango es un rango, una lista o conjunto son varios valores
+        aceptados y cualquier otro valor es una igualdad"""
+        filtros = []
+        for campo, valor in criterios.items():
+            if campo in CAMPOS_RANGO:
+                if isinstance(valor, tuple):
+                    filtros.append(cls.rango(campo, *valor))
+                else:
+                    filtros.append(cls.rango(campo, valor, valor))
+            elif isinstance(valor, (list, set, frozenset, tuple)):
+                filtros.append(cls.igual(campo, *valor))
+            else:
+                filtros.append(cls.igual(campo, valor))
+        return filtros
+
+    @property
+    def campo(self) -> str:
+        return self.__campo
+
+    @property
+    def valores(self) -> Tuple:
+        return self.__valores
+
+    @property
+    def minimo(self) -> Optional[int]:
+        return self.__minimo
+
+    @property
+    def maximo(self) -> Optional[int]:
+        return self.__maximo
+
+    @property
+    def es_rango(self) -> bool:
+        return self.__campo in CAMPOS_RANGO
+
+    def __repr__(self):
+        if self.es_rango:
+            return f"Filtro({self.__campo}: {self.__minimo}..{self.__maximo})"
+        valores = ", ".join(getattr(v, "value", v) for v in self.__valores)
+        return f"Filtro({self.__campo} = {valores})"
+
+
+class IndiceConsultas:
+    """Índices secundarios sobre las ubicaciones (proyecto, institucion, beneficiario).
+
+    Una institución que participa en varios proyectos aporta una ubicación
+    por proyecto, igual que el índice de nombres del gestor.
+    """
+
+    def __init__(self):
+        self.__secuencia = 0
+        self.__ubicaciones: Dict[int, Tuple] = {}
+        # (id(institucion), id(beneficiario)) -> ids de sus ubicaciones
+        self.__ids_por_beneficiario: Dict[Tuple[int, int], List[int]] = {}
+        # Respuesta indexada de cada ubicación, para moverla cuando cambia
+        self.__respuestas: Dict[int, RespuestaTratamiento] = {}
+        self.__publicaciones: Dict[str, Dict[object, Set[int]]] = {
+            campo: {} for campo in CAMPOS_IGUALDAD}
+        # edad -> ids de las ubicaciones con esa edad
+        self.__edades: Dict[int, Set[int]] = {}
+
+    @property
+    def total(self) -> int:
+        return len(self.__ubicaciones)
+
+    @staticmethod
+    def __claves(proyecto, institucion, beneficiario) -> Dict[str, object]:
+        return {
+            "tipo": beneficiario.tipo,
+            "genero": beneficiario.genero,
+            "respuesta_tratamiento": beneficiario.respuesta_tratamiento,
+            "enfermedad": normalizar_texto(beneficiario.enfermedad),
+            "herramienta_tratamiento": normalizar_texto(beneficiario.herramienta_tratamiento),
+            "proyecto": normalizar_texto(proyecto.nombre),
+            "institucion": normalizar_texto(institucion.nombre),
+        }
+
+    def agregar(self, proyecto, institucion, beneficiario):
+        """Indexa una ubicación"""
+        self.__secuencia += 1
+        numero = self.__secuencia
+        self.__ubicaciones[numero] = (proyecto, institucion, beneficiario)
+        self.__ids_por_beneficiario.setdefault((id(institucion), id(beneficiario)), []).append(numero)
+        self.__respuestas[numero] = beneficiario.respuesta_tratamiento
+        for campo, clave in self.__claves(proyecto, institucion, beneficiario).items():
+            self.__publicaciones[campo].setdefault(clave, set()).add(numero)
+        self.__edades.setdefault(beneficiario.edad, set()).add(numero)
+
+    def remover(self, institucion, beneficiario):
+        """Quita del índice todas las ubicaciones del beneficiario en la institución"""
+        for numero in self.__ids_por_beneficiario.pop((id(institucion), id(beneficiario)), []):
+            proyecto, _, _ = self.__ubicaciones.pop(numero)
+            claves = self.__claves(proyecto, institucion, beneficiario)
+            claves["respuesta_tratamiento"] = self.__respuestas.pop(numero)
+            for campo, clave in claves.items():
+                self.__descartar(campo, clave, numero)
+            conjunto = self.__edades[beneficiario.edad]
+            conjunto.discard(numero)
+            if not conjunto:
+                del self.__edades[beneficiario.edad]
+
+    def actualizar_respuesta(self, institucion, beneficiario):
+        """Mueve las ubicaciones del beneficiario a su nueva respuesta"""
+        nueva = beneficiario.respuesta_tratamiento
+        for numero in self.__ids_por_beneficiario.get((id(institucion), id(beneficiario)), []):
+            anterior = self.__respuestas[numero]
+            if anterior is not nueva:
+                self.__descartar("respuesta_tratamiento", anterior, numero)
+                self.__publicaciones["respuesta_tratamiento"].setdefault(nueva, set()).add(numero)
+                self.__respuestas[numero] = nueva
+
+    def __descartar(self, campo: str, clave, numero: int):
+        conjunto = self.__publicaciones[campo].get(clave)
+        if conjunto is not None:
+            conjunto.discard(numero)
+            if not conjunto:
+                del self.__publicaciones[campo][clave]
+
+    def __conjuntos_rango(self, filtro: Filtro) -> Iterator[Set[int]]:
+        """Conjuntos de ids de cada edad del rango que tiene ubicaciones"""
+        if not self.__edades:
+            return
+        # Las edades son enteros acotados: se recorre el rango, recortado a
+        # las edades registradas
+        minimo = min(self.__edades) if filtro.minimo is None else max(filtro.minimo, min(self.__edades))
+        maximo = max(self.__edades) if filtro.maximo is None else min(filtro.maximo, max(self.__edades))
+        for edad in range(minimo, maximo + 1):
+            conjunto = self.__edades.get(edad)
+            if conjunto:
+                yield conjunto
+
+    def estimar(self, filtro: Filtro) -> int:
+        """Cantidad de ubicaciones que deja pasar el filtro por sí solo"""
+        if filtro.es_rango:
+            return sum(len(conjunto) for conjunto in self.__conjuntos_rango(filtro))
+        publicaciones = self.__publicaciones[filtro.campo]
+        return sum(len(publicaciones.get(valor, ())) for valor in set(filtro.valores))
+
+    def planificar(self, filtros: List[Filtro]) -> List[Tuple[Filtro, int]]:
+        """Filtros con su estimación, del más selectivo al menos selectivo"""
+        return sorted(((filtro, self.estimar(filtro)) for filtro in filtros), key=lambda par: par[1])
+
+    def __conjunto(self, filtro: Filtro) -> Set[int]:
+        """Ids que cumplen el filtro"""
+        if filtro.es_rango:
+            return set().union(*self.__conjuntos_rango(filtro))
+        publicaciones = self.__publicaciones[filtro.campo]
+        valores = [valor for valor in set(filtro.valores) if valor in publicaciones]
+        if len(valores) == 1:
+            return publicaciones[valores[0]]
+        conjunto = set()
+        for valor in valores:
+            conjunto.update(publicaciones[valor])
+        return conjunto
+
+    def __verificador(self, filtro: Filtro):
+        """Función id -> bool que comprueba un rango sin recorrer el índice"""
+        minimo = float("-inf") if filtro.minimo is None else filtro.minimo
+        maximo = float("inf") if filtro.maximo is None else filtro.maximo
+        ubicaciones = self.__ubicaciones
+        return lambda numero: minimo <= ubicaciones[numero][2].edad <= maximo
+
+    def consultar(self, filtros: List[Filtro]) -> Iterator[Tuple]:
+        """Recorre las ubicaciones (proyecto, institucion, beneficiario) que
+        cumplen todos los filtros, en orden de registro"""
+        if not filtros:
+            # Por número y no sobre el diccionario, que puede cambiar
+            # mientras se consumen los resultados
+            for numero in range(1, self.__secuencia + 1):
+                ubicacion = self.__ubicaciones.get(numero)
+                if ubicacion is not None:
+                    yield ubicacion
+            return
+        plan = self.planificar(filtros)
+        if plan[0][1] == 0:
+            return
+        # Se parte del filtro más selectivo y se intersecta con los demás
+        # índices de igualdad en orden de selectividad. Los rangos que no
+        # encabezan el plan se comprueban al entregar cada resultado
+        candidatos = set(self.__conjunto(plan[0][0]))
+        verificadores = []
+        for filtro, _ in plan[1:]:
+            if not candidatos:
+                return
+            if filtro.es_rango:
+                verificadores.append(self.__verificador(filtro))
+            else:
+                candidatos.intersection_update(self.__conjunto(filtro))
+        for numero in sorted(candidatos):
+            ubicacion = self.__ubicaciones.get(numero)
+            # La ubicación pudo removerse mientras se consumían los resultados
+            if ubicacion is not None and all(verificar(numero) for verificar in verificadores):
+                yield ubicacion
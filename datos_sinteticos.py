@@ -0,0 +1,249 @@
+"""Generador reproducible de datos sintéticos para pruebas de carga.
+
+Con la misma semilla se obtienen siempre los mismos proyectos,
+instituciones y beneficiarios. Las distribuciones buscan parecerse a las de
+los programas reales:
+
+- la mayoría de beneficiarios son pacientes y cuidadores, y predominan las mujeres,
+- la edad depende del tipo (los trabajadores de salud están en edad laboral),
+- la enfermedad depende del tipo (estrés laboral y agotamiento en trabajadores),
+- las primeras herramientas de cada proyecto se usan más que las últimas,
+- las respuestas buenas son más frecuentes que las malas,
+- unas pocas instituciones concentran la mayor parte de los beneficiarios.
+
+Uso:
+    python datos_sinteticos.py --cantidad 100000 --instantanea datos_salud.jsonl
+    python datos_sinteticos.py --cantidad 100000 --filas ingreso.csv
+"""
+import argparse
+import csv
+import json
+import random
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Tuple
+
+from proyecto_salud import (TIPOS_PROYECTO, Beneficiario, GestorProyectos, Genero, Institucion,
+                            Proyecto, RespuestaTratamiento, TipoBeneficiario)
+
+SEMILLA = 42
+INSTITUCIONES_POR_PROYECTO = 3
+TAMANO_BLOQUE = 10000
+# Días después del inicio del proyecto en los que se registran beneficiarios
+DIAS_REGISTRO = 730
+
+NOMBRES = [
+    "Ana", "María", "José", "Juan", "Luis", "Carmen", "Lucía", "Sofía", "Andrés", "Camila",
+    "Valentina", "Mateo", "Santiago", "Isabella", "Daniel", "Gabriela", "Sebastián", "Paula",
+    "Julián", "Natalia", "Carlos", "Laura", "Diego", "Mariana", "Felipe", "Daniela", "Jorge",
+    "Catalina", "Alejandro", "Manuela", "Ricardo", "Juliana", "Óscar", "Verónica", "Héctor",
+    "Adriana", "Martín", "Ángela", "Tomás", "Mónica", "Samuel", "Elena", "Emilio", "Rocío",
+    "Fernando", "Inés", "Gustavo", "Beatriz", "Raúl", "Claudia", "Esteban", "Patricia",
+    "Nicolás", "Lorena", "Iván", "Ximena", "Álvaro", "Yolanda", "Hernán", "Silvia",
+]
+APELLIDOS = [
+    "García", "Rodríguez", "Martínez", "López", "González", "Pérez", "Sánchez", "Ramírez",
+    "Torres", "Flórez", "Rivera", "Gómez", "Díaz", "Cruz", "Morales", "Ortiz", "Gutiérrez",
+    "Chávez", "Ramos", "Vargas", "Castillo", "Jiménez", "Moreno", "Romero", "Herrera",
+    "Medina", "Aguilar", "Castro", "Muñoz", "Rojas", "Mendoza", "Ruiz", "Álvarez", "Vásquez",
+    "Suárez", "Cárdenas", "Osorio", "Restrepo", "Valencia", "Zapata", "Giraldo", "Cardona",
+    "Londoño", "Marín", "Quintero", "Arango", "Salazar", "Ospina", "Montoya", "Betancur",
+    "Hincapié", "Mejía", "Henao", "Echeverri", "Patiño", "Bedoya", "Carmona",
+    "Acevedo", "Escobar", "Franco", "Duque", "Velásquez", "Toro", "Arias", "Correa", "Pineda",
+    "Vélez", "Agudelo", "Benítez", "Cano", "Orozco", "Serna", "Uribe", "Ocampo", "Peña",
+    "Rendón", "Sierra", "Jaramillo", "Palacio",
+]
+
+# (valor, peso) de cada distribución
+PESOS_TIPO = [
+    (TipoBeneficiario.PACIENTE_CUIDADOR, 60),
+    (TipoBeneficiario.TRABAJADOR_SALUD, 25),
+    (TipoBeneficiario.PERSONA_PARTICULAR, 15),
+]
+PESOS_GENERO = [(Genero.FEMENINO, 62), (Genero.MASCULINO, 36), (Genero.OTRO, 2)]
+PESOS_RESPUESTA = [
+    (RespuestaTratamiento.EXCELENTE, 25),
+    (RespuestaTratamiento.BUENA, 40),
+    (RespuestaTratamiento.REGULAR, 25),
+    (RespuestaTratamiento.MALA, 10),
+]
+# Edad por tipo: (media, desviación, mínima, máxima)
+EDADES = {
+    TipoBeneficiario.PACIENTE_CUIDADOR: (48, 20, 5, 95),
+    TipoBeneficiario.TRABAJADOR_SALUD: (38, 10, 20, 67),
+    TipoBeneficiario.PERSONA_PARTICULAR: (42, 16, 15, 90),
+}
+ENFERMEDADES = {
+    TipoBeneficiario.PACIENTE_CUIDADOR: [
+        ("Ansiedad", 20), ("Depresión", 18), ("Dolor crónico", 14), ("Cáncer", 10),
+        ("Enfermedad renal", 8), ("Alzheimer", 7), ("Accidente cerebrovascular", 7),
+        ("Insomnio", 6), ("Sobrecarga del cuidador", 10),
+    ],
+    TipoBeneficiario.TRABAJADOR_SALUD: [
+        ("Estrés laboral", 40), ("Síndrome de agotamiento", 25), ("Ansiedad", 15),
+        ("Insomnio", 12), ("Depresión", 8),
+    ],
+    TipoBeneficiario.PERSONA_PARTICULAR: [
+        ("Ansiedad", 30), ("Depresión", 22), ("Insomnio", 15), ("Duelo", 13),
+        ("Estrés", 20),
+    ],
+}
+
+
+def _separar(pesos: List[Tuple[object, int]]) -> Tuple[List, List[int]]:
+    """Valores y pesos acumulados, para random.choices"""
+    valores, acumulados, total = [], [], 0
+    for valor, peso in pesos:
+        total += peso
+        valores.append(valor)
+        acumulados.append(total)
+    return valores, acumulados
+
+
+_TIPOS = _separar(PESOS_TIPO)
+_GENEROS = _separar(PESOS_GENERO)
+_RESPUESTAS = _separar(PESOS_RESPUESTA)
+_ENFERMEDADES = {tipo: _separar(pesos) for tipo, pesos in ENFERMEDADES.items()}
+
+
+def _pesos_decrecientes(valores: List) -> Tuple[List, List[int]]:
+    """El primer valor es el más frecuente, el segundo la mitad de frecuente, etc."""
+    return _separar([(valor, 60 // (posicion + 1)) for posicion, valor in enumerate(valores)])
+
+
+def generar_nombre(rng: random.Random) -> str:
+    """Uno o dos nombres y dos apellidos"""
+    nombre = rng.choice(NOMBRES)
+    if rng.random() < 0.5:
+        nombre += " " + rng.choice(NOMBRES)
+    return f"{nombre} {rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}"
+
+
+def generar_beneficiarios(proyecto: Proyecto, cantidad: int,
+                          rng: random.Random) -> Iterator[Beneficiario]:
+    """Beneficiarios con herramientas del proyecto y fechas de registro
+    posteriores a su inicio. Los campos se sortean por bloques"""
+    herramientas = _pesos_decrecientes(proyecto.obtener_herramientas_especificas())
+    inicio = proyecto.fecha_inicio
+    segundos_registro = DIAS_REGISTRO * 24 * 3600
+    restantes = cantidad
+    while restantes > 0:
+        n = min(restantes, TAMANO_BLOQUE)
+        restantes -= n
+        tipos = rng.choices(_TIPOS[0], cum_weights=_TIPOS[1], k=n)
+        generos = rng.choices(_GENEROS[0], cum_weights=_GENEROS[1], k=n)
+        respuestas = rng.choices(_RESPUESTAS[0], cum_weights=_RESPUESTAS[1], k=n)
+        usadas = rng.choices(herramientas[0], cum_weights=herramientas[1], k=n)
+        for tipo, genero, respuesta, herramienta in zip(tipos, generos, respuestas, usadas):
+            media, desviacion, minima, maxima = EDADES[tipo]
+            edad = min(maxima, max(minima, round(rng.gauss(media, desviacion))))
+            enfermedades, acumulados = _ENFERMEDADES[tipo]
+            enfermedad = rng.choices(enfermedades, cum_weights=acumulados)[0]
+            fecha = inicio + timedelta(seconds=rng.randrange(segundos_registro))
+            yield Beneficiario(generar_nombre(rng), tipo, genero, edad, enfermedad,
+                               herramienta, respuesta, fecha)
+
+
+def crear_estructura(instituciones_por_proyecto: int = INSTITUCIONES_POR_PROYECTO) -> GestorProyectos:
+    """Gestor con un proyecto de cada tipo y sus instituciones, sin beneficiarios"""
+    gestor = GestorProyectos()
+    for numero, (tipo, clase) in enumerate(TIPOS_PROYECTO.items()):
+        proyecto = clase(f"Proyecto {tipo}", f"Proyecto sintético de {tipo.lower()}",
+                         datetime(2024, 1 + numero, 1))
+        for i in range(1, instituciones_por_proyecto + 1):
+            proyecto.agregar_institucion(
+                Institucion(f"Institución {i}", f"Calle {i} # {10 * i}-{i}", f"555-{i:04d}"))
+        gestor.agregar_proyecto(proyecto)
+    return gestor
+
+
+def repartir(gestor: GestorProyectos, cantidad: int,
+             semilla: int = SEMILLA) -> Iterator[Tuple[Institucion, Beneficiario]]:
+    """Reparte `cantidad` beneficiarios entre los proyectos y sus instituciones.
+    Los proyectos reciben partes parecidas y, dentro de cada proyecto, la
+    primera institución recibe el doble que la segunda, etc."""
+    rng = random.Random(semilla)
+    proyectos = gestor.proyectos
+    for posicion, proyecto in enumerate(proyectos):
+        parte = cantidad // len(proyectos) + (1 if posicion < cantidad % len(proyectos) else 0)
+        instituciones, acumulados = _pesos_decrecientes(proyecto.instituciones)
+        destinos = iter(rng.choices(instituciones, cum_weights=acumulados, k=parte))
+        for beneficiario in generar_beneficiarios(proyecto, parte, rng):
+            yield next(destinos), beneficiario
+
+
+def crear_gestor_sintetico(cantidad: int, semilla: int = SEMILLA,
+                           instituciones_por_proyecto: int = INSTITUCIONES_POR_PROYECTO) -> GestorProyectos:
+    """Gestor con `cantidad` beneficiarios sintéticos"""
+    gestor = crear_estructura(instituciones_por_proyecto)
+    for institucion, beneficiario in repartir(gestor, cantidad, semilla):
+        institucion.agregar_beneficiario(beneficiario)
+    return gestor
+
+
+def iterar_filas(gestor: GestorProyectos, cantidad: int, semilla: int = SEMILLA) -> Iterator[Dict]:
+    """Filas en el formato de importacion.py para las instituciones del gestor"""
+    # El proyecto de cada institución, para escribirlo en la fila
+    proyecto_de = {id(institucion): proyecto.nombre
+                   for proyecto in gestor.proyectos for institucion in proyecto.instituciones}
+    for institucion, beneficiario in repartir(gestor, cantidad, semilla):
+        yield {
+            "proyecto": proyecto_de[id(institucion)],
+            "institucion": institucion.nombre,
+            "nombre": beneficiario.nombre,
+            "tipo": beneficiario.tipo.value,
+            "genero": beneficiario.genero.value,
+            "edad": beneficiario.edad,
+            "enfermedad": beneficiario.enfermedad,
+            "herramienta_tratamiento": beneficiario.herramienta_tratamiento,
+            "respuesta_tratamiento": beneficiario.respuesta_tratamiento.value,
+            "fecha_registro": beneficiario.fecha_registro.isoformat(),
+        }
+
+
+def escribir_filas(archivo: str, gestor: GestorProyectos, cantidad: int,
+                   semilla: int = SEMILLA) -> int:
+    """Escribe filas sintéticas en un .csv o .jsonl. Retorna la cantidad escrita"""
+    escritas = 0
+    with open(archivo, "w", encoding="utf-8", newline="") as f:
+        if archivo.lower().endswith(".csv"):
+            from importacion import CAMPOS
+            escritor = csv.DictWriter(f, fieldnames=CAMPOS + ["fecha_registro"])
+            escritor.writeheader()
+            for fila in iterar_filas(gestor, cantidad, semilla):
+                escritor.writerow(fila)
+                escritas += 1
+        else:
+            for fila in iterar_filas(gestor, cantidad, semilla):
+                f.write(json.dumps(fila, ensure_ascii=False) + "\n")
+                escritas += 1
+    return escritas
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos reproducibles")
+    parser.add_argument("--cantidad", type=float, default=1000, help="beneficiarios a generar (admite 1e6)")
+    parser.add_argument("--semilla", type=int, default=SEMILLA)
+    parser.add_argument("--instituciones", type=int, default=INSTITUCIONES_POR_PROYECTO,
+                        help="instituciones por proyecto")
+    parser.add_argument("--instantanea", help="guarda la base de datos completa en este archivo")
+    parser.add_argument("--filas", help="escribe las filas en un .csv o .jsonl para importacion.py")
+    args = parser.parse_args(argumentos)
+    cantidad = int(args.cantidad)
+
+    if not args.instantanea and not args.filas:
+        parser.error("indique --instantanea y/o --filas")
+    if args.instantanea:
+        from persistencia import guardar_instantanea
+        gestor = crear_gestor_sintetico(cantidad, args.semilla, args.instituciones)
+        registros = guardar_instantanea(gestor, args.instantanea)
+        print(f"{registros} registros guardados en '{args.instantanea}'")
+    if args.filas:
+        # Las filas apuntan a la misma estructura que la instantánea
+        escritas = escribir_filas(args.filas, crear_estructura(args.instituciones), cantidad, args.semilla)
+        print(f"{escritas} filas escritas en '{args.filas}'")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+"""Exportación incremental: solo lo que cambió desde la exportación anterior.
+
+exportar_datos (proyecto_salud.py) reescribe el reporte completo cada vez.
+exportar_incremental() escribe en un directorio una exportación base, con
+todos los registros, y después deltas con solo los cambios posteriores a la
+marca de agua de la exportación anterior. La marca es la secuencia de la
+bitácora (bitacora.py), que registra cada cambio de los proyectos y de las
+instituciones, así que sirve entre ejecuciones distintas del programa.
+
+Cada archivo es JSON Lines, con los mismos registros que la instantánea
+(persistencia.py) más las bajas, los cambios de respuesta y los agregados:
+
+    {"registro": "encabezado", "formato": "salud-exportacion", "version": 1,
+     "tipo": "delta", "desde": 120, "hasta": 158, ...}
+    {"registro": "proyecto", "tipo": "Musicoterapia", "nombre": ..., ...}
+    {"registro": "institucion", "id": 3, "nombre": ..., ...}
+    {"registro": "vinculo", "proyecto": ..., "institucion": 3}
+    {"registro": "beneficiario", "institucion": 0, "nombre": ..., ...}
+    {"registro": "respuesta", "institucion": 0, "nombre": ..., ..., "anterior": "Regular"}
+    {"registro": "baja", "institucion": 0, "nombre": ..., ...}
+    {"registro": "agregado", "institucion": 0, "parcial": {...}, "estadisticas": {...}}
+    {"registro": "reporte", "proyecto": ..., "reporte": {...}}
+
+Un beneficiario no tiene id: las bajas (lápidas) llevan todos sus campos
+como estaban en la exportación anterior, y los cambios de respuesta sus
+campos actuales más la respuesta anterior. Los cambios se resumen por
+beneficiario: uno que se agregó y se dio de baja entre dos exportaciones no
+aparece. Un delta trae el agregado de cada institución que cambió y el
+reporte (el de generar_reporte_consolidado) de cada proyecto afectado.
+
+`manifiesto.json` lista la base y los deltas en orden, con sus marcas; el
+estado completo es la base más los deltas aplicados en ese orden
+(reconstruir). Si la bitácora ya no tiene los registros posteriores a la
+marca, o si se compactó después de la base (la compactación renumera las
+instituciones), se escribe una base nueva y el manifiesto vuelve a empezar
+desde ella. Los archivos que dejan de estar en el manifiesto no se borran.
+
+Uso:
+    resumen = exportar_incremental("datos_salud", "exportacion")
+    estado = reconstruir("exportacion")
+"""
+import gzip
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional
+
+from bitacora import DIRECTORIO_DATOS, cambios_desde, cargar_numerado, identificar_instantanea
+from instrumentacion import instrumentado
+from persistencia import beneficiario_a_registro, parcial_a_registro
+from proyecto_salud import escritura_atomica
+
+FORMATO = "salud-exportacion"
+FORMATO_MANIFIESTO = "salud-manifiesto"
+VERSION = 1
+DIRECTORIO_EXPORTACION = "exportacion"
+ARCHIVO_MANIFIESTO = "manifiesto.json"
+
+
+def leer_manifiesto(destino: str = DIRECTORIO_EXPORTACION) -> Optional[Dict]:
+    """Manifiesto del directorio de exportación, o None si no hay uno válido"""
+    try:
+        with open(os.path.join(destino, ARCHIVO_MANIFIESTO), "r", encoding="utf-8") as f:
+            manifiesto = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifiesto.get("formato") != FORMATO_MANIFIESTO or manifiesto.get("version") != VERSION:
+        return None
+    return manifiesto
+
+
+def _agregado(numero: int, parcial) -> Dict:
+    return {"registro": "agregado", "institucion": numero, "parcial": parcial_a_registro(parcial),
+            "estadisticas": parcial.a_estadisticas()}
+
+
+def _reporte(proyecto, parciales) -> Dict:
+    return {"registro": "reporte", "proyecto": proyecto.nombre,
+            "reporte": proyecto.reporte_desde_parciales(parciales)}
+
+
+def _registros_base(gestor, instituciones) -> Iterator[Dict]:
+    """Todos los registros del gestor, con los ids de institución de la bitácora"""
+    ids = {id(institucion): numero for numero, institucion in enumerate(instituciones)}
+    for proyecto in gestor.proyectos:
+        yield {"registro": "proyecto", "tipo": proyecto.TIPO_PROYECTO, "nombre": proyecto.nombre,
+               "descripcion": proyecto.descripcion, "fecha_inicio": proyecto.fecha_inicio.isoformat()}
+    for numero, institucion in enumerate(instituciones):
+        yield {"registro": "institucion", "id": numero, "nombre": institucion.nombre,
+               "direccion": institucion.direccion, "telefono": institucion.telefono}
+    for proyecto in gestor.proyectos:
+        for institucion in proyecto.instituciones:
+            yield {"registro": "vinculo", "proyecto": proyecto.nombre,
+                   "institucion": ids[id(institucion)]}
+    for numero, institucion in enumerate(instituciones):
+        for beneficiario in institucion.iterar_beneficiarios():
+            yield {"registro": "beneficiario", "institucion": numero,
+                   **beneficiario_a_registro(beneficiario)}
+    for numero, institucion in enumerate(instituciones):
+        yield _agregado(numero, institucion.obtener_parcial())
+    for proyecto in gestor.proyectos:
+        yield _reporte(proyecto, proyecto.obtener_parciales())
+
+
+def _registros_delta(cambios: Dict) -> Iterator[Dict]:
+    """Registros de un delta a partir de bitacora.cambios_desde"""
+    for clave in ("proyectos", "instituciones", "vinculos"):
+        for registro in cambios[clave]:
+            yield {campo: valor for campo, valor in registro.items() if campo != "secuencia"}
+    for numero, lista in cambios["beneficiarios"].items():
+        for anterior, actual in lista:
+            if anterior is None:
+                yield {"registro": "beneficiario", "institucion": numero, **actual}
+            elif actual is None:
+                yield {"registro": "baja", "institucion": numero, **anterior}
+            else:
+                yield {"registro": "respuesta", "institucion": numero, **actual,
+                       "anterior": anterior["respuesta_tratamiento"]}
+    for numero in cambios["beneficiarios"]:
+        yield _agregado(numero, cambios["parciales"][numero])
+    for proyecto, parciales in cambios["proyectos_afectados"]:
+        yield _reporte(proyecto, parciales)
+
+
+def _escribir(destino: str, archivo: str, encabezado: Dict, registros: Iterable[Dict],
+              comprimir: bool) -> Dict:
+    """Escribe un archivo de la exportación. Retorna su entrada del manifiesto"""
+    conteo: Dict[str, int] = {}
+    with escritura_atomica(os.path.join(destino, archivo), comprimir) as f:
+        f.write(json.dumps(encabezado, ensure_ascii=False) + "\n")
+        for registro in registros:
+            f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            conteo[registro["registro"]] = conteo.get(registro["registro"], 0) + 1
+    return {"archivo": archivo, "tipo": encabezado["tipo"], "desde": encabezado["desde"],
+            "hasta": encabezado["hasta"], "fecha_generacion": encabezado["fecha_generacion"],
+            "registros": conteo}
+
+
+@instrumentado
+def exportar_incremental(ruta: str = DIRECTORIO_DATOS, destino: str = DIRECTORIO_EXPORTACION,
+                         base: bool = False, comprimir: bool = False) -> Dict:
+    """Exporta los cambios de los datos de `ruta` (un directorio con
+    bitácora) posteriores a la última exportación de `destino`, o una base
+    completa si no la hay, si es de otros datos, si se compactaron después
+    de la base, si la bitácora ya no tiene esos cambios o si base=True. Retorna un resumen de lo exportado"""
+    inicio = time.perf_counter()
+    if not os.path.isdir(ruta):
+        raise ValueError(f"La exportación incremental necesita un directorio con bitácora: '{ruta}'")
+    os.makedirs(destino, exist_ok=True)
+    origen = os.path.abspath(ruta)
+    instantanea = identificar_instantanea(ruta)
+    manifiesto = leer_manifiesto(destino)
+    motivo = None
+    cambios = None
+    if base:
+        motivo = "pedida"
+    elif manifiesto is None:
+        motivo = "sin exportación anterior"
+    elif manifiesto["origen"] != origen:
+        motivo = "otros datos"
+    elif instantanea is None or manifiesto["instantanea"] != instantanea:
+        # Los deltas usan los ids de institución de la instantánea de la base
+        motivo = "los datos se compactaron después de la base"
+    else:
+        cambios = cambios_desde(ruta, manifiesto["marca"])
+        if cambios is None:
+            motivo = "la bitácora ya no tiene los cambios desde la marca"
+
+    fecha_generacion = datetime.now().isoformat()
+    sufijo = ".jsonl.gz" if comprimir else ".jsonl"
+    if cambios is not None:
+        desde = manifiesto["marca"]
+        if cambios["secuencia"] == desde:
+            return {"tipo": "sin cambios", "marca": desde,
+                    "segundos": time.perf_counter() - inicio}
+        encabezado = {"registro": "encabezado", "formato": FORMATO, "version": VERSION,
+                      "tipo": "delta", "desde": desde, "hasta": cambios["secuencia"],
+                      "fecha_generacion": fecha_generacion}
+        entrada = _escribir(destino, f"delta-{desde:012d}-{cambios['secuencia']:012d}{sufijo}",
+                            encabezado, _registros_delta(cambios), comprimir)
+        archivos = manifiesto["archivos"] + [entrada]
+    else:
+        gestor, instituciones, secuencia = cargar_numerado(ruta)
+        encabezado = {"registro": "encabezado", "formato": FORMATO, "version": VERSION,
+                      "tipo": "base", "desde": None, "hasta": secuencia,
+                      "fecha_generacion": fecha_generacion}
+        entrada = _escribir(destino, f"base-{secuencia:012d}{sufijo}", encabezado,
+                            _registros_base(gestor, instituciones), comprimir)
+        archivos = [entrada]
+
+    # El manifiesto se reemplaza al final: si algo falla antes, sigue
+    # apuntando a la exportación anterior
+    with escritura_atomica(os.path.join(destino, ARCHIVO_MANIFIESTO)) as f:
+        json.dump({"formato": FORMATO_MANIFIESTO, "version": VERSION, "origen": origen,
+                   "instantanea": instantanea, "marca": entrada["hasta"], "archivos": archivos},
+                  f, ensure_ascii=False, indent=2)
+    return {**entrada, "motivo_base": motivo, "segundos": time.perf_counter() - inicio}
+
+
+def _leer_archivo(ruta: str) -> Iterator[Dict]:
+    abrir = gzip.open if ruta.endswith(".gz") else open
+    with abrir(ruta, "rt", encoding="utf-8") as f:
+        encabezado = json.loads(f.readline())
+        if encabezado.get("formato") != FORMATO or encabezado.get("version") != VERSION:
+            raise ValueError(f"'{ruta}' no es un archivo de exportación")
+        for linea in f:
+            yield json.loads(linea)
+
+
+def _clave(registro: Dict):
+    return registro["nombre"], registro["fecha_registro"]
+
+
+def _campos(registro: Dict) -> Dict:
+    return {campo: valor for campo, valor in registro.items()
+            if campo not in ("registro", "institucion", "anterior")}
+
+
+def reconstruir(destino: str = DIRECTORIO_EXPORTACION) -> Dict:
+    """Estado completo según el manifiesto de `destino`: la base más los
+    deltas en orden, como lo cargaría el destino de la exportación.
+
+    Retorna {"marca", "proyectos": {nombre: registro con "instituciones"},
+    "instituciones": {id: registro}, "beneficiarios": {id: {(nombre,
+    fecha_registro): [registros]}}, "agregados": {id: registro},
+    "reportes": {nombre: reporte}}
+    """
+    manifiesto = leer_manifiesto(destino)
+    if manifiesto is None:
+        raise ValueError(f"No hay un manifiesto de exportación en '{destino}'")
+    estado = {"marca": manifiesto["marca"], "proyectos": {}, "instituciones": {},
+              "beneficiarios": {}, "agregados": {}, "reportes": {}}
+    for entrada in manifiesto["archivos"]:
+        for registro in _leer_archivo(os.path.join(destino, entrada["archivo"])):
+            clase = registro["registro"]
+            if clase == "proyecto":
+                estado["proyectos"][registro["nombre"]] = {**_campos(registro), "instituciones": []}
+            elif clase == "institucion":
+                estado["instituciones"][registro["id"]] = _campos(registro)
+                estado["beneficiarios"][registro["id"]] = {}
+            elif clase == "vinculo":
+                estado["proyectos"][registro["proyecto"]]["instituciones"].append(registro["institucion"])
+            elif clase == "agregado":
+                estado["agregados"][registro["institucion"]] = _campos(registro)
+            elif clase == "reporte":
+                estado["reportes"][registro["proyecto"]] = registro["reporte"]
+            else:
+                por_clave = estado["beneficiarios"][registro["institucion"]]
+                campos = _campos(registro)
+                if clase == "beneficiario":
+                    por_clave.setdefault(_clave(registro), []).append(campos)
+                    continue
+                buscado = campos if clase == "baja" else {
+                    **campos, "respuesta_tratamiento": registro["anterior"]}
+                lista = por_clave.get(_clave(registro), [])
+                if buscado not in lista:
+                    raise ValueError(f"'{entrada['archivo']}': {clase} de un beneficiario "
+                                     f"que no existe ({registro['nombre']})")
+                posicion = lista.index(buscado)
+                if clase == "baja":
+                    del lista[posicion]
+                    if not lista:
+                        del por_clave[_clave(registro)]
+                else:
+                    lista[posicion] = campos
+    return estado
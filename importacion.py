@@ -0,0 +1,283 @@
+"""Importación masiva de beneficiarios desde archivos CSV o JSONL.
+
+Cada fila debe traer las columnas:
+    proyecto, institucion, nombre, tipo, genero, edad, enfermedad,
+    herramienta_tratamiento, respuesta_tratamiento[, fecha_registro]
+
+La lectura se hace por bloques de texto sin decodificar; la decodificación
+(CSV o JSON) y la validación de cada bloque (enums, rango de edad,
+herramienta permitida en el proyecto) corren en un pool de procesos. Las
+filas rechazadas se escriben en un archivo de errores (JSONL) y las
+aceptadas se insertan por lotes con agregar_beneficiarios_lote.
+
+Uso:
+    python importacion.py ingreso.csv [--datos datos_salud] [--procesos 4]
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from proyecto_salud import (Beneficiario, GestorProyectos, Genero, RespuestaTratamiento,
+                            TipoBeneficiario)
+
+EDAD_MINIMA = 0
+EDAD_MAXIMA = 120
+TAMANO_BLOQUE = 5000
+
+CAMPOS = ["proyecto", "institucion", "nombre", "tipo", "genero", "edad", "enfermedad",
+          "herramienta_tratamiento", "respuesta_tratamiento"]
+
+# Catálogo de proyectos que usa cada proceso de validación:
+# {proyecto: ({herramienta en minúsculas: herramienta}, {instituciones})}
+_catalogo: Dict[str, Tuple[Dict[str, str], set]] = {}
+
+
+def _opciones_enum(enum) -> Dict[str, object]:
+    """Acepta tanto el valor ("trabajador_salud") como el nombre del miembro"""
+    opciones = {}
+    for miembro in enum:
+        opciones[miembro.value.lower()] = miembro
+        opciones[miembro.name.lower()] = miembro
+    return opciones
+
+
+_TIPOS = _opciones_enum(TipoBeneficiario)
+_GENEROS = _opciones_enum(Genero)
+_RESPUESTAS = _opciones_enum(RespuestaTratamiento)
+
+
+def crear_catalogo(gestor: GestorProyectos) -> Dict[str, Tuple[Dict[str, str], set]]:
+    """Herramientas e instituciones válidas por proyecto"""
+    return {
+        proyecto.nombre: (
+            {h.lower(): h for h in proyecto.obtener_herramientas_especificas()},
+            {institucion.nombre for institucion in proyecto.instituciones}
+        )
+        for proyecto in gestor.proyectos
+    }
+
+
+def _inicializar_proceso(catalogo):
+    global _catalogo
+    _catalogo = catalogo
+
+
+def _texto(fila: Dict, campo: str) -> str:
+    valor = fila.get(campo)
+    if valor is None or str(valor).strip() == "":
+        raise ValueError(f"falta el campo '{campo}'")
+    return str(valor).strip()
+
+
+def _enum(fila: Dict, campo: str, opciones: Dict[str, object]):
+    valor = _texto(fila, campo)
+    miembro = opciones.get(valor.lower())
+    if miembro is None:
+        raise ValueError(f"{campo} no válido: '{valor}'")
+    return miembro
+
+
+def validar_fila(fila: Dict) -> Tuple:
+    """Valida una fila y retorna los campos listos para crear el Beneficiario.
+    Lanza ValueError con el motivo del rechazo"""
+    proyecto = _texto(fila, "proyecto")
+    if proyecto not in _catalogo:
+        raise ValueError(f"proyecto desconocido: '{proyecto}'")
+    herramientas, instituciones = _catalogo[proyecto]
+
+    institucion = _texto(fila, "institucion")
+    if institucion not in instituciones:
+        raise ValueError(f"la institución '{institucion}' no participa en '{proyecto}'")
+
+    try:
+        edad = int(_texto(fila, "edad"))
+    except ValueError:
+        raise ValueError(f"edad no válida: '{fila.get('edad')}'")
+    if not EDAD_MINIMA <= edad <= EDAD_MAXIMA:
+        raise ValueError(f"edad fuera de rango ({EDAD_MINIMA}-{EDAD_MAXIMA}): {edad}")
+
+    herramienta = herramientas.get(_texto(fila, "herramienta_tratamiento").lower())
+    if herramienta is None:
+        raise ValueError(f"herramienta no disponible en '{proyecto}': "
+                         f"'{fila.get('herramienta_tratamiento')}'")
+
+    fecha = fila.get("fecha_registro")
+    fecha_registro = datetime.fromisoformat(str(fecha).strip()) if fecha else None
+
+    return (proyecto, institucion, _texto(fila, "nombre"), _enum(fila, "tipo", _TIPOS),
+            _enum(fila, "genero", _GENEROS), edad, _texto(fila, "enfermedad"), herramienta,
+            _enum(fila, "respuesta_tratamiento", _RESPUESTAS), fecha_registro)
+
+
+def validar_bloque(bloque: List[Tuple[int, str]],
+                   encabezado: Optional[List[str]] = None) -> Tuple[List[Tuple], List[Dict]]:
+    """Valida un bloque de (número de línea, texto). Cada texto es una línea
+    JSONL o, si se pasa el encabezado, un registro CSV; se decodifican aquí,
+    en el proceso de validación. Retorna (aceptadas, rechazadas)"""
+    aceptadas, rechazadas = [], []
+    for linea, fila in bloque:
+        try:
+            if encabezado is not None:
+                try:
+                    valores = next(csv.reader((fila,)), [])
+                except csv.Error as e:
+                    raise ValueError(f"CSV mal formado: {e}")
+                fila = dict(zip(encabezado, valores))
+            else:
+                try:
+                    fila = json.loads(fila)
+                except ValueError:
+                    raise ValueError("JSON mal formado")
+                if not isinstance(fila, dict):
+                    raise ValueError("se esperaba un objeto JSON")
+            aceptadas.append(validar_fila(fila))
+        except ValueError as e:
+            rechazadas.append({"linea": linea, "error": str(e), "fila": fila})
+    return aceptadas, rechazadas
+
+
+def _registros_csv(lineas: Iterator[str]) -> Iterator[Tuple[int, str]]:
+    """(línea inicial, texto) de cada registro CSV sin decodificar sus campos.
+    Un campo entre comillas puede tener saltos de línea: el registro sigue
+    mientras la cantidad de comillas sea impar (las comillas internas van
+    dobles, así que no cambian la paridad)"""
+    partes: List[str] = []
+    inicio = comillas = 0
+    for numero, linea in enumerate(lineas, 1):
+        if not partes:
+            inicio = numero
+        partes.append(linea)
+        comillas += linea.count('"')
+        if comillas % 2 == 0:
+            yield inicio, partes[0] if len(partes) == 1 else "".join(partes)
+            partes = []
+            comillas = 0
+    if partes:
+        yield inicio, "".join(partes)
+
+
+def leer_bloques(archivo: str, tamano: int = TAMANO_BLOQUE
+                 ) -> Iterator[Tuple[Optional[List[str]], List[Tuple[int, str]]]]:
+    """Lee el archivo por bloques de (número de línea, texto) sin decodificar
+    las filas. El formato se deduce de la extensión: .csv o .jsonl. Genera
+    (encabezado, bloque); el encabezado es None en JSONL"""
+    bloque = []
+    encabezado = None
+    with open(archivo, "r", encoding="utf-8", newline="") as f:
+        if archivo.lower().endswith(".csv"):
+            registros = _registros_csv(f)
+            for _, texto in registros:
+                if texto.strip():
+                    encabezado = next(csv.reader((texto,)))
+                    break
+            filas = ((numero, texto) for numero, texto in registros if texto.strip())
+        else:
+            filas = ((numero, linea) for numero, linea in enumerate(f, 1) if linea.strip())
+        for elemento in filas:
+            bloque.append(elemento)
+            if len(bloque) >= tamano:
+                yield encabezado, bloque
+                bloque = []
+    if bloque:
+        yield encabezado, bloque
+
+
+def _resultados(bloques, catalogo, procesos: int):
+    """Decodifica y valida los bloques en un pool de procesos, con a lo sumo 2
+    bloques pendientes por proceso para que la memoria no crezca con el archivo"""
+    if procesos <= 1:
+        _inicializar_proceso(catalogo)
+        for encabezado, bloque in bloques:
+            yield validar_bloque(bloque, encabezado)
+        return
+
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar_proceso,
+                             initargs=(catalogo,)) as pool:
+        pendientes = deque()
+        for encabezado, bloque in bloques:
+            pendientes.append(pool.submit(validar_bloque, bloque, encabezado))
+            if len(pendientes) >= 2 * procesos:
+                yield pendientes.popleft().result()
+        while pendientes:
+            yield pendientes.popleft().result()
+
+
+def importar_archivo(gestor: GestorProyectos, archivo: str,
+                     archivo_errores: Optional[str] = None,
+                     procesos: Optional[int] = None,
+                     tamano_bloque: int = TAMANO_BLOQUE) -> Dict:
+    """Importa beneficiarios desde un CSV o JSONL al gestor.
+
+    Retorna un resumen con las filas aceptadas y rechazadas, el tiempo y las
+    filas por segundo. Las rechazadas se guardan en `archivo_errores`
+    (por defecto <archivo>.errores.jsonl).
+    """
+    if archivo_errores is None:
+        archivo_errores = archivo + ".errores.jsonl"
+    if procesos is None:
+        procesos = os.cpu_count() or 1
+
+    catalogo = crear_catalogo(gestor)
+    instituciones = {
+        (proyecto.nombre, institucion.nombre): institucion
+        for proyecto in gestor.proyectos for institucion in proyecto.instituciones
+    }
+    aceptadas = rechazadas = 0
+    inicio = time.perf_counter()
+
+    with open(archivo_errores, "w", encoding="utf-8") as errores:
+        for validas, invalidas in _resultados(leer_bloques(archivo, tamano_bloque), catalogo, procesos):
+            # Agrupar por institución para insertar cada grupo en un solo lote
+            lotes: Dict[Tuple[str, str], List[Beneficiario]] = {}
+            for proyecto, institucion, *campos in validas:
+                lotes.setdefault((proyecto, institucion), []).append(Beneficiario(*campos))
+            for clave, lote in lotes.items():
+                aceptadas += instituciones[clave].agregar_beneficiarios_lote(lote)
+            for rechazo in invalidas:
+                errores.write(json.dumps(rechazo, ensure_ascii=False, default=str) + "\n")
+            rechazadas += len(invalidas)
+
+    segundos = time.perf_counter() - inicio
+    total = aceptadas + rechazadas
+    return {
+        "aceptadas": aceptadas,
+        "rechazadas": rechazadas,
+        "archivo_errores": archivo_errores,
+        "segundos": segundos,
+        "filas_por_segundo": total / segundos if segundos > 0 else float(total)
+    }
+
+
+def main(argumentos=None):
+    from bitacora import DIRECTORIO_DATOS, Bitacora
+
+    parser = argparse.ArgumentParser(description="Importa beneficiarios desde CSV o JSONL")
+    parser.add_argument("archivo", help="archivo .csv o .jsonl con los beneficiarios")
+    parser.add_argument("--datos", default=DIRECTORIO_DATOS, help="directorio de la base de datos")
+    parser.add_argument("--errores", default=None, help="archivo para las filas rechazadas")
+    parser.add_argument("--procesos", type=int, default=None, help="procesos de validación")
+    args = parser.parse_args(argumentos)
+
+    if not os.path.isdir(args.datos) or not Bitacora.existe(args.datos):
+        print(f"No existe la base de datos '{args.datos}'", file=sys.stderr)
+        return 1
+    # Igual que comandos.py importar: las altas quedan en la bitácora
+    gestor, bitacora, _ = Bitacora.recuperar(args.datos)
+    try:
+        resumen = importar_archivo(gestor, args.archivo, args.errores, args.procesos)
+        bitacora.compactar_si_corresponde()
+    finally:
+        bitacora.cerrar()
+    print(json.dumps(resumen, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
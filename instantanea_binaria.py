@@ -0,0 +1,626 @@
+"""Instantánea binaria compacta que se abre con mmap.
+
+Cargar una instantánea JSON crea un objeto Beneficiario (con sus campos,
+fecha y enums) por cada línea. Este formato guarda los beneficiarios como
+registros de ancho fijo y los textos en tablas de diccionario, de modo que
+al abrirlo solo se lee el encabezado: las estadísticas y los recorridos
+leen los campos directamente del archivo mapeado, y un Beneficiario se crea
+recién cuando se pide uno (por ejemplo, en consultar_beneficiario).
+
+Formato (little-endian, secciones alineadas a 8 bytes):
+
+    encabezado  magia "SALUDBIN", versión, tamaño de registro y la posición
+                de cada sección (ENCABEZADO)
+    registros   un REGISTRO de 32 bytes por beneficiario, agrupados por
+                institución en orden de registro:
+                fecha (microsegundos desde 1970, int64), códigos de nombre,
+                enfermedad y herramienta (uint32), edad (int16) y los
+                códigos de tipo, género y respuesta (uint8)
+    por nombre  por institución, sus filas (uint32) ordenadas por código de
+                nombre, para buscar un nombre por bisección
+    tablas      nombres (ordenados por sus bytes UTF-8, para buscarlos por
+                bisección), enfermedades y herramientas: cantidad, tabla de
+                posiciones (uint64) y los textos UTF-8 uno tras otro
+    metadatos   JSON con los proyectos, sus instituciones y, por institución,
+                su primer registro y su cantidad (la tabla de desplazamientos)
+
+Las instituciones abiertas son InstitucionMapeada: los cambios posteriores
+(altas, bajas y cambios de respuesta) se guardan en memoria sobre los datos
+mapeados, que no se modifican; para conservarlos hay que volver a guardar.
+
+Uso:
+    guardar_binaria(gestor, "datos_salud.bin")
+    gestor, resumen = abrir_binaria("datos_salud.bin")
+    python instantanea_binaria.py convertir datos_salud datos_salud.bin
+    python instantanea_binaria.py estadisticas datos_salud.bin
+"""
+import argparse
+import json
+import mmap
+import operator
+import struct
+import sys
+import time
+import weakref
+from array import array
+from collections import Counter
+from datetime import date, datetime, timedelta
+from itertools import repeat
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from almacen_columnar import GENEROS, RESPUESTAS, TIPOS, a_marca_tiempo, desde_marca_tiempo
+from instrumentacion import BUS_EVENTOS, instrumentado
+from persistencia import ErrorInstantanea, numerar_instituciones, registro_a_proyecto
+from proyecto_salud import (Beneficiario, EstadisticasParciales, GestorProyectos, Institucion,
+                            RespuestaTratamiento, SeriesTemporales, codigo_celda, escritura_atomica,
+                            franja_edad, memorizar_por_version)
+
+MAGIA = b"SALUDBIN"
+VERSION = 1
+ARCHIVO_BINARIO = "datos_salud.bin"
+# magia, versión, tamaño de registro, inicio y cantidad de registros, inicio
+# de las filas por nombre, de las tablas de nombres, enfermedades y
+# herramientas, y de los metadatos
+ENCABEZADO = struct.Struct("<8sIIQQQQQQQ")
+# fecha, nombre, enfermedad, herramienta, edad, tipo, género, respuesta
+REGISTRO = struct.Struct("<qIIIhBBB7x")
+# Posición de cada campo dentro del registro, para recorrer columnas
+_DESPLAZAMIENTO_NOMBRE = 8
+_DESPLAZAMIENTO_RESPUESTA = 24
+# Herramienta, edad, tipo, género y respuesta de un registro, que van seguidos
+_CLAVE_CUBO = struct.Struct("<16x9s7x")
+_CAMPOS_CUBO = struct.Struct("<IhBBB")
+
+_CODIGO_TIPO = {t: i for i, t in enumerate(TIPOS)}
+_CODIGO_GENERO = {g: i for i, g in enumerate(GENEROS)}
+_CODIGO_RESPUESTA = {r: i for i, r in enumerate(RESPUESTAS)}
+_MICROSEGUNDOS_POR_DIA = 24 * 3600 * 1000000
+_EPOCA = date(1970, 1, 1)
+
+
+def _alinear(posicion: int) -> int:
+    return (posicion + 7) & ~7
+
+
+def _tabla(textos: List[bytes]) -> bytes:
+    """Tabla de textos: cantidad, posiciones de inicio (y fin del último) y datos"""
+    posiciones = array("Q", [0])
+    for texto in textos:
+        posiciones.append(posiciones[-1] + len(texto))
+    if sys.byteorder != "little":
+        posiciones.byteswap()
+    datos = struct.pack("<Q", len(textos)) + posiciones.tobytes() + b"".join(textos)
+    return datos + bytes(_alinear(len(datos)) - len(datos))
+
+
+def guardar_binaria(gestor: GestorProyectos, archivo: str = ARCHIVO_BINARIO,
+                    encabezado: Optional[Dict] = None) -> int:
+    """Guarda el gestor en formato binario. Retorna la cantidad de beneficiarios.
+
+    Recorre los beneficiarios dos veces: primero arma las tablas de textos
+    y después escribe los registros con sus códigos."""
+    instituciones = numerar_instituciones(gestor)
+    nombres: Set[str] = set()
+    enfermedades: Dict[str, int] = {}
+    herramientas: Dict[str, int] = {}
+    cantidades = []
+    for institucion in instituciones:
+        cantidad = 0
+        for beneficiario in institucion.iterar_beneficiarios():
+            nombres.add(beneficiario.nombre)
+            enfermedades.setdefault(beneficiario.enfermedad, len(enfermedades))
+            herramientas.setdefault(beneficiario.herramienta_tratamiento, len(herramientas))
+            cantidad += 1
+        cantidades.append(cantidad)
+    nombres_ordenados = sorted(nombre.encode("utf-8") for nombre in nombres)
+    codigos_nombre = {nombre.decode("utf-8"): codigo for codigo, nombre in enumerate(nombres_ordenados)}
+    tablas = [_tabla(nombres_ordenados),
+              _tabla([e.encode("utf-8") for e in enfermedades]),
+              _tabla([h.encode("utf-8") for h in herramientas])]
+
+    total = sum(cantidades)
+    inicio_registros = _alinear(ENCABEZADO.size)
+    inicio_por_nombre = inicio_registros + total * REGISTRO.size
+    inicio_nombres = _alinear(inicio_por_nombre + 4 * total)
+    inicio_enfermedades = inicio_nombres + len(tablas[0])
+    inicio_herramientas = inicio_enfermedades + len(tablas[1])
+    inicio_metadatos = inicio_herramientas + len(tablas[2])
+
+    ids = {id(institucion): numero for numero, institucion in enumerate(instituciones)}
+    primeras = [sum(cantidades[:numero]) for numero in range(len(cantidades))]
+    metadatos = {
+        "fecha_generacion": datetime.now().isoformat(),
+        **(encabezado or {}),
+        "proyectos": [
+            {"tipo": proyecto.TIPO_PROYECTO, "nombre": proyecto.nombre,
+             "descripcion": proyecto.descripcion, "fecha_inicio": proyecto.fecha_inicio.isoformat(),
+             "instituciones": [ids[id(institucion)] for institucion in proyecto.instituciones]}
+            for proyecto in gestor.proyectos
+        ],
+        "instituciones": [
+            {"id": numero, "nombre": institucion.nombre, "direccion": institucion.direccion,
+             "telefono": institucion.telefono, "primero": primeras[numero],
+             "cantidad": cantidades[numero]}
+            for numero, institucion in enumerate(instituciones)
+        ]
+    }
+
+    with escritura_atomica(archivo) as texto:
+        texto.flush()
+        f = texto.buffer
+        cabecera = ENCABEZADO.pack(MAGIA, VERSION, REGISTRO.size, inicio_registros, total,
+                                   inicio_por_nombre, inicio_nombres, inicio_enfermedades,
+                                   inicio_herramientas, inicio_metadatos)
+        f.write(cabecera + bytes(inicio_registros - len(cabecera)))
+        empaquetar = REGISTRO.pack
+        por_nombre = array("I")
+        for numero, institucion in enumerate(instituciones):
+            bloque = bytearray()
+            codigos = array("I")
+            for b in institucion.iterar_beneficiarios():
+                codigo = codigos_nombre[b.nombre]
+                bloque += empaquetar(a_marca_tiempo(b.fecha_registro), codigo,
+                                     enfermedades[b.enfermedad], herramientas[b.herramienta_tratamiento],
+                                     b.edad, _CODIGO_TIPO[b.tipo], _CODIGO_GENERO[b.genero],
+                                     _CODIGO_RESPUESTA[b.respuesta_tratamiento])
+                codigos.append(codigo)
+                if len(bloque) >= 1 << 20:
+                    f.write(bloque)
+                    bloque.clear()
+            f.write(bloque)
+            if len(codigos) != cantidades[numero]:
+                raise RuntimeError(f"La institución {institucion.nombre} cambió mientras se guardaba")
+            # sorted es estable: los homónimos quedan en orden de registro
+            por_nombre.extend(sorted(range(len(codigos)), key=codigos.__getitem__))
+        if sys.byteorder != "little":
+            por_nombre.byteswap()
+        f.write(por_nombre.tobytes() + bytes(inicio_nombres - inicio_por_nombre - 4 * total))
+        for tabla in tablas:
+            f.write(tabla)
+        f.write(json.dumps(metadatos, ensure_ascii=False).encode("utf-8"))
+    return total
+
+
+class InstantaneaBinaria:
+    """Archivo binario abierto con mmap (solo lectura)"""
+
+    def __init__(self, archivo: str):
+        self.__archivo = archivo
+        with open(archivo, "rb") as f:
+            try:
+                self.__mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as e:  # archivo vacío
+                raise ErrorInstantanea(f"'{archivo}' no es una instantánea binaria") from e
+        try:
+            (magia, version, tamano_registro, self.__inicio_registros, self.__cantidad,
+             self.__inicio_por_nombre, inicio_nombres, inicio_enfermedades, inicio_herramientas,
+             inicio_metadatos) = ENCABEZADO.unpack_from(self.__mapa, 0)
+            if magia != MAGIA:
+                raise ErrorInstantanea(f"'{archivo}' no es una instantánea binaria")
+            if version != VERSION or tamano_registro != REGISTRO.size:
+                raise ErrorInstantanea(f"Versión de instantánea binaria no soportada: {version}")
+            self.__nombres = self.__leer_tabla(inicio_nombres)
+            self.__metadatos = json.loads(self.__mapa[inicio_metadatos:].decode("utf-8"))
+            # Enfermedades y herramientas son pocas: se decodifican una vez
+            self.__enfermedades = self.__textos(inicio_enfermedades)
+            self.__herramientas = self.__textos(inicio_herramientas)
+        except (struct.error, ValueError, KeyError) as e:
+            self.__mapa.close()
+            raise ErrorInstantanea(f"Instantánea binaria dañada '{archivo}': {e}") from e
+        except ErrorInstantanea:
+            self.__mapa.close()
+            raise
+
+    @property
+    def archivo(self) -> str:
+        return self.__archivo
+
+    @property
+    def cantidad(self) -> int:
+        return self.__cantidad
+
+    @property
+    def metadatos(self) -> Dict:
+        return self.__metadatos
+
+    def cerrar(self):
+        """Libera el mapa; las instituciones abiertas dejan de poder leerlo"""
+        self.__mapa.close()
+
+    def __leer_tabla(self, inicio: int) -> Tuple[int, int, int]:
+        """(cantidad, inicio de las posiciones, inicio de los textos)"""
+        cantidad, = struct.unpack_from("<Q", self.__mapa, inicio)
+        return cantidad, inicio + 8, inicio + 8 * (cantidad + 2)
+
+    def __texto(self, tabla: Tuple[int, int, int], codigo: int) -> bytes:
+        _, posiciones, datos = tabla
+        desde, hasta = struct.unpack_from("<QQ", self.__mapa, posiciones + 8 * codigo)
+        return self.__mapa[datos + desde:datos + hasta]
+
+    def __textos(self, inicio: int) -> List[str]:
+        tabla = self.__leer_tabla(inicio)
+        return [self.__texto(tabla, codigo).decode("utf-8") for codigo in range(tabla[0])]
+
+    def nombre(self, codigo: int) -> str:
+        return self.__texto(self.__nombres, codigo).decode("utf-8")
+
+    def enfermedad(self, codigo: int) -> str:
+        return self.__enfermedades[codigo]
+
+    def herramienta(self, codigo: int) -> str:
+        return self.__herramientas[codigo]
+
+    def codigo_nombre(self, nombre: str) -> Optional[int]:
+        """Código del nombre por bisección en la tabla ordenada; None si no está"""
+        buscado = nombre.encode("utf-8")
+        bajo, alto = 0, self.__nombres[0]
+        while bajo < alto:
+            medio = (bajo + alto) // 2
+            if self.__texto(self.__nombres, medio) < buscado:
+                bajo = medio + 1
+            else:
+                alto = medio
+        if bajo < self.__nombres[0] and self.__texto(self.__nombres, bajo) == buscado:
+            return bajo
+        return None
+
+    def registro(self, fila: int) -> Tuple:
+        """(fecha, nombre, enfermedad, herramienta, edad, tipo, genero, respuesta) en códigos"""
+        return REGISTRO.unpack_from(self.__mapa, self.__inicio_registros + fila * REGISTRO.size)
+
+    def valores(self, fila: int) -> Tuple:
+        """(tipo, genero, edad, respuesta, herramienta) de una fila, como en
+        EstadisticasParciales.agregar_valores"""
+        _, _, _, herramienta, edad, tipo, genero, respuesta = self.registro(fila)
+        return TIPOS[tipo], GENEROS[genero], edad, RESPUESTAS[respuesta], self.__herramientas[herramienta]
+
+    def beneficiario(self, fila: int) -> Beneficiario:
+        """Crea el Beneficiario de una fila"""
+        fecha, nombre, enfermedad, herramienta, edad, tipo, genero, respuesta = self.registro(fila)
+        return Beneficiario(self.nombre(nombre), TIPOS[tipo], GENEROS[genero], edad,
+                            self.__enfermedades[enfermedad], self.__herramientas[herramienta],
+                            RESPUESTAS[respuesta], desde_marca_tiempo(fecha))
+
+    def filas_con_nombre(self, nombre: str, primero: int, cantidad: int) -> List[int]:
+        """Filas (relativas a `primero`) con ese nombre, en orden de registro.
+        Busca por bisección en las filas del bloque ordenadas por nombre"""
+        codigo = self.codigo_nombre(nombre)
+        if codigo is None:
+            return []
+        mapa = self.__mapa
+        orden = self.__inicio_por_nombre + 4 * primero
+        registros = self.__inicio_registros + primero * REGISTRO.size + _DESPLAZAMIENTO_NOMBRE
+
+        def fila(posicion: int) -> int:
+            return struct.unpack_from("<I", mapa, orden + 4 * posicion)[0]
+
+        def codigo_en(posicion: int) -> int:
+            return struct.unpack_from("<I", mapa, registros + fila(posicion) * REGISTRO.size)[0]
+
+        bajo, alto = 0, cantidad
+        while bajo < alto:
+            medio = (bajo + alto) // 2
+            if codigo_en(medio) < codigo:
+                bajo = medio + 1
+            else:
+                alto = medio
+        filas = []
+        while bajo < cantidad and codigo_en(bajo) == codigo:
+            filas.append(fila(bajo))
+            bajo += 1
+        return filas
+
+    def iterar_registros(self, primero: int, cantidad: int) -> Iterator[Tuple]:
+        inicio = self.__inicio_registros + primero * REGISTRO.size
+        with memoryview(self.__mapa) as vista:
+            yield from REGISTRO.iter_unpack(vista[inicio:inicio + cantidad * REGISTRO.size])
+
+    def iterar_nombres(self, primero: int, cantidad: int) -> Iterator[str]:
+        """Nombres de las filas del bloque (uno por fila, con repeticiones)"""
+        for registro in self.iterar_registros(primero, cantidad):
+            yield self.nombre(registro[1])
+
+    def contar(self, primero: int, cantidad: int) -> EstadisticasParciales:
+        """Agregado parcial de un bloque. Los campos del cubo (herramienta,
+        edad, tipo, género y respuesta) están seguidos en cada registro: se
+        cuentan como una sola clave de bytes por fila"""
+        inicio = self.__inicio_registros + primero * REGISTRO.size
+        with memoryview(self.__mapa) as vista:
+            bloque = vista[inicio:inicio + cantidad * REGISTRO.size]
+            claves = Counter(map(operator.itemgetter(0), _CLAVE_CUBO.iter_unpack(bloque)))
+            del bloque
+        cubo: Dict[Tuple[str, int], int] = {}
+        suma_edades = 0
+        for clave, n in claves.items():
+            herramienta, edad, tipo, genero, respuesta = _CAMPOS_CUBO.unpack(clave)
+            celda = codigo_celda(tipo, genero, respuesta, franja_edad(edad))
+            posicion = (self.__herramientas[herramienta], celda)
+            cubo[posicion] = cubo.get(posicion, 0) + n
+            suma_edades += edad * n
+        return EstadisticasParciales.desde_conteos(cubo, suma_edades)
+
+    def contar_por_dia(self, primero: int, cantidad: int) -> Counter:
+        """Ingresos por (día desde 1970, código de respuesta) de un bloque"""
+        inicio = self.__inicio_registros + primero * REGISTRO.size
+        paso = REGISTRO.size
+        with memoryview(self.__mapa) as vista:
+            bloque = vista[inicio:inicio + cantidad * paso]
+            respuestas = bytes(bloque[_DESPLAZAMIENTO_RESPUESTA::paso])
+            fechas = bloque.cast("q")
+            dias = map(operator.floordiv, fechas[::paso // 8], repeat(_MICROSEGUNDOS_POR_DIA))
+            conteo = Counter(zip(dias, respuestas))
+            del dias, fechas, bloque
+        return conteo
+
+
+class InstitucionMapeada(Institucion):
+    """Institución cuyos beneficiarios están en una InstantaneaBinaria.
+
+    Las filas del bloque se leen del mapa; los Beneficiario se crean al
+    pedirlos y se comparten mientras sigan en uso. Las altas se guardan
+    como objetos, las bajas como filas descartadas y un beneficiario cuya
+    respuesta cambió se conserva para no perder el cambio. Los agregados y
+    las series se calculan sobre las columnas la primera vez que se piden
+    y desde entonces se mantienen con cada cambio.
+    """
+
+    INDICE_EN_GESTOR = False
+
+    def __init__(self, nombre: str, direccion: str, telefono: str,
+                 instantanea: InstantaneaBinaria, primero: int, cantidad: int):
+        super().__init__(nombre, direccion, telefono)
+        self.__instantanea = instantanea
+        self.__primero = primero
+        self.__cantidad = cantidad
+        self.__bajas: Set[int] = set()
+        self.__vivos = weakref.WeakValueDictionary()
+        self.__filas = weakref.WeakKeyDictionary()
+        # Filas mapeadas cuya respuesta cambió (el mapa conserva la anterior)
+        self.__modificados: Dict[int, Beneficiario] = {}
+        # Altas posteriores a la apertura; sus filas siguen a las del bloque
+        self.__nuevos: Dict[int, Beneficiario] = {}
+        self.__nombres_nuevos: Dict[str, List[int]] = {}
+        self.__siguiente = cantidad
+        self.__agregados: Optional[EstadisticasParciales] = None
+        self.__series: Optional[SeriesTemporales] = None
+
+    @property
+    def beneficiarios(self):
+        return list(self.iterar_beneficiarios())
+
+    @property
+    def total_beneficiarios(self) -> int:
+        return self.__cantidad - len(self.__bajas) + len(self.__nuevos)
+
+    def __beneficiario(self, fila: int) -> Beneficiario:
+        """Beneficiario de una fila, creándolo desde el mapa si no está en uso"""
+        beneficiario = self.__nuevos.get(fila) or self.__modificados.get(fila) or self.__vivos.get(fila)
+        if beneficiario is None:
+            beneficiario = self.__instantanea.beneficiario(self.__primero + fila)
+            beneficiario.agregar_observador(self.__actualizar_respuesta)
+            self.__vivos[fila] = beneficiario
+            self.__filas[beneficiario] = fila
+        return beneficiario
+
+    def __filas_con_nombre(self, nombre: str) -> List[int]:
+        filas = [fila for fila in self.__instantanea.filas_con_nombre(nombre, self.__primero, self.__cantidad)
+                 if fila not in self.__bajas]
+        return filas + self.__nombres_nuevos.get(nombre, [])
+
+    def iterar_beneficiarios(self):
+        """Recorre los beneficiarios creando cada uno al llegar a él"""
+        for fila in range(self.__cantidad):
+            if fila not in self.__bajas:
+                yield self.__beneficiario(fila)
+        yield from list(self.__nuevos.values())
+
+    def iterar_nombres(self):
+        vistos = set()
+        for fila, nombre in enumerate(self.__instantanea.iterar_nombres(self.__primero, self.__cantidad)):
+            if fila not in self.__bajas and nombre not in vistos:
+                vistos.add(nombre)
+                yield nombre
+        for nombre in list(self.__nombres_nuevos):
+            if nombre not in vistos:
+                yield nombre
+
+    def agregar_beneficiario(self, beneficiario: Beneficiario):
+        """Agrega un beneficiario de los 3 grupos a la institución"""
+        fila = self.__siguiente
+        self.__siguiente += 1
+        self.__nuevos[fila] = beneficiario
+        self.__nombres_nuevos.setdefault(beneficiario.nombre, []).append(fila)
+        self.__filas[beneficiario] = fila
+        if self.__agregados is not None:
+            self.__agregados.agregar(beneficiario)
+        if self.__series is not None:
+            self.__series.agregar(beneficiario.fecha_registro, beneficiario.respuesta_tratamiento)
+        beneficiario.agregar_observador(self.__actualizar_respuesta)
+        self._notificar("agregado", beneficiario)
+        if BUS_EVENTOS.escuchado("beneficiario_agregado"):
+            BUS_EVENTOS.publicar("beneficiario_agregado", beneficiario=beneficiario.nombre,
+                                 institucion=self.nombre)
+
+    def remover_beneficiario(self, nombre: str) -> bool:
+        """Remueve un beneficiario por nombre"""
+        filas = self.__filas_con_nombre(nombre)
+        if filas:
+            fila = filas[0]
+            beneficiario = self.__beneficiario(fila)
+            if fila < self.__cantidad:
+                self.__bajas.add(fila)
+                self.__modificados.pop(fila, None)
+                self.__vivos.pop(fila, None)
+            else:
+                del self.__nuevos[fila]
+                self.__nombres_nuevos[nombre].remove(fila)
+                if not self.__nombres_nuevos[nombre]:
+                    del self.__nombres_nuevos[nombre]
+            if self.__agregados is not None:
+                self.__agregados.agregar(beneficiario, -1)
+            if self.__series is not None:
+                self.__series.agregar(beneficiario.fecha_registro, beneficiario.respuesta_tratamiento, -1)
+            beneficiario.remover_observador(self.__actualizar_respuesta)
+            self._notificar("removido", beneficiario)
+            BUS_EVENTOS.publicar("beneficiario_removido", beneficiario=nombre, institucion=self.nombre)
+            return True
+        BUS_EVENTOS.publicar("beneficiario_no_encontrado", beneficiario=nombre, institucion=self.nombre)
+        return False
+
+    def buscar_beneficiario(self, nombre: str) -> Optional[Beneficiario]:
+        """Buscar beneficiario por su nombre"""
+        filas = self.__filas_con_nombre(nombre)
+        return self.__beneficiario(filas[0]) if filas else None
+
+    def buscar_beneficiarios(self, nombre: str) -> List[Beneficiario]:
+        """Todos los beneficiarios con ese nombre, en orden de registro"""
+        return [self.__beneficiario(fila) for fila in self.__filas_con_nombre(nombre)]
+
+    def __actualizar_respuesta(self, beneficiario: Beneficiario, anterior: RespuestaTratamiento,
+                               nueva: RespuestaTratamiento):
+        fila = self.__filas.get(beneficiario)
+        if fila is not None and fila < self.__cantidad:
+            self.__modificados[fila] = beneficiario
+        if self.__agregados is not None:
+            self.__agregados.mover_respuesta(beneficiario, anterior, nueva)
+        if self.__series is not None:
+            self.__series.mover_respuesta(beneficiario.fecha_registro, anterior, nueva)
+        self._notificar("respuesta_actualizada", beneficiario)
+
+    def __contar(self) -> EstadisticasParciales:
+        """Agregado recalculado: columnas del mapa corregidas con los cambios"""
+        instantanea = self.__instantanea
+        parcial = instantanea.contar(self.__primero, self.__cantidad)
+        for fila in self.__bajas:
+            parcial.agregar_valores(*instantanea.valores(self.__primero + fila), -1)
+        for fila, beneficiario in self.__modificados.items():
+            original = instantanea.valores(self.__primero + fila)[3]
+            if original is not beneficiario.respuesta_tratamiento:
+                parcial.mover_respuesta(beneficiario, original, beneficiario.respuesta_tratamiento)
+        for beneficiario in self.__nuevos.values():
+            parcial.agregar(beneficiario)
+        return parcial
+
+    def __obtener_agregados(self) -> EstadisticasParciales:
+        if self.__agregados is None:
+            self.__agregados = self.__contar()
+        return self.__agregados
+
+    def _calcular_estadisticas(self) -> Dict:
+        """Estadísticas desde los agregados, contados sobre el mapa la primera vez"""
+        return self.__obtener_agregados().a_estadisticas()
+
+    def recalcular_estadisticas(self) -> Dict:
+        """Estadísticas recorriendo de nuevo las columnas del mapa"""
+        return self.__contar().a_estadisticas()
+
+    def contar_herramientas(self) -> Dict[str, int]:
+        """Cuenta los beneficiarios por herramienta de tratamiento"""
+        return self.__obtener_agregados().por_herramienta
+
+    def obtener_parcial(self) -> EstadisticasParciales:
+        """Copia del agregado parcial de la institución"""
+        return self.__obtener_agregados().copiar()
+
+    def obtener_series(self) -> SeriesTemporales:
+        """Series de ingresos y respuestas por período (no deben modificarse)"""
+        if self.__series is None:
+            instantanea = self.__instantanea
+            series = SeriesTemporales()
+            for (dia, respuesta), cantidad in instantanea.contar_por_dia(self.__primero,
+                                                                         self.__cantidad).items():
+                series.agregar(_EPOCA + timedelta(days=dia), RESPUESTAS[respuesta], cantidad)
+            for fila in self.__bajas:
+                fecha, _, _, _, _, _, _, respuesta = instantanea.registro(self.__primero + fila)
+                series.agregar(desde_marca_tiempo(fecha), RESPUESTAS[respuesta], -1)
+            for fila, beneficiario in self.__modificados.items():
+                original = instantanea.valores(self.__primero + fila)[3]
+                if original is not beneficiario.respuesta_tratamiento:
+                    series.mover_respuesta(beneficiario.fecha_registro, original,
+                                           beneficiario.respuesta_tratamiento)
+            for beneficiario in self.__nuevos.values():
+                series.agregar(beneficiario.fecha_registro, beneficiario.respuesta_tratamiento)
+            self.__series = series
+        return self.__series
+
+    def iterar_valores(self):
+        """Genera (tipo, genero, edad, respuesta, herramienta) por beneficiario
+        leyendo los registros del mapa, sin crear los objetos"""
+        instantanea = self.__instantanea
+        for fila, (_, _, _, herramienta, edad, tipo, genero, respuesta) in enumerate(
+                instantanea.iterar_registros(self.__primero, self.__cantidad)):
+            if fila in self.__bajas:
+                continue
+            modificado = self.__modificados.get(fila)
+            yield (TIPOS[tipo], GENEROS[genero], edad,
+                   modificado.respuesta_tratamiento if modificado else RESPUESTAS[respuesta],
+                   instantanea.herramienta(herramienta))
+        for b in list(self.__nuevos.values()):
+            yield b.tipo, b.genero, b.edad, b.respuesta_tratamiento, b.herramienta_tratamiento
+
+    def __str__(self):
+        return f"{self.nombre} ({self.total_beneficiarios} beneficiarios)"
+
+
+def abrir_binaria(archivo: str = ARCHIVO_BINARIO) -> Tuple[GestorProyectos, Dict]:
+    """Abre una instantánea binaria sin leer sus beneficiarios. Retorna el
+    gestor y un resumen con la cantidad de beneficiarios, el tiempo y los
+    metadatos propios del encabezado"""
+    inicio = time.perf_counter()
+    instantanea = InstantaneaBinaria(archivo)
+    metadatos = instantanea.metadatos
+    try:
+        instituciones = [
+            InstitucionMapeada(datos["nombre"], datos["direccion"], datos["telefono"],
+                               instantanea, datos["primero"], datos["cantidad"])
+            for datos in metadatos["instituciones"]
+        ]
+        gestor = GestorProyectos()
+        for datos in metadatos["proyectos"]:
+            proyecto = registro_a_proyecto(datos)
+            gestor.agregar_proyecto(proyecto)
+            for numero in datos["instituciones"]:
+                proyecto.agregar_institucion(instituciones[numero])
+    except (KeyError, IndexError, ValueError, TypeError) as e:
+        raise ErrorInstantanea(f"Metadatos inválidos en '{archivo}': {e}") from e
+    segundos = time.perf_counter() - inicio
+    return gestor, {
+        "beneficiarios": instantanea.cantidad,
+        "instituciones": len(instituciones),
+        "segundos": segundos,
+        "encabezado": {clave: valor for clave, valor in metadatos.items()
+                       if clave not in ("proyectos", "instituciones")},
+    }
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Instantáneas binarias mapeadas en memoria")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+    convertir = subcomandos.add_parser("convertir", help="guardar datos existentes en formato binario")
+    convertir.add_argument("origen", help="directorio con bitácora o instantánea JSON Lines")
+    convertir.add_argument("destino", nargs="?", default=ARCHIVO_BINARIO)
+    estadisticas = subcomandos.add_parser("estadisticas", help="reporte consolidado de un archivo binario")
+    estadisticas.add_argument("archivo", nargs="?", default=ARCHIVO_BINARIO)
+    args = parser.parse_args(argumentos)
+
+    try:
+        if args.comando == "convertir":
+            from bitacora import cargar
+            gestor, _ = cargar(args.origen)
+            inicio = time.perf_counter()
+            cantidad = guardar_binaria(gestor, args.destino)
+            print(json.dumps({"archivo": args.destino, "beneficiarios": cantidad,
+                              "segundos": time.perf_counter() - inicio}, ensure_ascii=False))
+        else:
+            gestor, resumen = abrir_binaria(args.archivo)
+            reporte = gestor.generar_reporte_consolidado()
+            print(json.dumps({"apertura": resumen, "reporte": reporte}, ensure_ascii=False, indent=2,
+                             default=str))
+    except (ErrorInstantanea, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
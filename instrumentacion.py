@@ -0,0 +1,398 @@
+"""Eventos del sistema e instrumentación de las operaciones costosas.
+
+Los métodos del núcleo no escriben en pantalla: publican eventos en
+BUS_EVENTOS (beneficiario agregado o removido, institución o proyecto
+agregado, exportación fallida) y quien quiera mostrarlos se suscribe. El
+menú de proyecto_salud.main los imprime y `comandos.py --eventos` los
+escribe como JSON Lines. Sin suscriptores, publicar no hace nada.
+
+INSTRUMENTACION lleva, para cada operación marcada con @instrumentado
+(búsquedas, estadísticas, reportes y exportaciones), la cantidad de
+llamadas y errores y un histograma de duraciones con cubetas que se
+duplican desde 1 µs; de él salen los percentiles aproximados. Opcionalmente
+toma muestras: una de cada N llamadas de cada operación se ejecuta bajo
+cProfile o tracemalloc. El resumen se consulta mientras el sistema corre o
+se guarda como JSON:
+
+    INSTRUMENTACION.configurar(perfil_cada=100)
+    ...
+    INSTRUMENTACION.resumen()["operaciones"]["GestorProyectos.generar_reporte_consolidado"]
+    INSTRUMENTACION.volcar("metricas_rendimiento.json")
+
+No importa nada del proyecto porque proyecto_salud lo usa al definir sus clases.
+"""
+import cProfile
+import functools
+import json
+import math
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from bisect import bisect_right
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+ARCHIVO_METRICAS = "metricas_rendimiento.json"
+# Cubeta i: duraciones menores a 2**i µs; la última junta todo lo que dure más
+CUBETAS = 32
+_LIMITES_CUBETAS = tuple(2 ** cubeta / 1e6 for cubeta in range(CUBETAS - 1))
+# Funciones por operación en el resumen de los perfiles
+FUNCIONES_PERFIL = 15
+
+
+class BusEventos:
+    """Reparte eventos entre las funciones suscritas, en el hilo que los publica.
+
+    Cada evento es un diccionario con el tipo en "evento", el momento en que
+    ocurrió y los datos propios del tipo (nombres, no objetos, para que se
+    pueda serializar tal cual).
+    """
+
+    def __init__(self):
+        # Tipo de evento -> manejadores; la clave None son los suscritos a todos.
+        # Las listas se reemplazan en vez de modificarse, así publicar no
+        # necesita el cerrojo
+        self.__manejadores: Dict[Optional[str], List[Callable]] = {}
+        self.__cerrojo = threading.Lock()
+
+    def suscribir(self, manejador: Callable, *eventos: str):
+        """Llama a manejador(evento) con cada evento de los tipos indicados,
+        o con todos si no se indica ninguno"""
+        with self.__cerrojo:
+            for evento in eventos or (None,):
+                manejadores = self.__manejadores.get(evento, [])
+                if manejador not in manejadores:
+                    self.__manejadores[evento] = manejadores + [manejador]
+
+    def desuscribir(self, manejador: Callable, *eventos: str):
+        """Deja de llamar al manejador (con los mismos tipos con que se suscribió)"""
+        with self.__cerrojo:
+            for evento in eventos or (None,):
+                manejadores = [m for m in self.__manejadores.get(evento, []) if m != manejador]
+                if manejadores:
+                    self.__manejadores[evento] = manejadores
+                else:
+                    self.__manejadores.pop(evento, None)
+
+    def escuchado(self, evento: str) -> bool:
+        """Si alguien recibiría un evento de ese tipo; en los caminos muy
+        usados evita armar los datos de un evento que nadie va a recibir"""
+        return evento in self.__manejadores or None in self.__manejadores
+
+    def publicar(self, evento: str, **datos):
+        """Entrega el evento a sus suscriptores"""
+        manejadores = self.__manejadores
+        if not manejadores:
+            return
+        destinatarios = manejadores.get(evento, []) + manejadores.get(None, [])
+        if not destinatarios:
+            return
+        registro = {"evento": evento, "momento": datetime.now().isoformat(), **datos}
+        for manejador in destinatarios:
+            manejador(registro)
+
+# Bus compartido por instituciones, proyectos y el gestor
+BUS_EVENTOS = BusEventos()
+
+
+class _Operacion:
+    """Contadores de una operación instrumentada"""
+    __slots__ = ("sin_medir", "errores", "total", "minimo", "maximo", "histograma",
+                 "muestras_memoria", "pico_total", "pico_maximo")
+
+    def __init__(self):
+        # Las llamadas muestreadas no se cronometran porque el perfilador
+        # las hace más lentas; las cronometradas son las del histograma
+        self.sin_medir = 0
+        self.errores = 0
+        self.total = 0.0
+        self.minimo = math.inf
+        self.maximo = 0.0
+        self.histograma = [0] * CUBETAS
+        self.muestras_memoria = 0
+        self.pico_total = 0
+        self.pico_maximo = 0
+
+    @property
+    def medidas(self) -> int:
+        return sum(self.histograma)
+
+    @property
+    def llamadas(self) -> int:
+        return self.medidas + self.sin_medir
+
+    def sumar(self, otra: "_Operacion"):
+        self.sin_medir += otra.sin_medir
+        self.errores += otra.errores
+        self.total += otra.total
+        self.minimo = min(self.minimo, otra.minimo)
+        self.maximo = max(self.maximo, otra.maximo)
+        self.histograma = [a + b for a, b in zip(self.histograma, otra.histograma)]
+        self.muestras_memoria += otra.muestras_memoria
+        self.pico_total += otra.pico_total
+        self.pico_maximo = max(self.pico_maximo, otra.pico_maximo)
+
+    def percentil(self, fraccion: float) -> Optional[float]:
+        """Límite superior de la cubeta donde cae el percentil, acotado por
+        la menor y la mayor duración medidas"""
+        medidas = self.medidas
+        if not medidas:
+            return None
+        posicion = max(1, math.ceil(fraccion * medidas))
+        acumulado = 0
+        for cubeta, cantidad in enumerate(self.histograma):
+            acumulado += cantidad
+            if acumulado >= posicion:
+                return min(max(2 ** cubeta / 1e6, self.minimo), self.maximo)
+        return self.maximo
+
+    def a_diccionario(self) -> Dict:
+        medidas = self.medidas
+        datos = {
+            "llamadas": medidas + self.sin_medir,
+            "errores": self.errores,
+            "medidas": medidas,
+            "segundos_total": self.total,
+            "segundos_media": self.total / medidas if medidas else None,
+            "segundos_minimo": self.minimo if medidas else None,
+            "segundos_maximo": self.maximo if medidas else None,
+            "segundos_p50": self.percentil(0.5),
+            "segundos_p90": self.percentil(0.9),
+            "segundos_p99": self.percentil(0.99),
+            # [límite superior en segundos, llamadas], solo cubetas con llamadas
+            "histograma": [[2 ** cubeta / 1e6, cantidad]
+                           for cubeta, cantidad in enumerate(self.histograma) if cantidad]
+        }
+        if self.muestras_memoria:
+            datos["memoria"] = {
+                "muestras": self.muestras_memoria,
+                "pico_medio_bytes": self.pico_total // self.muestras_memoria,
+                "pico_maximo_bytes": self.pico_maximo
+            }
+        return datos
+
+
+class Instrumentacion:
+    """Métricas de las operaciones marcadas con @instrumentado.
+
+    Se puede usar desde varios hilos. Cada hilo cuenta en su propia tabla,
+    sin cerrojos, y resumen() suma las de todos; por eso el muestreo también
+    va por hilo (la primera llamada de cada operación en cada hilo y luego
+    una de cada N). Las muestras con cProfile o tracemalloc son de a una por
+    vez en todo el proceso, porque las dos herramientas son globales: una
+    llamada que toca muestra mientras otra se está tomando corre sin
+    perfilador.
+    """
+
+    def __init__(self):
+        self.__activa = True
+        self.__perfil_cada = 0
+        self.__memoria_cada = 0
+        self.__local = threading.local()
+        # Tablas operación -> _Operacion de todos los hilos que midieron algo
+        self.__tablas: List[Dict[str, _Operacion]] = []
+        self.__perfiles: Dict[str, cProfile.Profile] = {}
+        self.__desde = datetime.now()
+        self.__cerrojo = threading.Lock()
+        self.__muestreando = threading.Lock()
+
+    @property
+    def activa(self) -> bool:
+        return self.__activa
+
+    def configurar(self, activa: Optional[bool] = None, perfil_cada: Optional[int] = None,
+                   memoria_cada: Optional[int] = None):
+        """Activa o desactiva las mediciones y fija cada cuántas llamadas de una
+        operación se toma una muestra con cProfile o con tracemalloc (0: nunca)"""
+        if activa is not None:
+            self.__activa = activa
+        if perfil_cada is not None:
+            if perfil_cada < 0:
+                raise ValueError(f"perfil_cada no puede ser negativo: {perfil_cada}")
+            self.__perfil_cada = perfil_cada
+        if memoria_cada is not None:
+            if memoria_cada < 0:
+                raise ValueError(f"memoria_cada no puede ser negativo: {memoria_cada}")
+            self.__memoria_cada = memoria_cada
+
+    def reiniciar(self):
+        """Descarta las mediciones y los perfiles acumulados"""
+        with self.__muestreando, self.__cerrojo:
+            for tabla in self.__tablas:
+                tabla.clear()
+            self.__perfiles.clear()
+            self.__desde = datetime.now()
+
+    def __tabla(self) -> Dict[str, _Operacion]:
+        try:
+            return self.__local.tabla
+        except AttributeError:
+            tabla = self.__local.tabla = {}
+            with self.__cerrojo:
+                self.__tablas.append(tabla)
+            return tabla
+
+    def __operacion(self, operacion: str) -> _Operacion:
+        tabla = self.__tabla()
+        datos = tabla.get(operacion)
+        if datos is None:
+            datos = tabla[operacion] = _Operacion()
+        return datos
+
+    def ejecutar(self, operacion: str, funcion: Callable, args, kwargs):
+        """Llama a funcion(*args, **kwargs) registrando la llamada en `operacion`"""
+        if not self.__activa:
+            return funcion(*args, **kwargs)
+        if self.__perfil_cada or self.__memoria_cada:
+            return self.__ejecutar_con_muestras(operacion, funcion, args, kwargs)
+        inicio = time.perf_counter()
+        try:
+            resultado = funcion(*args, **kwargs)
+        except BaseException:
+            self.__registrar(self.__operacion(operacion), time.perf_counter() - inicio, True)
+            raise
+        segundos = time.perf_counter() - inicio
+        # Lo mismo que __registrar, en línea porque es el camino de casi todas las llamadas
+        try:
+            datos = self.__local.tabla[operacion]
+        except (AttributeError, KeyError):
+            datos = self.__operacion(operacion)
+        datos.total += segundos
+        if segundos < datos.minimo:
+            datos.minimo = segundos
+        if segundos > datos.maximo:
+            datos.maximo = segundos
+        datos.histograma[bisect_right(_LIMITES_CUBETAS, segundos)] += 1
+        return resultado
+
+    @staticmethod
+    def __registrar(datos: _Operacion, segundos: Optional[float], error: bool):
+        if error:
+            datos.errores += 1
+        if segundos is None:
+            datos.sin_medir += 1
+        else:
+            datos.total += segundos
+            if segundos < datos.minimo:
+                datos.minimo = segundos
+            if segundos > datos.maximo:
+                datos.maximo = segundos
+            datos.histograma[bisect_right(_LIMITES_CUBETAS, segundos)] += 1
+
+    def __ejecutar_con_muestras(self, operacion: str, funcion: Callable, args, kwargs):
+        datos = self.__operacion(operacion)
+        llamadas = datos.llamadas
+        perfilar = self.__perfil_cada > 0 and llamadas % self.__perfil_cada == 0
+        medir_memoria = self.__memoria_cada > 0 and llamadas % self.__memoria_cada == 0
+        if (perfilar or medir_memoria) and self.__muestreando.acquire(blocking=False):
+            try:
+                return self.__muestrear(datos, operacion, funcion, args, kwargs,
+                                        perfilar, medir_memoria)
+            finally:
+                self.__muestreando.release()
+
+        # Mientras hay una muestra en curso, en cualquier hilo, no se
+        # cronometra: el perfilador es global y hace todo más lento
+        medir = not self.__muestreando.locked()
+        inicio = time.perf_counter()
+        error = True
+        try:
+            resultado = funcion(*args, **kwargs)
+            error = False
+            return resultado
+        finally:
+            self.__registrar(datos, time.perf_counter() - inicio if medir else None, error)
+
+    def __muestrear(self, datos: _Operacion, operacion: str, funcion: Callable, args, kwargs,
+                    perfilar: bool, medir_memoria: bool):
+        """Ejecuta la llamada bajo cProfile y/o tracemalloc (con __muestreando tomado)"""
+        perfil = None
+        if perfilar:
+            perfil = self.__perfiles.get(operacion)
+            if perfil is None:
+                perfil = self.__perfiles[operacion] = cProfile.Profile()
+            try:
+                perfil.enable()
+            except ValueError:
+                # Otra herramienta de perfilado (un depurador, coverage) está activa
+                perfil = None
+        if medir_memoria:
+            iniciado = not tracemalloc.is_tracing()
+            if iniciado:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        error = True
+        try:
+            resultado = funcion(*args, **kwargs)
+            error = False
+            return resultado
+        finally:
+            if perfil is not None:
+                perfil.disable()
+            if medir_memoria:
+                pico = max(tracemalloc.get_traced_memory()[1] - base, 0)
+                if iniciado:
+                    tracemalloc.stop()
+                datos.muestras_memoria += 1
+                datos.pico_total += pico
+                datos.pico_maximo = max(datos.pico_maximo, pico)
+            self.__registrar(datos, None, error)
+
+    def __resumir_perfil(self, perfil: cProfile.Profile) -> List[Dict]:
+        filas = sorted(pstats.Stats(perfil).stats.items(), key=lambda fila: fila[1][3], reverse=True)
+        resumen = []
+        for (archivo, linea, funcion), (_, llamadas, propio, acumulado, _) in filas[:FUNCIONES_PERFIL]:
+            nombre = funcion if archivo == "~" else f"{os.path.basename(archivo)}:{linea}({funcion})"
+            resumen.append({"funcion": nombre, "llamadas": llamadas,
+                            "segundos_propios": propio, "segundos_acumulados": acumulado})
+        return resumen
+
+    def resumen(self) -> Dict:
+        """Configuración y métricas de cada operación, listas para serializar
+        en JSON. Las duraciones están en segundos y los percentiles salen del
+        histograma: son cotas superiores, a menos del doble del valor real"""
+        with self.__muestreando:
+            perfiles = {operacion: self.__resumir_perfil(perfil)
+                        for operacion, perfil in self.__perfiles.items()}
+        totales: Dict[str, _Operacion] = {}
+        with self.__cerrojo:
+            for tabla in self.__tablas:
+                # Los otros hilos pueden estar agregando operaciones a su tabla
+                for operacion, datos in list(tabla.items()):
+                    totales.setdefault(operacion, _Operacion()).sumar(datos)
+            desde = self.__desde
+        operaciones = {}
+        for operacion in sorted(totales):
+            operaciones[operacion] = totales[operacion].a_diccionario()
+            if perfiles.get(operacion):
+                operaciones[operacion]["perfil"] = perfiles[operacion]
+        return {
+            "desde": desde.isoformat(),
+            "fecha_generacion": datetime.now().isoformat(),
+            "activa": self.__activa,
+            "perfil_cada": self.__perfil_cada,
+            "memoria_cada": self.__memoria_cada,
+            "operaciones": operaciones
+        }
+
+    def volcar(self, archivo: str = ARCHIVO_METRICAS):
+        """Guarda el resumen en un archivo JSON"""
+        from proyecto_salud import escritura_atomica
+        with escritura_atomica(archivo) as f:
+            json.dump(self.resumen(), f, ensure_ascii=False, indent=2)
+
+# Métricas compartidas por todos los módulos
+INSTRUMENTACION = Instrumentacion()
+
+def instrumentado(funcion):
+    """Registra en INSTRUMENTACION cada llamada a la función o método, con
+    su __qualname__ como nombre de la operación"""
+    operacion = funcion.__qualname__
+
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        return INSTRUMENTACION.ejecutar(operacion, funcion, args, kwargs)
+    return envoltura
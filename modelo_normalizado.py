@@ -0,0 +1,415 @@
+"""Modelo normalizado de proyectos, instituciones y beneficiarios.
+
+En el modelo de objetos de proyecto_salud, una misma Institucion agregada a
+dos proyectos comparte su lista de beneficiarios, así que cada beneficiario
+aparece (y se cuenta) en ambos proyectos. Aquí cada dato se guarda una vez:
+
+- FichaInstitucion: datos de cada institución (nombre, dirección, teléfono)
+- Persona: datos propios de cada beneficiario (tipo, género, edad, enfermedad),
+  con un identificador propio: dos personas pueden llamarse igual
+- Inscripcion: la relación (proyecto, institución, persona, herramienta, respuesta)
+
+Las inscripciones se indexan por proyecto, institución y persona, y los
+agregados por (proyecto, institución) se mantienen en cada alta, baja o
+cambio de respuesta, de modo que los reportes no recorren beneficiarios.
+Dentro de este modelo una persona puede inscribirse en varias terapias sin
+duplicar su registro.
+
+Es un modelo de reportes, aparte del que usa la aplicación: el gestor, la
+bitácora y los demás módulos siguen trabajando con Institucion y
+Beneficiario. desde_gestor() convierte un gestor cargado para los reportes
+que cuentan personas distintas (comandos.py reporte --normalizado), y
+a_gestor() hace la conversión inversa, con un Beneficiario por inscripción:
+en el gestor una persona inscrita en dos terapias vuelve a ser dos objetos.
+"""
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from proyecto_salud import (Beneficiario, EstadisticasParciales, GestorProyectos, Genero, Institucion,
+                            Proyecto, RespuestaTratamiento, TipoBeneficiario)
+
+
+class FichaInstitucion:
+    """Datos de una institución, compartidos por todos los proyectos"""
+
+    def __init__(self, nombre: str, direccion: str, telefono: str):
+        self.__nombre = nombre
+        self.__direccion = direccion
+        self.__telefono = telefono
+
+    @property
+    def nombre(self):
+        return self.__nombre
+
+    @property
+    def direccion(self):
+        return self.__direccion
+
+    @property
+    def telefono(self):
+        return self.__telefono
+
+    def __str__(self):
+        return self.__nombre
+
+
+class Persona:
+    """Datos propios de un beneficiario, independientes de sus inscripciones"""
+
+    def __init__(self, identificador: int, nombre: str, tipo: TipoBeneficiario, genero: Genero,
+                 edad: int, enfermedad: str, fecha_registro: Optional[datetime] = None):
+        self.__identificador = identificador
+        self.__nombre = nombre
+        self.__tipo = tipo
+        self.__genero = genero
+        self.__edad = edad
+        self.__enfermedad = enfermedad
+        self.__fecha_registro = fecha_registro or datetime.now()
+
+    @property
+    def identificador(self) -> int:
+        return self.__identificador
+
+    @property
+    def nombre(self):
+        return self.__nombre
+
+    @property
+    def tipo(self):
+        return self.__tipo
+
+    @property
+    def genero(self):
+        return self.__genero
+
+    @property
+    def edad(self):
+        return self.__edad
+
+    @property
+    def enfermedad(self):
+        return self.__enfermedad
+
+    @property
+    def fecha_registro(self):
+        return self.__fecha_registro
+
+    def __str__(self):
+        return f"{self.__nombre} ({self.__tipo.value}, {self.__edad} años)"
+
+
+class Inscripcion:
+    """Inscripción de una persona en un proyecto a través de una institución.
+
+    Tiene la misma interfaz de lectura que Beneficiario, así que puede usarse
+    donde antes se usaba un Beneficiario (por ejemplo con get_data).
+    """
+
+    def __init__(self, proyecto: str, institucion: FichaInstitucion, persona: Persona,
+                 herramienta_tratamiento: str, respuesta_tratamiento: RespuestaTratamiento,
+                 al_cambiar_respuesta: Optional[Callable] = None):
+        self.__proyecto = proyecto
+        self.__institucion = institucion
+        self.__persona = persona
+        self.__herramienta_tratamiento = herramienta_tratamiento
+        self.__respuesta_tratamiento = respuesta_tratamiento
+        self.__al_cambiar_respuesta = al_cambiar_respuesta
+
+    @property
+    def proyecto(self) -> str:
+        return self.__proyecto
+
+    @property
+    def institucion(self) -> FichaInstitucion:
+        return self.__institucion
+
+    @property
+    def persona(self) -> Persona:
+        return self.__persona
+
+    @property
+    def nombre(self):
+        return self.__persona.nombre
+
+    @property
+    def tipo(self):
+        return self.__persona.tipo
+
+    @property
+    def genero(self):
+        return self.__persona.genero
+
+    @property
+    def edad(self):
+        return self.__persona.edad
+
+    @property
+    def enfermedad(self):
+        return self.__persona.enfermedad
+
+    @property
+    def fecha_registro(self):
+        return self.__persona.fecha_registro
+
+    @property
+    def herramienta_tratamiento(self):
+        return self.__herramienta_tratamiento
+
+    @property
+    def respuesta_tratamiento(self):
+        return self.__respuesta_tratamiento
+
+    @respuesta_tratamiento.setter
+    def respuesta_tratamiento(self, valor: RespuestaTratamiento):
+        anterior = self.__respuesta_tratamiento
+        self.__respuesta_tratamiento = valor
+        if anterior is not valor and self.__al_cambiar_respuesta:
+            self.__al_cambiar_respuesta(self, anterior, valor)
+
+    def get_data(self):
+        """Muestra información completa de la inscripción"""
+        print(f"""
+Id beneficiario: {self.nombre}
+Tipo: {self.tipo.value}
+Género: {self.genero.value}
+Edad: {self.edad}
+Enfermedad/Padecimiento: {self.enfermedad}
+Herramienta de tratamiento: {self.__herramienta_tratamiento}
+Respuesta al tratamiento: {self.__respuesta_tratamiento.value}
+""")
+
+    def __str__(self):
+        return f"{self.__persona} en {self.__proyecto} -> {self.__institucion.nombre}"
+
+
+class ModeloInscripciones:
+    """Registros de instituciones y personas más la relación de inscripciones"""
+
+    def __init__(self):
+        self.__proyectos: Dict[str, Proyecto] = {}
+        self.__instituciones: Dict[str, FichaInstitucion] = {}
+        self.__personas: Dict[int, Persona] = {}
+        # Identificadores de las personas con cada nombre, en orden de registro
+        self.__personas_por_nombre: Dict[str, List[int]] = {}
+        # Instituciones de cada proyecto, en orden de vinculación
+        self.__vinculos: Dict[str, List[str]] = {}
+        # Inscripciones por número y sus índices (dict como conjunto ordenado)
+        self.__inscripciones: Dict[int, Inscripcion] = {}
+        self.__secuencia = 0
+        self.__secuencia_personas = 0
+        self.__por_clave: Dict[Tuple[str, str, int], int] = {}
+        self.__por_proyecto: Dict[str, Dict[int, None]] = {}
+        self.__por_institucion: Dict[str, Dict[int, None]] = {}
+        self.__por_persona: Dict[int, Dict[int, None]] = {}
+        self.__agregados: Dict[Tuple[str, str], EstadisticasParciales] = {}
+
+    # Registros
+    def registrar_proyecto(self, proyecto: Proyecto):
+        """Registra un proyecto (se usan su nombre, tipo y herramientas)"""
+        self.__proyectos.setdefault(proyecto.nombre, proyecto)
+        self.__vinculos.setdefault(proyecto.nombre, [])
+
+    def registrar_institucion(self, nombre: str, direccion: str, telefono: str) -> FichaInstitucion:
+        """Registra una institución; si ya existe con los mismos datos,
+        retorna la ficha existente"""
+        ficha = self.__instituciones.get(nombre)
+        if ficha is None:
+            ficha = self.__instituciones[nombre] = FichaInstitucion(nombre, direccion, telefono)
+        elif (ficha.direccion, ficha.telefono) != (direccion, telefono):
+            raise ValueError(f"La institución {nombre} ya está registrada con otros datos")
+        return ficha
+
+    def registrar_persona(self, nombre: str, tipo: TipoBeneficiario, genero: Genero, edad: int,
+                          enfermedad: str, fecha_registro: Optional[datetime] = None) -> Persona:
+        """Registra una persona nueva, aunque ya haya otra con el mismo nombre"""
+        self.__secuencia_personas += 1
+        persona = Persona(self.__secuencia_personas, nombre, tipo, genero, edad, enfermedad,
+                          fecha_registro)
+        self.__personas[persona.identificador] = persona
+        self.__personas_por_nombre.setdefault(nombre, []).append(persona.identificador)
+        return persona
+
+    def vincular(self, nombre_proyecto: str, nombre_institucion: str):
+        """Hace participar una institución registrada en un proyecto"""
+        instituciones = self.__vinculos.get(nombre_proyecto)
+        if instituciones is None:
+            raise ValueError(f"Proyecto no registrado: {nombre_proyecto}")
+        if nombre_institucion not in self.__instituciones:
+            raise ValueError(f"Institución no registrada: {nombre_institucion}")
+        if nombre_institucion not in instituciones:
+            instituciones.append(nombre_institucion)
+            self.__agregados[(nombre_proyecto, nombre_institucion)] = EstadisticasParciales()
+
+    @property
+    def proyectos(self) -> List[str]:
+        return list(self.__proyectos)
+
+    @property
+    def instituciones(self) -> List[FichaInstitucion]:
+        return list(self.__instituciones.values())
+
+    def instituciones_de(self, nombre_proyecto: str) -> List[str]:
+        return list(self.__vinculos.get(nombre_proyecto, []))
+
+    def buscar_persona(self, identificador: int) -> Optional[Persona]:
+        return self.__personas.get(identificador)
+
+    def buscar_personas(self, nombre: str) -> List[Persona]:
+        """Personas con ese nombre, en orden de registro"""
+        return [self.__personas[i] for i in self.__personas_por_nombre.get(nombre, [])]
+
+    @property
+    def total_personas(self) -> int:
+        return len(self.__personas)
+
+    # Inscripciones
+    def inscribir(self, nombre_proyecto: str, nombre_institucion: str, persona: Persona,
+                  herramienta: str, respuesta: RespuestaTratamiento) -> Inscripcion:
+        """Inscribe a una persona registrada en un proyecto a través de una institución"""
+        if nombre_institucion not in self.__vinculos.get(nombre_proyecto, []):
+            raise ValueError(f"La institución {nombre_institucion} no participa en {nombre_proyecto}")
+        if self.__personas.get(persona.identificador) is not persona:
+            raise ValueError(f"Persona no registrada: {persona.nombre}")
+        if herramienta not in self.__proyectos[nombre_proyecto].obtener_herramientas_especificas():
+            raise ValueError(f"Herramienta no disponible en {nombre_proyecto}: {herramienta}")
+        if (nombre_proyecto, nombre_institucion, persona.identificador) in self.__por_clave:
+            raise ValueError(f"{persona.nombre} ya está inscrito en {nombre_proyecto} -> {nombre_institucion}")
+        return self.__crear_inscripcion(nombre_proyecto, nombre_institucion, persona, herramienta, respuesta)
+
+    def __crear_inscripcion(self, nombre_proyecto: str, nombre_institucion: str, persona: Persona,
+                            herramienta: str, respuesta: RespuestaTratamiento) -> Inscripcion:
+        """Guarda una inscripción ya validada y actualiza índices y agregados"""
+        inscripcion = Inscripcion(nombre_proyecto, self.__instituciones[nombre_institucion], persona,
+                                  herramienta, respuesta, self.__actualizar_respuesta)
+        self.__secuencia += 1
+        numero = self.__secuencia
+        self.__inscripciones[numero] = inscripcion
+        self.__por_clave[(nombre_proyecto, nombre_institucion, persona.identificador)] = numero
+        self.__por_proyecto.setdefault(nombre_proyecto, {})[numero] = None
+        self.__por_institucion.setdefault(nombre_institucion, {})[numero] = None
+        self.__por_persona.setdefault(persona.identificador, {})[numero] = None
+        self.__agregados[(nombre_proyecto, nombre_institucion)].agregar(inscripcion)
+        return inscripcion
+
+    def desinscribir(self, nombre_proyecto: str, nombre_institucion: str, persona: Persona) -> bool:
+        """Elimina una inscripción; la persona sigue registrada"""
+        numero = self.__por_clave.pop((nombre_proyecto, nombre_institucion, persona.identificador), None)
+        if numero is None:
+            return False
+        inscripcion = self.__inscripciones.pop(numero)
+        del self.__por_proyecto[nombre_proyecto][numero]
+        del self.__por_institucion[nombre_institucion][numero]
+        del self.__por_persona[persona.identificador][numero]
+        self.__agregados[(nombre_proyecto, nombre_institucion)].agregar(inscripcion, -1)
+        return True
+
+    def __actualizar_respuesta(self, inscripcion: Inscripcion, anterior: RespuestaTratamiento,
+                               nueva: RespuestaTratamiento):
+        clave = (inscripcion.proyecto, inscripcion.institucion.nombre, inscripcion.persona.identificador)
+        if self.__inscripciones.get(self.__por_clave.get(clave)) is inscripcion:
+            self.__agregados[clave[:2]].mover_respuesta(inscripcion, anterior, nueva)
+
+    def __listar(self, indice: Dict, clave) -> Iterator[Inscripcion]:
+        return (self.__inscripciones[numero] for numero in indice.get(clave, {}))
+
+    def inscripciones_de_proyecto(self, nombre_proyecto: str) -> Iterator[Inscripcion]:
+        return self.__listar(self.__por_proyecto, nombre_proyecto)
+
+    def inscripciones_de_institucion(self, nombre_institucion: str) -> Iterator[Inscripcion]:
+        return self.__listar(self.__por_institucion, nombre_institucion)
+
+    def inscripciones_de_persona(self, persona: Persona) -> Iterator[Inscripcion]:
+        return self.__listar(self.__por_persona, persona.identificador)
+
+    def buscar_beneficiario_global(self, nombre: str) -> List[tuple]:
+        """Mismo formato que GestorProyectos.buscar_beneficiario_global"""
+        return [(i.proyecto, i.institucion.nombre, i) for persona in self.buscar_personas(nombre)
+                for i in self.inscripciones_de_persona(persona)]
+
+    # Estadísticas y reportes (desde los agregados, sin recorrer inscripciones)
+    def estadisticas_institucion(self, nombre_proyecto: str, nombre_institucion: str) -> Dict:
+        parcial = self.__agregados.get((nombre_proyecto, nombre_institucion))
+        if parcial is None:
+            raise ValueError(f"La institución {nombre_institucion} no participa en {nombre_proyecto}")
+        return parcial.a_estadisticas()
+
+    def generar_reporte_especializado(self, nombre_proyecto: str) -> Dict:
+        """Reporte con el mismo formato que Proyecto.generar_reporte_especializado"""
+        proyecto = self.__proyectos[nombre_proyecto]
+        return proyecto.reporte_desde_parciales(
+            [(nombre, self.__agregados[(nombre_proyecto, nombre)])
+             for nombre in self.__vinculos[nombre_proyecto]])
+
+    def generar_reporte_consolidado(self) -> Dict:
+        """Reporte consolidado; total_beneficiarios cuenta personas distintas y
+        total_inscripciones cuenta inscripciones en todos los proyectos"""
+        reportes = [self.generar_reporte_especializado(nombre) for nombre in self.__proyectos]
+        return {
+            "fecha_generacion": datetime.now().isoformat(),
+            "total_proyectos": len(reportes),
+            "total_beneficiarios": sum(1 for inscripciones in self.__por_persona.values() if inscripciones),
+            "total_inscripciones": len(self.__inscripciones),
+            "proyectos": reportes
+        }
+
+    def a_gestor(self) -> GestorProyectos:
+        """Arma un GestorProyectos con las inscripciones del modelo.
+
+        Cada proyecto recibe su propio objeto Institucion, creado desde la
+        ficha compartida, con un Beneficiario por inscripción: así el modelo
+        de objetos no cuenta a nadie en un proyecto en el que no se inscribió,
+        pero los datos de una persona se copian en cada inscripción.
+        """
+        gestor = GestorProyectos()
+        for nombre, registrado in self.__proyectos.items():
+            proyecto = type(registrado)(registrado.nombre, registrado.descripcion, registrado.fecha_inicio)
+            instituciones = {}
+            for nombre_institucion in self.__vinculos[nombre]:
+                ficha = self.__instituciones[nombre_institucion]
+                instituciones[nombre_institucion] = Institucion(ficha.nombre, ficha.direccion, ficha.telefono)
+                proyecto.agregar_institucion(instituciones[nombre_institucion])
+            for inscripcion in self.inscripciones_de_proyecto(nombre):
+                persona = inscripcion.persona
+                instituciones[inscripcion.institucion.nombre].agregar_beneficiario(Beneficiario(
+                    persona.nombre, persona.tipo, persona.genero, persona.edad, persona.enfermedad,
+                    inscripcion.herramienta_tratamiento, inscripcion.respuesta_tratamiento,
+                    persona.fecha_registro))
+            gestor.agregar_proyecto(proyecto)
+        return gestor
+
+    @classmethod
+    def desde_gestor(cls, gestor: GestorProyectos) -> "ModeloInscripciones":
+        """Convierte el modelo de objetos al modelo normalizado.
+
+        Las instituciones compartidas entre proyectos se registran una vez, y
+        cada objeto Beneficiario es una persona (los homónimos son personas
+        distintas). Como en el modelo de objetos no se sabe en cuál de los
+        proyectos de una institución compartida se atendió a cada
+        beneficiario, se le inscribe en los que ofrecen su herramienta de
+        tratamiento (en todos si ninguno la ofrece).
+        """
+        modelo = cls()
+        proyectos_por_institucion: Dict[int, List[Proyecto]] = {}
+        instituciones = {}
+        for proyecto in gestor.proyectos:
+            modelo.registrar_proyecto(proyecto)
+            for institucion in proyecto.instituciones:
+                modelo.registrar_institucion(institucion.nombre, institucion.direccion, institucion.telefono)
+                modelo.vincular(proyecto.nombre, institucion.nombre)
+                proyectos_por_institucion.setdefault(id(institucion), []).append(proyecto)
+                instituciones[id(institucion)] = institucion
+
+        for clave, institucion in instituciones.items():
+            proyectos = proyectos_por_institucion[clave]
+            for beneficiario in institucion.iterar_beneficiarios():
+                persona = modelo.registrar_persona(beneficiario.nombre, beneficiario.tipo, beneficiario.genero,
+                                                   beneficiario.edad, beneficiario.enfermedad,
+                                                   beneficiario.fecha_registro)
+                destinos = [p for p in proyectos
+                            if beneficiario.herramienta_tratamiento in p.obtener_herramientas_especificas()]
+                for proyecto in destinos or proyectos:
+                    # Se conserva la herramienta registrada aunque el proyecto no la ofrezca
+                    modelo.__crear_inscripcion(proyecto.nombre, institucion.nombre, persona,
+                                               beneficiario.herramienta_tratamiento,
+                                               beneficiario.respuesta_tratamiento)
+        return modelo
@@ -0,0 +1,362 @@
+"""Instantáneas de la base de datos a nivel de registro.
+
+Formato: JSON Lines (un registro JSON por línea), opcionalmente comprimido
+con gzip si el archivo termina en ".gz". Los registros se escriben en este
+orden para que el cargador pueda reconstruir todo en una sola pasada:
+
+    {"registro": "encabezado", "formato": "salud-instantanea", "version": 1, ...}
+    {"registro": "proyecto", "tipo": "Musicoterapia", "nombre": ..., ...}
+    {"registro": "institucion", "id": 0, "nombre": ..., ...}
+    {"registro": "vinculo", "proyecto": ..., "institucion": 0}
+    {"registro": "beneficiario", "institucion": 0, "nombre": ..., ...}
+
+Las instituciones llevan un id propio porque una misma institución puede
+participar en varios proyectos.
+
+Junto a cada instantánea sin comprimir se guarda un índice
+(`<archivo>.indice.json`) con los proyectos, las instituciones, la posición
+en bytes del bloque de beneficiarios de cada institución y su agregado
+parcial. Con él se pueden obtener estadísticas sin leer beneficiarios, o
+cargar solo las instituciones que se necesitan (cargar_instituciones).
+"""
+import gzip
+import json
+import os
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional, solo acelera la carga
+    orjson = None
+
+from proyecto_salud import (TIPOS_PROYECTO, Beneficiario, EstadisticasParciales, GestorProyectos,
+                            Genero, Institucion, Proyecto, RespuestaTratamiento, TipoBeneficiario,
+                            escritura_atomica)
+
+FORMATO = "salud-instantanea"
+VERSION = 1
+ARCHIVO_DATOS = "datos_salud.jsonl"
+FORMATO_INDICE = "salud-indice"
+
+
+class ErrorInstantanea(Exception):
+    """El archivo no es una instantánea válida"""
+
+
+def _decodificar(linea):
+    if orjson is not None:
+        return orjson.loads(linea)
+    return json.loads(linea)
+
+
+def _abrir_lectura(archivo: str):
+    if archivo.endswith(".gz"):
+        return gzip.open(archivo, "rt", encoding="utf-8")
+    return open(archivo, "r", encoding="utf-8")
+
+
+def beneficiario_a_registro(beneficiario: Beneficiario) -> Dict:
+    """Convierte un beneficiario en un diccionario serializable"""
+    return {
+        "nombre": beneficiario.nombre,
+        "tipo": beneficiario.tipo.value,
+        "genero": beneficiario.genero.value,
+        "edad": beneficiario.edad,
+        "enfermedad": beneficiario.enfermedad,
+        "herramienta_tratamiento": beneficiario.herramienta_tratamiento,
+        "respuesta_tratamiento": beneficiario.respuesta_tratamiento.value,
+        "fecha_registro": beneficiario.fecha_registro.isoformat()
+    }
+
+
+def registro_a_beneficiario(registro: Dict) -> Beneficiario:
+    """Reconstruye un beneficiario desde su diccionario serializado"""
+    return Beneficiario(
+        registro["nombre"],
+        TipoBeneficiario(registro["tipo"]),
+        Genero(registro["genero"]),
+        registro["edad"],
+        registro["enfermedad"],
+        registro["herramienta_tratamiento"],
+        RespuestaTratamiento(registro["respuesta_tratamiento"]),
+        datetime.fromisoformat(registro["fecha_registro"])
+    )
+
+
+def parcial_a_registro(parcial: EstadisticasParciales) -> Dict:
+    """Convierte un agregado parcial en un diccionario serializable"""
+    return {
+        "suma_edades": parcial.suma_edades,
+        "por_tipo": {t.value: n for t, n in parcial.por_tipo.items() if n},
+        "por_genero": {g.value: n for g, n in parcial.por_genero.items() if n},
+        "por_respuesta": {r.value: n for r, n in parcial.por_respuesta.items() if n},
+        "por_herramienta": parcial.por_herramienta,
+        "cubo": [[herramienta, celda, n] for (herramienta, celda), n in sorted(parcial.cubo.items())]
+    }
+
+
+def registro_a_parcial(registro: Dict) -> EstadisticasParciales:
+    """Reconstruye un agregado parcial desde su diccionario serializado"""
+    return EstadisticasParciales.desde_conteos(
+        {(herramienta, celda): n for herramienta, celda, n in registro["cubo"]},
+        registro["suma_edades"])
+
+
+def registro_a_proyecto(registro: Dict) -> Proyecto:
+    """Crea el proyecto (sin instituciones) de un registro de proyecto"""
+    return TIPOS_PROYECTO[registro["tipo"]](
+        registro["nombre"], registro["descripcion"], datetime.fromisoformat(registro["fecha_inicio"]))
+
+
+def numerar_instituciones(gestor: GestorProyectos) -> List[Institucion]:
+    """Instituciones de todos los proyectos, una vez cada una; su posición en
+    la lista es el id con el que se escriben en la instantánea"""
+    vistas = set()
+    instituciones = []
+    for proyecto in gestor.proyectos:
+        for institucion in proyecto.instituciones:
+            if id(institucion) not in vistas:
+                vistas.add(id(institucion))
+                instituciones.append(institucion)
+    return instituciones
+
+
+def iterar_registros(gestor: GestorProyectos, encabezado: Optional[Dict] = None) -> Iterator[Dict]:
+    """Genera los registros de la instantánea en el orden del formato.
+    `encabezado` agrega campos propios al registro de encabezado"""
+    yield {"registro": "encabezado", "formato": FORMATO, "version": VERSION,
+           "fecha_generacion": datetime.now().isoformat(), **(encabezado or {})}
+
+    proyectos = gestor.proyectos
+    for proyecto in proyectos:
+        yield {"registro": "proyecto", "tipo": proyecto.TIPO_PROYECTO, "nombre": proyecto.nombre,
+               "descripcion": proyecto.descripcion, "fecha_inicio": proyecto.fecha_inicio.isoformat()}
+
+    # Cada institución se escribe una sola vez aunque esté en varios proyectos
+    instituciones = numerar_instituciones(gestor)
+    ids = {id(institucion): numero for numero, institucion in enumerate(instituciones)}
+    for numero, institucion in enumerate(instituciones):
+        yield {"registro": "institucion", "id": numero, "nombre": institucion.nombre,
+               "direccion": institucion.direccion, "telefono": institucion.telefono}
+
+    for proyecto in proyectos:
+        for institucion in proyecto.instituciones:
+            yield {"registro": "vinculo", "proyecto": proyecto.nombre,
+                   "institucion": ids[id(institucion)]}
+
+    for numero, institucion in enumerate(instituciones):
+        for beneficiario in institucion.iterar_beneficiarios():
+            registro = beneficiario_a_registro(beneficiario)
+            registro["registro"] = "beneficiario"
+            registro["institucion"] = numero
+            yield registro
+
+
+_TIPOS = {tipo.value: tipo for tipo in TipoBeneficiario}
+_GENEROS = {genero.value: genero for genero in Genero}
+_RESPUESTAS = {respuesta.value: respuesta for respuesta in RespuestaTratamiento}
+
+
+def guardar_instantanea(gestor: GestorProyectos, archivo: str = ARCHIVO_DATOS,
+                        encabezado: Optional[Dict] = None) -> int:
+    """Guarda proyectos, instituciones y beneficiarios en `archivo`.
+    Retorna la cantidad de registros escritos"""
+    comprimir = archivo.endswith(".gz")
+    cantidad = 0
+    posicion = 0
+    # El índice se arma con los mismos registros que se escriben, así no
+    # puede diferir de la instantánea aunque el gestor cambie mientras tanto
+    proyectos: List[Dict] = []
+    vinculos: Dict[str, List[int]] = {}
+    instituciones: List[Dict] = []
+    # Beneficiarios por (tipo, genero, edad, respuesta, herramienta) de cada institución
+    conteos: List[Counter] = []
+    with escritura_atomica(archivo, comprimir=comprimir) as f:
+        for registro in iterar_registros(gestor, encabezado):
+            linea = json.dumps(registro, ensure_ascii=False) + "\n"
+            f.write(linea)
+            cantidad += 1
+            if comprimir:
+                continue
+            largo = len(linea.encode("utf-8"))
+            clase = registro["registro"]
+            if clase == "beneficiario":
+                datos = instituciones[registro["institucion"]]
+                if datos["total"] == 0:
+                    datos["bloque"] = [posicion, posicion]
+                datos["bloque"][1] = posicion + largo
+                datos["total"] += 1
+                conteos[registro["institucion"]][(
+                    registro["tipo"], registro["genero"], registro["edad"],
+                    registro["respuesta_tratamiento"], registro["herramienta_tratamiento"])] += 1
+            elif clase == "vinculo":
+                vinculos[registro["proyecto"]].append(registro["institucion"])
+            elif clase == "institucion":
+                instituciones.append({"id": registro["id"], "nombre": registro["nombre"],
+                                      "direccion": registro["direccion"],
+                                      "telefono": registro["telefono"], "bloque": [0, 0], "total": 0})
+                conteos.append(Counter())
+            elif clase == "proyecto":
+                datos = {clave: valor for clave, valor in registro.items() if clave != "registro"}
+                datos["instituciones"] = vinculos[registro["nombre"]] = []
+                proyectos.append(datos)
+            else:
+                fecha_generacion = registro["fecha_generacion"]
+            posicion += largo
+    if not comprimir:
+        for datos, conteo in zip(instituciones, conteos):
+            parcial = EstadisticasParciales()
+            for (tipo, genero, edad, respuesta, herramienta), n in conteo.items():
+                parcial.agregar_valores(_TIPOS[tipo], _GENEROS[genero], edad, _RESPUESTAS[respuesta],
+                                        herramienta, n)
+            datos["parcial"] = parcial_a_registro(parcial)
+        _guardar_indice(archivo, posicion, fecha_generacion, proyectos, instituciones, encabezado)
+    return cantidad
+
+
+def ruta_indice(archivo: str) -> str:
+    return archivo + ".indice.json"
+
+
+def _guardar_indice(archivo: str, tamano: int, fecha_generacion: str, proyectos: List[Dict],
+                    instituciones: List[Dict], encabezado: Optional[Dict]):
+    indice = {
+        "formato": FORMATO_INDICE,
+        "version": VERSION,
+        "tamano": tamano,
+        "fecha_generacion": fecha_generacion,
+        **(encabezado or {}),
+        "proyectos": proyectos,
+        "instituciones": instituciones
+    }
+    with escritura_atomica(ruta_indice(archivo)) as f:
+        json.dump(indice, f, ensure_ascii=False)
+
+
+def leer_indice(archivo: str) -> Optional[Dict]:
+    """Índice de la instantánea, o None si no existe o no corresponde a
+    ella (por ejemplo, si el proceso se cortó entre guardar una y otro)"""
+    try:
+        with open(ruta_indice(archivo), "r", encoding="utf-8") as f:
+            indice = json.load(f)
+        if indice.get("formato") != FORMATO_INDICE or indice.get("version") != VERSION:
+            return None
+        if os.path.getsize(archivo) != indice["tamano"]:
+            return None
+        # Índices anteriores a las tablas cruzadas: sus parciales no tienen cubo
+        if any("cubo" not in datos["parcial"] for datos in indice["instituciones"]):
+            return None
+        with open(archivo, "r", encoding="utf-8") as f:
+            encabezado = json.loads(f.readline())
+        if encabezado.get("fecha_generacion") != indice["fecha_generacion"]:
+            return None
+        return indice
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def cargar_instituciones(archivo: str, indice: Dict, ids) -> Dict[int, Institucion]:
+    """Crea las instituciones con esos ids y sus beneficiarios, leyendo solo
+    sus bloques de la instantánea"""
+    instituciones = {}
+    with open(archivo, "rb") as f:
+        for numero in sorted(ids):
+            datos = indice["instituciones"][numero]
+            institucion = Institucion(datos["nombre"], datos["direccion"], datos["telefono"])
+            inicio, fin = datos["bloque"]
+            if fin > inicio:
+                f.seek(inicio)
+                institucion.agregar_beneficiarios_lote(
+                    registro_a_beneficiario(_decodificar(linea))
+                    for linea in f.read(fin - inicio).splitlines())
+            instituciones[numero] = institucion
+    return instituciones
+
+
+def cargar_instantanea(archivo: str = ARCHIVO_DATOS) -> Tuple[GestorProyectos, Dict]:
+    """Reconstruye un GestorProyectos leyendo la instantánea línea por línea.
+
+    Solo se mantiene en memoria el registro que se está procesando (además
+    de los objetos reconstruidos). Retorna el gestor y un resumen de la carga
+    con la cantidad de registros, el tiempo, los registros por segundo y el
+    registro de encabezado.
+    """
+    gestor = GestorProyectos()
+    encabezado = {}
+    proyectos = {}
+    instituciones: Dict[int, Institucion] = {}
+    conteo = {"proyecto": 0, "institucion": 0, "vinculo": 0, "beneficiario": 0}
+    inicio = time.perf_counter()
+
+    with _abrir_lectura(archivo) as f:
+        for numero_linea, linea in enumerate(f, 1):
+            if not linea.strip():
+                continue
+            try:
+                registro = _decodificar(linea)
+                clase = registro["registro"]
+                if clase == "beneficiario":
+                    instituciones[registro["institucion"]].agregar_beneficiario(
+                        registro_a_beneficiario(registro))
+                elif clase == "vinculo":
+                    proyectos[registro["proyecto"]].agregar_institucion(
+                        instituciones[registro["institucion"]])
+                elif clase == "institucion":
+                    instituciones[registro["id"]] = Institucion(
+                        registro["nombre"], registro["direccion"], registro["telefono"])
+                elif clase == "proyecto":
+                    proyecto = registro_a_proyecto(registro)
+                    proyectos[proyecto.nombre] = proyecto
+                    gestor.agregar_proyecto(proyecto)
+                elif clase == "encabezado":
+                    if registro.get("formato") != FORMATO or registro.get("version") != VERSION:
+                        raise ErrorInstantanea(f"Formato no soportado: {registro.get('formato')} "
+                                               f"v{registro.get('version')}")
+                    encabezado = registro
+                    continue
+                else:
+                    raise ErrorInstantanea(f"Tipo de registro desconocido: {clase}")
+                conteo[clase] += 1
+            except ErrorInstantanea:
+                raise
+            except (KeyError, ValueError, TypeError) as e:
+                raise ErrorInstantanea(f"Registro inválido en la línea {numero_linea}: {e}") from e
+
+    segundos = time.perf_counter() - inicio
+    total = sum(conteo.values())
+    resumen = {
+        "registros": total,
+        "por_tipo": conteo,
+        "segundos": segundos,
+        "registros_por_segundo": total / segundos if segundos > 0 else float(total),
+        "encabezado": encabezado
+    }
+    return gestor, resumen
+
+
+def buscar_en_bloque(archivo: str, indice: Dict, numero: int, nombres) -> Dict[str, List[Beneficiario]]:
+    """Beneficiarios de la institución `numero` con alguno de esos nombres,
+    en orden de registro. Recorre el bloque línea por línea y compara el
+    nombre de cada registro decodificado"""
+    encontrados: Dict[str, List[Beneficiario]] = {nombre: [] for nombre in nombres}
+    inicio, fin = indice["instituciones"][numero]["bloque"]
+    if fin <= inicio or not encontrados:
+        return encontrados
+    with open(archivo, "rb") as f:
+        f.seek(inicio)
+        posicion = inicio
+        while posicion < fin:
+            linea = f.readline()
+            if not linea:
+                break
+            posicion += len(linea)
+            if not linea.strip():
+                continue
+            registro = _decodificar(linea)
+            lista = encontrados.get(registro["nombre"])
+            if lista is not None:
+                lista.append(registro_a_beneficiario(registro))
+    return encontrados
@@ -1,9 +1,22 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Callable, Tuple
+from collections import OrderedDict
+from contextlib import contextmanager
 from enum import Enum
-from datetime import datetime
+from datetime import date, datetime, timedelta
+import bisect
+import functools
+import gzip
+import io
+import itertools
 import json
+import operator
 import os
+import tempfile
+import threading
+
+from busqueda_nombres import IndiceNombres
+from instrumentacion import BUS_EVENTOS, INSTRUMENTACION, instrumentado
 
 class TipoBeneficiario(Enum):
     TRABAJADOR_SALUD = "trabajador_salud"
@@ -21,12 +34,93 @@ class RespuestaTratamiento(Enum):
     REGULAR = "regular"
     MALA = "mala"
 
+class CacheReportes:
+    """Caché LRU acotada para estadísticas y reportes.
+    
+    Las claves incluyen la versión de los objetos de los que depende cada
+    resultado, así que una entrada queda obsoleta sola cuando hay cambios y
+    termina saliendo por LRU. Cada llamada recibe su propia copia de los
+    diccionarios y listas guardados, así que modificar un resultado no
+    altera los siguientes.
+    
+    Se puede usar desde varios hilos. El cálculo de un valor faltante se hace
+    fuera del cerrojo, así que dos hilos pueden calcular la misma clave a la vez.
+    """
+    
+    def __init__(self, capacidad: int = 1024):
+        self.__capacidad = capacidad
+        self.__entradas: OrderedDict = OrderedDict()
+        self.__aciertos = 0
+        self.__fallos = 0
+        self.__cerrojo = threading.Lock()
+    
+    def obtener(self, clave, calcular: Callable):
+        """Retorna el valor guardado para la clave o lo calcula y lo guarda"""
+        with self.__cerrojo:
+            if clave in self.__entradas:
+                self.__entradas.move_to_end(clave)
+                self.__aciertos += 1
+                return _copiar_resultado(self.__entradas[clave])
+            self.__fallos += 1
+        valor = calcular()
+        if self.__capacidad > 0:
+            with self.__cerrojo:
+                self.__entradas[clave] = valor
+                if len(self.__entradas) > self.__capacidad:
+                    self.__entradas.popitem(last=False)
+            return _copiar_resultado(valor)
+        return valor
+    
+    def limpiar(self):
+        """Descarta todas las entradas y reinicia los contadores de aciertos y fallos"""
+        with self.__cerrojo:
+            self.__entradas.clear()
+            self.__aciertos = 0
+            self.__fallos = 0
+    
+    def estadisticas(self) -> Dict:
+        """Aciertos, fallos y ocupación de la caché"""
+        with self.__cerrojo:
+            consultas = self.__aciertos + self.__fallos
+            return {
+                "aciertos": self.__aciertos,
+                "fallos": self.__fallos,
+                "tasa_aciertos": self.__aciertos / consultas if consultas else 0.0,
+                "entradas": len(self.__entradas),
+                "capacidad": self.__capacidad
+            }
+
+def _copiar_resultado(valor):
+    """Copia los diccionarios y listas anidados de un resultado; el resto
+    (números, textos, enums) es inmutable y se comparte"""
+    if isinstance(valor, dict):
+        return {clave: _copiar_resultado(v) for clave, v in valor.items()}
+    if isinstance(valor, list):
+        return [_copiar_resultado(v) for v in valor]
+    return valor
+
+# Caché compartida por instituciones, proyectos y el gestor
+CACHE_REPORTES = CacheReportes()
+
+# Identificadores únicos para las claves de la caché (id() se puede reutilizar)
+_identificadores = itertools.count(1)
+
+def memorizar_por_version(metodo):
+    """Guarda en CACHE_REPORTES el resultado de un método sin argumentos
+    mientras no cambie self.clave_version()"""
+    @functools.wraps(metodo)
+    def envoltura(self):
+        return CACHE_REPORTES.obtener((metodo.__qualname__, self.clave_version()),
+                                      lambda: metodo(self))
+    return envoltura
+
 class Beneficiario:
     """Clase que representa un beneficiario del proyecto"""
     
     def __init__(self, nombre: str, tipo: TipoBeneficiario, genero: Genero, 
                  edad: int, enfermedad: str, herramienta_tratamiento: str, 
-                 respuesta_tratamiento: RespuestaTratamiento):
+                 respuesta_tratamiento: RespuestaTratamiento,
+                 fecha_registro: Optional[datetime] = None):
         self.__nombre = nombre
         self.__tipo = tipo
         self.__genero = genero
@@ -34,7 +128,8 @@ class Beneficiario:
         self.__enfermedad = enfermedad
         self.__herramienta_tratamiento = herramienta_tratamiento
         self.__respuesta_tratamiento = respuesta_tratamiento
-        self.__fecha_registro = datetime.now()
+        self.__fecha_registro = fecha_registro or datetime.now()
+        self.__observadores: List[Callable] = []
     
     # Properties (getters y setters) 
     @property
@@ -65,9 +160,27 @@ class Beneficiario:
     def respuesta_tratamiento(self):
         return self.__respuesta_tratamiento
     
+    @property
+    def fecha_registro(self):
+        return self.__fecha_registro
+    
     @respuesta_tratamiento.setter
     def respuesta_tratamiento(self, valor: RespuestaTratamiento):
+        anterior = self.__respuesta_tratamiento
         self.__respuesta_tratamiento = valor
+        if anterior is not valor:
+            for observador in list(self.__observadores):
+                observador(self, anterior, valor)
+    
+    def agregar_observador(self, observador: Callable):
+        """Registra una función que se llama con (beneficiario, anterior, nueva)
+        cada vez que cambia la respuesta al tratamiento"""
+        self.__observadores.append(observador)
+    
+    def remover_observador(self, observador: Callable):
+        """Deja de notificar a un observador registrado"""
+        if observador in self.__observadores:
+            self.__observadores.remove(observador)
     
     def get_data(self):
         """Muestra información completa del beneficiario"""
@@ -84,45 +197,503 @@ Respuesta al tratamiento: {self.__respuesta_tratamiento.value}
     def __str__(self):
         return f"{self.__nombre} ({self.__tipo.value}, {self.__edad} años)"
 
+# Franjas de edad de las tablas cruzadas: cada límite es la primera edad de
+# la franja siguiente
+LIMITES_FRANJAS_EDAD = (18, 30, 45, 60)
+FRANJAS_EDAD = ("0-17", "18-29", "30-44", "45-59", "60+")
+
+# Dimensiones de las tablas cruzadas, en el orden en que se codifican las celdas
+DIMENSIONES = ("tipo", "genero", "respuesta", "franja_edad", "herramienta")
+
+# Tablas que incluyen los reportes de proyecto
+TABLAS_CRUZADAS = (("herramienta", "respuesta"), ("tipo", "respuesta"), ("franja_edad", "herramienta"))
+
+_TIPOS = list(TipoBeneficiario)
+_GENEROS = list(Genero)
+_RESPUESTAS = list(RespuestaTratamiento)
+_CODIGO_TIPO = {t: i for i, t in enumerate(_TIPOS)}
+_CODIGO_GENERO = {g: i for i, g in enumerate(_GENEROS)}
+_CODIGO_RESPUESTA = {r: i for i, r in enumerate(_RESPUESTAS)}
+
+def franja_edad(edad: int) -> int:
+    """Posición en FRANJAS_EDAD de la franja que contiene a `edad`"""
+    if 0 <= edad < len(_FRANJA_POR_EDAD):
+        return _FRANJA_POR_EDAD[edad]
+    return bisect.bisect_right(LIMITES_FRANJAS_EDAD, edad)
+
+_FRANJA_POR_EDAD = [bisect.bisect_right(LIMITES_FRANJAS_EDAD, edad) for edad in range(130)]
+
+def codigo_celda(tipo: int, genero: int, respuesta: int, franja: int) -> int:
+    """Celda del cubo para los códigos (posiciones en su enum) de tipo,
+    género y respuesta, y la franja de edad"""
+    return ((tipo * len(_GENEROS) + genero) * len(_RESPUESTAS) + respuesta) * len(FRANJAS_EDAD) + franja
+
+CELDAS_CUBO = len(_TIPOS) * len(_GENEROS) * len(_RESPUESTAS) * len(FRANJAS_EDAD)
+
+# Celda -> (tipo, genero, respuesta, franja), cada uno como posición
+_VALORES_CELDA = [
+    (t, g, r, f)
+    for t in range(len(_TIPOS)) for g in range(len(_GENEROS))
+    for r in range(len(_RESPUESTAS)) for f in range(len(FRANJAS_EDAD))
+]
+
+class EstadisticasParciales:
+    """Agregado parcial de beneficiarios (conteos y suma de edades).
+    
+    Dos parciales se pueden combinar, por lo que sirven para acumular
+    institución por institución o para repartir el cálculo entre procesos.
+    
+    Además de los conteos por dimensión guarda el cubo completo: cuántos
+    beneficiarios hay por (herramienta, celda), donde la celda codifica tipo,
+    género, respuesta y franja de edad. Cualquier tabla cruzada de esas
+    dimensiones sale de sumar celdas, sin recorrer beneficiarios.
+    """
+    
+    def __init__(self):
+        self.__total = 0
+        self.__suma_edades = 0
+        self.__por_tipo: Dict[TipoBeneficiario, int] = dict.fromkeys(TipoBeneficiario, 0)
+        self.__por_genero: Dict[Genero, int] = dict.fromkeys(Genero, 0)
+        self.__por_respuesta: Dict[RespuestaTratamiento, int] = dict.fromkeys(RespuestaTratamiento, 0)
+        self.__por_herramienta: Dict[str, int] = {}
+        # (herramienta, celda) -> cantidad; solo las celdas con beneficiarios
+        self.__cubo: Dict[Tuple[str, int], int] = {}
+    
+    @classmethod
+    def desde_valores(cls, filas) -> "EstadisticasParciales":
+        """Crea un parcial a partir de tuplas (tipo, genero, edad, respuesta, herramienta)"""
+        parcial = cls()
+        for fila in filas:
+            parcial.agregar_valores(*fila)
+        return parcial
+    
+    @classmethod
+    def desde_conteos(cls, cubo: Dict[Tuple[str, int], int], suma_edades: int) -> "EstadisticasParciales":
+        """Crea un parcial a partir del cubo ya contado ((herramienta, celda) -> cantidad)"""
+        parcial = cls()
+        for (herramienta, celda), n in cubo.items():
+            if not n:
+                continue
+            parcial.__cubo[(herramienta, celda)] = n
+            tipo, genero, respuesta, _ = _VALORES_CELDA[celda]
+            parcial.__total += n
+            parcial.__por_tipo[_TIPOS[tipo]] += n
+            parcial.__por_genero[_GENEROS[genero]] += n
+            parcial.__por_respuesta[_RESPUESTAS[respuesta]] += n
+            parcial.__por_herramienta[herramienta] = parcial.__por_herramienta.get(herramienta, 0) + n
+        parcial.__suma_edades = suma_edades
+        return parcial
+    
+    @property
+    def total(self) -> int:
+        return self.__total
+    
+    @property
+    def suma_edades(self) -> int:
+        return self.__suma_edades
+    
+    @property
+    def por_tipo(self) -> Dict[TipoBeneficiario, int]:
+        return dict(self.__por_tipo)
+    
+    @property
+    def por_genero(self) -> Dict[Genero, int]:
+        return dict(self.__por_genero)
+    
+    @property
+    def por_respuesta(self) -> Dict[RespuestaTratamiento, int]:
+        return dict(self.__por_respuesta)
+    
+    @property
+    def por_herramienta(self) -> Dict[str, int]:
+        return dict(self.__por_herramienta)
+    
+    @property
+    def cubo(self) -> Dict[Tuple[str, int], int]:
+        return dict(self.__cubo)
+    
+    def __sumar_celda(self, clave: Tuple[str, int], cantidad: int):
+        conteo = self.__cubo.get(clave, 0) + cantidad
+        if conteo:
+            self.__cubo[clave] = conteo
+        else:
+            del self.__cubo[clave]
+    
+    def agregar_valores(self, tipo: TipoBeneficiario, genero: Genero, edad: int,
+                        respuesta: RespuestaTratamiento, herramienta: str, signo: int = 1):
+        """Suma (signo=1) o resta (signo=-1) un beneficiario"""
+        self.__total += signo
+        self.__suma_edades += signo * edad
+        self.__por_tipo[tipo] += signo
+        self.__por_genero[genero] += signo
+        self.__por_respuesta[respuesta] += signo
+        conteo = self.__por_herramienta.get(herramienta, 0) + signo
+        if conteo:
+            self.__por_herramienta[herramienta] = conteo
+        else:
+            del self.__por_herramienta[herramienta]
+        clave = (herramienta, codigo_celda(_CODIGO_TIPO[tipo], _CODIGO_GENERO[genero],
+                                           _CODIGO_RESPUESTA[respuesta], franja_edad(edad)))
+        conteo = self.__cubo.get(clave, 0) + signo
+        if conteo:
+            self.__cubo[clave] = conteo
+        else:
+            del self.__cubo[clave]
+    
+    def agregar(self, beneficiario: Beneficiario, signo: int = 1):
+        """Suma (signo=1) o resta (signo=-1) un beneficiario"""
+        self.agregar_valores(beneficiario.tipo, beneficiario.genero, beneficiario.edad,
+                             beneficiario.respuesta_tratamiento,
+                             beneficiario.herramienta_tratamiento, signo)
+    
+    def mover_respuesta(self, beneficiario: Beneficiario, anterior: RespuestaTratamiento,
+                        nueva: RespuestaTratamiento):
+        """Registra que un beneficiario cambió de respuesta al tratamiento"""
+        self.__por_respuesta[anterior] -= 1
+        self.__por_respuesta[nueva] += 1
+        tipo = _CODIGO_TIPO[beneficiario.tipo]
+        genero = _CODIGO_GENERO[beneficiario.genero]
+        franja = franja_edad(beneficiario.edad)
+        herramienta = beneficiario.herramienta_tratamiento
+        self.__sumar_celda(
+            (herramienta, codigo_celda(tipo, genero, _CODIGO_RESPUESTA[anterior], franja)), -1)
+        self.__sumar_celda(
+            (herramienta, codigo_celda(tipo, genero, _CODIGO_RESPUESTA[nueva], franja)), 1)
+    
+    def combinar(self, otro: "EstadisticasParciales") -> "EstadisticasParciales":
+        """Suma otro parcial a este y retorna este mismo parcial"""
+        self.__total += otro.total
+        self.__suma_edades += otro.suma_edades
+        for tipo, n in otro.por_tipo.items():
+            self.__por_tipo[tipo] += n
+        for genero, n in otro.por_genero.items():
+            self.__por_genero[genero] += n
+        for respuesta, n in otro.por_respuesta.items():
+            self.__por_respuesta[respuesta] += n
+        for herramienta, n in otro.por_herramienta.items():
+            self.__por_herramienta[herramienta] = self.__por_herramienta.get(herramienta, 0) + n
+        for clave, n in otro.__cubo.items():
+            self.__sumar_celda(clave, n)
+        return self
+    
+    def copiar(self) -> "EstadisticasParciales":
+        return EstadisticasParciales().combinar(self)
+    
+    def a_estadisticas(self) -> Dict:
+        """Estadísticas con el formato de Institucion.obtener_estadisticas"""
+        if self.__total == 0:
+            return {"total": 0}
+        return {
+            "total": self.__total,
+            "por_tipo": {t.value: n for t, n in self.__por_tipo.items() if n},
+            "por_genero": {g.value: n for g, n in self.__por_genero.items() if n},
+            "por_respuesta": {r.value: n for r, n in self.__por_respuesta.items() if n},
+            "edad_promedio": self.__suma_edades / self.__total
+        }
+    
+    @instrumentado
+    def tablas_cruzadas(self, combinaciones=TABLAS_CRUZADAS) -> Dict[str, Dict]:
+        """Tablas de contingencia de las combinaciones de DIMENSIONES pedidas,
+        por ejemplo [("herramienta", "respuesta"), ("tipo",)].
+        
+        No se recorren beneficiarios: la tabla más grande sale de sumar las
+        celdas del cubo y cada una de las demás de la tabla ya armada más
+        chica que la contiene, así que pedir más tablas cuesta poco más que
+        pedir una. Cada tabla se nombra con sus dimensiones unidas por "_x_"
+        y es un diccionario anidado en ese orden que omite los ceros:
+            {"herramienta_x_respuesta": {"Pintura": {"excelente": 3, "buena": 1}}}
+        """
+        combinaciones = [tuple(combinacion) for combinacion in combinaciones]
+        for combinacion in combinaciones:
+            invalidas = [d for d in combinacion if d not in DIMENSIONES]
+            if invalidas or not combinacion:
+                raise ValueError(f"Dimensión no válida: '{', '.join(invalidas)}' "
+                                 f"(opciones: {', '.join(DIMENSIONES)})")
+        herramientas = sorted(self.__por_herramienta)
+        codigo_herramienta = {h: i for i, h in enumerate(herramientas)}
+        # Conteos por tupla de códigos, en el orden de las dimensiones de la tabla
+        armadas: Dict[Tuple[str, ...], Dict[Tuple, int]] = {
+            DIMENSIONES: {_VALORES_CELDA[celda] + (codigo_herramienta[herramienta],): n
+                          for (herramienta, celda), n in self.__cubo.items()}}
+        for combinacion in sorted(set(combinaciones), key=len, reverse=True):
+            if combinacion in armadas:
+                continue
+            origen = min((dimensiones for dimensiones in armadas if set(combinacion) <= set(dimensiones)),
+                         key=lambda dimensiones: len(armadas[dimensiones]))
+            indices = [origen.index(d) for d in combinacion]
+            if len(indices) > 1:
+                extraer = operator.itemgetter(*indices)
+            else:
+                extraer = lambda valores, i=indices[0]: (valores[i],)
+            conteo: Dict[Tuple, int] = {}
+            for valores, n in armadas[origen].items():
+                clave = extraer(valores)
+                conteo[clave] = conteo.get(clave, 0) + n
+            armadas[combinacion] = conteo
+        
+        etiquetas = {"tipo": [t.value for t in _TIPOS], "genero": [g.value for g in _GENEROS],
+                     "respuesta": [r.value for r in _RESPUESTAS], "franja_edad": FRANJAS_EDAD,
+                     "herramienta": herramientas}
+        tablas = {}
+        for combinacion in combinaciones:
+            conteo = armadas[combinacion]
+            tabla: Dict = {}
+            # Las claves son códigos: ordenarlas deja cada nivel en el orden de su dimensión
+            for clave in sorted(conteo):
+                nivel = tabla
+                for dimension, codigo in zip(combinacion[:-1], clave[:-1]):
+                    nivel = nivel.setdefault(etiquetas[dimension][codigo], {})
+                nivel[etiquetas[combinacion[-1]][clave[-1]]] = conteo[clave]
+            tablas["_x_".join(combinacion)] = tabla
+        return tablas
+
+# Períodos de las series temporales
+PERIODOS = ("dia", "semana", "mes")
+
+def inicio_periodo(fecha, periodo: str) -> date:
+    """Primer día del período que contiene a `fecha` (las semanas empiezan el lunes)"""
+    if isinstance(fecha, datetime):
+        fecha = fecha.date()
+    if periodo == "dia":
+        return fecha
+    if periodo == "semana":
+        return fecha - timedelta(days=fecha.weekday())
+    if periodo == "mes":
+        return fecha.replace(day=1)
+    raise ValueError(f"Período no válido: '{periodo}' (opciones: {', '.join(PERIODOS)})")
+
+def siguiente_periodo(inicio: date, periodo: str) -> date:
+    """Primer día del período siguiente"""
+    if periodo == "dia":
+        return inicio + timedelta(days=1)
+    if periodo == "semana":
+        return inicio + timedelta(days=7)
+    if inicio.month == 12:
+        return date(inicio.year + 1, 1, 1)
+    return date(inicio.year, inicio.month + 1, 1)
+
+@functools.lru_cache(maxsize=4096)
+def _inicios_periodos(dia: date) -> Tuple[date, date, date]:
+    """Inicio del día, la semana y el mes de `dia` (muchos registros comparten día)"""
+    return dia, dia - timedelta(days=dia.weekday()), dia.replace(day=1)
+
+class SeriesTemporales:
+    """Ingresos y respuestas al tratamiento por período de registro.
+    
+    Cada beneficiario cuenta en el día, la semana y el mes de su
+    fecha_registro, con su respuesta actual: si la respuesta cambia, el
+    conteo se mueve dentro de esos mismos períodos. Así, la respuesta de un
+    período describe a los beneficiarios que ingresaron en él.
+    """
+    
+    def __init__(self):
+        # periodo -> {inicio del período: {respuesta: cantidad}}, en el orden de PERIODOS
+        self.__cubetas: Dict[str, Dict[date, Dict[RespuestaTratamiento, int]]] = {
+            periodo: {} for periodo in PERIODOS}
+    
+    def agregar(self, fecha_registro: datetime, respuesta: RespuestaTratamiento, cantidad: int = 1):
+        """Suma (cantidad > 0) o resta (cantidad < 0) ingresos con esa respuesta"""
+        dia = fecha_registro.date() if isinstance(fecha_registro, datetime) else fecha_registro
+        for cubetas, inicio in zip(self.__cubetas.values(), _inicios_periodos(dia)):
+            cubeta = cubetas.get(inicio)
+            if cubeta is None:
+                cubeta = cubetas[inicio] = {}
+            conteo = cubeta.get(respuesta, 0) + cantidad
+            if conteo:
+                cubeta[respuesta] = conteo
+            else:
+                del cubeta[respuesta]
+                if not cubeta:
+                    del cubetas[inicio]
+    
+    def mover_respuesta(self, fecha_registro: datetime, anterior: RespuestaTratamiento,
+                        nueva: RespuestaTratamiento):
+        """Registra que un beneficiario cambió de respuesta al tratamiento"""
+        self.agregar(fecha_registro, anterior, -1)
+        self.agregar(fecha_registro, nueva)
+    
+    def cubetas(self, periodo: str) -> Dict[date, Dict[RespuestaTratamiento, int]]:
+        """Conteos por inicio de período (sin copiar: no deben modificarse)"""
+        if periodo not in self.__cubetas:
+            raise ValueError(f"Período no válido: '{periodo}' (opciones: {', '.join(PERIODOS)})")
+        return self.__cubetas[periodo]
+    
+    @staticmethod
+    def consultar_varias(series: List["SeriesTemporales"], periodo: str = "mes",
+                         desde=None, hasta=None, completar: bool = True) -> List[Dict]:
+        """Suma las series período por período entre `desde` y `hasta` (incluidos).
+        
+        Retorna una lista ordenada de {"periodo", "ingresos", "por_respuesta"}.
+        Con completar=True los períodos sin ingresos aparecen con ceros.
+        """
+        inicio = inicio_periodo(desde, periodo) if desde is not None else None
+        fin = inicio_periodo(hasta, periodo) if hasta is not None else None
+        suma: Dict[date, Dict[RespuestaTratamiento, int]] = {}
+        for serie in series:
+            for clave, cubeta in serie.cubetas(periodo).items():
+                if (inicio is not None and clave < inicio) or (fin is not None and clave > fin):
+                    continue
+                acumulado = suma.setdefault(clave, {})
+                for respuesta, cantidad in cubeta.items():
+                    acumulado[respuesta] = acumulado.get(respuesta, 0) + cantidad
+        
+        claves = sorted(suma)
+        if completar and (claves or (inicio is not None and fin is not None)):
+            actual = inicio if inicio is not None else claves[0]
+            ultimo = fin if fin is not None else claves[-1]
+            claves = []
+            while actual <= ultimo:
+                claves.append(actual)
+                actual = siguiente_periodo(actual, periodo)
+        
+        resultado = []
+        for clave in claves:
+            cubeta = suma.get(clave, {})
+            resultado.append({
+                "periodo": clave.isoformat(),
+                "ingresos": sum(cubeta.values()),
+                "por_respuesta": {r.value: cubeta.get(r, 0) for r in RespuestaTratamiento}
+            })
+        return resultado
+    
+    def consultar(self, periodo: str = "mes", desde=None, hasta=None,
+                  completar: bool = True) -> List[Dict]:
+        """Ingresos y respuestas por período (ver consultar_varias)"""
+        return SeriesTemporales.consultar_varias([self], periodo, desde, hasta, completar)
+
 class Institucion:
     """Clase que representa una institución participante"""
     
+    # Con el modo depuración activo, cada consulta de estadísticas se compara
+    # contra un recálculo completo de los beneficiarios
+    MODO_DEPURACION = os.environ.get("SALUD_DEPURACION") == "1"
+    
+    # GestorProyectos guarda en su índice global la ubicación de cada
+    # beneficiario; las instituciones que buscan por nombre en sus propios
+    # datos sin crear los objetos (InstitucionMapeada) lo desactivan
+    INDICE_EN_GESTOR = True
+    
     def __init__(self, nombre: str, direccion: str, telefono: str):
         self.__nombre = nombre
         self.__direccion = direccion
         self.__telefono = telefono
-        self.__beneficiarios: List[Beneficiario] = []
+        # Beneficiarios en orden de registro (clave: número de registro)
+        self.__beneficiarios: Dict[int, Beneficiario] = {}
+        # Índice nombre -> números de registro, para búsquedas en O(1)
+        self.__indice_nombres: Dict[str, List[int]] = {}
+        self.__secuencia = 0
+        self.__observadores: List[Callable] = []
+        # Agregados que se actualizan en cada alta, baja o cambio de respuesta
+        self.__agregados = EstadisticasParciales()
+        # Ingresos y respuestas por día, semana y mes de registro
+        self.__series = SeriesTemporales()
+        # Resúmenes aproximados (resumenes_aproximados.py); se crean con la
+        # primera consulta
+        self.__seguimiento_aproximado = None
+        # Versión de los datos: aumenta con cada alta, baja o cambio de respuesta
+        self.__uid = next(_identificadores)
+        self.__version = 0
     
     @property
     def nombre(self):
         return self.__nombre
     
+    @property
+    def direccion(self):
+        return self.__direccion
+    
+    @property
+    def telefono(self):
+        return self.__telefono
+    
     @property
     def beneficiarios(self):
-        return self.__beneficiarios.copy()
+        return list(self.__beneficiarios.values())
+    
+    def iterar_beneficiarios(self):
+        """Recorre los beneficiarios sin copiar la lista"""
+        return iter(self.__beneficiarios.values())
+    
+    @property
+    def total_beneficiarios(self) -> int:
+        return len(self.__beneficiarios)
+    
+    def agregar_observador(self, observador: Callable):
+        """Registra una función que se llama con (evento, institucion, beneficiario)
+        cada vez que se agrega o se remueve un beneficiario, o cambia su respuesta"""
+        if observador not in self.__observadores:
+            self.__observadores.append(observador)
+    
+    def remover_observador(self, observador: Callable):
+        """Deja de notificar a un observador registrado"""
+        if observador in self.__observadores:
+            self.__observadores.remove(observador)
+    
+    @property
+    def version(self) -> int:
+        return self.__version
+    
+    def clave_version(self) -> Tuple:
+        """Identifica el estado actual de la institución para la caché"""
+        return (self.__uid, self.__version)
+    
+    def _notificar(self, evento: str, beneficiario: Beneficiario):
+        self.__version += 1
+        for observador in list(self.__observadores):
+            observador(evento, self, beneficiario)
     
     def agregar_beneficiario(self, beneficiario: Beneficiario):
         """Agrega un beneficiario de los 3 grupos a la institución"""
-        self.__beneficiarios.append(beneficiario)
-        print(f"Beneficiario {beneficiario.nombre} agregado a {self.__nombre}")
+        self.__secuencia += 1
+        self.__beneficiarios[self.__secuencia] = beneficiario
+        self.__indice_nombres.setdefault(beneficiario.nombre, []).append(self.__secuencia)
+        self.__agregados.agregar(beneficiario)
+        self.__series.agregar(beneficiario.fecha_registro, beneficiario.respuesta_tratamiento)
+        beneficiario.agregar_observador(self.__actualizar_respuesta)
+        self._notificar("agregado", beneficiario)
+        if BUS_EVENTOS.escuchado("beneficiario_agregado"):
+            BUS_EVENTOS.publicar("beneficiario_agregado", beneficiario=beneficiario.nombre,
+                                 institucion=self.__nombre)
+    
+    def agregar_beneficiarios_lote(self, beneficiarios) -> int:
+        """Agrega varios beneficiarios. Retorna la cantidad agregada"""
+        cantidad = 0
+        for beneficiario in beneficiarios:
+            self.agregar_beneficiario(beneficiario)
+            cantidad += 1
+        return cantidad
     
     def remover_beneficiario(self, nombre: str) -> bool:
         """Remueve un beneficiario por nombre"""
-        for i, beneficiario in enumerate(self.__beneficiarios):
-            if beneficiario.nombre == nombre:
-                self.__beneficiarios.pop(i)
-                print(f"Beneficiario {nombre} removido de {self.__nombre}")
-                return True
-        print(f"Beneficiario {nombre} no encontrado en {self.__nombre}")
+        registros = self.__indice_nombres.get(nombre)
+        if registros:
+            beneficiario = self.__beneficiarios.pop(registros.pop(0))
+            if not registros:
+                del self.__indice_nombres[nombre]
+            self.__agregados.agregar(beneficiario, -1)
+            self.__series.agregar(beneficiario.fecha_registro, beneficiario.respuesta_tratamiento, -1)
+            beneficiario.remover_observador(self.__actualizar_respuesta)
+            self._notificar("removido", beneficiario)
+            BUS_EVENTOS.publicar("beneficiario_removido", beneficiario=nombre, institucion=self.__nombre)
+            return True
+        BUS_EVENTOS.publicar("beneficiario_no_encontrado", beneficiario=nombre, institucion=self.__nombre)
         return False
     
     def buscar_beneficiario(self, nombre: str) -> Optional[Beneficiario]:
         """Buscar beneficiario por su nombre"""
-        for beneficiario in self.__beneficiarios:
-            if beneficiario.nombre == nombre:
-                return beneficiario
+        registros = self.__indice_nombres.get(nombre)
+        if registros:
+            return self.__beneficiarios[registros[0]]
         return None
     
+    def buscar_beneficiarios(self, nombre: str) -> List[Beneficiario]:
+        """Todos los beneficiarios con ese nombre, en orden de registro"""
+        return [self.__beneficiarios[numero] for numero in self.__indice_nombres.get(nombre, [])]
+    
+    def iterar_nombres(self):
+        """Recorre los nombres distintos de los beneficiarios"""
+        return iter(self.__indice_nombres)
+    
     def consultar_beneficiario(self, nombre: str):
         """Consulta y muestra información de un beneficiario"""
         beneficiario = self.buscar_beneficiario(nombre)
@@ -132,8 +703,70 @@ class Institucion:
         else:
             print(f"\nEl beneficiario {nombre} no se encuentra registrado en {self.__nombre}")
     
+    def __actualizar_respuesta(self, beneficiario: Beneficiario, anterior: RespuestaTratamiento,
+                               nueva: RespuestaTratamiento):
+        """Mueve el conteo de respuestas cuando un beneficiario cambia de respuesta"""
+        self.__agregados.mover_respuesta(beneficiario, anterior, nueva)
+        self.__series.mover_respuesta(beneficiario.fecha_registro, anterior, nueva)
+        self._notificar("respuesta_actualizada", beneficiario)
+    
+    def _calcular_estadisticas(self) -> Dict:
+        """Estadísticas desde los agregados. Cada tipo de institución lo
+        redefine según cómo guarda sus beneficiarios; obtener_estadisticas
+        las memoriza y, en modo depuración, las verifica"""
+        return self.__agregados.a_estadisticas()
+    
+    @memorizar_por_version
+    def _estadisticas_memorizadas(self) -> Dict:
+        return self._calcular_estadisticas()
+    
+    @instrumentado
     def obtener_estadisticas(self) -> Dict:
         """Obtener datos/estadísticas de beneficiarios en la institución"""
+        stats = self._estadisticas_memorizadas()
+        
+        # Fuera de la memorización, para verificar también lo que sale de la caché
+        if Institucion.MODO_DEPURACION:
+            recuento = self.recalcular_estadisticas()
+            if stats != recuento:
+                raise AssertionError(
+                    f"Estadísticas desactualizadas en {self.__nombre}: {stats} != {recuento}")
+        return stats
+    
+    def contar_herramientas(self) -> Dict[str, int]:
+        """Cuenta los beneficiarios por herramienta de tratamiento"""
+        return self.__agregados.por_herramienta
+    
+    def obtener_parcial(self) -> EstadisticasParciales:
+        """Copia del agregado parcial de la institución"""
+        return self.__agregados.copiar()
+    
+    def obtener_series(self) -> SeriesTemporales:
+        """Series de ingresos y respuestas por período (no deben modificarse)"""
+        return self.__series
+    
+    def consultar_series(self, periodo: str = "mes", desde=None, hasta=None) -> List[Dict]:
+        """Ingresos y respuestas por día, semana o mes de registro, sin recorrer
+        los beneficiarios"""
+        return self.obtener_series().consultar(periodo, desde, hasta)
+    
+    def obtener_resumen_aproximado(self):
+        """Copia del ResumenAproximado de la institución (cuantiles de edad,
+        distintos y más frecuentes). La primera llamada recorre los
+        beneficiarios; desde entonces se mantiene con cada alta y baja"""
+        if self.__seguimiento_aproximado is None:
+            from resumenes_aproximados import SeguimientoAproximado
+            self.__seguimiento_aproximado = SeguimientoAproximado(self)
+        return self.__seguimiento_aproximado.obtener()
+    
+    def iterar_valores(self):
+        """Genera (tipo, genero, edad, respuesta, herramienta) por beneficiario,
+        el formato que usa EstadisticasParciales.desde_valores"""
+        for b in self.__beneficiarios.values():
+            yield b.tipo, b.genero, b.edad, b.respuesta_tratamiento, b.herramienta_tratamiento
+    
+    def recalcular_estadisticas(self) -> Dict:
+        """Calcula las estadísticas recorriendo todos los beneficiarios"""
         total = len(self.__beneficiarios)
         if total == 0:
             return {"total": 0}
@@ -143,10 +776,10 @@ class Institucion:
             "por_tipo": {},
             "por_genero": {},
             "por_respuesta": {},
-            "edad_promedio": sum(b.edad for b in self.__beneficiarios) / total
+            "edad_promedio": sum(b.edad for b in self.__beneficiarios.values()) / total
         }
         
-        for beneficiario in self.__beneficiarios:
+        for beneficiario in self.__beneficiarios.values():
             # Estadísticas por tipo
             tipo = beneficiario.tipo.value
             stats["por_tipo"][tipo] = stats["por_tipo"].get(tipo, 0) + 1
@@ -167,11 +800,17 @@ class Institucion:
 class Proyecto(ABC):
     """Clase base para proyectos"""
     
+    # Nombre del tipo de proyecto en reportes y archivos de datos
+    TIPO_PROYECTO = ""
+    
     def __init__(self, nombre: str, descripcion: str, fecha_inicio: datetime):
         self.__nombre = nombre
         self.__descripcion = descripcion
         self.__fecha_inicio = fecha_inicio
         self.__instituciones: List[Institucion] = []
+        self.__observadores: List[Callable] = []
+        self.__uid = next(_identificadores)
+        self.__version = 0
     
     @property
     def nombre(self):
@@ -181,14 +820,42 @@ class Proyecto(ABC):
     def descripcion(self):
         return self.__descripcion
     
+    @property
+    def fecha_inicio(self):
+        return self.__fecha_inicio
+    
     @property
     def instituciones(self):
         return self.__instituciones.copy()
     
+    @property
+    def version(self) -> int:
+        """Aumenta cada vez que se agrega una institución al proyecto"""
+        return self.__version
+    
+    def clave_version(self) -> Tuple:
+        """Identifica el estado del proyecto y de sus instituciones para la caché"""
+        return (self.__uid, self.__version,
+                tuple(institucion.clave_version() for institucion in self.__instituciones))
+    
+    def agregar_observador(self, observador: Callable):
+        """Registra una función que se llama con (proyecto, institucion)
+        cada vez que se agrega una institución al proyecto"""
+        if observador not in self.__observadores:
+            self.__observadores.append(observador)
+    
+    def remover_observador(self, observador: Callable):
+        """Deja de notificar a un observador registrado"""
+        if observador in self.__observadores:
+            self.__observadores.remove(observador)
+    
     def agregar_institucion(self, institucion: Institucion):
         """Agrega una institución al proyecto"""
         self.__instituciones.append(institucion)
-        print(f"Institución {institucion.nombre} agregada al proyecto {self.__nombre}")
+        self.__version += 1
+        for observador in list(self.__observadores):
+            observador(self, institucion)
+        BUS_EVENTOS.publicar("institucion_agregada", institucion=institucion.nombre, proyecto=self.__nombre)
     
     def buscar_institucion(self, nombre: str) -> Optional[Institucion]:
         """Busca una institución por nombre"""
@@ -199,7 +866,7 @@ class Proyecto(ABC):
     
     def obtener_total_beneficiarios(self) -> int:
         """Obtiene el total de beneficiarios en el proyecto"""
-        return sum(len(inst.beneficiarios) for inst in self.__instituciones)
+        return sum(inst.total_beneficiarios for inst in self.__instituciones)
     
     @abstractmethod
     def obtener_herramientas_especificas(self) -> List[str]:
@@ -211,6 +878,106 @@ class Proyecto(ABC):
         """Método para generar reportes específicos del tipo de proyecto"""
         pass
     
+    @abstractmethod
+    def obtener_datos_especializados(self, conteo_herramientas: Optional[Dict[str, int]] = None) -> Dict:
+        """Campos propios del tipo de proyecto que completan el reporte.
+        Si no se entrega el conteo de herramientas, se calcula"""
+        pass
+    
+    def contar_herramientas(self) -> Dict[str, int]:
+        """Cuenta los beneficiarios por herramienta en todas las instituciones"""
+        conteo = {}
+        for institucion in self.__instituciones:
+            for herramienta, cantidad in institucion.contar_herramientas().items():
+                conteo[herramienta] = conteo.get(herramienta, 0) + cantidad
+        return self.ordenar_herramientas(conteo)
+    
+    def ordenar_herramientas(self, conteo: Dict[str, int]) -> Dict[str, int]:
+        """Ordena un conteo de herramientas como en obtener_herramientas_especificas
+        (las que no estén en esa lista van al final, en orden alfabético), para
+        que el reporte no dependa del orden en que se registraron los datos"""
+        orden = {h: i for i, h in enumerate(self.obtener_herramientas_especificas())}
+        claves = sorted(conteo, key=lambda h: (orden.get(h, len(orden)), h))
+        return {h: conteo[h] for h in claves}
+    
+    def obtener_parciales(self) -> List[Tuple[str, EstadisticasParciales]]:
+        """Agregados parciales de cada institución del proyecto"""
+        return [(institucion.nombre, institucion.obtener_parcial()) for institucion in self.__instituciones]
+    
+    @instrumentado
+    def reporte_desde_parciales(self, parciales: List[Tuple[str, EstadisticasParciales]]) -> Dict:
+        """Arma el reporte especializado en una sola pasada sobre los parciales
+        de cada institución (en el orden de las instituciones del proyecto)"""
+        combinado = EstadisticasParciales()
+        por_institucion = {}
+        for nombre, parcial in parciales:
+            por_institucion[nombre] = parcial.a_estadisticas()
+            combinado.combinar(parcial)
+        
+        reporte = {
+            "nombre_proyecto": self.__nombre,
+            "total_instituciones": len(parciales),
+            "total_beneficiarios": combinado.total,
+            "estadisticas_por_institucion": por_institucion
+        }
+        reporte.update(self.obtener_datos_especializados(
+            self.ordenar_herramientas(combinado.por_herramienta)))
+        reporte["tablas_cruzadas"] = combinado.tablas_cruzadas()
+        return reporte
+    
+    @instrumentado
+    def obtener_tablas_cruzadas(self, combinaciones=TABLAS_CRUZADAS) -> Dict[str, Dict]:
+        """Tablas de contingencia del proyecto (ver EstadisticasParciales.tablas_cruzadas),
+        por ejemplo:
+            proyecto.obtener_tablas_cruzadas([("herramienta", "respuesta"), ("tipo", "franja_edad")])
+        """
+        combinaciones = tuple(tuple(combinacion) for combinacion in combinaciones)
+        
+        def calcular():
+            combinado = EstadisticasParciales()
+            for institucion in self.__instituciones:
+                combinado.combinar(institucion.obtener_parcial())
+            return combinado.tablas_cruzadas(combinaciones)
+        return CACHE_REPORTES.obtener(
+            ("Proyecto.obtener_tablas_cruzadas", combinaciones, self.clave_version()), calcular)
+    
+    def obtener_resumen_aproximado(self):
+        """ResumenAproximado del proyecto, combinando los de sus instituciones"""
+        from resumenes_aproximados import ResumenAproximado
+        resumen = ResumenAproximado()
+        for institucion in self.__instituciones:
+            resumen.combinar(institucion.obtener_resumen_aproximado())
+        return resumen
+    
+    @instrumentado
+    def consultar_series(self, periodo: str = "mes", desde=None, hasta=None) -> List[Dict]:
+        """Ingresos y respuestas de todas las instituciones por día, semana o mes
+        de registro. Por defecto desde la fecha de inicio del proyecto, por ejemplo:
+            proyecto.consultar_series("mes")  # tendencia mensual desde el inicio
+        """
+        if desde is None:
+            desde = self.__fecha_inicio
+        return SeriesTemporales.consultar_varias(
+            [institucion.obtener_series() for institucion in self.__instituciones],
+            periodo, desde, hasta)
+    
+    def iterar_estadisticas_por_institucion(self):
+        """Genera pares (nombre institución, estadísticas) uno a la vez"""
+        for institucion in self.__instituciones:
+            yield institucion.nombre, institucion.obtener_estadisticas()
+    
+    def iterar_reporte_especializado(self):
+        """Genera los pares (clave, valor) del reporte especializado sin armarlo
+        completo en memoria; las estadísticas por institución se entregan como
+        un _FlujoObjeto"""
+        yield "nombre_proyecto", self.__nombre
+        yield "total_instituciones", len(self.__instituciones)
+        yield "total_beneficiarios", self.obtener_total_beneficiarios()
+        yield "estadisticas_por_institucion", _FlujoObjeto(self.iterar_estadisticas_por_institucion())
+        yield from self.obtener_datos_especializados().items()
+        yield "tablas_cruzadas", self.obtener_tablas_cruzadas()
+    
+    @instrumentado
     def obtener_estadisticas_generales(self) -> Dict:
         """Obtiene estadísticas generales del proyecto"""
         stats = {
@@ -231,6 +998,8 @@ class Proyecto(ABC):
 class ProyectoMusicoterapia(Proyecto):
     """Clase específica para proyectos de musicoterapia"""
     
+    TIPO_PROYECTO = "Musicoterapia"
+    
     def __init__(self, nombre: str, descripcion: str, fecha_inicio: datetime):
         super().__init__(nombre, descripcion, fecha_inicio)
         self.__herramientas_disponibles = ["Meditación sonora", "Acompañamiento musical", "Taller"]
@@ -239,25 +1008,28 @@ class ProyectoMusicoterapia(Proyecto):
         """Retorna las herramientas específicas de musicoterapia"""
         return self.__herramientas_disponibles.copy()
     
+    @instrumentado
+    @memorizar_por_version
     def generar_reporte_especializado(self) -> Dict:
         """Genera reporte específico para musicoterapia"""
-        reporte = self.obtener_estadisticas_generales()
-        reporte["tipo_proyecto"] = "Musicoterapia"
-        reporte["herramientas_disponibles"] = self.__herramientas_disponibles
-        
+        return self.reporte_desde_parciales(self.obtener_parciales())
+    
+    def obtener_datos_especializados(self, conteo_herramientas: Optional[Dict[str, int]] = None) -> Dict:
+        """Campos del reporte propios de musicoterapia"""
         # Análisis específico de musicoterapia
-        abordajes_usados = {}
-        for institucion in self.instituciones:
-            for beneficiario in institucion.beneficiarios:
-                abordaje = beneficiario.herramienta_tratamiento
-                abordajes_usados[abordaje] = abordajes_usados.get(abordaje, 0) + 1
+        abordajes_usados = conteo_herramientas if conteo_herramientas is not None else self.contar_herramientas()
         
-        reporte["abordajes_mas_usados"] = abordajes_usados
-        return reporte
+        return {
+            "tipo_proyecto": self.TIPO_PROYECTO,
+            "herramientas_disponibles": self.__herramientas_disponibles,
+            "abordajes_mas_usados": abordajes_usados
+        }
 
 class ProyectoArteterapia(Proyecto):
     """Clase específica para proyectos de arteterapia"""
     
+    TIPO_PROYECTO = "Arteterapia"
+    
     def __init__(self, nombre: str, descripcion: str, fecha_inicio: datetime):
         super().__init__(nombre, descripcion, fecha_inicio)
         self.__tecnicas_disponibles = ["Pintura", "Poesía", "Lectura", "Artesanías", "Otro"]
@@ -266,32 +1038,254 @@ class ProyectoArteterapia(Proyecto):
         """Retorna las herramientas específicas de arteterapia"""
         return self.__tecnicas_disponibles.copy()
     
+    @instrumentado
+    @memorizar_por_version
     def generar_reporte_especializado(self) -> Dict:
         """Genera reporte específico para arteterapia"""
-        reporte = self.obtener_estadisticas_generales()
-        reporte["tipo_proyecto"] = "Arteterapia"
-        reporte["tecnicas_disponibles"] = self.__tecnicas_disponibles
-        
+        return self.reporte_desde_parciales(self.obtener_parciales())
+    
+    def obtener_datos_especializados(self, conteo_herramientas: Optional[Dict[str, int]] = None) -> Dict:
+        """Campos del reporte propios de arteterapia"""
         # Análisis específico de arteterapia
-        tecnicas_usadas = {}
-        for institucion in self.instituciones:
-            for beneficiario in institucion.beneficiarios:
-                tecnica = beneficiario.herramienta_tratamiento
-                tecnicas_usadas[tecnica] = tecnicas_usadas.get(tecnica, 0) + 1
+        tecnicas_usadas = conteo_herramientas if conteo_herramientas is not None else self.contar_herramientas()
         
-        reporte["tecnicas_mas_usadas"] = tecnicas_usadas
-        return reporte
+        return {
+            "tipo_proyecto": self.TIPO_PROYECTO,
+            "tecnicas_disponibles": self.__tecnicas_disponibles,
+            "tecnicas_mas_usadas": tecnicas_usadas
+        }
+
+# Clases de proyecto por su TIPO_PROYECTO, para reconstruirlos desde archivos
+TIPOS_PROYECTO = {clase.TIPO_PROYECTO: clase for clase in (ProyectoMusicoterapia, ProyectoArteterapia)}
+
+class _FlujoObjeto:
+    """Objeto JSON cuyos pares (clave, valor) se generan bajo demanda"""
+    
+    def __init__(self, pares):
+        self.elementos = pares
+
+class _FlujoLista:
+    """Lista JSON cuyos elementos se generan bajo demanda"""
+    
+    def __init__(self, elementos):
+        self.elementos = elementos
+
+def _fragmentos_json(valor, sangria: Optional[int], nivel: int = 0):
+    """Genera el texto JSON de un valor por fragmentos. Produce la misma salida
+    que json.dump (con indent=sangria), pero los _FlujoObjeto y _FlujoLista se
+    escriben a medida que se consumen"""
+    if not isinstance(valor, (_FlujoObjeto, _FlujoLista)):
+        separadores = (",", ": ") if sangria is not None else (",", ":")
+        texto = json.dumps(valor, indent=sangria, separators=separadores,
+                           ensure_ascii=False, default=str)
+        if sangria:
+            texto = texto.replace("\n", "\n" + " " * (sangria * nivel))
+        yield texto
+        return
+    
+    es_objeto = isinstance(valor, _FlujoObjeto)
+    if sangria is None:
+        salto, salto_cierre, separador_clave = "", "", ":"
+    else:
+        salto = "\n" + " " * (sangria * (nivel + 1))
+        salto_cierre = "\n" + " " * (sangria * nivel)
+        separador_clave = ": "
+    
+    yield "{" if es_objeto else "["
+    vacio = True
+    for elemento in valor.elementos:
+        yield salto if vacio else "," + salto
+        if es_objeto:
+            clave, elemento = elemento
+            yield json.dumps(clave, ensure_ascii=False) + separador_clave
+        yield from _fragmentos_json(elemento, sangria, nivel + 1)
+        vacio = False
+    if not vacio:
+        yield salto_cierre
+    yield "}" if es_objeto else "]"
+
+def _modo_destino(archivo: str) -> int:
+    """Permisos que debe tener el archivo escrito: los del destino si ya
+    existe, o los de un archivo nuevo según la umask del proceso"""
+    try:
+        return os.stat(archivo).st_mode & 0o7777
+    except FileNotFoundError:
+        pass
+    # os.umask solo se puede leer cambiándola; se restaura de inmediato
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+@contextmanager
+def escritura_atomica(archivo: str, comprimir: bool = False):
+    """Abre un archivo temporal de texto junto a `archivo` y, si el bloque
+    termina sin errores, lo sincroniza a disco y lo renombra sobre el destino
+    con los permisos del destino (mkstemp crea el temporal con 0600). En POSIX
+    también se sincroniza el directorio, para que el renombre sobreviva a un
+    corte de energía. Con comprimir=True el contenido se escribe en formato gzip"""
+    directorio = os.path.dirname(os.path.abspath(archivo))
+    descriptor, temporal = tempfile.mkstemp(
+        dir=directorio, prefix=f".{os.path.basename(archivo)}.", suffix=".tmp")
+    try:
+        with open(descriptor, "wb") as binario:
+            salida = gzip.GzipFile(fileobj=binario, mode="wb") if comprimir else binario
+            texto = io.TextIOWrapper(salida, encoding="utf-8")
+            yield texto
+            texto.flush()
+            texto.detach()
+            if comprimir:
+                salida.close()
+            binario.flush()
+            if hasattr(os, "fchmod"):
+                os.fchmod(binario.fileno(), _modo_destino(archivo))
+            os.fsync(binario.fileno())
+        os.replace(temporal, archivo)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    _sincronizar_directorio(directorio)
+
+
+def _sincronizar_directorio(directorio: str):
+    """fsync del directorio, que es donde queda registrado un renombre. En
+    Windows no se pueden abrir directorios y el renombre ya es persistente"""
+    if os.name != "posix":
+        return
+    descriptor = os.open(directorio, os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
 
 class GestorProyectos:
     """Clase principal para gestionar el sistema"""
     
     def __init__(self):
         self.__proyectos: List[Proyecto] = []
+        # Proyectos en los que participa cada institución (clave: id de la institución)
+        self.__proyectos_por_institucion: Dict[int, List[Proyecto]] = {}
+        # Índice global nombre -> [(proyecto, institucion, beneficiario)]
+        self.__indice_beneficiarios: Dict[str, List[Tuple[Proyecto, Institucion, Beneficiario]]] = {}
+        # (proyecto, institucion) que no usan el índice global: se les
+        # pregunta directamente en cada búsqueda (ver Institucion.INDICE_EN_GESTOR)
+        self.__sin_indice: List[Tuple[Proyecto, Institucion]] = []
+        # Índices secundarios para consultar(); se crean con la primera consulta
+        self.__indice_consultas = None
+        # Índice de nombres normalizados para búsquedas aproximadas; se
+        # mantiene con cada nombre nuevo o que deja de usarse
+        self.__indice_nombres = IndiceNombres()
+        # Protege la lista de proyectos y los índices globales, que se
+        # actualizan desde las instituciones de cualquier proyecto
+        self.__cerrojo = threading.RLock()
+        self.__observadores: List[Callable] = []
+        self.__uid = next(_identificadores)
+        self.__version = 0
+    
+    @property
+    def proyectos(self):
+        return self.__proyectos.copy()
+    
+    @property
+    def cerrojo(self) -> threading.RLock:
+        """Cerrojo de los índices globales, para recorrerlos desde varios hilos"""
+        return self.__cerrojo
+    
+    def agregar_observador(self, observador: Callable):
+        """Registra una función que se llama con (gestor, proyecto)
+        cada vez que se agrega un proyecto al sistema"""
+        if observador not in self.__observadores:
+            self.__observadores.append(observador)
+    
+    def remover_observador(self, observador: Callable):
+        """Deja de notificar a un observador registrado"""
+        if observador in self.__observadores:
+            self.__observadores.remove(observador)
     
     def agregar_proyecto(self, proyecto: Proyecto):
         """Agrega un proyecto al sistema"""
-        self.__proyectos.append(proyecto)
-        print(f"Proyecto {proyecto.nombre} agregado al sistema")
+        with self.__cerrojo:
+            self.__proyectos.append(proyecto)
+            self.__version += 1
+            proyecto.agregar_observador(self.__registrar_institucion)
+            for institucion in proyecto.instituciones:
+                self.__registrar_institucion(proyecto, institucion)
+            for observador in list(self.__observadores):
+                observador(self, proyecto)
+        BUS_EVENTOS.publicar("proyecto_agregado", proyecto=proyecto.nombre)
+    
+    def __registrar_institucion(self, proyecto: Proyecto, institucion: Institucion):
+        """Incorpora al índice global los beneficiarios de una institución del proyecto"""
+        with self.__cerrojo:
+            proyectos = self.__proyectos_por_institucion.setdefault(id(institucion), [])
+            if not proyectos:
+                institucion.agregar_observador(self.__actualizar_indice)
+            proyectos.append(proyecto)
+            if not institucion.INDICE_EN_GESTOR:
+                self.__sin_indice.append((proyecto, institucion))
+                for nombre in institucion.iterar_nombres():
+                    self.__indice_nombres.agregar(nombre)
+                if self.__indice_consultas is not None:
+                    for beneficiario in institucion.iterar_beneficiarios():
+                        self.__indice_consultas.agregar(proyecto, institucion, beneficiario)
+                return
+            for beneficiario in institucion.beneficiarios:
+                self.__indexar_nombre(beneficiario.nombre).append((proyecto, institucion, beneficiario))
+                if self.__indice_consultas is not None:
+                    self.__indice_consultas.agregar(proyecto, institucion, beneficiario)
+    
+    def __indexar_nombre(self, nombre: str) -> List[Tuple[Proyecto, Institucion, Beneficiario]]:
+        """Ubicaciones registradas con el nombre; un nombre nuevo también
+        entra al índice de búsqueda aproximada"""
+        ubicaciones = self.__indice_beneficiarios.get(nombre)
+        if ubicaciones is None:
+            ubicaciones = self.__indice_beneficiarios[nombre] = []
+            self.__indice_nombres.agregar(nombre)
+        return ubicaciones
+    
+    def __actualizar_indice(self, evento: str, institucion: Institucion, beneficiario: Beneficiario):
+        """Mantiene el índice global al agregar o remover beneficiarios"""
+        with self.__cerrojo:
+            if evento == "agregado":
+                if institucion.INDICE_EN_GESTOR:
+                    ubicaciones = self.__indexar_nombre(beneficiario.nombre)
+                else:
+                    self.__indice_nombres.agregar(beneficiario.nombre)
+                for proyecto in self.__proyectos_por_institucion.get(id(institucion), []):
+                    if institucion.INDICE_EN_GESTOR:
+                        ubicaciones.append((proyecto, institucion, beneficiario))
+                    if self.__indice_consultas is not None:
+                        self.__indice_consultas.agregar(proyecto, institucion, beneficiario)
+            elif evento == "removido":
+                ubicaciones = [
+                    (p, i, b) for p, i, b in self.__indice_beneficiarios.get(beneficiario.nombre, [])
+                    if not (i is institucion and b is beneficiario)
+                ]
+                if ubicaciones:
+                    self.__indice_beneficiarios[beneficiario.nombre] = ubicaciones
+                else:
+                    self.__indice_beneficiarios.pop(beneficiario.nombre, None)
+                    if not any(i.buscar_beneficiario(beneficiario.nombre) is not None
+                               for _, i in self.__sin_indice):
+                        self.__indice_nombres.remover(beneficiario.nombre)
+                if self.__indice_consultas is not None:
+                    self.__indice_consultas.remover(institucion, beneficiario)
+            elif evento == "respuesta_actualizada":
+                if self.__indice_consultas is not None:
+                    self.__indice_consultas.actualizar_respuesta(institucion, beneficiario)
+    
+    def clave_version(self) -> Tuple:
+        """Identifica el estado de todos los proyectos para la caché"""
+        return (self.__uid, self.__version,
+                tuple(proyecto.clave_version() for proyecto in self.__proyectos))
+    
+    def a_modelo_inscripciones(self):
+        """Convierte los datos al modelo normalizado (modelo_normalizado.py),
+        que cuenta cada persona una vez aunque esté en varios proyectos"""
+        from modelo_normalizado import ModeloInscripciones
+        with self.__cerrojo:
+            return ModeloInscripciones.desde_gestor(self)
     
     def buscar_proyecto(self, nombre: str) -> Optional[Proyecto]:
         """Busca un proyecto por nombre"""
@@ -304,41 +1298,205 @@ class GestorProyectos:
         """Lista todos los proyectos"""
         return [proyecto.nombre for proyecto in self.__proyectos]
     
-    def buscar_beneficiario_global(self, nombre: str) -> List[tuple]:
-        """Busca un beneficiario en todos los proyectos e instituciones"""
-        resultados = []
-        for proyecto in self.__proyectos:
-            for institucion in proyecto.instituciones:
-                beneficiario = institucion.buscar_beneficiario(nombre)
-                if beneficiario:
-                    resultados.append((proyecto.nombre, institucion.nombre, beneficiario))
-        return resultados
+    @instrumentado
+    def buscar_beneficiario_global(self, nombre: str, aproximado: bool = False,
+                                   limite: int = 10) -> List[tuple]:
+        """Busca un beneficiario en todos los proyectos e instituciones.
+        
+        Por defecto el nombre debe coincidir exactamente. Con aproximado=True
+        se retornan hasta `limite` nombres distintos, sin distinguir tildes ni
+        mayúsculas: primero los iguales, luego los que empiezan con lo escrito
+        ("Ana Garc") y por último los parecidos con errores de tipeo.
+        """
+        with self.__cerrojo:
+            if not aproximado:
+                nombres = [nombre]
+            else:
+                nombres = self.__buscar_nombres(nombre, limite)
+            resultados = []
+            for encontrado in nombres:
+                resultados.extend(
+                    (proyecto.nombre, institucion.nombre, beneficiario)
+                    for proyecto, institucion, beneficiario in self.__indice_beneficiarios.get(encontrado, []))
+                resultados.extend(
+                    (proyecto.nombre, institucion.nombre, beneficiario)
+                    for proyecto, institucion in self.__sin_indice
+                    for beneficiario in institucion.buscar_beneficiarios(encontrado))
+            return resultados
+    
+    def __buscar_nombres(self, texto: str, limite: int) -> List[str]:
+        indice = self.__indice_nombres
+        nombres = indice.buscar_exacto(texto)[:limite]
+        # Los pasos siguientes solo se hacen si todavía faltan resultados
+        if len(nombres) < limite:
+            nombres += [n for n in indice.buscar_prefijo(texto, limite) if n not in nombres]
+        if len(nombres) < limite:
+            nombres += [n for n, _ in indice.buscar_aproximado(texto, limite) if n not in nombres]
+        return nombres[:limite]
+    
+    def __obtener_indice_consultas(self):
+        """Crea los índices secundarios con los beneficiarios actuales; desde
+        entonces se mantienen con cada alta, baja o cambio de respuesta"""
+        with self.__cerrojo:
+            if self.__indice_consultas is None:
+                from consultas import IndiceConsultas
+                indice = IndiceConsultas()
+                for proyecto in self.__proyectos:
+                    for institucion in proyecto.instituciones:
+                        for beneficiario in institucion.iterar_beneficiarios():
+                            indice.agregar(proyecto, institucion, beneficiario)
+                self.__indice_consultas = indice
+            return self.__indice_consultas
+    
+    def consultar(self, *filtros, **criterios):
+        """Busca beneficiarios en todos los proyectos que cumplan todos los filtros.
+        
+        Acepta objetos consultas.Filtro y criterios con nombre, por ejemplo:
+            gestor.consultar(tipo=TipoBeneficiario.PACIENTE_CUIDADOR,
+                             genero=Genero.FEMENINO, edad=(30, 50),
+                             respuesta_tratamiento=RespuestaTratamiento.MALA,
+                             enfermedad="Ansiedad")
+        Retorna un iterador de (nombre_proyecto, nombre_institucion, beneficiario)
+        que se recorre a medida que se consumen los resultados. Si otros hilos
+        modifican los datos mientras tanto, recorrerlo dentro de `cerrojo`.
+        """
+        from consultas import Filtro
+        filtros = list(filtros) + Filtro.desde_criterios(criterios)
+        indice = self.__obtener_indice_consultas()
+        return ((proyecto.nombre, institucion.nombre, beneficiario)
+                for proyecto, institucion, beneficiario in indice.consultar(filtros))
+    
+    def explicar_consulta(self, *filtros, **criterios) -> List[Tuple[str, int]]:
+        """Plan de la consulta: cada filtro con la cantidad estimada de
+        resultados, en el orden en que se aplican"""
+        from consultas import Filtro
+        filtros = list(filtros) + Filtro.desde_criterios(criterios)
+        with self.__cerrojo:
+            return [(repr(filtro), estimado)
+                    for filtro, estimado in self.__obtener_indice_consultas().planificar(filtros)]
     
+    @instrumentado
     def generar_reporte_consolidado(self) -> Dict:
-        """Genera un reporte consolidado de todos los proyectos"""
-        reporte = {
-            "fecha_generacion": datetime.now().isoformat(),
-            "total_proyectos": len(self.__proyectos),
-            "total_beneficiarios": sum(p.obtener_total_beneficiarios() for p in self.__proyectos),
-            "proyectos": []
-        }
+        """Genera un reporte consolidado de todos los proyectos.
         
-        for proyecto in self.__proyectos:
-            reporte["proyectos"].append(proyecto.generar_reporte_especializado())
+        Las estadísticas salen de los agregados que cada institución mantiene
+        al día, por lo que no se recorren los beneficiarios.
+        """
+        # Cada proyecto sin cambios sale de la caché; solo se recalcula lo modificado
+        reporte = CACHE_REPORTES.obtener(
+            ("GestorProyectos.generar_reporte_consolidado", self.clave_version()),
+            lambda: self.__armar_reporte_consolidado(
+                [proyecto.generar_reporte_especializado() for proyecto in self.__proyectos]))
         
-        return reporte
+        return {**reporte, "fecha_generacion": datetime.now().isoformat()}
+    
+    @instrumentado
+    def generar_reporte_aproximado(self, cantidad: int = 5) -> Dict:
+        """Reporte con los resúmenes aproximados de cada proyecto y del total:
+        mediana y p90 de edad, beneficiarios y enfermedades distintos, y las
+        `cantidad` enfermedades y herramientas más frecuentes. Una institución
+        de varios proyectos cuenta una sola vez en el total"""
+        reporte = CACHE_REPORTES.obtener(
+            ("GestorProyectos.generar_reporte_aproximado", cantidad, self.clave_version()),
+            lambda: self.__armar_reporte_aproximado(cantidad))
+        return {**reporte, "fecha_generacion": datetime.now().isoformat()}
     
-    def exportar_datos(self, archivo: str = "reporte_proyectos.json") -> bool:
-        """Exporta todos los datos a un archivo JSON"""
+    def __armar_reporte_aproximado(self, cantidad: int) -> Dict:
+        from resumenes_aproximados import ResumenAproximado
+        with self.__cerrojo:
+            proyectos = list(self.__proyectos)
+        por_institucion = {}
+        reportes = []
+        for proyecto in proyectos:
+            resumen = ResumenAproximado()
+            for institucion in proyecto.instituciones:
+                if id(institucion) not in por_institucion:
+                    por_institucion[id(institucion)] = institucion.obtener_resumen_aproximado()
+                resumen.combinar(por_institucion[id(institucion)])
+            reportes.append({"nombre_proyecto": proyecto.nombre, **resumen.a_diccionario(cantidad)})
+        total = ResumenAproximado()
+        for resumen in por_institucion.values():
+            total.combinar(resumen)
+        return {
+            "fecha_generacion": None,
+            "total_proyectos": len(proyectos),
+            "total": total.a_diccionario(cantidad),
+            "proyectos": reportes
+        }
+    
+    def __armar_reporte_consolidado(self, reportes: List[Dict]) -> Dict:
+        return {
+            "fecha_generacion": None,
+            "total_proyectos": len(self.__proyectos),
+            "total_beneficiarios": sum(r["total_beneficiarios"] for r in reportes),
+            "proyectos": reportes
+        }
+    
+    def iterar_reporte_consolidado(self) -> _FlujoObjeto:
+        """Reporte consolidado como flujo: proyecto por proyecto e institución
+        por institución, sin armar el diccionario completo"""
+        def pares():
+            yield "fecha_generacion", datetime.now().isoformat()
+            yield "total_proyectos", len(self.__proyectos)
+            yield "total_beneficiarios", sum(p.obtener_total_beneficiarios() for p in self.__proyectos)
+            yield "proyectos", _FlujoLista(
+                _FlujoObjeto(proyecto.iterar_reporte_especializado()) for proyecto in self.__proyectos)
+        return _FlujoObjeto(pares())
+    
+    @instrumentado
+    def exportar_datos(self, archivo: str = "reporte_proyectos.json",
+                       compacto: bool = False, comprimir: bool = False) -> bool:
+        """Exporta todos los datos a un archivo JSON.
+        
+        El reporte se escribe por partes en un archivo temporal que reemplaza
+        al destino solo cuando quedó completo. compacto=True omite la
+        indentación y comprimir=True escribe el archivo en formato gzip.
+        Para exportar solo lo que cambió desde la exportación anterior ver
+        exportacion_incremental.py.
+        """
         try:
-            reporte = self.generar_reporte_consolidado()
-            with open(archivo, 'w', encoding='utf-8') as f:
-                json.dump(reporte, f, indent=2, ensure_ascii=False, default=str)
+            sangria = None if compacto else 2
+            with escritura_atomica(archivo, comprimir) as f:
+                for fragmento in _fragmentos_json(self.iterar_reporte_consolidado(), sangria):
+                    f.write(fragmento)
             return True
         except Exception as e:
-            print(f"Error al exportar: {e}")
+            BUS_EVENTOS.publicar("exportacion_fallida", archivo=archivo, error=str(e))
             return False
 
+# Mensajes del menú para los eventos que publica el núcleo
+MENSAJES_EVENTOS = {
+    "beneficiario_agregado": "Beneficiario {beneficiario} agregado a {institucion}",
+    "beneficiario_removido": "Beneficiario {beneficiario} removido de {institucion}",
+    "beneficiario_no_encontrado": "Beneficiario {beneficiario} no encontrado en {institucion}",
+    "institucion_agregada": "Institución {institucion} agregada al proyecto {proyecto}",
+    "proyecto_agregado": "Proyecto {proyecto} agregado al sistema",
+    "exportacion_fallida": "Error al exportar: {error}"
+}
+
+def mostrar_evento(evento: Dict):
+    """Muestra en pantalla un evento de BUS_EVENTOS"""
+    print(MENSAJES_EVENTOS[evento["evento"]].format(**evento))
+
+def mostrar_metricas():
+    """Muestra las métricas de las operaciones instrumentadas y las guarda en JSON"""
+    from instrumentacion import ARCHIVO_METRICAS
+    operaciones = INSTRUMENTACION.resumen()["operaciones"]
+    if not operaciones:
+        print("Todavía no hay operaciones medidas")
+    for operacion, datos in operaciones.items():
+        linea = f"{operacion}: {datos['llamadas']} llamadas"
+        if datos["medidas"]:
+            linea += (f", media {datos['segundos_media'] * 1000:.3f} ms, "
+                      f"p90 {datos['segundos_p90'] * 1000:.3f} ms, "
+                      f"máximo {datos['segundos_maximo'] * 1000:.3f} ms")
+        print(linea)
+    try:
+        INSTRUMENTACION.volcar(ARCHIVO_METRICAS)
+        print(f"✓ Métricas guardadas en '{ARCHIVO_METRICAS}'")
+    except OSError as e:
+        print(f"✗ Error al guardar métricas: {e}")
+
 # Función para imprimir menú de opciones
 def impresion_menu():
     lmenu = [
@@ -347,7 +1505,9 @@ def impresion_menu():
         "3. Ver estadísticas proyecto", 
         "4. Generar reporte consolidado",
         "5. Exportar datos",
-        "6. Salir"
+        "6. Guardar base de datos",
+        "7. Ver métricas de rendimiento",
+        "8. Salir"
     ]
     
     print("\n" + "="*50)
@@ -366,69 +1526,84 @@ def impresion_menu():
         except ValueError:
             print(f"Su opción debe ser un número entre 1 y {len(lmenu)}")
 
-def main():
-    """Función principal para demostrar el uso del sistema"""
-    
-    print("=== SISTEMA DE GESTIÓN DE PROYECTOS DE SALUD PÚBLICA ===")
+def crear_datos_ejemplo() -> GestorProyectos:
+    """Crea el gestor con los proyectos, instituciones y beneficiarios de ejemplo.
     
-    # Crear gestor principal
+    Cada proyecto recibe su propio objeto Institucion (con los mismos datos),
+    de modo que un beneficiario solo aparece en el proyecto en el que se
+    inscribió
+    """
     gestor = GestorProyectos()
+    proyectos = [
+        ProyectoMusicoterapia(
+            "Melodía Vital", 
+            "Proyecto de musicoterapia para bienestar integral",
+            datetime(2024, 1, 15)
+        ),
+        ProyectoArteterapia(
+            "Cuadro Clínico",
+            "Proyecto de arteterapia para expresión y sanación",
+            datetime(2024, 2, 1)
+        ),
+    ]
+    for proyecto in proyectos:
+        for nombre, direccion, telefono in (
+                ("Hospital General", "Av. Salud 123", "555-0001"),
+                ("Clínica del Valle", "Calle Bienestar 456", "555-0002"),
+                ("Centro de Rehabilitación", "Plaza Esperanza 789", "555-0003")):
+            proyecto.agregar_institucion(Institucion(nombre, direccion, telefono))
+        gestor.agregar_proyecto(proyecto)
     
-    # Crear proyectos
-    proyecto_musico = ProyectoMusicoterapia(
-        "Melodía Vital", 
-        "Proyecto de musicoterapia para bienestar integral",
-        datetime(2024, 1, 15)
-    )
-    
-    proyecto_arte = ProyectoArteterapia(
-        "Cuadro Clínico",
-        "Proyecto de arteterapia para expresión y sanación",
-        datetime(2024, 2, 1)
-    )
-    
-    # Agregar proyectos al gestor
-    gestor.agregar_proyecto(proyecto_musico)
-    gestor.agregar_proyecto(proyecto_arte)
-    
-    # Crear instituciones
-    hospital = Institucion("Hospital General", "Av. Salud 123", "555-0001")
-    clinica = Institucion("Clínica del Valle", "Calle Bienestar 456", "555-0002")
-    centro = Institucion("Centro de Rehabilitación", "Plaza Esperanza 789", "555-0003")
-    
-    # Agregar instituciones a proyectos
-    proyecto_musico.agregar_institucion(hospital)
-    proyecto_musico.agregar_institucion(clinica)
-    proyecto_musico.agregar_institucion(centro)
-    
-    proyecto_arte.agregar_institucion(hospital)
-    proyecto_arte.agregar_institucion(clinica)
-    proyecto_arte.agregar_institucion(centro)
-    
-    # Crear algunos beneficiarios de ejemplo
-    beneficiarios_ejemplo = [
-        Beneficiario("Ana García", TipoBeneficiario.TRABAJADOR_SALUD, Genero.FEMENINO, 35, 
-                    "Estrés laboral", "Meditación sonora", RespuestaTratamiento.EXCELENTE),
+    # Agregar algunos beneficiarios de ejemplo al hospital en musicoterapia
+    hospital_musico = gestor.buscar_proyecto("Melodía Vital").buscar_institucion("Hospital General")
+    hospital_musico.agregar_beneficiarios_lote([
+        Beneficiario("Ana García", TipoBeneficiario.TRABAJADOR_SALUD, Genero.FEMENINO, 35,
+                     "Estrés laboral", "Meditación sonora", RespuestaTratamiento.EXCELENTE),
         Beneficiario("Carlos López", TipoBeneficiario.PACIENTE_CUIDADOR, Genero.MASCULINO, 42,
-                    "Ansiedad", "Acompañamiento musical", RespuestaTratamiento.BUENA),
+                     "Ansiedad", "Acompañamiento musical", RespuestaTratamiento.BUENA),
         Beneficiario("María Torres", TipoBeneficiario.PERSONA_PARTICULAR, Genero.FEMENINO, 28,
-                    "Depresión", "Taller", RespuestaTratamiento.REGULAR)
-    ]
+                     "Depresión", "Taller", RespuestaTratamiento.REGULAR)
+    ])
     
-    # Agregar beneficiarios de ejemplo al hospital en musicoterapia
-    hospital_musico = proyecto_musico.buscar_institucion("Hospital General")
-    for beneficiario in beneficiarios_ejemplo:
-        hospital_musico.agregar_beneficiario(beneficiario)
+    return gestor
+
+def main():
+    """Función principal para demostrar el uso del sistema"""
+    from bitacora import DIRECTORIO_DATOS, Bitacora
+    from persistencia import ARCHIVO_DATOS, cargar_instantanea
     
-    print("\n=== DATOS INICIALES CARGADOS ===")
-    print("✓ Proyectos creados: Melodía Vital (Musicoterapia) y Cuadro Clínico (Arteterapia)")
-    print("✓ Instituciones agregadas a cada proyecto")
-    print("✓ Beneficiarios de ejemplo agregados")
+    print("=== SISTEMA DE GESTIÓN DE PROYECTOS DE SALUD PÚBLICA ===")
+    
+    if Bitacora.existe(DIRECTORIO_DATOS):
+        # Última instantánea más los cambios registrados después
+        gestor, bitacora, resumen = Bitacora.recuperar(DIRECTORIO_DATOS)
+        print(f"\n=== DATOS RECUPERADOS DESDE '{DIRECTORIO_DATOS}' ===")
+        print(f"✓ {resumen['registros_instantanea']} registros de la instantánea y "
+              f"{resumen['registros_reproducidos']} cambios posteriores en {resumen['segundos']:.2f} s")
+    else:
+        if os.path.exists(ARCHIVO_DATOS):
+            # Cargar la base de datos guardada
+            gestor, resumen = cargar_instantanea(ARCHIVO_DATOS)
+            print(f"\n=== DATOS CARGADOS DESDE '{ARCHIVO_DATOS}' ===")
+            print(f"✓ {resumen['registros']} registros en {resumen['segundos']:.2f} s "
+                  f"({resumen['registros_por_segundo']:.0f} registros/s)")
+        else:
+            gestor = crear_datos_ejemplo()
+            print("\n=== DATOS INICIALES CARGADOS ===")
+            print("✓ Proyectos creados: Melodía Vital (Musicoterapia) y Cuadro Clínico (Arteterapia)")
+            print("✓ Instituciones agregadas a cada proyecto")
+            print("✓ Beneficiarios de ejemplo agregados")
+        # Desde aquí cada cambio queda registrado en la bitácora
+        bitacora = Bitacora.iniciar(gestor, DIRECTORIO_DATOS)
+    
+    # Desde aquí los eventos del núcleo se muestran en pantalla (la carga
+    # de los datos guardados no tiene a nadie suscrito)
+    BUS_EVENTOS.suscribir(mostrar_evento, *MENSAJES_EVENTOS)
     
     # Menú interactivo
     op = impresion_menu()
     
-    while op != 6:  # 6 es "Salir"
+    while op != 8:  # 8 es "Salir"
         if op == 1:  # Agregar beneficiario
             print("\n--- AGREGAR BENEFICIARIO ---")
             
@@ -514,7 +1689,13 @@ def main():
                     print(f"\nEncontrado en: {proyecto_nom} -> {institucion_nom}")
                     beneficiario.get_data()
             else:
-                print("Beneficiario no encontrado")
+                resultados = gestor.buscar_beneficiario_global(nombre, aproximado=True)
+                if resultados:
+                    print("Beneficiario no encontrado. Coincidencias aproximadas:")
+                    for proyecto_nom, institucion_nom, beneficiario in resultados:
+                        print(f"- {beneficiario} en {proyecto_nom} -> {institucion_nom}")
+                else:
+                    print("Beneficiario no encontrado")
         
         elif op == 3:  # Ver estadísticas proyecto
             print("\n--- ESTADÍSTICAS POR PROYECTO ---")
@@ -538,6 +1719,9 @@ def main():
                         print(f"Abordajes más usados: {reporte['abordajes_mas_usados']}")
                     else:
                         print(f"Técnicas más usadas: {reporte['tecnicas_mas_usadas']}")
+                    print("Respuesta por herramienta:")
+                    for herramienta, respuestas in reporte['tablas_cruzadas']['herramienta_x_respuesta'].items():
+                        print(f"  {herramienta}: {respuestas}")
                 else:
                     print("Proyecto no válido")
             except (ValueError, IndexError):
@@ -560,13 +1744,31 @@ def main():
             else:
                 print("✗ Error al exportar datos")
         
+        elif op == 6:  # Guardar base de datos
+            print("\n--- GUARDAR BASE DE DATOS ---")
+            # Los cambios ya están en la bitácora; guardar los compacta en una instantánea
+            try:
+                cantidad = bitacora.compactar()
+                print(f"✓ {cantidad} registros guardados en '{DIRECTORIO_DATOS}'")
+            except OSError as e:
+                print(f"✗ Error al guardar datos: {e}")
+        
+        elif op == 7:  # Ver métricas de rendimiento
+            print("\n--- MÉTRICAS DE RENDIMIENTO ---")
+            mostrar_metricas()
+        
         else:
             print("Opción no válida")
         
+        bitacora.compactar_si_corresponde()
         op = impresion_menu()
     
+    bitacora.cerrar()
     print("\n=== SISTEMA FINALIZADO ===")
     print("Gracias por usar el sistema de gestión de proyectos de salud pública de Fundacion Sanartes")
 
 if __name__ == "__main__":
-    main()
+    # Se ejecuta main() desde el módulo importado para que los módulos
+    # auxiliares (persistencia, etc.) compartan las mismas clases y enums
+    import proyecto_salud
+    proyecto_salud.main()
@@ -0,0 +1,504 @@
+"""Capa de repositorio para el almacenamiento de proyectos y beneficiarios.
+
+Repositorio define las operaciones; RepositorioMemoria las resuelve sobre el
+grafo de objetos de GestorProyectos (el comportamiento de siempre) y
+RepositorioSQLite las guarda en una base de datos SQLite local, con tablas
+normalizadas e índices, de modo que los datos no quedan limitados por la
+memoria y persisten entre ejecuciones.
+
+Ambos repositorios dan los mismos resultados, en el mismo orden. Una
+institución se identifica por su nombre: registrarla de nuevo con otra
+dirección o teléfono es un error.
+
+reflejar() suscribe un repositorio a los cambios de un GestorProyectos, y
+comandos.py lo usa para crear la base SQLite desde los datos guardados
+(sqlite), leer estadísticas de ella (estadisticas --sqlite) y mantenerla al
+importar (importar --sqlite).
+"""
+import sqlite3
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from proyecto_salud import (TIPOS_PROYECTO, Beneficiario, GestorProyectos, Genero, Institucion,
+                            Proyecto, RespuestaTratamiento, TipoBeneficiario)
+
+
+class Repositorio(ABC):
+    """Operaciones de almacenamiento y consulta del sistema"""
+
+    @abstractmethod
+    def agregar_proyecto(self, proyecto: Proyecto):
+        pass
+
+    @abstractmethod
+    def agregar_institucion(self, nombre_proyecto: str, institucion: Institucion):
+        pass
+
+    @abstractmethod
+    def agregar_beneficiarios_lote(self, nombre_proyecto: str, nombre_institucion: str,
+                                   beneficiarios: Iterable[Beneficiario]) -> int:
+        pass
+
+    @abstractmethod
+    def remover_beneficiario(self, nombre_proyecto: str, nombre_institucion: str,
+                             nombre: str) -> bool:
+        pass
+
+    @abstractmethod
+    def actualizar_respuesta(self, nombre_proyecto: str, nombre_institucion: str,
+                             nombre: str, respuesta: RespuestaTratamiento, orden: int = 0) -> bool:
+        """Cambia la respuesta del beneficiario número `orden` (desde 0) entre
+        los que tienen ese nombre en la institución, en orden de registro"""
+        pass
+
+    @abstractmethod
+    def listar_proyectos(self) -> List[str]:
+        pass
+
+    @abstractmethod
+    def buscar_beneficiario_global(self, nombre: str) -> List[tuple]:
+        """Retorna [(nombre proyecto, nombre institución, beneficiario)]"""
+        pass
+
+    @abstractmethod
+    def estadisticas_institucion(self, nombre_proyecto: str, nombre_institucion: str) -> Dict:
+        """Mismo formato que Institucion.obtener_estadisticas"""
+        pass
+
+    @abstractmethod
+    def estadisticas_proyecto(self, nombre_proyecto: str) -> Dict:
+        """Mismo formato que Proyecto.obtener_estadisticas_generales"""
+        pass
+
+    @abstractmethod
+    def contar_herramientas(self, nombre_proyecto: str) -> Dict[str, int]:
+        """Mismo formato y orden que Proyecto.contar_herramientas"""
+        pass
+
+    def agregar_beneficiario(self, nombre_proyecto: str, nombre_institucion: str,
+                             beneficiario: Beneficiario):
+        """Agrega un beneficiario a una institución de un proyecto"""
+        self.agregar_beneficiarios_lote(nombre_proyecto, nombre_institucion, [beneficiario])
+
+    @contextmanager
+    def transaccion(self):
+        """Agrupa varias operaciones; en memoria no tiene efecto"""
+        yield self
+
+    def cargar_gestor(self, gestor: GestorProyectos):
+        """Copia al repositorio todos los datos de un GestorProyectos"""
+        with self.transaccion():
+            for proyecto in gestor.proyectos:
+                self.agregar_proyecto(proyecto)
+                for institucion in proyecto.instituciones:
+                    self.agregar_institucion(proyecto.nombre, institucion)
+                    self.agregar_beneficiarios_lote(proyecto.nombre, institucion.nombre,
+                                                    institucion.iterar_beneficiarios())
+
+    def reflejar(self, gestor: GestorProyectos, copiar: bool = True) -> Callable[[], None]:
+        """Registra en el repositorio cada proyecto, institución, alta, baja y
+        cambio de respuesta del gestor. Con copiar=True primero se copian los
+        datos actuales; con False el repositorio ya debe tenerlos. Retorna
+        una función que deja de reflejar el gestor"""
+        if copiar:
+            self.cargar_gestor(gestor)
+        return _Reflejo(self, gestor).detener
+
+    def cerrar(self):
+        pass
+
+
+class _Reflejo:
+    """Observadores que llevan los cambios de un gestor a un repositorio"""
+
+    def __init__(self, repositorio: Repositorio, gestor: GestorProyectos):
+        self.__repositorio = repositorio
+        self.__gestor = gestor
+        # id de cada institución observada -> (institución, proyectos en los que participa)
+        self.__instituciones: Dict[int, Tuple[Institucion, List[Proyecto]]] = {}
+        self.__proyectos: List[Proyecto] = []
+        gestor.agregar_observador(self.__proyecto_agregado)
+        for proyecto in gestor.proyectos:
+            self.__observar_proyecto(proyecto)
+
+    def __observar_proyecto(self, proyecto: Proyecto):
+        proyecto.agregar_observador(self.__institucion_agregada)
+        self.__proyectos.append(proyecto)
+        for institucion in proyecto.instituciones:
+            self.__observar_institucion(proyecto, institucion)
+
+    def __observar_institucion(self, proyecto: Proyecto, institucion: Institucion):
+        _, proyectos = self.__instituciones.setdefault(id(institucion), (institucion, []))
+        if not proyectos:
+            institucion.agregar_observador(self.__beneficiario_modificado)
+        if not any(p is proyecto for p in proyectos):
+            proyectos.append(proyecto)
+
+    def __proyecto_agregado(self, gestor: GestorProyectos, proyecto: Proyecto):
+        with self.__repositorio.transaccion():
+            self.__repositorio.agregar_proyecto(proyecto)
+            for institucion in proyecto.instituciones:
+                self.__repositorio.agregar_institucion(proyecto.nombre, institucion)
+                self.__repositorio.agregar_beneficiarios_lote(proyecto.nombre, institucion.nombre,
+                                                              institucion.iterar_beneficiarios())
+        self.__observar_proyecto(proyecto)
+
+    def __institucion_agregada(self, proyecto: Proyecto, institucion: Institucion):
+        with self.__repositorio.transaccion():
+            self.__repositorio.agregar_institucion(proyecto.nombre, institucion)
+            self.__repositorio.agregar_beneficiarios_lote(proyecto.nombre, institucion.nombre,
+                                                          institucion.iterar_beneficiarios())
+        self.__observar_institucion(proyecto, institucion)
+
+    def __beneficiario_modificado(self, evento: str, institucion: Institucion, beneficiario: Beneficiario):
+        _, proyectos = self.__instituciones[id(institucion)]
+        if evento == "respuesta_actualizada":
+            # Posición entre los homónimos, igual que en la bitácora
+            homonimos = institucion.buscar_beneficiarios(beneficiario.nombre)
+            orden = next(i for i, b in enumerate(homonimos) if b is beneficiario)
+        with self.__repositorio.transaccion():
+            for proyecto in proyectos:
+                if evento == "agregado":
+                    self.__repositorio.agregar_beneficiario(proyecto.nombre, institucion.nombre, beneficiario)
+                elif evento == "removido":
+                    self.__repositorio.remover_beneficiario(proyecto.nombre, institucion.nombre,
+                                                            beneficiario.nombre)
+                elif evento == "respuesta_actualizada":
+                    self.__repositorio.actualizar_respuesta(proyecto.nombre, institucion.nombre,
+                                                            beneficiario.nombre,
+                                                            beneficiario.respuesta_tratamiento, orden)
+
+    def detener(self):
+        """Deja de observar el gestor"""
+        self.__gestor.remover_observador(self.__proyecto_agregado)
+        for proyecto in self.__proyectos:
+            proyecto.remover_observador(self.__institucion_agregada)
+        for institucion, _ in self.__instituciones.values():
+            institucion.remover_observador(self.__beneficiario_modificado)
+        self.__proyectos.clear()
+        self.__instituciones.clear()
+
+
+class RepositorioMemoria(Repositorio):
+    """Repositorio sobre el grafo de objetos en memoria"""
+
+    def __init__(self, gestor: Optional[GestorProyectos] = None):
+        self.__gestor = gestor if gestor is not None else GestorProyectos()
+
+    @property
+    def gestor(self) -> GestorProyectos:
+        return self.__gestor
+
+    def __proyecto(self, nombre: str) -> Proyecto:
+        proyecto = self.__gestor.buscar_proyecto(nombre)
+        if proyecto is None:
+            raise ValueError(f"Proyecto no encontrado: {nombre}")
+        return proyecto
+
+    def __institucion(self, nombre_proyecto: str, nombre: str) -> Institucion:
+        institucion = self.__proyecto(nombre_proyecto).buscar_institucion(nombre)
+        if institucion is None:
+            raise ValueError(f"Institución {nombre} no encontrada en {nombre_proyecto}")
+        return institucion
+
+    def agregar_proyecto(self, proyecto: Proyecto):
+        if self.__gestor.buscar_proyecto(proyecto.nombre) is None:
+            self.__gestor.agregar_proyecto(proyecto)
+
+    def agregar_institucion(self, nombre_proyecto: str, institucion: Institucion):
+        proyecto = self.__proyecto(nombre_proyecto)
+        for otro in self.__gestor.proyectos:
+            for registrada in otro.instituciones:
+                if (registrada.nombre == institucion.nombre
+                        and (registrada.direccion, registrada.telefono)
+                        != (institucion.direccion, institucion.telefono)):
+                    raise ValueError(f"La institución {institucion.nombre} ya está registrada con otros datos")
+        if proyecto.buscar_institucion(institucion.nombre) is None:
+            proyecto.agregar_institucion(institucion)
+
+    def agregar_beneficiarios_lote(self, nombre_proyecto, nombre_institucion, beneficiarios) -> int:
+        institucion = self.__institucion(nombre_proyecto, nombre_institucion)
+        return institucion.agregar_beneficiarios_lote(list(beneficiarios))
+
+    def remover_beneficiario(self, nombre_proyecto, nombre_institucion, nombre) -> bool:
+        institucion = self.__institucion(nombre_proyecto, nombre_institucion)
+        return institucion.remover_beneficiario(nombre)
+
+    def actualizar_respuesta(self, nombre_proyecto, nombre_institucion, nombre, respuesta,
+                             orden: int = 0) -> bool:
+        homonimos = self.__institucion(nombre_proyecto, nombre_institucion).buscar_beneficiarios(nombre)
+        if not 0 <= orden < len(homonimos):
+            return False
+        homonimos[orden].respuesta_tratamiento = respuesta
+        return True
+
+    def listar_proyectos(self) -> List[str]:
+        return self.__gestor.listar_proyectos()
+
+    def buscar_beneficiario_global(self, nombre: str) -> List[tuple]:
+        return self.__gestor.buscar_beneficiario_global(nombre)
+
+    def estadisticas_institucion(self, nombre_proyecto, nombre_institucion) -> Dict:
+        return self.__institucion(nombre_proyecto, nombre_institucion).obtener_estadisticas()
+
+    def estadisticas_proyecto(self, nombre_proyecto) -> Dict:
+        return self.__proyecto(nombre_proyecto).obtener_estadisticas_generales()
+
+    def contar_herramientas(self, nombre_proyecto) -> Dict[str, int]:
+        return self.__proyecto(nombre_proyecto).contar_herramientas()
+
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS proyectos (
+    id INTEGER PRIMARY KEY,
+    nombre TEXT NOT NULL UNIQUE,
+    tipo TEXT NOT NULL,
+    descripcion TEXT NOT NULL,
+    fecha_inicio TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS instituciones (
+    id INTEGER PRIMARY KEY,
+    nombre TEXT NOT NULL UNIQUE,
+    direccion TEXT NOT NULL,
+    telefono TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS proyecto_institucion (
+    proyecto_id INTEGER NOT NULL REFERENCES proyectos(id),
+    institucion_id INTEGER NOT NULL REFERENCES instituciones(id),
+    posicion INTEGER NOT NULL,
+    PRIMARY KEY (proyecto_id, institucion_id)
+);
+CREATE TABLE IF NOT EXISTS beneficiarios (
+    id INTEGER PRIMARY KEY,
+    proyecto_id INTEGER NOT NULL,
+    institucion_id INTEGER NOT NULL,
+    nombre TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    genero TEXT NOT NULL,
+    edad INTEGER NOT NULL,
+    enfermedad TEXT NOT NULL,
+    herramienta_tratamiento TEXT NOT NULL,
+    respuesta_tratamiento TEXT NOT NULL,
+    fecha_registro TEXT NOT NULL,
+    FOREIGN KEY (proyecto_id, institucion_id)
+        REFERENCES proyecto_institucion(proyecto_id, institucion_id)
+);
+CREATE INDEX IF NOT EXISTS idx_beneficiarios_nombre ON beneficiarios(nombre);
+CREATE INDEX IF NOT EXISTS idx_beneficiarios_institucion ON beneficiarios(proyecto_id, institucion_id);
+CREATE INDEX IF NOT EXISTS idx_beneficiarios_tipo ON beneficiarios(proyecto_id, institucion_id, tipo);
+CREATE INDEX IF NOT EXISTS idx_beneficiarios_respuesta
+    ON beneficiarios(proyecto_id, institucion_id, respuesta_tratamiento);
+"""
+
+_COLUMNAS_BENEFICIARIO = ("nombre, tipo, genero, edad, enfermedad, herramienta_tratamiento, "
+                          "respuesta_tratamiento, fecha_registro")
+
+
+class RepositorioSQLite(Repositorio):
+    """Repositorio en un archivo SQLite local.
+
+    Cada operación pública es su propia transacción, salvo dentro de
+    `with repositorio.transaccion():`, que agrupa todo en un solo commit.
+    Las estadísticas se calculan en la base con GROUP BY.
+    """
+
+    def __init__(self, archivo: str = "datos_salud.db"):
+        self.__conexion = sqlite3.connect(archivo)
+        self.__conexion.execute("PRAGMA journal_mode=WAL")
+        self.__conexion.execute("PRAGMA synchronous=NORMAL")
+        self.__conexion.execute("PRAGMA foreign_keys=ON")
+        self.__conexion.executescript(_ESQUEMA)
+        self.__profundidad = 0
+
+    @contextmanager
+    def transaccion(self):
+        """Agrupa varias operaciones en una sola transacción"""
+        self.__profundidad += 1
+        try:
+            yield self
+        except BaseException:
+            self.__profundidad -= 1
+            if self.__profundidad == 0:
+                self.__conexion.rollback()
+            raise
+        self.__profundidad -= 1
+        if self.__profundidad == 0:
+            self.__conexion.commit()
+
+    def __confirmar(self):
+        if self.__profundidad == 0:
+            self.__conexion.commit()
+
+    def __id_proyecto(self, nombre: str) -> int:
+        fila = self.__conexion.execute("SELECT id FROM proyectos WHERE nombre = ?", (nombre,)).fetchone()
+        if fila is None:
+            raise ValueError(f"Proyecto no encontrado: {nombre}")
+        return fila[0]
+
+    def __id_institucion(self, nombre_proyecto: str, nombre: str) -> Tuple[int, int]:
+        """Retorna (id del proyecto, id de la institución) de una participación"""
+        fila = self.__conexion.execute(
+            "SELECT p.id, i.id FROM instituciones i "
+            "JOIN proyecto_institucion pi ON pi.institucion_id = i.id "
+            "JOIN proyectos p ON p.id = pi.proyecto_id "
+            "WHERE p.nombre = ? AND i.nombre = ?", (nombre_proyecto, nombre)).fetchone()
+        if fila is None:
+            raise ValueError(f"Institución {nombre} no encontrada en {nombre_proyecto}")
+        return fila
+
+    def agregar_proyecto(self, proyecto: Proyecto):
+        self.__conexion.execute(
+            "INSERT OR IGNORE INTO proyectos (nombre, tipo, descripcion, fecha_inicio) VALUES (?, ?, ?, ?)",
+            (proyecto.nombre, proyecto.TIPO_PROYECTO, proyecto.descripcion,
+             proyecto.fecha_inicio.isoformat()))
+        self.__confirmar()
+
+    def agregar_institucion(self, nombre_proyecto: str, institucion: Institucion):
+        proyecto_id = self.__id_proyecto(nombre_proyecto)
+        registrada = self.__conexion.execute(
+            "SELECT direccion, telefono FROM instituciones WHERE nombre = ?",
+            (institucion.nombre,)).fetchone()
+        if registrada is None:
+            self.__conexion.execute(
+                "INSERT INTO instituciones (nombre, direccion, telefono) VALUES (?, ?, ?)",
+                (institucion.nombre, institucion.direccion, institucion.telefono))
+        elif tuple(registrada) != (institucion.direccion, institucion.telefono):
+            raise ValueError(f"La institución {institucion.nombre} ya está registrada con otros datos")
+        self.__conexion.execute(
+            "INSERT OR IGNORE INTO proyecto_institucion (proyecto_id, institucion_id, posicion) "
+            "SELECT ?, id, (SELECT COUNT(*) FROM proyecto_institucion WHERE proyecto_id = ?) "
+            "FROM instituciones WHERE nombre = ?",
+            (proyecto_id, proyecto_id, institucion.nombre))
+        self.__confirmar()
+
+    def agregar_beneficiarios_lote(self, nombre_proyecto, nombre_institucion, beneficiarios) -> int:
+        proyecto_id, institucion_id = self.__id_institucion(nombre_proyecto, nombre_institucion)
+        cursor = self.__conexion.executemany(
+            f"INSERT INTO beneficiarios (proyecto_id, institucion_id, {_COLUMNAS_BENEFICIARIO}) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ((proyecto_id, institucion_id, b.nombre, b.tipo.value, b.genero.value, b.edad, b.enfermedad,
+              b.herramienta_tratamiento, b.respuesta_tratamiento.value, b.fecha_registro.isoformat())
+             for b in beneficiarios))
+        self.__confirmar()
+        return cursor.rowcount
+
+    def remover_beneficiario(self, nombre_proyecto, nombre_institucion, nombre) -> bool:
+        proyecto_id, institucion_id = self.__id_institucion(nombre_proyecto, nombre_institucion)
+        cursor = self.__conexion.execute(
+            "DELETE FROM beneficiarios WHERE id = (SELECT MIN(id) FROM beneficiarios "
+            "WHERE proyecto_id = ? AND institucion_id = ? AND nombre = ?)",
+            (proyecto_id, institucion_id, nombre))
+        self.__confirmar()
+        return cursor.rowcount > 0
+
+    def actualizar_respuesta(self, nombre_proyecto, nombre_institucion, nombre, respuesta,
+                             orden: int = 0) -> bool:
+        proyecto_id, institucion_id = self.__id_institucion(nombre_proyecto, nombre_institucion)
+        cursor = self.__conexion.execute(
+            "UPDATE beneficiarios SET respuesta_tratamiento = ? WHERE id = (SELECT id "
+            "FROM beneficiarios WHERE proyecto_id = ? AND institucion_id = ? AND nombre = ? "
+            "ORDER BY id LIMIT 1 OFFSET ?)",
+            (respuesta.value, proyecto_id, institucion_id, nombre, orden))
+        self.__confirmar()
+        return cursor.rowcount > 0
+
+    def listar_proyectos(self) -> List[str]:
+        return [fila[0] for fila in self.__conexion.execute("SELECT nombre FROM proyectos ORDER BY id")]
+
+    def buscar_beneficiario_global(self, nombre: str) -> List[tuple]:
+        filas = self.__conexion.execute(
+            f"SELECT p.nombre, i.nombre, {', '.join('b.' + c.strip() for c in _COLUMNAS_BENEFICIARIO.split(','))} "
+            "FROM beneficiarios b "
+            "JOIN instituciones i ON i.id = b.institucion_id "
+            "JOIN proyectos p ON p.id = b.proyecto_id "
+            # En orden de registro, como el índice de nombres del gestor
+            "WHERE b.nombre = ? ORDER BY b.id", (nombre,))
+        return [
+            (proyecto, institucion, Beneficiario(
+                nombre_b, TipoBeneficiario(tipo), Genero(genero), edad, enfermedad, herramienta,
+                RespuestaTratamiento(respuesta), datetime.fromisoformat(fecha)))
+            for proyecto, institucion, nombre_b, tipo, genero, edad, enfermedad, herramienta,
+            respuesta, fecha in filas
+        ]
+
+    def __estadisticas_por_institucion(self, condicion: str, parametros: tuple) -> Dict[int, Dict]:
+        """Estadísticas agrupadas por institución con GROUP BY; `condicion`
+        filtra sobre la tabla beneficiarios (alias b) y debe limitarse a un proyecto"""
+        resultado: Dict[int, Dict] = {}
+        totales = self.__conexion.execute(
+            f"SELECT b.institucion_id, COUNT(*), SUM(b.edad) FROM beneficiarios b "
+            f"WHERE {condicion} GROUP BY b.institucion_id", parametros)
+        for institucion_id, total, suma_edades in totales:
+            resultado[institucion_id] = {"total": total, "por_tipo": {}, "por_genero": {},
+                                         "por_respuesta": {}, "edad_promedio": suma_edades / total}
+
+        for columna, clave, enum in (("tipo", "por_tipo", TipoBeneficiario),
+                                     ("genero", "por_genero", Genero),
+                                     ("respuesta_tratamiento", "por_respuesta", RespuestaTratamiento)):
+            conteos = {}
+            for institucion_id, valor, cantidad in self.__conexion.execute(
+                    f"SELECT b.institucion_id, b.{columna}, COUNT(*) FROM beneficiarios b "
+                    f"WHERE {condicion} GROUP BY b.institucion_id, b.{columna}", parametros):
+                conteos[(institucion_id, valor)] = cantidad
+            # Mismo orden de claves que Institucion.obtener_estadisticas
+            for institucion_id, stats in resultado.items():
+                for miembro in enum:
+                    cantidad = conteos.get((institucion_id, miembro.value))
+                    if cantidad:
+                        stats[clave][miembro.value] = cantidad
+        return resultado
+
+    def estadisticas_institucion(self, nombre_proyecto, nombre_institucion) -> Dict:
+        proyecto_id, institucion_id = self.__id_institucion(nombre_proyecto, nombre_institucion)
+        stats = self.__estadisticas_por_institucion(
+            "b.proyecto_id = ? AND b.institucion_id = ?", (proyecto_id, institucion_id))
+        return stats.get(institucion_id, {"total": 0})
+
+    def estadisticas_proyecto(self, nombre_proyecto) -> Dict:
+        proyecto_id = self.__id_proyecto(nombre_proyecto)
+        instituciones = self.__conexion.execute(
+            "SELECT i.id, i.nombre FROM instituciones i "
+            "JOIN proyecto_institucion pi ON pi.institucion_id = i.id "
+            "WHERE pi.proyecto_id = ? ORDER BY pi.posicion", (proyecto_id,)).fetchall()
+        por_institucion = self.__estadisticas_por_institucion(
+            "b.proyecto_id = ?", (proyecto_id,))
+        return {
+            "nombre_proyecto": nombre_proyecto,
+            "total_instituciones": len(instituciones),
+            "total_beneficiarios": sum(s["total"] for s in por_institucion.values()),
+            "estadisticas_por_institucion": {
+                nombre: por_institucion.get(institucion_id, {"total": 0})
+                for institucion_id, nombre in instituciones
+            }
+        }
+
+    def contar_herramientas(self, nombre_proyecto) -> Dict[str, int]:
+        proyecto_id = self.__id_proyecto(nombre_proyecto)
+        conteo = dict(self.__conexion.execute(
+            "SELECT b.herramienta_tratamiento, COUNT(*) FROM beneficiarios b "
+            "WHERE b.proyecto_id = ? GROUP BY b.herramienta_tratamiento", (proyecto_id,)))
+        # El orden lo define el proyecto, como en memoria
+        return self.crear_proyecto(nombre_proyecto).ordenar_herramientas(conteo)
+
+    def sincronizar(self, gestor: GestorProyectos):
+        """Reemplaza todo el contenido de la base por los datos del gestor, en
+        una sola transacción. Sirve para volver a igualarlos cuando un
+        reflejo quedó a medias"""
+        with self.transaccion():
+            for tabla in ("beneficiarios", "proyecto_institucion", "instituciones", "proyectos"):
+                self.__conexion.execute(f"DELETE FROM {tabla}")
+            self.cargar_gestor(gestor)
+
+    def crear_proyecto(self, nombre: str) -> Proyecto:
+        """Crea el objeto Proyecto (sin instituciones) guardado con ese nombre"""
+        fila = self.__conexion.execute(
+            "SELECT tipo, descripcion, fecha_inicio FROM proyectos WHERE nombre = ?", (nombre,)).fetchone()
+        if fila is None:
+            raise ValueError(f"Proyecto no encontrado: {nombre}")
+        tipo, descripcion, fecha_inicio = fila
+        return TIPOS_PROYECTO[tipo](nombre, descripcion, datetime.fromisoformat(fecha_inicio))
+
+    def cerrar(self):
+        self.__conexion.close()
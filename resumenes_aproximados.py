@@ -0,0 +1,372 @@
+"""Resúmenes aproximados y combinables de los beneficiarios.
+
+Cada institución puede mantener un ResumenAproximado que se actualiza en
+tiempo constante con cada alta o baja y que se combina barato con los de
+otras instituciones para los reportes de Proyecto y GestorProyectos:
+
+- HistogramaEdades: cuantiles de edad (mediana, p90). Las edades son
+  enteros acotados, así que basta un conteo por edad: ocupa menos que un
+  t-digest, admite bajas y los cuantiles son exactos.
+- HyperLogLog: cantidad aproximada de nombres y de enfermedades distintos
+  (error típico de 1.04 / sqrt(2 ** precision), 1.6 % por defecto). Al
+  combinar, un mismo nombre en varias instituciones se cuenta una vez.
+- MasFrecuentes: herramientas y enfermedades más frecuentes con un
+  Count-Min (sobreestima a lo sumo e / ancho * total, con probabilidad
+  1 - e ** -profundidad) y una lista corta de candidatos.
+
+Todos usan la misma huella de 64 bits (blake2b) del texto, que no depende
+de PYTHONHASHSEED: los resúmenes calculados en otro proceso se combinan
+igual. Las bajas se descuentan del histograma y de los Count-Min, pero
+HyperLogLog no admite restar; SeguimientoAproximado recalcula los
+distintos recorriendo la institución la próxima vez que se consultan.
+"""
+import functools
+import math
+from array import array
+from hashlib import blake2b
+from operator import add
+from typing import Dict, Iterable, List, Optional, Tuple
+
+PRECISION_HLL = 12
+ANCHO_CONTEO = 2048
+PROFUNDIDAD_CONTEO = 4
+CANDIDATOS_FRECUENTES = 10
+
+_MASCARA_32 = 0xFFFFFFFF
+
+
+def huella(texto: str) -> int:
+    """Hash de 64 bits estable entre procesos y ejecuciones"""
+    return int.from_bytes(blake2b(texto.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+# Enfermedades y herramientas se repiten mucho; los nombres casi nunca
+_huella_repetida = functools.lru_cache(maxsize=4096)(huella)
+
+
+@functools.lru_cache(maxsize=4096)
+def _posiciones(valor_huella: int, ancho: int, profundidad: int) -> Tuple[int, ...]:
+    """Celda de cada fila de un ConteoMinimo. Doble hashing: la fila i usa
+    h1 + i * h2, con h1 y h2 tomados de una sola huella"""
+    h1 = valor_huella & _MASCARA_32
+    h2 = (valor_huella >> 32) | 1
+    return tuple(fila * ancho + (h1 + fila * h2) % ancho for fila in range(profundidad))
+
+
+class HistogramaEdades:
+    """Cantidad de beneficiarios por edad, para cuantiles exactos"""
+
+    def __init__(self):
+        self.__conteo: Dict[int, int] = {}
+        self.__total = 0
+
+    @property
+    def total(self) -> int:
+        return self.__total
+
+    def agregar(self, edad: int, cantidad: int = 1):
+        restante = self.__conteo.get(edad, 0) + cantidad
+        if restante:
+            self.__conteo[edad] = restante
+        else:
+            del self.__conteo[edad]
+        self.__total += cantidad
+
+    def cuantil(self, q: float) -> Optional[int]:
+        """Edad en la posición q (0 < q <= 1) por rango más cercano; None sin datos"""
+        if self.__total <= 0:
+            return None
+        objetivo = max(1, math.ceil(q * self.__total))
+        acumulado = 0
+        for edad in sorted(self.__conteo):
+            acumulado += self.__conteo[edad]
+            if acumulado >= objetivo:
+                return edad
+        return max(self.__conteo)
+
+    def combinar(self, otro: "HistogramaEdades") -> "HistogramaEdades":
+        for edad, cantidad in otro.__conteo.items():
+            self.agregar(edad, cantidad)
+        return self
+
+    def copiar(self) -> "HistogramaEdades":
+        return HistogramaEdades().combinar(self)
+
+    def a_diccionario(self) -> Dict:
+        if self.__total <= 0:
+            return {}
+        return {
+            "minima": min(self.__conteo),
+            "mediana": self.cuantil(0.5),
+            "p90": self.cuantil(0.9),
+            "maxima": max(self.__conteo),
+        }
+
+
+class HyperLogLog:
+    """Estimador de la cantidad de valores distintos en 2 ** precision bytes"""
+
+    def __init__(self, precision: int = PRECISION_HLL):
+        if not 4 <= precision <= 16:
+            raise ValueError("La precisión de HyperLogLog debe estar entre 4 y 16")
+        self.__precision = precision
+        self.__registros = bytearray(1 << precision)
+
+    @property
+    def precision(self) -> int:
+        return self.__precision
+
+    def agregar(self, texto: str, valor_huella: Optional[int] = None):
+        if valor_huella is None:
+            valor_huella = huella(texto)
+        bits_resto = 64 - self.__precision
+        posicion = valor_huella >> bits_resto
+        resto = valor_huella & ((1 << bits_resto) - 1)
+        # Posición del primer 1 en los bits restantes (contando desde 1)
+        rango = bits_resto - resto.bit_length() + 1
+        if rango > self.__registros[posicion]:
+            self.__registros[posicion] = rango
+
+    def estimar(self) -> int:
+        m = len(self.__registros)
+        alfa = 0.7213 / (1 + 1.079 / m)
+        suma = sum(2.0 ** -registro for registro in self.__registros)
+        estimado = alfa * m * m / suma
+        vacios = self.__registros.count(0)
+        if estimado <= 2.5 * m and vacios:
+            # Corrección para cardinalidades bajas (conteo lineal)
+            estimado = m * math.log(m / vacios)
+        return round(estimado)
+
+    def combinar(self, otro: "HyperLogLog") -> "HyperLogLog":
+        if otro.__precision != self.__precision:
+            raise ValueError("Solo se combinan HyperLogLog de la misma precisión")
+        self.__registros = bytearray(map(max, self.__registros, otro.__registros))
+        return self
+
+    def copiar(self) -> "HyperLogLog":
+        copia = HyperLogLog(self.__precision)
+        copia.__registros = bytearray(self.__registros)
+        return copia
+
+
+class ConteoMinimo:
+    """Count-Min: frecuencia aproximada de cada valor (nunca menor que la
+    real mientras no haya más bajas que altas de un valor)"""
+
+    def __init__(self, ancho: int = ANCHO_CONTEO, profundidad: int = PROFUNDIDAD_CONTEO):
+        self.__ancho = ancho
+        self.__profundidad = profundidad
+        # Las filas van una tras otra en un solo arreglo
+        self.__celdas = array("q", bytes(8 * ancho * profundidad))
+        self.__total = 0
+
+    @property
+    def total(self) -> int:
+        return self.__total
+
+    @property
+    def error_maximo(self) -> int:
+        """Sobreestimación máxima esperada de estimar()"""
+        return math.ceil(math.e / self.__ancho * self.__total)
+
+    def agregar(self, valor_huella: int, cantidad: int = 1) -> int:
+        """Suma `cantidad` al valor y retorna su nueva frecuencia estimada"""
+        celdas = self.__celdas
+        posiciones = _posiciones(valor_huella, self.__ancho, self.__profundidad)
+        for posicion in posiciones:
+            celdas[posicion] += cantidad
+        self.__total += cantidad
+        return min([celdas[posicion] for posicion in posiciones])
+
+    def estimar(self, valor_huella: int) -> int:
+        celdas = self.__celdas
+        return min([celdas[posicion]
+                    for posicion in _posiciones(valor_huella, self.__ancho, self.__profundidad)])
+
+    def combinar(self, otro: "ConteoMinimo") -> "ConteoMinimo":
+        if (otro.__ancho, otro.__profundidad) != (self.__ancho, self.__profundidad):
+            raise ValueError("Solo se combinan Count-Min de las mismas dimensiones")
+        self.__celdas = array("q", map(add, self.__celdas, otro.__celdas))
+        self.__total += otro.__total
+        return self
+
+    def copiar(self) -> "ConteoMinimo":
+        copia = ConteoMinimo(self.__ancho, self.__profundidad)
+        copia.__celdas = array("q", self.__celdas)
+        copia.__total = self.__total
+        return copia
+
+
+class MasFrecuentes:
+    """Valores más frecuentes: un ConteoMinimo más los `capacidad` candidatos
+    con mayor frecuencia estimada"""
+
+    def __init__(self, capacidad: int = CANDIDATOS_FRECUENTES, ancho: int = ANCHO_CONTEO,
+                 profundidad: int = PROFUNDIDAD_CONTEO):
+        self.__capacidad = capacidad
+        self.__conteo = ConteoMinimo(ancho, profundidad)
+        # Candidato -> (huella, última frecuencia estimada)
+        self.__candidatos: Dict[str, Tuple[int, int]] = {}
+        # Candidato de menor frecuencia; None si hay que volver a buscarlo
+        self.__menor: Optional[str] = None
+
+    @property
+    def total(self) -> int:
+        return self.__conteo.total
+
+    @property
+    def error_maximo(self) -> int:
+        return self.__conteo.error_maximo
+
+    def agregar(self, valor: str, cantidad: int = 1, valor_huella: Optional[int] = None):
+        if valor_huella is None:
+            valor_huella = _huella_repetida(valor)
+        estimado = self.__conteo.agregar(valor_huella, cantidad)
+        candidatos = self.__candidatos
+        if valor in candidatos or len(candidatos) < self.__capacidad:
+            if estimado > 0:
+                candidatos[valor] = (valor_huella, estimado)
+            else:
+                candidatos.pop(valor, None)
+            if cantidad < 0 or valor == self.__menor:
+                self.__menor = None
+        elif cantidad > 0:
+            if self.__menor is None:
+                self.__menor = min(candidatos, key=lambda c: candidatos[c][1])
+            if estimado > candidatos[self.__menor][1]:
+                del candidatos[self.__menor]
+                candidatos[valor] = (valor_huella, estimado)
+                self.__menor = None
+
+    def estimar(self, valor: str) -> int:
+        return self.__conteo.estimar(_huella_repetida(valor))
+
+    def mas_frecuentes(self, cantidad: Optional[int] = None) -> List[Tuple[str, int]]:
+        """(valor, frecuencia estimada) de mayor a menor frecuencia"""
+        actuales = [(valor, self.__conteo.estimar(valor_huella))
+                    for valor, (valor_huella, _) in self.__candidatos.items()]
+        actuales = sorted((par for par in actuales if par[1] > 0), key=lambda par: (-par[1], par[0]))
+        return actuales[:cantidad] if cantidad is not None else actuales
+
+    def combinar(self, otro: "MasFrecuentes") -> "MasFrecuentes":
+        self.__conteo.combinar(otro.__conteo)
+        # Los candidatos de ambos lados se vuelven a estimar con el conteo combinado
+        union = {**self.__candidatos, **otro.__candidatos}
+        estimados = sorted(((valor, (valor_huella, self.__conteo.estimar(valor_huella)))
+                            for valor, (valor_huella, _) in union.items()),
+                           key=lambda par: (-par[1][1], par[0]))
+        self.__candidatos = {valor: dato for valor, dato in estimados[:self.__capacidad] if dato[1] > 0}
+        self.__menor = None
+        return self
+
+    def copiar(self) -> "MasFrecuentes":
+        copia = MasFrecuentes(self.__capacidad)
+        copia.__conteo = self.__conteo.copiar()
+        copia.__candidatos = dict(self.__candidatos)
+        copia.__menor = self.__menor
+        return copia
+
+
+class ResumenAproximado:
+    """Resúmenes de edad, distintos y más frecuentes de un grupo de beneficiarios"""
+
+    def __init__(self):
+        self.__edades = HistogramaEdades()
+        self.__nombres = HyperLogLog()
+        self.__enfermedades = HyperLogLog()
+        self.__frecuentes_enfermedad = MasFrecuentes()
+        self.__frecuentes_herramienta = MasFrecuentes()
+
+    @property
+    def total(self) -> int:
+        return self.__edades.total
+
+    @property
+    def edades(self) -> HistogramaEdades:
+        return self.__edades
+
+    def agregar(self, beneficiario, signo: int = 1):
+        """Suma (signo=1) o resta (signo=-1) un beneficiario. Las bajas no
+        afectan a los distintos: ver reconstruir_distintos"""
+        enfermedad = beneficiario.enfermedad
+        huella_enfermedad = _huella_repetida(enfermedad)
+        self.__edades.agregar(beneficiario.edad, signo)
+        self.__frecuentes_enfermedad.agregar(enfermedad, signo, huella_enfermedad)
+        self.__frecuentes_herramienta.agregar(beneficiario.herramienta_tratamiento, signo)
+        if signo > 0:
+            self.__nombres.agregar(beneficiario.nombre)
+            self.__enfermedades.agregar(enfermedad, huella_enfermedad)
+
+    def reconstruir_distintos(self, beneficiarios: Iterable):
+        """Recalcula los HyperLogLog con los beneficiarios actuales"""
+        nombres = HyperLogLog(self.__nombres.precision)
+        enfermedades = HyperLogLog(self.__enfermedades.precision)
+        for beneficiario in beneficiarios:
+            nombres.agregar(beneficiario.nombre)
+            enfermedades.agregar(beneficiario.enfermedad)
+        self.__nombres = nombres
+        self.__enfermedades = enfermedades
+
+    def combinar(self, otro: "ResumenAproximado") -> "ResumenAproximado":
+        self.__edades.combinar(otro.__edades)
+        self.__nombres.combinar(otro.__nombres)
+        self.__enfermedades.combinar(otro.__enfermedades)
+        self.__frecuentes_enfermedad.combinar(otro.__frecuentes_enfermedad)
+        self.__frecuentes_herramienta.combinar(otro.__frecuentes_herramienta)
+        return self
+
+    def copiar(self) -> "ResumenAproximado":
+        copia = ResumenAproximado()
+        copia.__edades = self.__edades.copiar()
+        copia.__nombres = self.__nombres.copiar()
+        copia.__enfermedades = self.__enfermedades.copiar()
+        copia.__frecuentes_enfermedad = self.__frecuentes_enfermedad.copiar()
+        copia.__frecuentes_herramienta = self.__frecuentes_herramienta.copiar()
+        return copia
+
+    def a_diccionario(self, cantidad: int = 5) -> Dict:
+        """Valores del resumen listos para un reporte JSON"""
+        if self.total <= 0:
+            return {"total": 0}
+        return {
+            "total": self.total,
+            "edad": self.__edades.a_diccionario(),
+            "beneficiarios_distintos": self.__nombres.estimar(),
+            "enfermedades_distintas": self.__enfermedades.estimar(),
+            "enfermedades_frecuentes": dict(self.__frecuentes_enfermedad.mas_frecuentes(cantidad)),
+            "herramientas_frecuentes": dict(self.__frecuentes_herramienta.mas_frecuentes(cantidad)),
+            "error_maximo_frecuencias": self.__frecuentes_enfermedad.error_maximo,
+        }
+
+
+class SeguimientoAproximado:
+    """Mantiene el ResumenAproximado de una institución como observador:
+    se calcula una vez con los beneficiarios actuales y desde entonces se
+    actualiza con cada alta y baja (los cambios de respuesta no lo afectan)"""
+
+    def __init__(self, institucion):
+        self.__institucion = institucion
+        self.__resumen = ResumenAproximado()
+        for beneficiario in institucion.iterar_beneficiarios():
+            self.__resumen.agregar(beneficiario)
+        self.__bajas_pendientes = False
+        institucion.agregar_observador(self.__actualizar)
+
+    def __actualizar(self, evento: str, institucion, beneficiario):
+        if evento == "agregado":
+            self.__resumen.agregar(beneficiario)
+        elif evento == "removido":
+            self.__resumen.agregar(beneficiario, -1)
+            self.__bajas_pendientes = True
+
+    def obtener(self) -> ResumenAproximado:
+        """Copia del resumen; si hubo bajas, antes recalcula los distintos"""
+        if self.__bajas_pendientes:
+            self.__resumen.reconstruir_distintos(self.__institucion.iterar_beneficiarios())
+            self.__bajas_pendientes = False
+        return self.__resumen.copiar()
+
+    def detener(self):
+        """Deja de seguir los cambios de la institución"""
+        self.__institucion.remover_observador(self.__actualizar)
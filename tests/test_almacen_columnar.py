@@ -0,0 +1,78 @@
+from datetime import datetime
+
+import pytest
+
+from proyecto_salud import (Beneficiario, EstadisticasParciales, Genero, RespuestaTratamiento,
+                            TipoBeneficiario)
+
+pytest.importorskip("numpy")
+from almacen_columnar import AlmacenColumnar  # noqa: E402
+
+
+def _beneficiario(nombre, edad, herramienta="Taller", respuesta=RespuestaTratamiento.BUENA):
+    return Beneficiario(nombre, TipoBeneficiario.PACIENTE_CUIDADOR, Genero.FEMENINO, edad,
+                        "Ansiedad", herramienta, respuesta, datetime(2024, 3, 1, 9, 30))
+
+
+def _valores(almacen):
+    return [(almacen.tipo(f), almacen.genero(f), almacen.edad(f), almacen.respuesta(f),
+             almacen.herramienta(f)) for f in almacen.filas()]
+
+
+def test_agregar_crece_y_conserva_los_campos():
+    almacen = AlmacenColumnar(capacidad_inicial=2)
+    originales = [_beneficiario(f"Persona {i}", 20 + i, "Coro" if i % 2 else "Taller")
+                  for i in range(9)]
+    assert [almacen.agregar(b) for b in originales] == list(range(9))
+    assert len(almacen) == 9
+    for fila, original in zip(almacen.filas(), originales):
+        vista = almacen.vista(fila)
+        assert (vista.nombre, vista.edad, vista.enfermedad, vista.herramienta_tratamiento,
+                vista.fecha_registro) == (original.nombre, original.edad, original.enfermedad,
+                                          original.herramienta_tratamiento,
+                                          original.fecha_registro)
+
+
+def test_remover_conserva_los_numeros_de_fila():
+    almacen = AlmacenColumnar()
+    for i in range(4):
+        almacen.agregar(_beneficiario(f"Persona {i}", 30 + i))
+    vista = almacen.vista(3)
+    almacen.remover(1)
+    almacen.remover(1)
+    assert len(almacen) == 3
+    assert list(almacen.filas()) == [0, 2, 3]
+    assert almacen.vista(3) is vista
+    assert vista.nombre == "Persona 3"
+
+
+def test_cambio_de_respuesta_avisa_a_observadores():
+    avisos, cambios = [], []
+    almacen = AlmacenColumnar(al_cambiar_respuesta=avisos.append)
+    fila = almacen.agregar(_beneficiario("Ana García", 30))
+    vista = almacen.vista(fila)
+    vista.agregar_observador(lambda v, anterior, nuevo: cambios.append((anterior, nuevo)))
+    vista.respuesta_tratamiento = RespuestaTratamiento.BUENA
+    vista.respuesta_tratamiento = RespuestaTratamiento.MALA
+    assert cambios == [(RespuestaTratamiento.BUENA, RespuestaTratamiento.MALA)]
+    assert avisos == [vista]
+    almacen.remover(fila)
+    vista.respuesta_tratamiento = RespuestaTratamiento.REGULAR
+    assert len(cambios) == 1 and len(avisos) == 1
+
+
+def test_agregaciones_iguales_que_recorrer_las_filas():
+    almacen = AlmacenColumnar(capacidad_inicial=4)
+    assert almacen.obtener_estadisticas() == {"total": 0}
+    respuestas = list(RespuestaTratamiento)
+    for i in range(40):
+        almacen.agregar(_beneficiario(f"Persona {i}", 5 + 2 * i, ("Coro", "Taller", "Danza")[i % 3],
+                                      respuestas[i % len(respuestas)]))
+    for fila in (0, 7, 8, 21):
+        almacen.remover(fila)
+    assert (almacen.obtener_estadisticas()
+            == EstadisticasParciales.desde_valores(_valores(almacen)).a_estadisticas())
+    esperado = {}
+    for *_, herramienta in _valores(almacen):
+        esperado[herramienta] = esperado.get(herramienta, 0) + 1
+    assert almacen.contar_herramientas() == esperado
@@ -0,0 +1,135 @@
+import random
+
+import pytest
+
+from datos_sinteticos import crear_estructura, repartir
+from proyecto_salud import GestorProyectos, Institucion, RespuestaTratamiento
+
+CANTIDAD = 600
+
+
+def _instituciones(gestor):
+    return [institucion for proyecto in gestor.proyectos for institucion in proyecto.instituciones]
+
+
+def _gestor_en_memoria(tmp_path):
+    gestor = crear_estructura(3)
+    for institucion, beneficiario in repartir(gestor, CANTIDAD):
+        institucion.agregar_beneficiario(beneficiario)
+    return gestor
+
+
+def _gestor_columnar(tmp_path):
+    pytest.importorskip("numpy")
+    from almacen_columnar import InstitucionColumnar
+    estructura = crear_estructura(3)
+    gestor = GestorProyectos()
+    for proyecto in estructura.proyectos:
+        nuevo = type(proyecto)(proyecto.nombre, proyecto.descripcion, proyecto.fecha_inicio)
+        for institucion in proyecto.instituciones:
+            nuevo.agregar_institucion(InstitucionColumnar(institucion.nombre, institucion.direccion,
+                                                          institucion.telefono))
+        gestor.agregar_proyecto(nuevo)
+    columnares = dict(zip(map(id, _instituciones(estructura)), _instituciones(gestor)))
+    for institucion, beneficiario in repartir(estructura, CANTIDAD):
+        columnares[id(institucion)].agregar_beneficiario(beneficiario)
+    return gestor
+
+
+def _gestor_binario(tmp_path):
+    from instantanea_binaria import abrir_binaria, guardar_binaria
+    archivo = str(tmp_path / "datos.bin")
+    guardar_binaria(_gestor_en_memoria(tmp_path), archivo)
+    gestor, _ = abrir_binaria(archivo)
+    return gestor
+
+
+BACKENDS = [pytest.param(_gestor_en_memoria, id="memoria"),
+            pytest.param(_gestor_columnar, id="columnar"),
+            pytest.param(_gestor_binario, id="binaria")]
+
+
+def _modificar(gestor):
+    """Las mismas altas, bajas y cambios de respuesta en cualquier backend"""
+    rng = random.Random(7)
+    instituciones = _instituciones(gestor)
+    nombres = sorted({b.nombre for i in instituciones for b in i.iterar_beneficiarios()})
+    for institucion in instituciones[::2]:
+        for nombre in rng.sample(nombres, 30):
+            institucion.remover_beneficiario(nombre)
+    for institucion in instituciones:
+        for nombre in rng.sample(nombres, 20):
+            for beneficiario in institucion.buscar_beneficiarios(nombre)[-1:]:
+                beneficiario.respuesta_tratamiento = rng.choice(list(RespuestaTratamiento))
+    extra = crear_estructura(3)
+    destinos = dict(zip(map(id, _instituciones(extra)), instituciones))
+    for institucion, beneficiario in repartir(extra, 150, semilla=99):
+        destinos[id(institucion)].agregar_beneficiario(beneficiario)
+
+
+def _fila(beneficiario):
+    return (beneficiario.nombre, beneficiario.tipo, beneficiario.genero, beneficiario.edad,
+            beneficiario.enfermedad, beneficiario.herramienta_tratamiento,
+            beneficiario.respuesta_tratamiento, beneficiario.fecha_registro)
+
+
+def _resumen(gestor):
+    reporte = gestor.generar_reporte_consolidado()
+    del reporte["fecha_generacion"]
+    instituciones = [(p.nombre, i) for p in gestor.proyectos for i in p.instituciones]
+    return {
+        "reporte": reporte,
+        "beneficiarios": [(p, i.nombre, _fila(b)) for p, i in instituciones
+                          for b in i.iterar_beneficiarios()],
+        "herramientas": [(p, i.nombre, list(i.contar_herramientas().items())) for p, i in instituciones],
+        "nombres": [(p, i.nombre, sorted(i.iterar_nombres())) for p, i in instituciones],
+    }
+
+
+@pytest.fixture
+def esperado(tmp_path):
+    gestor = _gestor_en_memoria(tmp_path)
+    _modificar(gestor)
+    return gestor
+
+
+@pytest.mark.parametrize("crear_gestor", BACKENDS)
+def test_mismos_resultados_que_en_memoria(tmp_path, crear_gestor, esperado):
+    gestor = crear_gestor(tmp_path)
+    _modificar(gestor)
+    assert _resumen(gestor) == _resumen(esperado)
+
+
+@pytest.mark.parametrize("crear_gestor", BACKENDS)
+def test_busquedas_por_nombre(tmp_path, crear_gestor, esperado):
+    gestor = crear_gestor(tmp_path)
+    _modificar(gestor)
+    nombres = sorted({b.nombre for p in esperado.proyectos for i in p.instituciones
+                      for b in i.iterar_beneficiarios()})
+    for nombre in random.Random(3).sample(nombres, 40):
+        assert ([(p, i, _fila(b)) for p, i, b in gestor.buscar_beneficiario_global(nombre)]
+                == [(p, i, _fila(b)) for p, i, b in esperado.buscar_beneficiario_global(nombre)])
+
+
+@pytest.mark.parametrize("crear_gestor", BACKENDS)
+def test_consultas(tmp_path, crear_gestor, esperado):
+    gestor = crear_gestor(tmp_path)
+    _modificar(gestor)
+    for criterios in ({"edad": (30, 50)},
+                      {"respuesta_tratamiento": RespuestaTratamiento.MALA, "edad": (0, 40)}):
+        assert (sorted((p, i, _fila(b)) for p, i, b in gestor.consultar(**criterios))
+                == sorted((p, i, _fila(b)) for p, i, b in esperado.consultar(**criterios)))
+
+
+@pytest.mark.parametrize("crear_gestor", BACKENDS)
+def test_modo_depuracion_verifica_cada_backend(tmp_path, crear_gestor, monkeypatch):
+    gestor = crear_gestor(tmp_path)
+    _modificar(gestor)
+    institucion = _instituciones(gestor)[0]
+    monkeypatch.setattr(Institucion, "MODO_DEPURACION", True)
+    for otra in _instituciones(gestor):
+        otra.obtener_estadisticas()
+    # Un recuento distinto del memorizado tiene que detectarse en cualquier backend
+    monkeypatch.setattr(institucion, "recalcular_estadisticas", lambda: {"total": -1})
+    with pytest.raises(AssertionError):
+        institucion.obtener_estadisticas()
@@ -0,0 +1,110 @@
+from datetime import datetime
+
+import pytest
+
+from bitacora import Bitacora
+from proyecto_salud import (Beneficiario, Genero, GestorProyectos, Institucion,
+                            ProyectoMusicoterapia, RespuestaTratamiento, TipoBeneficiario)
+
+
+def _institucion_en_memoria(nombre):
+    return Institucion(nombre, "Calle 1", "555-0101")
+
+
+def _institucion_columnar(nombre):
+    pytest.importorskip("numpy")
+    from almacen_columnar import InstitucionColumnar
+    return InstitucionColumnar(nombre, "Calle 1", "555-0101")
+
+
+BACKENDS = [pytest.param(_institucion_en_memoria, id="memoria"),
+            pytest.param(_institucion_columnar, id="columnar")]
+
+
+def _beneficiario(nombre, edad, respuesta=RespuestaTratamiento.REGULAR):
+    return Beneficiario(nombre, TipoBeneficiario.PERSONA_PARTICULAR, Genero.FEMENINO, edad,
+                        "Ansiedad", "Canto", respuesta, datetime(2024, 3, 1, 10, 0))
+
+
+def _gestor(crear_institucion):
+    gestor = GestorProyectos()
+    proyecto = ProyectoMusicoterapia("Melodía Vital", "Prueba", datetime(2024, 1, 1))
+    institucion = crear_institucion("Hospital Central")
+    proyecto.agregar_institucion(institucion)
+    gestor.agregar_proyecto(proyecto)
+    return gestor, institucion
+
+
+def _respuestas(gestor):
+    return [(b.nombre, b.edad, b.respuesta_tratamiento)
+            for proyecto in gestor.proyectos
+            for institucion in proyecto.instituciones
+            for b in institucion.iterar_beneficiarios()]
+
+
+@pytest.mark.parametrize("crear_institucion", BACKENDS)
+def test_cambio_de_respuesta_se_recupera(tmp_path, crear_institucion):
+    gestor, institucion = _gestor(crear_institucion)
+    institucion.agregar_beneficiario(_beneficiario("Ana Pérez", 30))
+    bitacora = Bitacora.iniciar(gestor, str(tmp_path), ventana_commit=0, compactar_cada=None)
+
+    institucion.agregar_beneficiario(_beneficiario("Luis Gómez", 41))
+    institucion.buscar_beneficiario("Ana Pérez").respuesta_tratamiento = RespuestaTratamiento.BUENA
+    institucion.buscar_beneficiario("Luis Gómez").respuesta_tratamiento = RespuestaTratamiento.MALA
+    bitacora.cerrar()
+
+    recuperado, bitacora, _ = Bitacora.recuperar(str(tmp_path), ventana_commit=0)
+    bitacora.cerrar()
+    assert _respuestas(recuperado) == _respuestas(gestor)
+    assert [r for _, _, r in _respuestas(recuperado)] == [RespuestaTratamiento.BUENA,
+                                                          RespuestaTratamiento.MALA]
+
+
+@pytest.mark.parametrize("crear_institucion", BACKENDS)
+def test_cambio_de_respuesta_entre_homonimos(tmp_path, crear_institucion):
+    gestor, institucion = _gestor(crear_institucion)
+    bitacora = Bitacora.iniciar(gestor, str(tmp_path), ventana_commit=0, compactar_cada=None)
+
+    institucion.agregar_beneficiario(_beneficiario("Ana Pérez", 30))
+    institucion.agregar_beneficiario(_beneficiario("Ana Pérez", 52))
+    segunda = institucion.buscar_beneficiarios("Ana Pérez")[1]
+    segunda.respuesta_tratamiento = RespuestaTratamiento.EXCELENTE
+    bitacora.cerrar()
+
+    recuperado, bitacora, _ = Bitacora.recuperar(str(tmp_path), ventana_commit=0)
+    bitacora.cerrar()
+    assert _respuestas(recuperado) == [("Ana Pérez", 30, RespuestaTratamiento.REGULAR),
+                                       ("Ana Pérez", 52, RespuestaTratamiento.EXCELENTE)]
+
+
+@pytest.mark.parametrize("crear_institucion", BACKENDS)
+def test_reproduce_bajas_tras_compactar(tmp_path, crear_institucion):
+    gestor, institucion = _gestor(crear_institucion)
+    bitacora = Bitacora.iniciar(gestor, str(tmp_path), ventana_commit=0, compactar_cada=None)
+    for edad in range(20, 26):
+        institucion.agregar_beneficiario(_beneficiario(f"Persona {edad}", edad))
+    bitacora.compactar()
+    institucion.remover_beneficiario("Persona 22")
+    institucion.buscar_beneficiario("Persona 25").respuesta_tratamiento = RespuestaTratamiento.BUENA
+    bitacora.cerrar()
+
+    recuperado, bitacora, _ = Bitacora.recuperar(str(tmp_path), ventana_commit=0)
+    bitacora.cerrar()
+    assert _respuestas(recuperado) == _respuestas(gestor)
+    assert "Persona 22" not in [nombre for nombre, _, _ in _respuestas(recuperado)]
+
+
+def test_reproduce_proyectos_e_instituciones_nuevos(tmp_path):
+    gestor, _ = _gestor(_institucion_en_memoria)
+    bitacora = Bitacora.iniciar(gestor, str(tmp_path), ventana_commit=0, compactar_cada=None)
+    proyecto = ProyectoMusicoterapia("Sonidos del Alma", "Prueba", datetime(2024, 2, 1))
+    gestor.agregar_proyecto(proyecto)
+    clinica = _institucion_en_memoria("Clínica Norte")
+    proyecto.agregar_institucion(clinica)
+    clinica.agregar_beneficiario(_beneficiario("Eva Ruiz", 25))
+    bitacora.cerrar()
+
+    recuperado, bitacora, _ = Bitacora.recuperar(str(tmp_path), ventana_commit=0)
+    bitacora.cerrar()
+    assert recuperado.listar_proyectos() == ["Melodía Vital", "Sonidos del Alma"]
+    assert _respuestas(recuperado) == _respuestas(gestor)
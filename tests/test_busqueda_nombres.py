@@ -0,0 +1,117 @@
+from datetime import datetime
+
+import pytest
+
+import busqueda_nombres
+from busqueda_nombres import IndiceNombres, normalizar_nombre
+from proyecto_salud import (Beneficiario, Genero, GestorProyectos, Institucion,
+                            ProyectoMusicoterapia, RespuestaTratamiento, TipoBeneficiario)
+
+
+def _indice(*nombres):
+    indice = IndiceNombres()
+    for nombre in nombres:
+        indice.agregar(nombre)
+    return indice
+
+
+def test_normalizar_nombre():
+    assert normalizar_nombre("  María-José  ÑANDÚ ") == "maria jose nandu"
+    assert normalizar_nombre("Straße İnés") == "strasse ines"
+
+
+def test_exacto_sin_tildes_ni_mayusculas():
+    indice = _indice("María Torres", "Maria Torres", "Mario Torres")
+    assert indice.buscar_exacto("MARIA torres") == ["Maria Torres", "María Torres"]
+    assert indice.total_nombres == 3
+
+
+def test_prefijo_por_palabras():
+    indice = _indice("Ana García López", "Ana Gómez", "Juana García", "Luis Garzón")
+    assert indice.buscar_prefijo("ana garc") == ["Ana García López"]
+    assert indice.buscar_prefijo("garc") == ["Ana García López", "Juana García"]
+    assert indice.buscar_prefijo("ana x") == []
+    assert indice.buscar_prefijo("ana garc", limite=0) == []
+
+
+def test_aproximado_con_errores_de_tipeo():
+    indice = _indice("Sofía Rodríguez Torres", "Sofía Ramírez", "Carlos Torres", "Laura Pérez")
+    resultados = indice.buscar_aproximado("Sofai Rodrigez Tores")
+    assert resultados[0][0] == "Sofía Rodríguez Torres"
+    assert [puntaje for _, puntaje in resultados] == sorted((p for _, p in resultados), reverse=True)
+    assert indice.buscar_aproximado("xyz") == []
+
+
+def test_aproximado_empates_en_orden_alfabetico():
+    indice = _indice("Bea Carmona", "Ana Cardona", "Carmona Cardona")
+    assert [n for n, _ in indice.buscar_aproximado("Carona", limite=2)] == ["Ana Cardona", "Bea Carmona"]
+
+
+def test_aproximado_limita_candidatos(monkeypatch):
+    monkeypatch.setattr(busqueda_nombres, "MAX_CANDIDATOS", 5)
+    indice = _indice(*(f"Persona{i:03d} Torres" for i in range(50)))
+    resultados = indice.buscar_aproximado("Torrse", limite=3)
+    assert [n for n, _ in resultados] == ["Persona000 Torres", "Persona001 Torres", "Persona002 Torres"]
+
+
+def test_remover_actualiza_prefijos_y_trigramas():
+    indice = _indice("Zoë Ñandú", "Zoe Nandu", "Ana Pérez")
+    indice.remover("Zoë Ñandú")
+    assert indice.buscar_exacto("zoe nandu") == ["Zoe Nandu"]
+    indice.remover("Zoe Nandu")
+    assert indice.buscar_exacto("zoe nandu") == []
+    assert indice.buscar_prefijo("zo") == []
+    assert indice.buscar_aproximado("Zoe Nandu") == []
+    assert indice.total_palabras == 2
+    indice.agregar("Zoe Nandu")
+    assert indice.buscar_prefijo("nan") == ["Zoe Nandu"]
+
+
+def _beneficiario(nombre):
+    return Beneficiario(nombre, TipoBeneficiario.PERSONA_PARTICULAR, Genero.OTRO, 40,
+                        "Estrés", "Canto", RespuestaTratamiento.BUENA, datetime(2024, 1, 1))
+
+
+def test_gestor_mantiene_el_indice_con_altas_y_bajas():
+    gestor = GestorProyectos()
+    proyecto = ProyectoMusicoterapia("Melodía Vital", "Prueba", datetime(2024, 1, 1))
+    institucion = Institucion("Hospital", "Calle 1", "555")
+    institucion.agregar_beneficiario(_beneficiario("María Torres"))
+    proyecto.agregar_institucion(institucion)
+    gestor.agregar_proyecto(proyecto)
+    institucion.agregar_beneficiario(_beneficiario("Ana García"))
+
+    def encontrados(texto):
+        return [b.nombre for _, _, b in gestor.buscar_beneficiario_global(texto, aproximado=True)]
+
+    assert encontrados("maria torres") == ["María Torres"]
+    assert encontrados("ana garc") == ["Ana García"]
+    institucion.remover_beneficiario("Ana García")
+    assert encontrados("ana garc") == []
+
+
+def test_gestor_busca_en_instituciones_columnares():
+    pytest.importorskip("numpy")
+    from almacen_columnar import InstitucionColumnar
+    gestor = GestorProyectos()
+    proyecto = ProyectoMusicoterapia("Melodía Vital", "Prueba", datetime(2024, 1, 1))
+    institucion = InstitucionColumnar("Hospital", "Calle 1", "555")
+    proyecto.agregar_institucion(institucion)
+    gestor.agregar_proyecto(proyecto)
+    institucion.agregar_beneficiario(_beneficiario("Sofía Rodríguez"))
+    assert [b.nombre for _, _, b in gestor.buscar_beneficiario_global("Sofai Rodrigez", aproximado=True)] \
+        == ["Sofía Rodríguez"]
+
+
+def test_prefijo_prioriza_palabras_completas_y_comienzo():
+    indice = _indice("Adriana Mariana Torres Arias", "María Torresano", "María Torres López",
+                     "Mariana Torres", "Ana María Torres")
+    assert indice.buscar_prefijo("maria torres") == [
+        "María Torres López", "Ana María Torres", "María Torresano", "Mariana Torres",
+        "Adriana Mariana Torres Arias"]
+
+
+def test_prefijo_limita_nombres_y_no_claves():
+    indice = _indice("María Torres", "Maria Torres", "MARÍA TORRES", "María Torrente")
+    assert indice.buscar_prefijo("maria torres", limite=2) == ["MARÍA TORRES", "Maria Torres"]
+    assert len(indice.buscar_prefijo("maria torr", limite=10)) == 4
@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+import comandos
+from bitacora import Bitacora
+from datos_sinteticos import crear_gestor_sintetico, crear_estructura, escribir_filas
+from persistencia import beneficiario_a_registro
+from proyecto_salud import TipoBeneficiario
+
+
+@pytest.fixture
+def datos(tmp_path):
+    directorio = str(tmp_path / "datos")
+    Bitacora.iniciar(crear_gestor_sintetico(500), directorio, ventana_commit=0).cerrar()
+    return directorio
+
+
+def _ejecutar(capsys, *argumentos):
+    codigo = comandos.main(list(argumentos))
+    salida = capsys.readouterr().out
+    return codigo, salida
+
+
+def _sin_fecha(reporte):
+    return {clave: valor for clave, valor in reporte.items() if clave != "fecha_generacion"}
+
+
+def test_lecturas_iguales_que_el_gestor(tmp_path, capsys, datos):
+    gestor = crear_gestor_sintetico(500)
+    musica = gestor.proyectos[0]
+
+    codigo, salida = _ejecutar(capsys, "estadisticas", "--datos", datos, "--proyecto", musica.nombre)
+    assert codigo == 0
+    proyectos = json.loads(salida)["proyectos"]
+    assert [p["nombre_proyecto"] for p in proyectos] == [musica.nombre]
+    assert proyectos[0]["estadisticas_por_institucion"] == {
+        i.nombre: i.obtener_estadisticas() for i in musica.instituciones}
+
+    _, salida = _ejecutar(capsys, "reporte", "--datos", datos, "--compacto")
+    assert _sin_fecha(json.loads(salida)) == json.loads(json.dumps(
+        _sin_fecha(gestor.generar_reporte_consolidado()), default=str))
+
+    _, salida = _ejecutar(capsys, "tablas", "--datos", datos, "--tabla", "tipo,respuesta")
+    assert (json.loads(salida)["proyectos"][0]["tablas_cruzadas"]
+            == musica.obtener_tablas_cruzadas([("tipo", "respuesta")]))
+
+    archivo = str(tmp_path / "reporte.json")
+    _, salida = _ejecutar(capsys, "exportar", "--datos", datos, "--salida", archivo)
+    assert json.loads(salida)["total_beneficiarios"] == 500
+    with open(archivo, encoding="utf-8") as f:
+        assert _sin_fecha(json.load(f))["proyectos"] == json.loads(
+            json.dumps(gestor.generar_reporte_consolidado()["proyectos"], default=str))
+
+
+def test_consultar_por_filtros_y_por_nombre(capsys, datos):
+    gestor = crear_gestor_sintetico(500)
+    _, salida = _ejecutar(capsys, "consultar", "--datos", datos, "--tipo", "paciente_cuidador",
+                          "--edad-min", "30", "--edad-max", "40")
+    filas = [json.loads(linea) for linea in salida.splitlines()]
+    esperadas = [{"proyecto": p, "institucion": i, **beneficiario_a_registro(b)}
+                 for p, i, b in gestor.consultar(tipo=TipoBeneficiario.PACIENTE_CUIDADOR, edad=(30, 40))]
+    assert filas and sorted(filas, key=json.dumps) == sorted(esperadas, key=json.dumps)
+
+    nombre = filas[0]["nombre"]
+    _, salida = _ejecutar(capsys, "consultar", "--datos", datos, "--nombre", nombre.upper(),
+                          "--aproximado", "--formato", "json", "--limite", "1")
+    assert [fila["nombre"] for fila in json.loads(salida)] == [nombre]
+
+
+def test_errores_salen_con_codigo_1(tmp_path, capsys, datos):
+    assert comandos.main(["estadisticas", "--datos", datos, "--proyecto", "Nada"]) == 1
+    assert comandos.main(["consultar", "--datos", datos]) == 1
+    assert comandos.main(["reporte", "--datos", str(tmp_path / "no_existe")]) == 1
+    assert comandos.main(["reporte", "--datos", datos, "--perfilar", "2"]) == 1
+    assert "Error:" in capsys.readouterr().err
+
+
+def test_importar_y_metricas(tmp_path, capsys, datos):
+    archivo = str(tmp_path / "ingreso.jsonl")
+    escribir_filas(archivo, crear_estructura(3), 300, semilla=5)
+    codigo, salida = _ejecutar(capsys, "importar", archivo, "--datos", datos, "--procesos", "1")
+    assert codigo == 0 and json.loads(salida)["aceptadas"] == 300
+
+    metricas = str(tmp_path / "metricas.json")
+    _, salida = _ejecutar(capsys, "estadisticas", "--datos", datos, "--metricas", metricas)
+    assert json.loads(salida)["total_beneficiarios"] == 800
+    with open(metricas, encoding="utf-8") as f:
+        assert json.load(f)["operaciones"]
+
+
+def test_importar_sqlite_fallido_deja_la_base_igual_que_la_bitacora(tmp_path, capsys, datos):
+    base = str(tmp_path / "datos.db")
+    assert _ejecutar(capsys, "sqlite", base, "--datos", datos)[0] == 0
+    archivo = str(tmp_path / "ingreso.csv")
+    # Más de un bloque válido y después bytes que no son UTF-8
+    escribir_filas(archivo, crear_estructura(3), 6000)
+    with open(archivo, "ab") as f:
+        f.write(b"Proyecto Musicoterapia,Instituci\xf3n 1\n")
+
+    codigo, _ = _ejecutar(capsys, "importar", archivo, "--datos", datos, "--sqlite", base,
+                          "--procesos", "1")
+    assert codigo == 1
+    _, desde_bitacora = _ejecutar(capsys, "estadisticas", "--datos", datos, "--compacto")
+    _, desde_sqlite = _ejecutar(capsys, "estadisticas", "--sqlite", base, "--compacto")
+    assert json.loads(desde_bitacora)["total_beneficiarios"] > 500
+    assert desde_sqlite == desde_bitacora
@@ -0,0 +1,88 @@
+import random
+from datetime import datetime
+
+import pytest
+
+from consultas import Filtro
+from proyecto_salud import (Beneficiario, Genero, GestorProyectos, Institucion,
+                            ProyectoArteterapia, ProyectoMusicoterapia, RespuestaTratamiento,
+                            TipoBeneficiario)
+
+ENFERMEDADES = ["Ansiedad", "Depresión", "Insomnio"]
+
+
+@pytest.fixture
+def datos():
+    rng = random.Random(3)
+    gestor = GestorProyectos()
+    compartida = Institucion("Hospital Central", "Calle 1", "555")
+    instituciones = [compartida, Institucion("Clínica Norte", "Calle 2", "556")]
+    musica = ProyectoMusicoterapia("Melodía Vital", "Prueba", datetime(2024, 1, 1))
+    arte = ProyectoArteterapia("Colores", "Prueba", datetime(2024, 1, 1))
+    for institucion in instituciones:
+        musica.agregar_institucion(institucion)
+    arte.agregar_institucion(compartida)
+    gestor.agregar_proyecto(musica)
+    gestor.agregar_proyecto(arte)
+    for i in range(300):
+        rng.choice(instituciones).agregar_beneficiario(Beneficiario(
+            f"Persona {i}", rng.choice(list(TipoBeneficiario)), rng.choice(list(Genero)),
+            rng.randint(5, 95), rng.choice(ENFERMEDADES), "Canto",
+            rng.choice(list(RespuestaTratamiento)), datetime(2024, 2, 1)))
+    return gestor, instituciones, rng
+
+
+def _todas(gestor):
+    return [(p.nombre, i.nombre, b) for p in gestor.proyectos for i in p.instituciones
+            for b in i.iterar_beneficiarios()]
+
+
+def _esperado(gestor, condicion):
+    return sorted(((p, i, b.nombre) for p, i, b in _todas(gestor) if condicion(b)))
+
+
+def _obtenido(gestor, *filtros, **criterios):
+    return sorted((p, i, b.nombre) for p, i, b in gestor.consultar(*filtros, **criterios))
+
+
+def test_rango_de_edad_y_igualdades(datos):
+    gestor, _, _ = datos
+    assert _obtenido(gestor, edad=(30, 50)) == _esperado(gestor, lambda b: 30 <= b.edad <= 50)
+    assert _obtenido(gestor, Filtro.rango("edad", maximo=20)) == _esperado(gestor, lambda b: b.edad <= 20)
+    assert _obtenido(gestor, Filtro.rango("edad", minimo=200)) == []
+    assert _obtenido(gestor, edad=(40, 90), genero=Genero.FEMENINO, enfermedad="ansiedad") == _esperado(
+        gestor, lambda b: 40 <= b.edad <= 90 and b.genero is Genero.FEMENINO and b.enfermedad == "Ansiedad")
+
+
+def test_indices_se_mantienen_con_altas_bajas_y_cambios(datos):
+    gestor, instituciones, rng = datos
+    list(gestor.consultar(edad=(0, 100)))  # crea los índices
+    for i in range(100):
+        institucion = rng.choice(instituciones)
+        accion = rng.random()
+        if accion < 0.4:
+            institucion.agregar_beneficiario(Beneficiario(
+                f"Nueva {i}", TipoBeneficiario.TRABAJADOR_SALUD, Genero.OTRO, rng.randint(20, 60),
+                "Insomnio", "Canto", RespuestaTratamiento.BUENA, datetime(2024, 3, 1)))
+        elif accion < 0.7:
+            beneficiario = next(iter(institucion.iterar_beneficiarios()), None)
+            if beneficiario is not None:
+                institucion.remover_beneficiario(beneficiario.nombre)
+        else:
+            beneficiario = rng.choice(institucion.beneficiarios)
+            beneficiario.respuesta_tratamiento = rng.choice(list(RespuestaTratamiento))
+    assert _obtenido(gestor, edad=(25, 45)) == _esperado(gestor, lambda b: 25 <= b.edad <= 45)
+    assert _obtenido(gestor, respuesta_tratamiento=RespuestaTratamiento.MALA, edad=(0, 60)) == _esperado(
+        gestor, lambda b: b.respuesta_tratamiento is RespuestaTratamiento.MALA and b.edad <= 60)
+    assert _obtenido(gestor) == _esperado(gestor, lambda b: True)
+
+
+def test_sin_filtros_entrega_de_a_uno(datos):
+    gestor, instituciones, _ = datos
+    resultados = gestor.consultar()
+    primero = next(resultados)
+    assert primero[1] == instituciones[0].nombre
+    # Se puede modificar mientras se recorre: lo removido ya no aparece
+    instituciones[0].remover_beneficiario(primero[2].nombre)
+    restantes = list(resultados)
+    assert len(restantes) == len(_todas(gestor))
@@ -0,0 +1,47 @@
+from collections import Counter
+
+from datos_sinteticos import (EDADES, crear_estructura, crear_gestor_sintetico, iterar_filas,
+                              repartir)
+from proyecto_salud import Genero, RespuestaTratamiento, TipoBeneficiario
+
+
+def _filas(gestor):
+    return [(p.nombre, i.nombre, b.nombre, b.tipo, b.genero, b.edad, b.enfermedad,
+             b.herramienta_tratamiento, b.respuesta_tratamiento, b.fecha_registro)
+            for p in gestor.proyectos for i in p.instituciones for b in i.iterar_beneficiarios()]
+
+
+def test_misma_semilla_mismos_datos():
+    assert _filas(crear_gestor_sintetico(500, semilla=7)) == _filas(crear_gestor_sintetico(500, semilla=7))
+    assert _filas(crear_gestor_sintetico(500, semilla=7)) != _filas(crear_gestor_sintetico(500, semilla=8))
+    assert (list(iterar_filas(crear_estructura(2), 300, semilla=5))
+            == list(iterar_filas(crear_estructura(2), 300, semilla=5)))
+
+
+def test_reparto_y_campos_respetan_cada_proyecto():
+    cantidad = 6000
+    gestor = crear_gestor_sintetico(cantidad, instituciones_por_proyecto=3)
+    assert sum(p.obtener_total_beneficiarios() for p in gestor.proyectos) == cantidad
+    for proyecto in gestor.proyectos:
+        totales = [i.total_beneficiarios for i in proyecto.instituciones]
+        assert sum(totales) == cantidad // len(gestor.proyectos)
+        # La primera institución concentra más beneficiarios que las siguientes
+        assert totales == sorted(totales, reverse=True)
+        herramientas = set(proyecto.obtener_herramientas_especificas())
+        for institucion in proyecto.instituciones:
+            for b in institucion.iterar_beneficiarios():
+                assert b.herramienta_tratamiento in herramientas
+                assert b.fecha_registro >= proyecto.fecha_inicio
+                _, _, minima, maxima = EDADES[b.tipo]
+                assert minima <= b.edad <= maxima
+
+
+def test_distribuciones_aproximadas():
+    gestor = crear_estructura()
+    beneficiarios = [b for _, b in repartir(gestor, 20000, semilla=3)]
+    tipos = Counter(b.tipo for b in beneficiarios)
+    generos = Counter(b.genero for b in beneficiarios)
+    respuestas = Counter(b.respuesta_tratamiento for b in beneficiarios)
+    assert 0.55 < tipos[TipoBeneficiario.PACIENTE_CUIDADOR] / len(beneficiarios) < 0.65
+    assert generos[Genero.FEMENINO] > generos[Genero.MASCULINO] > generos[Genero.OTRO]
+    assert respuestas[RespuestaTratamiento.BUENA] > respuestas[RespuestaTratamiento.MALA]
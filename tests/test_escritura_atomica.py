@@ -0,0 +1,64 @@
+import gzip
+import os
+import stat
+
+import pytest
+
+from proyecto_salud import escritura_atomica
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fchmod"), reason="requiere permisos POSIX")
+
+
+def _modo(ruta):
+    return stat.S_IMODE(os.stat(ruta).st_mode)
+
+
+@pytest.fixture
+def umask_022():
+    anterior = os.umask(0o022)
+    yield
+    os.umask(anterior)
+
+
+def test_archivo_nuevo_respeta_umask(tmp_path, umask_022):
+    ruta = tmp_path / "reporte.json"
+    with escritura_atomica(str(ruta)) as f:
+        f.write("{}")
+    assert ruta.read_text(encoding="utf-8") == "{}"
+    assert _modo(ruta) == 0o644
+
+
+def test_conserva_permisos_del_destino(tmp_path, umask_022):
+    ruta = tmp_path / "reporte.json.gz"
+    ruta.write_bytes(b"")
+    os.chmod(ruta, 0o640)
+    with escritura_atomica(str(ruta), comprimir=True) as f:
+        f.write("datos")
+    assert gzip.decompress(ruta.read_bytes()) == "datos".encode("utf-8")
+    assert _modo(ruta) == 0o640
+
+
+def test_error_deja_el_destino_intacto(tmp_path):
+    ruta = tmp_path / "reporte.json"
+    ruta.write_text("anterior", encoding="utf-8")
+    with pytest.raises(RuntimeError):
+        with escritura_atomica(str(ruta)) as f:
+            f.write("nuevo")
+            raise RuntimeError("corte")
+    assert ruta.read_text(encoding="utf-8") == "anterior"
+    assert os.listdir(tmp_path) == ["reporte.json"]
+
+
+def test_sincroniza_el_directorio_despues_de_renombrar(tmp_path, monkeypatch):
+    ruta = tmp_path / "reporte.json"
+    sincronizados = []
+    fsync = os.fsync
+
+    def registrar(descriptor):
+        sincronizados.append((os.path.exists(ruta), stat.S_ISDIR(os.fstat(descriptor).st_mode)))
+        fsync(descriptor)
+
+    monkeypatch.setattr(os, "fsync", registrar)
+    with escritura_atomica(str(ruta)) as f:
+        f.write("{}")
+    assert sincronizados == [(False, False), (True, True)]
@@ -0,0 +1,91 @@
+from datetime import datetime
+
+import pytest
+
+from datos_sinteticos import crear_gestor_sintetico
+from proyecto_salud import (CACHE_REPORTES, Beneficiario, EstadisticasParciales, Genero, Institucion,
+                            RespuestaTratamiento, TipoBeneficiario)
+
+
+def _institucion():
+    institucion = Institucion("Hospital General", "Av. Salud 123", "555-0001")
+    for nombre, edad in (("Ana García", 30), ("Luis Pérez", 41)):
+        institucion.agregar_beneficiario(Beneficiario(
+            nombre, TipoBeneficiario.PACIENTE_CUIDADOR, Genero.FEMENINO, edad, "Ansiedad",
+            "Taller", RespuestaTratamiento.BUENA, datetime(2024, 3, 1)))
+    return institucion
+
+
+def test_estadisticas_se_memorizan_hasta_el_cambio():
+    institucion = _institucion()
+    primera = institucion.obtener_estadisticas()
+    aciertos = CACHE_REPORTES.estadisticas()["aciertos"]
+    assert institucion.obtener_estadisticas() == primera
+    assert CACHE_REPORTES.estadisticas()["aciertos"] == aciertos + 1
+    institucion.remover_beneficiario("Luis Pérez")
+    assert institucion.obtener_estadisticas()["total"] == 1
+
+
+def test_modificar_un_resultado_no_altera_la_cache():
+    institucion = _institucion()
+    estadisticas = institucion.obtener_estadisticas()
+    estadisticas["total"] = 999
+    estadisticas["por_genero"].clear()
+    assert institucion.obtener_estadisticas()["total"] == 2
+    assert institucion.obtener_estadisticas()["por_genero"] == {"femenino": 2}
+
+    gestor = crear_gestor_sintetico(300)
+    reporte = gestor.generar_reporte_consolidado()
+    total = reporte["proyectos"][0]["total_beneficiarios"]
+    reporte["proyectos"][0]["total_beneficiarios"] = -1
+    reporte["proyectos"][0]["estadisticas_por_institucion"].clear()
+    otro = gestor.generar_reporte_consolidado()
+    assert otro["proyectos"][0]["total_beneficiarios"] == total
+    assert otro["proyectos"][0]["estadisticas_por_institucion"]
+
+
+def test_modo_depuracion_verifica_tambien_la_cache(monkeypatch):
+    monkeypatch.setattr(Institucion, "MODO_DEPURACION", True)
+    institucion = _institucion()
+    institucion.obtener_estadisticas()
+    # Un cambio que no pasa por la institución deja la caché desactualizada
+    ana = institucion.buscar_beneficiarios("Ana García")[0]
+    ana._Beneficiario__edad = 90
+    with pytest.raises(AssertionError):
+        institucion.obtener_estadisticas()
+
+
+def test_reporte_consolidado_igual_que_recontar():
+    gestor = crear_gestor_sintetico(3000)
+    reporte = gestor.generar_reporte_consolidado()
+    for proyecto, obtenido in zip(gestor.proyectos, reporte["proyectos"]):
+        recontado = proyecto.reporte_desde_parciales(
+            [(institucion.nombre, EstadisticasParciales.desde_valores(institucion.iterar_valores()))
+             for institucion in proyecto.instituciones])
+        assert obtenido == recontado
+
+
+def test_agregados_siguen_altas_bajas_y_cambios_de_respuesta():
+    institucion = _institucion()
+    institucion.agregar_beneficiario(Beneficiario(
+        "Luis Pérez", TipoBeneficiario.PERSONA_PARTICULAR, Genero.MASCULINO, 70, "Estrés",
+        "Canto", RespuestaTratamiento.MALA, datetime(2024, 4, 1)))
+    ana = institucion.buscar_beneficiario("Ana García")
+    ana.respuesta_tratamiento = RespuestaTratamiento.REGULAR
+    ana.respuesta_tratamiento = RespuestaTratamiento.REGULAR
+    assert institucion.obtener_estadisticas() == institucion.recalcular_estadisticas()
+    assert institucion.obtener_estadisticas()["por_respuesta"] == {
+        "regular": 1, "buena": 1, "mala": 1}
+
+    institucion.remover_beneficiario("Luis Pérez")
+    assert institucion.obtener_estadisticas() == institucion.recalcular_estadisticas()
+    assert institucion.obtener_estadisticas()["edad_promedio"] == 50
+    assert institucion.contar_herramientas() == {"Taller": 1, "Canto": 1}
+
+    # Un beneficiario removido ya no mueve los conteos de la institución
+    ana.respuesta_tratamiento = RespuestaTratamiento.MALA
+    institucion.remover_beneficiario("Ana García")
+    institucion.remover_beneficiario("Luis Pérez")
+    assert institucion.obtener_estadisticas() == institucion.recalcular_estadisticas() == {"total": 0}
+    ana.respuesta_tratamiento = RespuestaTratamiento.BUENA
+    assert institucion.obtener_estadisticas() == {"total": 0}
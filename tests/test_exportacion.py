@@ -0,0 +1,32 @@
+import gzip
+import json
+
+import pytest
+
+from concurrencia import GestorConcurrente
+from proyecto_salud import _fragmentos_json, crear_datos_ejemplo
+
+
+def _sin_fecha(reporte):
+    return {clave: valor for clave, valor in reporte.items() if clave != "fecha_generacion"}
+
+
+@pytest.mark.parametrize("sangria", [None, 2])
+def test_flujo_igual_que_json_dump(sangria):
+    instantanea = GestorConcurrente(crear_datos_ejemplo()).instantanea()
+    separadores = (",", ": ") if sangria is not None else (",", ":")
+    esperado = json.dumps(instantanea.reporte_consolidado(), indent=sangria,
+                          separators=separadores, ensure_ascii=False, default=str)
+    assert "".join(_fragmentos_json(instantanea.iterar_reporte_consolidado(), sangria)) == esperado
+
+
+@pytest.mark.parametrize("comprimir", [False, True])
+@pytest.mark.parametrize("concurrente", [False, True])
+def test_exportar_ida_y_vuelta(tmp_path, comprimir, concurrente):
+    gestor = crear_datos_ejemplo()
+    exportador = GestorConcurrente(gestor) if concurrente else gestor
+    archivo = str(tmp_path / "reporte.json")
+    assert exportador.exportar_datos(archivo, comprimir=comprimir)
+    with (gzip.open if comprimir else open)(archivo, "rt", encoding="utf-8") as f:
+        exportado = json.load(f)
+    assert _sin_fecha(exportado) == _sin_fecha(gestor.generar_reporte_consolidado())
@@ -0,0 +1,57 @@
+import json
+from datetime import datetime
+
+from bitacora import Bitacora
+from datos_sinteticos import crear_estructura, crear_gestor_sintetico, repartir
+from exportacion_incremental import exportar_incremental, leer_manifiesto, reconstruir
+from proyecto_salud import Institucion, RespuestaTratamiento
+
+
+def _normalizar(estado):
+    """Los homónimos con la misma fecha pueden quedar en otro orden"""
+    return {**estado, "beneficiarios": {
+        numero: {clave: sorted(lista, key=json.dumps) for clave, lista in por_clave.items()}
+        for numero, por_clave in estado["beneficiarios"].items()}}
+
+
+def _modificar(gestor, semilla):
+    instituciones = [i for p in gestor.proyectos for i in p.instituciones]
+    for institucion in instituciones[::2]:
+        for nombre in list(institucion.iterar_nombres())[:15]:
+            institucion.remover_beneficiario(nombre)
+    for institucion in instituciones[1::2]:
+        for beneficiario in list(institucion.iterar_beneficiarios())[:20]:
+            beneficiario.respuesta_tratamiento = RespuestaTratamiento.MALA
+    estructura = crear_estructura()
+    destinos = dict(zip(map(id, [i for p in estructura.proyectos for i in p.instituciones]),
+                        instituciones))
+    for institucion, beneficiario in repartir(estructura, 200, semilla=semilla):
+        destinos[id(institucion)].agregar_beneficiario(beneficiario)
+    # Un alta que se da de baja antes de exportar no aparece en el delta
+    efimero = next(iter(instituciones[0].iterar_beneficiarios()))
+    instituciones[0].remover_beneficiario(efimero.nombre)
+    instituciones[0].agregar_beneficiario(efimero)
+
+
+def test_base_mas_deltas_igual_que_base_nueva(tmp_path):
+    datos, incremental, completa = (str(tmp_path / nombre) for nombre in
+                                    ("datos", "incremental", "completa"))
+    gestor = crear_gestor_sintetico(1500)
+    bitacora = Bitacora.iniciar(gestor, datos, ventana_commit=0, compactar_cada=None)
+    assert exportar_incremental(datos, incremental)["tipo"] == "base"
+
+    _modificar(gestor, semilla=11)
+    nueva = Institucion("Clínica Nueva", "Calle 9", "555-0909")
+    gestor.proyectos[1].agregar_institucion(nueva)
+    nueva.agregar_beneficiario(next(iter(gestor.proyectos[1].instituciones[0].iterar_beneficiarios())))
+    assert exportar_incremental(datos, incremental)["tipo"] == "delta"
+    _modificar(gestor, semilla=12)
+    assert exportar_incremental(datos, incremental)["tipo"] == "delta"
+    assert exportar_incremental(datos, incremental)["tipo"] == "sin cambios"
+    bitacora.cerrar()
+
+    exportar_incremental(datos, completa, base=True)
+    assert [a["tipo"] for a in leer_manifiesto(incremental)["archivos"]] == ["base", "delta", "delta"]
+    estado = reconstruir(incremental)
+    assert len(estado["instituciones"]) == 7
+    assert _normalizar(estado) == _normalizar(reconstruir(completa))
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from bitacora import Bitacora
+from datos_sinteticos import crear_estructura, escribir_filas
+from importacion import importar_archivo
+
+
+def _contenido(gestor):
+    return [(p.nombre, i.nombre, [(b.nombre, b.edad, b.herramienta_tratamiento,
+                                   b.respuesta_tratamiento, b.fecha_registro)
+                                  for b in i.iterar_beneficiarios()])
+            for p in gestor.proyectos for i in p.instituciones]
+
+
+@pytest.fixture
+def archivo(tmp_path):
+    archivo = str(tmp_path / "ingreso.csv")
+    escribir_filas(archivo, crear_estructura(3), 2500)
+    with open(archivo, "a", encoding="utf-8") as f:
+        f.write("Proyecto Musicoterapia,Institución 1,Sin Edad,persona_particular,femenino,"
+                "abc,Estrés,Taller,buena,2024-05-01T10:00:00\n")
+        f.write("Proyecto Nuevo,Institución 1,Sin Proyecto,persona_particular,femenino,"
+                "30,Estrés,Taller,buena,2024-05-01T10:00:00\n")
+    return archivo
+
+
+@pytest.mark.parametrize("extension", ["csv", "jsonl"])
+def test_en_paralelo_igual_que_en_serie(tmp_path, extension):
+    archivo = str(tmp_path / f"ingreso.{extension}")
+    escribir_filas(archivo, crear_estructura(3), 2500)
+    serie, paralelo = crear_estructura(3), crear_estructura(3)
+    resumen_serie = importar_archivo(serie, archivo, procesos=1, tamano_bloque=300)
+    resumen_paralelo = importar_archivo(paralelo, archivo, procesos=2, tamano_bloque=300)
+    assert resumen_serie["aceptadas"] == resumen_paralelo["aceptadas"] == 2500
+    assert _contenido(paralelo) == _contenido(serie)
+
+
+def test_rechazos_van_al_archivo_de_errores(tmp_path, archivo):
+    errores = str(tmp_path / "errores.jsonl")
+    resumen = importar_archivo(crear_estructura(3), archivo, errores, procesos=2, tamano_bloque=300)
+    assert (resumen["aceptadas"], resumen["rechazadas"]) == (2500, 2)
+    with open(errores, encoding="utf-8") as f:
+        rechazos = [json.loads(linea) for linea in f]
+    assert len(rechazos) == 2
+
+
+def test_importacion_se_recupera_de_la_bitacora(tmp_path, archivo):
+    directorio = str(tmp_path / "datos")
+    gestor = crear_estructura(3)
+    bitacora = Bitacora.iniciar(gestor, directorio, ventana_commit=0, compactar_cada=None)
+    importar_archivo(gestor, archivo, str(tmp_path / "errores.jsonl"), procesos=1)
+    bitacora.cerrar()
+
+    recuperado, bitacora, _ = Bitacora.recuperar(directorio, ventana_commit=0)
+    bitacora.cerrar()
+    assert _contenido(recuperado) == _contenido(gestor)
+
+
+def test_csv_con_saltos_de_linea_entre_comillas(tmp_path):
+    archivo = str(tmp_path / "ingreso.csv")
+    with open(archivo, "w", encoding="utf-8", newline="") as f:
+        f.write("proyecto,institucion,nombre,tipo,genero,edad,enfermedad,"
+                "herramienta_tratamiento,respuesta_tratamiento,fecha_registro\r\n")
+        f.write('Proyecto Musicoterapia,Institución 1,"Ana ""Anita""\nGarcía",persona_particular,'
+                "femenino,30,Estrés,Taller,buena,2024-05-01T10:00:00\r\n")
+        f.write("\r\n")
+        f.write("Proyecto Musicoterapia,Institución 1,Luis Pérez,persona_particular,"
+                "masculino,200,Estrés,Taller,buena,2024-05-01T10:00:00\r\n")
+    gestor = crear_estructura(3)
+    resumen = importar_archivo(gestor, archivo, str(tmp_path / "errores.jsonl"), procesos=2)
+    assert (resumen["aceptadas"], resumen["rechazadas"]) == (1, 1)
+    institucion = gestor.proyectos[0].instituciones[0]
+    assert [b.nombre for b in institucion.iterar_beneficiarios()] == ['Ana "Anita"\nGarcía']
+    with open(str(tmp_path / "errores.jsonl"), encoding="utf-8") as f:
+        assert json.loads(f.readline())["linea"] == 5
@@ -0,0 +1,52 @@
+from datetime import datetime
+
+from proyecto_salud import (Beneficiario, Genero, GestorProyectos, Institucion, ProyectoArteterapia,
+                            ProyectoMusicoterapia, RespuestaTratamiento, TipoBeneficiario)
+
+
+def _beneficiario(nombre, edad=40):
+    return Beneficiario(nombre, TipoBeneficiario.PERSONA_PARTICULAR, Genero.OTRO, edad,
+                        "Estrés", "Canto", RespuestaTratamiento.BUENA, datetime(2024, 1, 1))
+
+
+def _ubicaciones(gestor, nombre):
+    return [(p, i, b.edad) for p, i, b in gestor.buscar_beneficiario_global(nombre)]
+
+
+def test_institucion_indexa_homonimos_en_orden_de_registro():
+    institucion = Institucion("Hospital", "Calle 1", "555")
+    for nombre, edad in (("Ana García", 30), ("Luis Pérez", 41), ("Ana García", 52)):
+        institucion.agregar_beneficiario(_beneficiario(nombre, edad))
+    assert institucion.buscar_beneficiario("Ana García").edad == 30
+    assert [b.edad for b in institucion.buscar_beneficiarios("Ana García")] == [30, 52]
+
+    assert institucion.remover_beneficiario("Ana García")
+    assert [b.edad for b in institucion.buscar_beneficiarios("Ana García")] == [52]
+    assert institucion.remover_beneficiario("Ana García")
+    assert institucion.buscar_beneficiario("Ana García") is None
+    assert not institucion.remover_beneficiario("Ana García")
+    assert list(institucion.iterar_nombres()) == ["Luis Pérez"]
+    assert [b.nombre for b in institucion.iterar_beneficiarios()] == ["Luis Pérez"]
+
+
+def test_gestor_sigue_altas_y_bajas_en_instituciones_compartidas():
+    compartida = Institucion("Hospital", "Calle 1", "555")
+    compartida.agregar_beneficiario(_beneficiario("Ana García", 30))
+    musica = ProyectoMusicoterapia("Melodía Vital", "Prueba", datetime(2024, 1, 1))
+    arte = ProyectoArteterapia("Colores", "Prueba", datetime(2024, 1, 1))
+    musica.agregar_institucion(compartida)
+    gestor = GestorProyectos()
+    gestor.agregar_proyecto(musica)
+    gestor.agregar_proyecto(arte)
+    # Una institución agregada después de registrar el proyecto también entra al índice
+    arte.agregar_institucion(compartida)
+    otra = Institucion("Clínica", "Calle 2", "556")
+    arte.agregar_institucion(otra)
+    otra.agregar_beneficiario(_beneficiario("Ana García", 61))
+
+    assert _ubicaciones(gestor, "Ana García") == [
+        ("Melodía Vital", "Hospital", 30), ("Colores", "Hospital", 30), ("Colores", "Clínica", 61)]
+    compartida.remover_beneficiario("Ana García")
+    assert _ubicaciones(gestor, "Ana García") == [("Colores", "Clínica", 61)]
+    otra.remover_beneficiario("Ana García")
+    assert _ubicaciones(gestor, "Ana García") == []
@@ -0,0 +1,110 @@
+import json
+import threading
+from datetime import datetime
+
+import pytest
+
+from instrumentacion import (BUS_EVENTOS, INSTRUMENTACION, BusEventos, Instrumentacion,
+                             instrumentado)
+from proyecto_salud import (Beneficiario, Genero, Institucion, RespuestaTratamiento,
+                            TipoBeneficiario)
+
+
+def test_bus_entrega_por_tipo_y_a_los_suscritos_a_todo():
+    bus = BusEventos()
+    todos, altas = [], []
+    assert not bus.escuchado("alta")
+    bus.publicar("alta", nombre="sin suscriptores")
+    bus.suscribir(todos.append)
+    bus.suscribir(altas.append, "alta")
+    bus.suscribir(altas.append, "alta")
+    assert bus.escuchado("baja")
+    bus.publicar("alta", nombre="Ana")
+    bus.publicar("baja", nombre="Luis")
+    assert [e["nombre"] for e in altas] == ["Ana"]
+    assert [(e["evento"], e["nombre"]) for e in todos] == [("alta", "Ana"), ("baja", "Luis")]
+    json.dumps(todos)
+
+    bus.desuscribir(todos.append)
+    assert not bus.escuchado("baja")
+    bus.desuscribir(altas.append, "alta")
+    bus.publicar("alta", nombre="Eva")
+    assert len(altas) == 1 and len(todos) == 2
+
+
+def test_institucion_publica_altas_y_bajas():
+    eventos = []
+    BUS_EVENTOS.suscribir(eventos.append, "beneficiario_agregado", "beneficiario_removido",
+                          "beneficiario_no_encontrado")
+    try:
+        institucion = Institucion("Hospital", "Calle 1", "555")
+        institucion.agregar_beneficiario(Beneficiario(
+            "Ana García", TipoBeneficiario.PACIENTE_CUIDADOR, Genero.FEMENINO, 30, "Ansiedad",
+            "Taller", RespuestaTratamiento.BUENA, datetime(2024, 3, 1)))
+        institucion.remover_beneficiario("Ana García")
+        institucion.remover_beneficiario("Ana García")
+    finally:
+        BUS_EVENTOS.desuscribir(eventos.append, "beneficiario_agregado", "beneficiario_removido",
+                                "beneficiario_no_encontrado")
+    assert [(e["evento"], e["beneficiario"], e["institucion"]) for e in eventos] == [
+        ("beneficiario_agregado", "Ana García", "Hospital"),
+        ("beneficiario_removido", "Ana García", "Hospital"),
+        ("beneficiario_no_encontrado", "Ana García", "Hospital")]
+
+
+def test_cuenta_llamadas_errores_y_percentiles():
+    instrumentacion = Instrumentacion()
+
+    def fallar():
+        raise KeyError("x")
+
+    for _ in range(10):
+        instrumentacion.ejecutar("sumar", sum, ([1, 2],), {})
+    with pytest.raises(KeyError):
+        instrumentacion.ejecutar("fallar", fallar, (), {})
+    operaciones = instrumentacion.resumen()["operaciones"]
+    sumar = operaciones["sumar"]
+    assert (sumar["llamadas"], sumar["medidas"], sumar["errores"]) == (10, 10, 0)
+    assert sum(cantidad for _, cantidad in sumar["histograma"]) == 10
+    assert (sumar["segundos_minimo"] <= sumar["segundos_p50"] <= sumar["segundos_p99"]
+            <= sumar["segundos_maximo"])
+    assert (operaciones["fallar"]["llamadas"], operaciones["fallar"]["errores"]) == (1, 1)
+
+    instrumentacion.configurar(activa=False)
+    instrumentacion.ejecutar("sumar", sum, ([1],), {})
+    assert instrumentacion.resumen()["operaciones"]["sumar"]["llamadas"] == 10
+    instrumentacion.reiniciar()
+    assert instrumentacion.resumen()["operaciones"] == {}
+
+
+def test_muestras_de_perfil_y_memoria():
+    instrumentacion = Instrumentacion()
+    with pytest.raises(ValueError):
+        instrumentacion.configurar(perfil_cada=-1)
+    instrumentacion.configurar(perfil_cada=2, memoria_cada=3)
+    for _ in range(6):
+        instrumentacion.ejecutar("armar", lambda: [0] * 10000, (), {})
+    armar = instrumentacion.resumen()["operaciones"]["armar"]
+    assert armar["llamadas"] == 6
+    # Las llamadas 0, 2, 3 y 4 se muestrean y no se cronometran
+    assert armar["medidas"] == 2
+    assert armar["memoria"]["muestras"] == 2
+    assert armar["memoria"]["pico_maximo_bytes"] >= 80000
+    assert armar["perfil"]
+
+
+def test_instrumentado_suma_los_hilos():
+    @instrumentado
+    def operacion_de_prueba(valor):
+        return valor * 2
+
+    nombre = operacion_de_prueba.__qualname__
+    hilos = [threading.Thread(target=lambda: [operacion_de_prueba(i) for i in range(50)])
+             for _ in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert operacion_de_prueba(3) == 6
+    assert operacion_de_prueba.__name__ == "operacion_de_prueba"
+    assert INSTRUMENTACION.resumen()["operaciones"][nombre]["llamadas"] == 201
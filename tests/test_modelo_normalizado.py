@@ -0,0 +1,112 @@
+from datetime import datetime
+
+import pytest
+
+from modelo_normalizado import ModeloInscripciones
+from proyecto_salud import (Beneficiario, Genero, GestorProyectos, Institucion, ProyectoArteterapia,
+                            ProyectoMusicoterapia, RespuestaTratamiento, TipoBeneficiario,
+                            crear_datos_ejemplo)
+
+
+def _beneficiario(nombre, edad, herramienta="Taller", respuesta=RespuestaTratamiento.BUENA):
+    return Beneficiario(nombre, TipoBeneficiario.PACIENTE_CUIDADOR, Genero.FEMENINO, edad,
+                        "Ansiedad", herramienta, respuesta, datetime(2024, 3, 1))
+
+
+@pytest.fixture
+def modelo():
+    modelo = ModeloInscripciones()
+    modelo.registrar_proyecto(ProyectoMusicoterapia("Melodía Vital", "M", datetime(2024, 1, 1)))
+    modelo.registrar_proyecto(ProyectoArteterapia("Cuadro Clínico", "A", datetime(2024, 1, 1)))
+    modelo.registrar_institucion("Hospital General", "Av. Salud 123", "555-0001")
+    modelo.vincular("Melodía Vital", "Hospital General")
+    modelo.vincular("Cuadro Clínico", "Hospital General")
+    return modelo
+
+
+def test_homonimos_son_personas_distintas(modelo):
+    ana = modelo.registrar_persona("Ana García", TipoBeneficiario.PACIENTE_CUIDADOR, Genero.FEMENINO,
+                                   30, "Ansiedad")
+    otra = modelo.registrar_persona("Ana García", TipoBeneficiario.TRABAJADOR_SALUD, Genero.FEMENINO,
+                                    52, "Estrés laboral")
+    modelo.inscribir("Melodía Vital", "Hospital General", ana, "Taller", RespuestaTratamiento.BUENA)
+    modelo.inscribir("Melodía Vital", "Hospital General", otra, "Taller", RespuestaTratamiento.MALA)
+    assert ana.identificador != otra.identificador
+    assert [p.edad for p in modelo.buscar_personas("Ana García")] == [30, 52]
+    assert len(modelo.buscar_beneficiario_global("Ana García")) == 2
+    reporte = modelo.generar_reporte_consolidado()
+    assert reporte["total_beneficiarios"] == 2
+    assert reporte["proyectos"][0]["total_beneficiarios"] == 2
+    assert modelo.desinscribir("Melodía Vital", "Hospital General", otra)
+    assert modelo.estadisticas_institucion("Melodía Vital", "Hospital General")["total"] == 1
+
+
+def test_una_persona_en_varias_terapias(modelo):
+    persona = modelo.registrar_persona("Luis Díaz", TipoBeneficiario.PERSONA_PARTICULAR,
+                                       Genero.MASCULINO, 40, "Duelo")
+    modelo.inscribir("Melodía Vital", "Hospital General", persona, "Taller", RespuestaTratamiento.BUENA)
+    inscripcion = modelo.inscribir("Cuadro Clínico", "Hospital General", persona, "Pintura",
+                                   RespuestaTratamiento.REGULAR)
+    with pytest.raises(ValueError):
+        modelo.inscribir("Cuadro Clínico", "Hospital General", persona, "Poesía",
+                         RespuestaTratamiento.REGULAR)
+    inscripcion.respuesta_tratamiento = RespuestaTratamiento.EXCELENTE
+    reporte = modelo.generar_reporte_consolidado()
+    assert (reporte["total_beneficiarios"], reporte["total_inscripciones"]) == (1, 2)
+    estadisticas = modelo.estadisticas_institucion("Cuadro Clínico", "Hospital General")
+    assert estadisticas["por_respuesta"]["excelente"] == 1
+    assert sum(estadisticas["por_respuesta"].values()) == 1
+
+
+def test_institucion_con_otros_datos(modelo):
+    assert modelo.registrar_institucion("Hospital General", "Av. Salud 123", "555-0001") \
+        is modelo.instituciones[0]
+    with pytest.raises(ValueError):
+        modelo.registrar_institucion("Hospital General", "Otra dirección", "555-0001")
+
+
+def test_desde_gestor_conserva_homonimos_y_comparte_instituciones():
+    gestor = GestorProyectos()
+    musica = ProyectoMusicoterapia("Melodía Vital", "M", datetime(2024, 1, 1))
+    arte = ProyectoArteterapia("Cuadro Clínico", "A", datetime(2024, 1, 1))
+    compartida = Institucion("Hospital General", "Av. Salud 123", "555-0001")
+    musica.agregar_institucion(compartida)
+    arte.agregar_institucion(compartida)
+    gestor.agregar_proyecto(musica)
+    gestor.agregar_proyecto(arte)
+    compartida.agregar_beneficiario(_beneficiario("Ana García", 30, "Taller"))
+    compartida.agregar_beneficiario(_beneficiario("Ana García", 52, "Taller"))
+    compartida.agregar_beneficiario(_beneficiario("Eva Ruiz", 61, "Pintura"))
+
+    modelo = gestor.a_modelo_inscripciones()
+    assert len(modelo.buscar_personas("Ana García")) == 2
+    assert len(modelo.instituciones) == 1
+    reporte = modelo.generar_reporte_consolidado()
+    # El gestor cuenta a los beneficiarios de la institución compartida en
+    # ambos proyectos; el modelo inscribe a cada uno según su herramienta
+    assert gestor.generar_reporte_consolidado()["total_beneficiarios"] == 6
+    assert (reporte["total_beneficiarios"], reporte["total_inscripciones"]) == (3, 3)
+    assert [p["total_beneficiarios"] for p in reporte["proyectos"]] == [2, 1]
+
+
+def test_a_gestor_ida_y_vuelta(modelo):
+    persona = modelo.registrar_persona("Luis Díaz", TipoBeneficiario.PERSONA_PARTICULAR,
+                                       Genero.MASCULINO, 40, "Duelo", datetime(2024, 3, 1))
+    modelo.inscribir("Cuadro Clínico", "Hospital General", persona, "Pintura", RespuestaTratamiento.BUENA)
+    gestor = modelo.a_gestor()
+    musica, arte = gestor.proyectos
+    assert musica.instituciones[0] is not arte.instituciones[0]
+    assert musica.instituciones[0].total_beneficiarios == 0
+    assert [b.nombre for b in arte.instituciones[0].beneficiarios] == ["Luis Díaz"]
+    assert gestor.a_modelo_inscripciones().generar_reporte_especializado("Cuadro Clínico")["total_beneficiarios"] == 1
+
+
+def test_datos_de_ejemplo():
+    gestor = crear_datos_ejemplo()
+    assert gestor.listar_proyectos() == ["Melodía Vital", "Cuadro Clínico"]
+    hospital = gestor.buscar_proyecto("Melodía Vital").buscar_institucion("Hospital General")
+    assert [b.nombre for b in hospital.beneficiarios] == ["Ana García", "Carlos López", "María Torres"]
+    arte = gestor.buscar_proyecto("Cuadro Clínico")
+    assert [i.nombre for i in arte.instituciones] == ["Hospital General", "Clínica del Valle",
+                                                      "Centro de Rehabilitación"]
+    assert sum(i.total_beneficiarios for i in arte.instituciones) == 0
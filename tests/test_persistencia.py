@@ -0,0 +1,80 @@
+import json
+from datetime import datetime
+
+from datos_sinteticos import crear_gestor_sintetico
+from persistencia import (beneficiario_a_registro, buscar_en_bloque, cargar_instantanea,
+                          cargar_instituciones, guardar_instantanea, leer_indice, parcial_a_registro)
+from proyecto_salud import (Beneficiario, Genero, RespuestaTratamiento, TipoBeneficiario,
+                            crear_datos_ejemplo)
+
+
+def _filas(gestor):
+    return [(p.nombre, i.nombre, [beneficiario_a_registro(b) for b in i.iterar_beneficiarios()])
+            for p in gestor.proyectos for i in p.instituciones]
+
+
+def test_ida_y_vuelta(tmp_path):
+    gestor = crear_gestor_sintetico(2000)
+    archivo = str(tmp_path / "datos.jsonl")
+    guardar_instantanea(gestor, archivo)
+    cargado, resumen = cargar_instantanea(archivo)
+    assert resumen["por_tipo"]["beneficiario"] == 2000
+    assert _filas(cargado) == _filas(gestor)
+
+
+def test_ida_y_vuelta_comprimida(tmp_path):
+    gestor = crear_gestor_sintetico(300)
+    archivo = str(tmp_path / "datos.jsonl.gz")
+    guardar_instantanea(gestor, archivo)
+    assert _filas(cargar_instantanea(archivo)[0]) == _filas(gestor)
+
+
+def test_indice_con_bloques_y_parciales(tmp_path):
+    gestor = crear_gestor_sintetico(2000)
+    archivo = str(tmp_path / "datos.jsonl")
+    guardar_instantanea(gestor, archivo)
+    indice = leer_indice(archivo)
+    instituciones = [i for p in gestor.proyectos for i in p.instituciones]
+    assert [datos["total"] for datos in indice["instituciones"]] == [
+        i.total_beneficiarios for i in instituciones]
+    assert [datos["parcial"] for datos in indice["instituciones"]] == [
+        parcial_a_registro(i.obtener_parcial()) for i in instituciones]
+    cargadas = cargar_instituciones(archivo, indice, [1])
+    assert ([beneficiario_a_registro(b) for b in cargadas[1].iterar_beneficiarios()]
+            == [beneficiario_a_registro(b) for b in instituciones[1].iterar_beneficiarios()])
+
+
+def test_indice_descartado_si_la_instantanea_cambia(tmp_path):
+    archivo = str(tmp_path / "datos.jsonl")
+    guardar_instantanea(crear_datos_ejemplo(), archivo)
+    with open(archivo, "a", encoding="utf-8") as f:
+        f.write("\n")
+    assert leer_indice(archivo) is None
+
+
+def test_buscar_en_bloque_con_homonimos(tmp_path):
+    gestor = crear_datos_ejemplo()
+    hospital = gestor.proyectos[0].instituciones[0]
+    hospital.agregar_beneficiario(Beneficiario(
+        "Ana García", TipoBeneficiario.PACIENTE_CUIDADOR, Genero.FEMENINO, 61, "Ansiedad",
+        "Taller", RespuestaTratamiento.MALA, datetime(2024, 5, 1)))
+    archivo = str(tmp_path / "datos.jsonl")
+    guardar_instantanea(gestor, archivo)
+    encontrados = buscar_en_bloque(archivo, leer_indice(archivo), 0, {"Ana García", "Nadie"})
+    assert [b.edad for b in encontrados["Ana García"]] == [35, 61]
+    assert encontrados["Nadie"] == []
+
+
+def test_buscar_en_bloque_no_depende_del_formato_json(tmp_path):
+    registros = [beneficiario_a_registro(b) for b in
+                 crear_datos_ejemplo().proyectos[0].instituciones[0].iterar_beneficiarios()]
+    archivo = str(tmp_path / "bloque.jsonl")
+    with open(archivo, "w", encoding="utf-8") as f:
+        for registro in registros:
+            # Otro orden de claves, sin espacios y con escapes \u
+            f.write(json.dumps(dict(reversed(list(registro.items()))), separators=(",", ":"),
+                               ensure_ascii=True) + "\n")
+        tamano = f.tell()
+    indice = {"instituciones": [{"bloque": [0, tamano]}]}
+    encontrados = buscar_en_bloque(archivo, indice, 0, {"María Torres"})
+    assert [b.edad for b in encontrados["María Torres"]] == [28]
@@ -0,0 +1,77 @@
+from datetime import datetime
+
+import pytest
+
+from proyecto_salud import (Beneficiario, Genero, GestorProyectos, Institucion, ProyectoArteterapia,
+                            ProyectoMusicoterapia, RespuestaTratamiento, TipoBeneficiario,
+                            crear_datos_ejemplo)
+from repositorio import RepositorioMemoria, RepositorioSQLite
+
+
+def _beneficiario(nombre, edad, herramienta="Taller", respuesta=RespuestaTratamiento.BUENA):
+    return Beneficiario(nombre, TipoBeneficiario.PACIENTE_CUIDADOR, Genero.FEMENINO, edad,
+                        "Ansiedad", herramienta, respuesta, datetime(2024, 3, 1))
+
+
+def _resumen(repositorio):
+    """Todo lo que se puede consultar de un repositorio, para compararlos"""
+    return {
+        nombre: (repositorio.estadisticas_proyecto(nombre), list(repositorio.contar_herramientas(nombre).items()))
+        for nombre in repositorio.listar_proyectos()
+    }
+
+
+def _global(repositorio, nombre):
+    return [(proyecto, institucion, b.edad, b.herramienta_tratamiento, b.respuesta_tratamiento)
+            for proyecto, institucion, b in repositorio.buscar_beneficiario_global(nombre)]
+
+
+@pytest.fixture
+def sqlite(tmp_path):
+    repositorio = RepositorioSQLite(str(tmp_path / "datos.db"))
+    yield repositorio
+    repositorio.cerrar()
+
+
+def test_sqlite_igual_que_memoria(sqlite):
+    gestor = crear_datos_ejemplo()
+    sqlite.cargar_gestor(gestor)
+    memoria = RepositorioMemoria(gestor)
+    assert _resumen(sqlite) == _resumen(memoria)
+    nombre = next(gestor.proyectos[0].instituciones[0].iterar_beneficiarios()).nombre
+    assert _global(sqlite, nombre) == _global(memoria, nombre)
+
+
+@pytest.mark.parametrize("backend", ["memoria", "sqlite"])
+def test_institucion_con_otros_datos_es_error(backend, sqlite):
+    repositorio = sqlite if backend == "sqlite" else RepositorioMemoria()
+    repositorio.agregar_proyecto(ProyectoMusicoterapia("Melodía Vital", "M", datetime(2024, 1, 1)))
+    repositorio.agregar_institucion("Melodía Vital", Institucion("Hospital General", "Av. Salud 123", "555-0001"))
+    # Los mismos datos no son un conflicto
+    repositorio.agregar_institucion("Melodía Vital", Institucion("Hospital General", "Av. Salud 123", "555-0001"))
+    with pytest.raises(ValueError):
+        repositorio.agregar_institucion("Melodía Vital", Institucion("Hospital General", "Otra 1", "555-0001"))
+    assert repositorio.estadisticas_proyecto("Melodía Vital")["total_instituciones"] == 1
+
+
+def test_reflejar_lleva_los_cambios(sqlite):
+    gestor = GestorProyectos()
+    gestor.agregar_proyecto(ProyectoArteterapia("Cuadro Clínico", "A", datetime(2024, 1, 1)))
+    detener = sqlite.reflejar(gestor)
+    musica = ProyectoMusicoterapia("Melodía Vital", "M", datetime(2024, 1, 1))
+    gestor.agregar_proyecto(musica)
+    hospital = Institucion("Hospital General", "Av. Salud 123", "555-0001")
+    musica.agregar_institucion(hospital)
+    gestor.buscar_proyecto("Cuadro Clínico").agregar_institucion(hospital)
+    hospital.agregar_beneficiario(_beneficiario("Ana García", 30))
+    hospital.agregar_beneficiario(_beneficiario("Ana García", 52, "Pintura"))
+    hospital.agregar_beneficiario(_beneficiario("Luis Pérez", 41, "Poesía"))
+    hospital.remover_beneficiario("Luis Pérez")
+    # Cambia la segunda homónima, no la primera
+    hospital.buscar_beneficiarios("Ana García")[1].respuesta_tratamiento = RespuestaTratamiento.MALA
+    assert _resumen(sqlite) == _resumen(RepositorioMemoria(gestor))
+    assert _global(sqlite, "Ana García") == _global(RepositorioMemoria(gestor), "Ana García")
+
+    detener()
+    hospital.agregar_beneficiario(_beneficiario("Eva Ruiz", 25))
+    assert sqlite.buscar_beneficiario_global("Eva Ruiz") == []
@@ -0,0 +1,100 @@
+import random
+from collections import Counter
+
+import pytest
+
+from datos_sinteticos import crear_gestor_sintetico
+from resumenes_aproximados import (ConteoMinimo, HistogramaEdades, HyperLogLog, MasFrecuentes,
+                                   huella)
+
+
+def test_hyperloglog_dentro_del_error_y_combinable():
+    a, b = HyperLogLog(), HyperLogLog()
+    for i in range(30000):
+        a.agregar(f"persona {i}")
+    for i in range(20000, 50000):
+        b.agregar(f"persona {i}")
+    # Error típico 1.6 %: 5 % deja margen de sobra
+    assert abs(a.estimar() - 30000) < 0.05 * 30000
+    combinado = a.copiar().combinar(b)
+    assert abs(combinado.estimar() - 50000) < 0.05 * 50000
+    assert a.estimar() < combinado.estimar()
+    # Repetir valores no cambia la estimación; con pocos valores es casi exacta
+    pocos = HyperLogLog()
+    for _ in range(3):
+        for i in range(100):
+            pocos.agregar(f"enfermedad {i}")
+    assert abs(pocos.estimar() - 100) <= 2
+    with pytest.raises(ValueError):
+        a.combinar(HyperLogLog(10))
+
+
+def test_conteo_minimo_nunca_subestima():
+    rng = random.Random(1)
+    valores = [f"valor {int(rng.paretovariate(1.2))}" for _ in range(20000)]
+    reales = Counter(valores)
+    mitad = len(valores) // 2
+    a, b = ConteoMinimo(ancho=256), ConteoMinimo(ancho=256)
+    for valor in valores[:mitad]:
+        a.agregar(huella(valor))
+    for valor in valores[mitad:]:
+        b.agregar(huella(valor))
+    a.combinar(b)
+    assert a.total == len(valores)
+    for valor, real in reales.items():
+        assert real <= a.estimar(huella(valor)) <= real + 4 * a.error_maximo
+    a.agregar(huella("valor 1"), -reales["valor 1"])
+    assert 0 <= a.estimar(huella("valor 1")) <= 4 * a.error_maximo
+    with pytest.raises(ValueError):
+        a.combinar(ConteoMinimo(ancho=128))
+
+
+def test_mas_frecuentes_combinados_igual_que_juntos():
+    gestor = crear_gestor_sintetico(4000)
+    instituciones = [i for p in gestor.proyectos for i in p.instituciones]
+    total = MasFrecuentes()
+    reales = Counter()
+    partes = []
+    for institucion in instituciones:
+        parte = MasFrecuentes()
+        for b in institucion.iterar_beneficiarios():
+            parte.agregar(b.enfermedad)
+            total.agregar(b.enfermedad)
+            reales[b.enfermedad] += 1
+        partes.append(parte)
+    combinado = partes[0].copiar()
+    for parte in partes[1:]:
+        combinado.combinar(parte)
+    esperados = [valor for valor, _ in reales.most_common(3)]
+    assert [valor for valor, _ in combinado.mas_frecuentes(3)] == esperados
+    assert [valor for valor, _ in total.mas_frecuentes(3)] == esperados
+    for valor, estimado in combinado.mas_frecuentes():
+        assert reales[valor] <= estimado <= reales[valor] + combinado.error_maximo
+
+
+def test_histograma_cuantiles_y_bajas():
+    histograma = HistogramaEdades()
+    for edad in range(1, 101):
+        histograma.agregar(edad)
+    assert (histograma.cuantil(0.5), histograma.cuantil(0.9)) == (50, 90)
+    for edad in range(51, 101):
+        histograma.agregar(edad, -1)
+    assert histograma.a_diccionario() == {"minima": 1, "mediana": 25, "p90": 45, "maxima": 50}
+
+
+def test_resumen_de_proyecto_combina_instituciones():
+    gestor = crear_gestor_sintetico(3000)
+    proyecto = gestor.proyectos[0]
+    institucion = proyecto.instituciones[0]
+    # El resumen se sigue desde la primera consulta y descuenta las bajas posteriores
+    antes = institucion.obtener_resumen_aproximado()
+    for nombre in list(institucion.iterar_nombres())[:100]:
+        institucion.remover_beneficiario(nombre)
+    beneficiarios = [b for i in proyecto.instituciones for b in i.iterar_beneficiarios()]
+    resumen = proyecto.obtener_resumen_aproximado().a_diccionario()
+    assert resumen["total"] == len(beneficiarios)
+    edades = sorted(b.edad for b in beneficiarios)
+    assert resumen["edad"]["mediana"] == edades[(len(edades) + 1) // 2 - 1]
+    distintos = len({b.nombre for b in beneficiarios})
+    assert abs(resumen["beneficiarios_distintos"] - distintos) < 0.05 * distintos
+    assert antes.total - institucion.obtener_resumen_aproximado().total == 100
@@ -0,0 +1,74 @@
+from collections import Counter
+from datetime import date, datetime
+
+import pytest
+
+from datos_sinteticos import crear_gestor_sintetico
+from proyecto_salud import (PERIODOS, Beneficiario, Genero, Institucion, RespuestaTratamiento,
+                            TipoBeneficiario, inicio_periodo)
+
+
+def _recontar(beneficiarios, periodo, desde, hasta):
+    """Conteos por período recorriendo los beneficiarios, sin completar ceros"""
+    conteo = Counter()
+    for b in beneficiarios:
+        inicio = inicio_periodo(b.fecha_registro, periodo)
+        if inicio_periodo(desde, periodo) <= inicio <= inicio_periodo(hasta, periodo):
+            conteo[inicio.isoformat(), b.respuesta_tratamiento.value] += 1
+    return conteo
+
+
+def _contar(filas):
+    return Counter({(fila["periodo"], respuesta): cantidad for fila in filas
+                    for respuesta, cantidad in fila["por_respuesta"].items() if cantidad})
+
+
+def test_inicio_periodo():
+    jueves = datetime(2024, 2, 29, 15, 0)
+    assert inicio_periodo(jueves, "dia") == date(2024, 2, 29)
+    assert inicio_periodo(jueves, "semana") == date(2024, 2, 26)
+    assert inicio_periodo(jueves, "mes") == date(2024, 2, 1)
+    with pytest.raises(ValueError):
+        inicio_periodo(jueves, "trimestre")
+
+
+@pytest.mark.parametrize("periodo", PERIODOS)
+def test_series_iguales_que_recontar(periodo):
+    gestor = crear_gestor_sintetico(3000)
+    proyecto = gestor.proyectos[0]
+    beneficiarios = [b for i in proyecto.instituciones for b in i.iterar_beneficiarios()]
+    # Cambios de respuesta y bajas después de registrar
+    for b in beneficiarios[::7]:
+        b.respuesta_tratamiento = RespuestaTratamiento.MALA
+    institucion = proyecto.instituciones[0]
+    for nombre in list(institucion.iterar_nombres())[:50]:
+        institucion.remover_beneficiario(nombre)
+    beneficiarios = [b for i in proyecto.instituciones for b in i.iterar_beneficiarios()]
+
+    desde, hasta = datetime(2024, 3, 15), datetime(2024, 11, 2)
+    filas = proyecto.consultar_series(periodo, desde, hasta)
+    assert _contar(filas) == _recontar(beneficiarios, periodo, desde, hasta)
+    # Períodos consecutivos, también los que no tienen ingresos
+    assert filas[0]["periodo"] == inicio_periodo(desde, periodo).isoformat()
+    assert filas[-1]["periodo"] == inicio_periodo(hasta, periodo).isoformat()
+    assert all(f["ingresos"] == sum(f["por_respuesta"].values()) for f in filas)
+
+    # Sin `desde`, el proyecto empieza en su fecha de inicio
+    completas = proyecto.consultar_series(periodo)
+    assert completas[0]["periodo"] == inicio_periodo(proyecto.fecha_inicio, periodo).isoformat()
+    assert sum(f["ingresos"] for f in completas) == len(beneficiarios)
+
+
+def test_periodos_sin_ingresos_aparecen_con_ceros():
+    institucion = Institucion("Hospital", "Calle 1", "555")
+    for fecha in (datetime(2024, 1, 10), datetime(2024, 4, 2)):
+        institucion.agregar_beneficiario(Beneficiario(
+            "Ana García", TipoBeneficiario.PACIENTE_CUIDADOR, Genero.FEMENINO, 30, "Ansiedad",
+            "Taller", RespuestaTratamiento.BUENA, fecha))
+    filas = institucion.consultar_series("mes")
+    assert [(f["periodo"], f["ingresos"]) for f in filas] == [
+        ("2024-01-01", 1), ("2024-02-01", 0), ("2024-03-01", 0), ("2024-04-01", 1)]
+    institucion.remover_beneficiario("Ana García")
+    institucion.remover_beneficiario("Ana García")
+    assert institucion.consultar_series("mes") == []
+    assert institucion.obtener_series().cubetas("dia") == {}
@@ -0,0 +1,45 @@
+import pytest
+
+from datos_sinteticos import crear_gestor_sintetico
+from proyecto_salud import FRANJAS_EDAD, EstadisticasParciales, franja_edad
+
+COMBINACIONES = [("herramienta", "respuesta"), ("tipo", "genero", "franja_edad"), ("respuesta",),
+                 ("franja_edad", "herramienta", "tipo", "genero", "respuesta")]
+
+
+def _valor(beneficiario, dimension):
+    return {"tipo": beneficiario.tipo.value, "genero": beneficiario.genero.value,
+            "respuesta": beneficiario.respuesta_tratamiento.value,
+            "franja_edad": FRANJAS_EDAD[franja_edad(beneficiario.edad)],
+            "herramienta": beneficiario.herramienta_tratamiento}[dimension]
+
+
+def _tabla_recorriendo(beneficiarios, combinacion):
+    tabla = {}
+    for beneficiario in beneficiarios:
+        nivel = tabla
+        for dimension in combinacion[:-1]:
+            nivel = nivel.setdefault(_valor(beneficiario, dimension), {})
+        ultimo = _valor(beneficiario, combinacion[-1])
+        nivel[ultimo] = nivel.get(ultimo, 0) + 1
+    return tabla
+
+
+def test_tablas_iguales_que_recorrer_los_beneficiarios():
+    gestor = crear_gestor_sintetico(4000)
+    for proyecto in gestor.proyectos:
+        beneficiarios = [b for i in proyecto.instituciones for b in i.iterar_beneficiarios()]
+        tablas = proyecto.obtener_tablas_cruzadas(COMBINACIONES)
+        assert list(tablas) == ["_x_".join(c) for c in COMBINACIONES]
+        for combinacion in COMBINACIONES:
+            assert tablas["_x_".join(combinacion)] == _tabla_recorriendo(beneficiarios, combinacion)
+
+
+def test_orden_de_las_dimensiones_y_dimension_invalida():
+    gestor = crear_gestor_sintetico(500)
+    tabla = gestor.proyectos[0].obtener_tablas_cruzadas([("franja_edad", "respuesta")])
+    franjas = list(tabla["franja_edad_x_respuesta"])
+    assert franjas == [f for f in FRANJAS_EDAD if f in franjas]
+    with pytest.raises(ValueError):
+        EstadisticasParciales().tablas_cruzadas([("tipo", "ciudad")])
+    assert EstadisticasParciales().tablas_cruzadas([("tipo",)]) == {"tipo": {}}